@@ -0,0 +1,331 @@
+"""Admission control and load shedding by endpoint class.
+
+Requests are classified by path into endpoint classes, in priority order:
+
+- fraud: /fraud/... (on the checkout path)
+- recommendations: /recommendations/...
+- analytics: /forecast/..., /price-optimize/..., /chat/..., /reviews/...
+
+Each class may have at most ADMISSION_<CLASS>_CONCURRENCY requests in
+flight, and all classes together at most ADMISSION_MAX_CONCURRENCY.
+Requests over the limit wait in a bounded per-class queue
+(ADMISSION_<CLASS>_QUEUE) for up to ADMISSION_<CLASS>_MAX_WAIT_MS. A
+freed slot goes to the waiting request of the highest-priority class
+that is under its own limit, so a burst of forecasts or chat queries
+cannot starve fraud scoring. Other paths (health, metrics, debug) are
+not limited.
+
+A client can send its remaining time budget in the X-Request-Timeout-Ms
+header. A request does not wait in the queue past that deadline, and
+handlers can read what is left of it with `remaining()`.
+
+A request that cannot be admitted (queue full, waited too long, deadline
+passed) is shed with 503 and Retry-After. Routes registered with
+`allow_degraded` instead run with `degraded()` returning the reason,
+and serve a cheaper answer such as a moving-average forecast or a
+rules-only fraud score. These responses carry an X-Degraded header.
+Degraded requests of all classes share ADMISSION_DEGRADED_CONCURRENCY
+slots of their own and do not wait for one: beyond it they are shed
+too, with reason degraded_full.
+
+Limits apply per worker process. Outcomes are counted in
+ml_admission_requests_total{class,result}.
+"""
+import asyncio
+import contextvars
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from .config import settings
+from .metrics import registry
+
+TIMEOUT_HEADER = "x-request-timeout-ms"
+DEGRADED_HEADER = "X-Degraded"
+
+admission_requests = registry.counter(
+    "ml_admission_requests_total",
+    "Requests by endpoint class and admission result (admitted, queued, degraded, rejected)",
+    labels=("class", "result")
+)
+admission_wait_seconds = registry.histogram(
+    "ml_admission_wait_seconds", "Time admitted requests waited in the queue, by endpoint class",
+    labels=("class",)
+)
+admission_in_flight = registry.gauge(
+    "ml_admission_in_flight", "Requests being handled by endpoint class",
+    labels=("class",)
+)
+admission_queued = registry.gauge(
+    "ml_admission_queued", "Requests waiting for admission by endpoint class",
+    labels=("class",)
+)
+
+
+class Rejected(Exception):
+    """A request could not be admitted; `reason` is queue_full, timeout or deadline."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class EndpointClass:
+    """Requests sharing a concurrency limit and queue."""
+    name: str
+    priority: int  # lower is served first
+    prefixes: Tuple[str, ...]
+    concurrency: int
+    queue: int
+    max_wait: float  # seconds
+    in_flight: int = 0
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+
+@dataclass
+class Admission:
+    """How the current request was admitted."""
+    endpoint_class: str
+    deadline: Optional[float]  # time.monotonic()
+    degraded: Optional[str] = None
+
+
+_current: contextvars.ContextVar[Optional[Admission]] = contextvars.ContextVar("admission", default=None)
+
+
+def degraded() -> Optional[str]:
+    """Why the current request runs degraded (queue_full, timeout, deadline), or None."""
+    admission = _current.get()
+    return admission.degraded if admission is not None else None
+
+
+def remaining() -> Optional[float]:
+    """Seconds left of the current request's X-Request-Timeout-Ms budget, or None."""
+    admission = _current.get()
+    if admission is None or admission.deadline is None:
+        return None
+    return admission.deadline - time.monotonic()
+
+
+class AdmissionController:
+    """Concurrency limits and priority queues of the endpoint classes of one process."""
+
+    def __init__(self, classes: List[EndpointClass], max_concurrency: int, degraded_concurrency: int = 4):
+        """
+        Args:
+            classes: Endpoint classes; a path belongs to the first class with a matching prefix
+            max_concurrency: Requests in flight across all classes
+            degraded_concurrency: Degraded requests in flight across all classes
+        """
+        self.classes = sorted(classes, key=lambda c: c.priority)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.degraded_concurrency = degraded_concurrency
+        self.degraded_in_flight = 0
+        self._degraded_routes: List[Tuple[str, re.Pattern]] = []
+
+    @classmethod
+    def from_settings(cls) -> 'AdmissionController':
+        def endpoint_class(name: str, priority: int, prefixes: Tuple[str, ...]) -> EndpointClass:
+            return EndpointClass(
+                name, priority, prefixes,
+                concurrency=getattr(settings, f"admission_{name}_concurrency"),
+                queue=getattr(settings, f"admission_{name}_queue"),
+                max_wait=getattr(settings, f"admission_{name}_max_wait_ms") / 1000,
+            )
+
+        controller = cls([
+            endpoint_class("fraud", 0, ("/fraud/",)),
+            endpoint_class("recommendations", 1, ("/recommendations/",)),
+            endpoint_class("analytics", 2, ("/forecast/", "/price-optimize/", "/chat/", "/reviews/")),
+        ], settings.admission_max_concurrency, settings.admission_degraded_concurrency)
+        for c in controller.classes:
+            admission_in_flight.set_function(lambda c=c: c.in_flight, **{"class": c.name})
+            admission_queued.set_function(lambda c=c: len(c.waiters), **{"class": c.name})
+        return controller
+
+    def classify(self, path: str) -> Optional[EndpointClass]:
+        for endpoint_class in self.classes:
+            if path.startswith(endpoint_class.prefixes):
+                return endpoint_class
+        return None
+
+    def allow_degraded(self, method: str, path: str):
+        """
+        Serve requests to a route degraded instead of rejecting them.
+
+        Args:
+            method: HTTP method
+            path: Route path template, e.g. /forecast/product/{product_id}
+        """
+        pattern = re.compile("^" + re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(path)) + "$")
+        self._degraded_routes.append((method.upper(), pattern))
+
+    def degradable(self, method: str, path: str) -> bool:
+        return any(method == m and pattern.match(path) for m, pattern in self._degraded_routes)
+
+    def _can_start(self, endpoint_class: EndpointClass) -> bool:
+        return endpoint_class.in_flight < endpoint_class.concurrency and self.in_flight < self.max_concurrency
+
+    def _start(self, endpoint_class: EndpointClass):
+        endpoint_class.in_flight += 1
+        self.in_flight += 1
+
+    async def acquire(self, endpoint_class: EndpointClass, deadline: Optional[float] = None) -> float:
+        """
+        Wait for a slot of the class.
+
+        Args:
+            endpoint_class: Class of the request
+            deadline: time.monotonic() after which the request is not worth serving
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            Rejected: If the queue is full, or no slot freed up within the
+                class's max wait or before the deadline
+        """
+        if deadline is not None and deadline <= time.monotonic():
+            raise Rejected("deadline")
+        if self._can_start(endpoint_class):
+            self._start(endpoint_class)
+            return 0.0
+        if len(endpoint_class.waiters) >= endpoint_class.queue:
+            raise Rejected("queue_full")
+        timeout, reason = endpoint_class.max_wait, "timeout"
+        if deadline is not None and deadline - time.monotonic() < timeout:
+            timeout, reason = deadline - time.monotonic(), "deadline"
+        if timeout <= 0:
+            raise Rejected(reason)
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        endpoint_class.waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait ended; hand the slot on
+                self.release(endpoint_class)
+            elif future in endpoint_class.waiters:
+                endpoint_class.waiters.remove(future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise Rejected(reason) from None
+        return time.monotonic() - start
+
+    def release(self, endpoint_class: EndpointClass):
+        """Free a slot and grant freed slots to waiters, highest priority first."""
+        endpoint_class.in_flight -= 1
+        self.in_flight -= 1
+        for waiting_class in self.classes:
+            while waiting_class.waiters and self._can_start(waiting_class):
+                future = waiting_class.waiters.popleft()
+                if not future.done():
+                    self._start(waiting_class)
+                    future.set_result(None)
+
+    def try_acquire_degraded(self) -> bool:
+        """Take a degraded slot if one is free (degraded requests never wait)."""
+        if self.degraded_in_flight >= self.degraded_concurrency:
+            return False
+        self.degraded_in_flight += 1
+        return True
+
+    def release_degraded(self):
+        self.degraded_in_flight -= 1
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        return {
+            c.name: {"in_flight": c.in_flight, "queued": len(c.waiters), "concurrency": c.concurrency,
+                     "queue": c.queue, "max_wait_ms": int(c.max_wait * 1000)}
+            for c in self.classes
+        }
+
+
+# The service's controller, used by AdmissionMiddleware unless given another
+admission_controller = AdmissionController.from_settings()
+
+
+def allow_degraded(method: str, path: str):
+    """Register a route of the service as able to serve degraded responses (see module docstring)."""
+    admission_controller.allow_degraded(method, path)
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """time.monotonic() deadline of an X-Request-Timeout-Ms value (None if absent or invalid)."""
+    if not value:
+        return None
+    try:
+        return time.monotonic() + float(value) / 1000
+    except ValueError:
+        return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting, queueing, degrading or shedding requests."""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller if controller is not None else admission_controller
+
+    async def __call__(self, scope, receive, send):
+        endpoint_class = self.controller.classify(scope["path"]) if scope["type"] == "http" else None
+        if endpoint_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        timeout = headers.get(TIMEOUT_HEADER.encode("latin-1"))
+        admission = Admission(endpoint_class.name, parse_deadline(timeout.decode("latin-1") if timeout else None))
+        controller = self.controller
+        try:
+            waited = await controller.acquire(endpoint_class, admission.deadline)
+        except Rejected as e:
+            reason = e.reason
+            if controller.degradable(scope["method"], scope["path"]):
+                if controller.try_acquire_degraded():
+                    admission_requests.inc(**{"class": endpoint_class.name, "result": "degraded"})
+                    admission.degraded = reason
+                    try:
+                        await self._run(admission, scope, receive, send)
+                    finally:
+                        controller.release_degraded()
+                    return
+                reason = "degraded_full"
+            admission_requests.inc(**{"class": endpoint_class.name, "result": "rejected"})
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": f"Service overloaded ({endpoint_class.name}: {reason}), retry later",
+                         "reason": reason},
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        admission_requests.inc(**{"class": endpoint_class.name, "result": "queued" if waited else "admitted"})
+        admission_wait_seconds.observe(waited, **{"class": endpoint_class.name})
+        try:
+            await self._run(admission, scope, receive, send)
+        finally:
+            controller.release(endpoint_class)
+
+    async def _run(self, admission: Admission, scope, receive, send):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and admission.degraded:
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (DEGRADED_HEADER.lower().encode("latin-1"), admission.degraded.encode("latin-1"))
+                ])
+            await send(message)
+
+        token = _current.set(admission)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
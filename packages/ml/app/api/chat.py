@@ -3,13 +3,14 @@ from fastapi import APIRouter, HTTPException, Body
 import numpy as np
 # Delay importing heavy NLP libraries until they are needed to avoid
 # long import times or environment issues during service startup.
-import faiss
 import joblib
 from typing import List, Dict, Any
 import json
 
 from ..db import db
+from ..cache import get_cache
 from ..config import settings
+from ..metrics import model_inference_seconds
 from ..schemas import ChatQuery, ChatResponse, ChatDocument
 
 router = APIRouter(prefix="/chat", tags=["chatbot"])
@@ -17,7 +18,13 @@ router = APIRouter(prefix="/chat", tags=["chatbot"])
 # Global models and indices
 _embedding_model = None
 _faiss_index = None
+_vector_store = None
 _documents = []
+# Search results by query, cleared when the index is refreshed
+_cache = get_cache("chat", ttl=settings.chat_cache_ttl_seconds)
+# Kept apart from the store training/build_vector_store.py writes for
+# chat_enhanced, which indexes different documents under the same names
+_store_dir = settings.vector_index_dir / "products"
 
 
 def load_embedding_model():
@@ -43,17 +50,33 @@ def load_embedding_model():
             _embedding_model = None
 
 
+def normalize(embeddings) -> np.ndarray:
+    """L2-normalise embeddings so inner products are cosine similarities."""
+    embeddings = np.array(embeddings, dtype='float32')
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
 def build_vector_index():
-    """Build FAISS index from product documents."""
-    global _faiss_index, _documents
+    """
+    Build the product vector store, or load the saved one.
+    
+    The index is quantized per VECTOR_QUANTIZATION; the exact embeddings
+    are memory-mapped from a side file and only used to re-rank results.
+    """
+    global _faiss_index, _vector_store, _documents
     
-    index_path = settings.vector_index_dir / "faiss_index.bin"
-    docs_path = settings.vector_index_dir / "documents.pkl"
+    import faiss
+    from ..vector_store import VectorStore, build_index, save_exact_vectors, INDEX_FILENAME
+    
+    index_path = _store_dir / INDEX_FILENAME
+    docs_path = _store_dir / "documents.pkl"
     
     # Try to load existing index
     if index_path.exists() and docs_path.exists():
         try:
-            _faiss_index = faiss.read_index(str(index_path))
+            _vector_store = VectorStore.load(_store_dir, rerank_candidates=settings.vector_rerank_candidates)
+            _faiss_index = _vector_store.index
             _documents = joblib.load(docs_path)
             return
         except Exception as e:
@@ -67,23 +90,26 @@ def build_vector_index():
         return
     
     # Get product documents
-    _documents = db.get_product_documents()
+    documents = db.get_product_documents()
     
-    if not _documents:
+    if not documents:
         return
     
     # Create embeddings
-    texts = [doc['text'] for doc in _documents]
-    embeddings = _embedding_model.encode(texts, show_progress_bar=False)
+    texts = [doc['text'] for doc in documents]
+    embeddings = normalize(_embedding_model.encode(texts, show_progress_bar=False))
     
-    # Build FAISS index
-    dimension = embeddings.shape[1]
-    _faiss_index = faiss.IndexFlatL2(dimension)
-    _faiss_index.add(embeddings.astype('float32'))
+    # Build quantized FAISS index and save it with the exact vectors
+    index = build_index(embeddings, settings.vector_quantization, settings.vector_pq_subquantizers)
+    _store_dir.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(index, str(index_path))
+    save_exact_vectors(embeddings, _store_dir, index)
+    joblib.dump(documents, docs_path)
     
-    # Save index
-    faiss.write_index(_faiss_index, str(index_path))
-    joblib.dump(_documents, docs_path)
+    # Reload so the exact vectors are memory-mapped rather than kept in RAM
+    _vector_store = VectorStore.load(_store_dir, rerank_candidates=settings.vector_rerank_candidates)
+    _faiss_index = _vector_store.index
+    _documents = documents
 
 
 def search_documents(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
@@ -97,27 +123,41 @@ def search_documents(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     Returns:
         List of relevant documents with scores
     """
-    if _embedding_model is None or _faiss_index is None or not _documents:
+    if _embedding_model is None or _vector_store is None or not _documents:
         return []
     
+    # The embedding model is uncased
+    cache_key = f"{top_k}:{' '.join(query.lower().split())}"
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     # Encode query
-    query_embedding = _embedding_model.encode([query], show_progress_bar=False)
+    with model_inference_seconds.time(model="sentence_transformer"):
+        query_embedding = normalize(_embedding_model.encode([query], show_progress_bar=False))
     
-    # Search
-    distances, indices = _faiss_index.search(query_embedding.astype('float32'), top_k)
+    # Search (quantized indexes are re-ranked with the exact vectors)
+    with model_inference_seconds.time(model="faiss"):
+        similarities, indices = _vector_store.search(query_embedding, top_k)
     
     results = []
-    for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
-        if idx < len(_documents):
+    for similarity, idx in zip(similarities[0], indices[0]):
+        if 0 <= idx < len(_documents):
             doc = _documents[idx].copy()
-            # Convert L2 distance to similarity score (0-1)
-            score = 1 / (1 + dist)
-            doc['score'] = float(score)
+            # Squared L2 distance between unit vectors, scored 0-1 as before
+            dist = max(0.0, 2.0 - 2.0 * float(similarity))
+            doc['score'] = float(1 / (1 + dist))
             results.append(doc)
     
+    _cache.set(cache_key, results)
     return results
 
 
+def index_memory() -> Dict[str, Any]:
+    """Memory held by the loaded vector store (empty until it is loaded)."""
+    return _vector_store.memory_stats() if _vector_store is not None else {}
+
+
 def generate_response(query: str, documents: List[Dict[str, Any]]) -> str:
     """
     Generate response based on retrieved documents.
@@ -193,6 +233,29 @@ def generate_response(query: str, documents: List[Dict[str, Any]]) -> str:
     return response
 
 
+def warm_up_embeddings() -> dict:
+    """Load the sentence transformer and encode one query."""
+    load_embedding_model()
+    
+    if _embedding_model is None:
+        raise RuntimeError("Embedding model unavailable")
+    
+    _embedding_model.encode(["fresh vegetables"], show_progress_bar=False)
+    return {"embedding_model": settings.embedding_model}
+
+
+def warm_up_index() -> dict:
+    """Load (or build) the FAISS index and run one search."""
+    if _faiss_index is None:
+        build_vector_index()
+    
+    if _faiss_index is None:
+        raise RuntimeError("Vector index unavailable")
+    
+    search_documents("fresh vegetables", top_k=1)
+    return {"num_documents": len(_documents), "quantization": _vector_store.quantization}
+
+
 @router.post("/query", response_model=ChatResponse)
 async def chat_query(query: ChatQuery = Body(...)):
     """
@@ -263,6 +326,7 @@ async def refresh_vector_index():
     """
     try:
         build_vector_index()
+        _cache.clear()
         return {
             "status": "success",
             "message": "Vector index refreshed",
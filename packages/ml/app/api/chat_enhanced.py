@@ -3,7 +3,6 @@ from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss
 import json
 from datetime import datetime
@@ -11,6 +10,8 @@ import hashlib
 
 from ..db import db
 from ..config import settings
+from ..metrics import model_inference_seconds
+from ..vector_store import VectorStore, INDEX_FILENAME, MAPPINGS_FILENAME
 
 router = APIRouter(prefix="/chat", tags=["chatbot"])
 
@@ -45,32 +46,42 @@ class ChatResponse(BaseModel):
 # Global cache
 _embedding_model = None
 _faiss_index = None
+_vector_store = None
 _documents = []
 _model_loaded = False
 
 
 def load_vector_store():
     """Load FAISS index and document mappings."""
-    global _embedding_model, _faiss_index, _documents, _model_loaded
+    global _embedding_model, _faiss_index, _vector_store, _documents, _model_loaded
     
     if _model_loaded:
         return
     
     try:
+        # Imported here: sentence-transformers pulls in torch, which would
+        # otherwise dominate service start-up time
+        from sentence_transformers import SentenceTransformer
+        
         # Load embedding model
         print(f"Loading embedding model: {settings.embedding_model}")
         _embedding_model = SentenceTransformer(settings.embedding_model)
         
         # Load FAISS index
-        index_path = settings.vector_index_dir / "faiss.index"
+        index_path = settings.vector_index_dir / INDEX_FILENAME
         if not index_path.exists():
             raise FileNotFoundError(f"FAISS index not found at {index_path}. Run build_vector_store.py first.")
         
-        _faiss_index = faiss.read_index(str(index_path))
-        print(f"  ✓ Loaded FAISS index with {_faiss_index.ntotal} vectors")
+        _vector_store = VectorStore.load(
+            settings.vector_index_dir,
+            rerank_candidates=settings.vector_rerank_candidates
+        )
+        _faiss_index = _vector_store.index
+        print(f"  ✓ Loaded FAISS index with {_faiss_index.ntotal} vectors "
+              f"(quantization: {_vector_store.quantization})")
         
         # Load document mappings
-        mappings_path = settings.vector_index_dir / "doc_mappings.json"
+        mappings_path = settings.vector_index_dir / MAPPINGS_FILENAME
         if not mappings_path.exists():
             raise FileNotFoundError(f"Document mappings not found at {mappings_path}")
         
@@ -101,22 +112,24 @@ def semantic_search(query: str, top_k: int = 5) -> List[Dict]:
     Returns:
         List of retrieved documents with scores
     """
-    if _embedding_model is None or _faiss_index is None:
+    if _embedding_model is None or _vector_store is None:
         load_vector_store()
     
     # Embed query
-    query_embedding = _embedding_model.encode([query], convert_to_numpy=True)
+    with model_inference_seconds.time(model="sentence_transformer"):
+        query_embedding = _embedding_model.encode([query], convert_to_numpy=True).astype('float32')
     
     # Normalize for cosine similarity
     faiss.normalize_L2(query_embedding)
     
-    # Search
-    scores, indices = _faiss_index.search(query_embedding, top_k)
+    # Search (quantized indexes are re-ranked with exact vectors)
+    with model_inference_seconds.time(model="faiss"):
+        scores, indices = _vector_store.search(query_embedding, top_k)
     
     # Prepare results
     results = []
     for idx, score in zip(indices[0], scores[0]):
-        if idx < len(_documents):
+        if 0 <= idx < len(_documents):
             doc = _documents[idx]
             results.append({
                 'doc_id': doc['doc_id'],
@@ -391,12 +404,13 @@ async def rebuild_index():
     
     Note: In production, this should be protected with authentication.
     """
-    global _model_loaded, _faiss_index, _documents, _embedding_model
+    global _model_loaded, _faiss_index, _vector_store, _documents, _embedding_model
     
     try:
         # Reset cache
         _model_loaded = False
         _faiss_index = None
+        _vector_store = None
         _documents = []
         _embedding_model = None
         
@@ -430,6 +444,7 @@ async def get_stats():
         "document_types": doc_types,
         "embedding_model": settings.embedding_model,
         "index_dimension": _faiss_index.d if _faiss_index else 0,
+        "index_memory": _vector_store.memory_stats() if _vector_store else {},
         "top_k_default": 5
     }
 
@@ -1,20 +1,28 @@
 """Demand forecasting API endpoints."""
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request, Response
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-from prophet import Prophet
-from statsmodels.tsa.arima.model import ARIMA
 import joblib
 import warnings
 
+from .. import admission
 from ..db import db
+from ..fast_json import FastJSONResponse, non_negative, records
+from ..cache import get_cache
 from ..config import settings
-from ..schemas import ForecastResponse, ForecastPoint, ForecastRequest
+from ..http_cache import make_etag, not_modified
+from ..metrics import model_inference_seconds
+from ..schemas import ForecastResponse, ForecastRequest
+from ..single_flight import single_flight
 
 warnings.filterwarnings('ignore')
 
 router = APIRouter(prefix="/forecast", tags=["forecast"])
+admission.allow_degraded("POST", "/forecast/product/{product_id}")
+
+# Forecast responses by product and horizon
+_cache = get_cache("forecast", ttl=settings.forecast_cache_ttl_seconds)
 
 
 def prepare_time_series(product_id: str, days: int = 365) -> pd.DataFrame:
@@ -63,6 +71,9 @@ def forecast_with_prophet(df: pd.DataFrame, days: int) -> pd.DataFrame:
     Returns:
         DataFrame with forecast
     """
+    # Prophet pulls in cmdstanpy and takes seconds to import; defer it
+    from prophet import Prophet
+    
     model = Prophet(
         daily_seasonality=True,
         weekly_seasonality=True,
@@ -71,11 +82,12 @@ def forecast_with_prophet(df: pd.DataFrame, days: int) -> pd.DataFrame:
         interval_width=0.95
     )
     
-    model.fit(df)
-    
-    # Create future dataframe
-    future = model.make_future_dataframe(periods=days)
-    forecast = model.predict(future)
+    with model_inference_seconds.time(model="prophet"):
+        model.fit(df)
+        
+        # Create future dataframe
+        future = model.make_future_dataframe(periods=days)
+        forecast = model.predict(future)
     
     # Return only future predictions
     forecast = forecast.tail(days)
@@ -94,12 +106,15 @@ def forecast_with_arima(df: pd.DataFrame, days: int) -> pd.DataFrame:
     Returns:
         DataFrame with forecast
     """
-    # Fit ARIMA model
-    model = ARIMA(df['y'].values, order=(1, 1, 1))
-    fitted = model.fit()
+    from statsmodels.tsa.arima.model import ARIMA
     
-    # Forecast
-    forecast = fitted.forecast(steps=days)
+    # Fit ARIMA model
+    with model_inference_seconds.time(model="arima"):
+        model = ARIMA(df['y'].values, order=(1, 1, 1))
+        fitted = model.fit()
+        
+        # Forecast
+        forecast = fitted.forecast(steps=days)
     
     # Create result dataframe
     last_date = df['ds'].max()
@@ -155,6 +170,115 @@ def simple_moving_average_forecast(df: pd.DataFrame, days: int, window: int = 7)
     return result
 
 
+def warm_up() -> dict:
+    """Import the forecasting libraries so the first request does not pay for it."""
+    import prophet
+    import statsmodels.tsa.arima.model  # noqa: F401
+
+    return {"prophet": prophet.__version__}
+
+
+@single_flight("forecast")
+def compute_forecast(product_id: str, days: int) -> dict:
+    """
+    Fit a forecast for a product and cache it.
+    
+    Concurrent calls for the same product and horizon share one fit.
+    
+    Args:
+        product_id: Product ID
+        days: Forecast horizon in days
+        
+    Returns:
+        ForecastResponse payload
+    """
+    # Get historical data
+    df = prepare_time_series(product_id, days=365)
+    
+    if df.empty or len(df) < settings.min_history_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient historical data. Need at least {settings.min_history_days} days."
+        )
+    
+    # Choose forecasting method based on data availability
+    method = "prophet"
+    confidence = 0.8
+    
+    try:
+        # Try Prophet first
+        forecast_df = forecast_with_prophet(df, days)
+    except Exception as e:
+        print(f"Prophet failed: {e}")
+        try:
+            # Fall back to ARIMA
+            forecast_df = forecast_with_arima(df, days)
+            method = "arima"
+            confidence = 0.6
+        except Exception as e2:
+            print(f"ARIMA failed: {e2}")
+            # Fall back to moving average
+            forecast_df = simple_moving_average_forecast(df, days)
+            method = "moving_average"
+            confidence = 0.4
+    
+    payload = forecast_payload(product_id, forecast_df, method, confidence)
+    _cache.set(f"{product_id}:{days}", payload)
+    return payload
+
+
+def forecast_payload(product_id: str, forecast_df: pd.DataFrame, method: str, confidence: float) -> dict:
+    """
+    ForecastResponse payload, built column-wise.
+    
+    Args:
+        product_id: Product ID
+        forecast_df: Forecast with 'ds', 'yhat', 'yhat_lower' and 'yhat_upper' columns
+        method: Forecasting method used
+        confidence: Confidence of the method
+        
+    Returns:
+        ForecastResponse payload (demand is non-negative)
+    """
+    return {
+        "product_id": product_id,
+        "forecast": records(
+            date=pd.to_datetime(forecast_df['ds']).dt.strftime('%Y-%m-%d').to_numpy(),
+            predicted_demand=non_negative(forecast_df['yhat']),
+            lower_bound=non_negative(forecast_df['yhat_lower']),
+            upper_bound=non_negative(forecast_df['yhat_upper'])
+        ),
+        "method": method,
+        "confidence": confidence,
+        "restock_recommendation": None,
+        "model_metadata": None
+    }
+
+
+@single_flight("forecast-degraded")
+def degraded_forecast(product_id: str, days: int) -> dict:
+    """
+    Moving-average forecast served when the service sheds load (not cached).
+    
+    Reads the sales history in the threadpool; concurrent degraded
+    requests for the same product share one call.
+    
+    Args:
+        product_id: Product ID
+        days: Forecast horizon in days
+        
+    Returns:
+        ForecastResponse payload with method moving_average
+    """
+    df = prepare_time_series(product_id, days=365)
+    if df.empty or len(df) < settings.min_history_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient historical data. Need at least {settings.min_history_days} days."
+        )
+    return forecast_payload(product_id, simple_moving_average_forecast(df, days), "moving_average", 0.4)
+
+
 @router.post("/product/{product_id}", response_model=ForecastResponse)
 async def forecast_product_demand(
     product_id: str,
@@ -165,57 +289,17 @@ async def forecast_product_demand(
     
     Uses Prophet for time series forecasting with automatic seasonality detection.
     Falls back to ARIMA or moving average if insufficient data.
+    Forecasts are cached for FORECAST_CACHE_TTL_SECONDS. Under load
+    (see app/admission.py) a cached forecast or else a moving average is
+    served instead of fitting a model.
     """
     try:
-        days = request.days
-        
-        # Get historical data
-        df = prepare_time_series(product_id, days=365)
-        
-        if df.empty or len(df) < settings.min_history_days:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient historical data. Need at least {settings.min_history_days} days."
-            )
-        
-        # Choose forecasting method based on data availability
-        method = "prophet"
-        confidence = 0.8
-        
-        try:
-            # Try Prophet first
-            forecast_df = forecast_with_prophet(df, days)
-        except Exception as e:
-            print(f"Prophet failed: {e}")
-            try:
-                # Fall back to ARIMA
-                forecast_df = forecast_with_arima(df, days)
-                method = "arima"
-                confidence = 0.6
-            except Exception as e2:
-                print(f"ARIMA failed: {e2}")
-                # Fall back to moving average
-                forecast_df = simple_moving_average_forecast(df, days)
-                method = "moving_average"
-                confidence = 0.4
-        
-        # Convert to response format
-        forecast_points = [
-            ForecastPoint(
-                date=row['ds'].strftime('%Y-%m-%d'),
-                predicted_demand=max(0, float(row['yhat'])),  # Ensure non-negative
-                lower_bound=max(0, float(row['yhat_lower'])),
-                upper_bound=max(0, float(row['yhat_upper']))
-            )
-            for _, row in forecast_df.iterrows()
-        ]
-        
-        return ForecastResponse(
-            product_id=product_id,
-            forecast=forecast_points,
-            method=method,
-            confidence=confidence
-        )
+        cached = _cache.get(f"{product_id}:{request.days}")
+        if cached is None:
+            if admission.degraded():
+                return FastJSONResponse(await degraded_forecast(product_id, request.days))
+            cached = await compute_forecast(product_id, request.days)
+        return FastJSONResponse(cached)
     
     except HTTPException:
         raise
@@ -226,12 +310,23 @@ async def forecast_product_demand(
 @router.get("/product/{product_id}/history")
 async def get_product_history(
     product_id: str,
+    request: Request,
+    response: Response,
     days: int = 90
 ):
     """
     Get historical sales data for a product.
+    
+    Answers If-None-Match with 304 while the product's sales and the
+    day window are unchanged.
     """
     try:
+        etag = make_etag("forecast-history", product_id, days, datetime.now().date(),
+                         db.get_product_sales_version(product_id))
+        cached = not_modified(request, response, etag)
+        if cached is not None:
+            return cached
+        
         df = prepare_time_series(product_id, days)
         
         if df.empty:
@@ -241,13 +336,10 @@ async def get_product_history(
                 "message": "No historical data available"
             }
         
-        history = [
-            {
-                "date": row['ds'].strftime('%Y-%m-%d'),
-                "quantity": float(row['y'])
-            }
-            for _, row in df.iterrows()
-        ]
+        history = records(
+            date=df['ds'].dt.strftime('%Y-%m-%d').to_numpy(),
+            quantity=df['y'].to_numpy(dtype=float)
+        )
         
         return {
             "product_id": product_id,
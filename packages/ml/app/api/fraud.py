@@ -2,27 +2,31 @@
 from fastapi import APIRouter, HTTPException, Body
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-import xgboost as xgb
 import joblib
+import threading
 from datetime import datetime
+from typing import Optional
 
+from .. import admission
 from ..db import db
 from ..config import settings
+from ..metrics import model_inference_seconds
 from ..schemas import TransactionFeatures, FraudScoreResponse
 
 router = APIRouter(prefix="/fraud", tags=["fraud-detection"])
+admission.allow_degraded("POST", "/fraud/score")
 
 # Global models
 _isolation_forest = None
 _xgb_model = None
 _scaler = None
+_models_loaded = False
+_load_lock = threading.Lock()
 
 
 def load_fraud_models():
     """Load fraud detection models."""
-    global _isolation_forest, _xgb_model, _scaler
+    global _isolation_forest, _xgb_model, _scaler, _models_loaded
     
     iso_path = settings.model_dir / "fraud_isolation_forest.pkl"
     xgb_path = settings.model_dir / "fraud_xgboost.pkl"
@@ -37,6 +41,23 @@ def load_fraud_models():
             _scaler = joblib.load(scaler_path)
     except Exception as e:
         print(f"Failed to load fraud models: {e}")
+    
+    _models_loaded = True
+
+
+def ensure_fraud_models_loaded():
+    """
+    Load fraud models on first use.
+    
+    Unpickling the models imports scikit-learn and XGBoost, so this is
+    deferred until the first score request (or warm-up) rather than done
+    at import time.
+    """
+    if _models_loaded:
+        return
+    with _load_lock:
+        if not _models_loaded:
+            load_fraud_models()
 
 
 def engineer_features(transaction: TransactionFeatures) -> pd.DataFrame:
@@ -146,13 +167,16 @@ def get_user_statistics(user_id: str) -> dict:
     }
 
 
-def calculate_risk_score(features_df: pd.DataFrame, transaction: TransactionFeatures) -> tuple:
+def calculate_risk_score(features_df: Optional[pd.DataFrame], transaction: TransactionFeatures,
+                         use_models: bool = True) -> tuple:
     """
     Calculate fraud risk score.
     
     Args:
-        features_df: Engineered features
+        features_df: Engineered features (unused without models)
         transaction: Original transaction
+        use_models: Combine the rules with the ML models (if loaded);
+            False for a rules-only score
         
     Returns:
         Tuple of (risk_score, risk_factors)
@@ -192,10 +216,11 @@ def calculate_risk_score(features_df: pd.DataFrame, transaction: TransactionFeat
         risk_factors.append("High quantity of low-value items")
     
     # Use ML models if available
-    if _isolation_forest is not None:
+    if use_models and _isolation_forest is not None:
         try:
             # Isolation Forest (anomaly detection)
-            iso_score = _isolation_forest.decision_function(features_df)[0]
+            with model_inference_seconds.time(model="isolation_forest"):
+                iso_score = _isolation_forest.decision_function(features_df)[0]
             # Convert to 0-1 scale (more negative = more anomalous)
             iso_risk = max(0, min(1, (1 - iso_score) / 2))
             risk_score = (risk_score + iso_risk) / 2
@@ -205,10 +230,11 @@ def calculate_risk_score(features_df: pd.DataFrame, transaction: TransactionFeat
         except Exception as e:
             print(f"Isolation Forest error: {e}")
     
-    if _xgb_model is not None:
+    if use_models and _xgb_model is not None:
         try:
             # XGBoost classifier
-            xgb_proba = _xgb_model.predict_proba(features_df)[0][1]
+            with model_inference_seconds.time(model="xgboost"):
+                xgb_proba = _xgb_model.predict_proba(features_df)[0][1]
             risk_score = (risk_score + xgb_proba) / 2
             
             if xgb_proba > 0.7:
@@ -222,15 +248,48 @@ def calculate_risk_score(features_df: pd.DataFrame, transaction: TransactionFeat
     return risk_score, risk_factors
 
 
+def warm_up() -> dict:
+    """Load fraud models if needed and score one synthetic transaction."""
+    ensure_fraud_models_loaded()
+    
+    transaction = TransactionFeatures(
+        user_id="warmup",
+        amount=100.0,
+        payment_method="CARD",
+        num_items=1,
+        avg_item_price=100.0,
+        max_item_price=100.0,
+        hour_of_day=12,
+        day_of_week=2,
+        user_history_days=30,
+        user_total_orders=1
+    )
+    features_df = engineer_features(transaction)
+    if _scaler is not None:
+        features_df = pd.DataFrame(_scaler.transform(features_df), columns=features_df.columns)
+    calculate_risk_score(features_df, transaction)
+    
+    return {
+        "isolation_forest": _isolation_forest is not None,
+        "xgboost": _xgb_model is not None,
+        "scaler": _scaler is not None
+    }
+
+
 @router.post("/score", response_model=FraudScoreResponse)
 async def score_transaction(transaction: TransactionFeatures = Body(...)):
     """
     Calculate fraud risk score for a transaction.
     
     Returns a risk score from 0 (safe) to 1 (fraudulent) along with
-    contributing risk factors and a recommendation.
+    contributing risk factors and a recommendation. Under load (see
+    app/admission.py) the score is computed from the rules only.
     """
     try:
+        use_models = not admission.degraded()
+        if use_models:
+            ensure_fraud_models_loaded()
+        
         # Get user statistics if not provided
         if transaction.user_history_days is None or transaction.user_total_orders is None:
             user_stats = get_user_statistics(transaction.user_id)
@@ -247,10 +306,10 @@ async def score_transaction(transaction: TransactionFeatures = Body(...)):
             transaction.day_of_week = now.weekday()
         
         # Engineer features
-        features_df = engineer_features(transaction)
+        features_df = engineer_features(transaction) if use_models else None
         
         # Scale features if scaler is available
-        if _scaler is not None:
+        if use_models and _scaler is not None:
             try:
                 features_df = pd.DataFrame(
                     _scaler.transform(features_df),
@@ -260,7 +319,7 @@ async def score_transaction(transaction: TransactionFeatures = Body(...)):
                 print(f"Scaling error: {e}")
         
         # Calculate risk score
-        risk_score, risk_factors = calculate_risk_score(features_df, transaction)
+        risk_score, risk_factors = calculate_risk_score(features_df, transaction, use_models)
         
         # Determine risk level
         if risk_score < 0.3:
@@ -330,7 +389,3 @@ async def get_user_risk_profile(user_id: str):
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Risk profile error: {str(e)}")
-
-
-# Initialize models on module load
-load_fraud_models()
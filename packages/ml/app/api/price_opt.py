@@ -1,18 +1,18 @@
 """Price optimization API endpoints."""
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request, Response
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
 import joblib
 
 from ..db import db
 from ..config import settings
+from ..fast_json import FastJSONResponse, non_negative, records
+from ..http_cache import make_etag, not_modified
 from ..schemas import (
     PriceOptimizationResponse,
-    PriceOptimizationRequest,
-    PricePoint
+    PriceOptimizationRequest
 )
+from ..single_flight import single_flight
 
 router = APIRouter(prefix="/price-optimize", tags=["price-optimization"])
 
@@ -27,23 +27,8 @@ def get_price_demand_data(product_id: str) -> pd.DataFrame:
     Returns:
         DataFrame with price and demand columns
     """
-    query = """
-        SELECT 
-            DATE(o.createdAt) as date,
-            AVG(oi.unitPrice) as price,
-            SUM(oi.qty) as demand,
-            COUNT(DISTINCT o.id) as num_orders
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.orderId
-        WHERE oi.productId = :product_id
-            AND o.status NOT IN ('CANCELLED', 'REFUNDED')
-        GROUP BY DATE(o.createdAt)
-        HAVING price > 0 AND demand > 0
-        ORDER BY date
-    """
-    
-    df = db.execute_query(query, {'product_id': product_id})
-    return df
+    # Served from the daily sales rollup (see app/rollup.py)
+    return db.get_daily_price_demand(product_id)
 
 
 def train_price_demand_model(df: pd.DataFrame, degree: int = 2):
@@ -60,6 +45,9 @@ def train_price_demand_model(df: pd.DataFrame, degree: int = 2):
     if len(df) < 5:
         return None, None, None
     
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import PolynomialFeatures
+    
     X = df[['price']].values
     y = df['demand'].values
     
@@ -86,10 +74,23 @@ def predict_demand(model, poly, price: float) -> float:
     Returns:
         Predicted demand
     """
-    X = np.array([[price]])
-    X_poly = poly.transform(X)
-    demand = model.predict(X_poly)[0]
-    return max(0, demand)  # Ensure non-negative
+    return predict_demands(model, poly, np.array([price]))[0]
+
+
+def predict_demands(model, poly, prices: np.ndarray) -> np.ndarray:
+    """
+    Predict demand for many prices in one model call.
+    
+    Args:
+        model: Trained model
+        poly: Polynomial features transformer
+        prices: Prices to predict demand for
+        
+    Returns:
+        Non-negative predicted demand per price
+    """
+    X_poly = poly.transform(np.asarray(prices, dtype=float).reshape(-1, 1))
+    return non_negative(model.predict(X_poly))
 
 
 def optimize_price(
@@ -110,34 +111,97 @@ def optimize_price(
         num_samples: Number of price points to evaluate
         
     Returns:
-        Tuple of (optimal_price, max_revenue, price_points)
+        Tuple of (optimal_price, max_revenue, price_points), price_points
+        as PricePoint dicts
     """
     min_price, max_price = price_range
     prices = np.linspace(min_price, max_price, num_samples)
+    demands = predict_demands(model, poly, prices)
+    revenues = prices * demands
     
-    price_points = []
-    max_revenue = 0
-    optimal_price = current_price
+    # Calculate confidence based on distance from training data
+    confidences = 1.0 / (1.0 + np.abs(prices - current_price) / current_price)
     
-    for price in prices:
-        demand = predict_demand(model, poly, price)
-        revenue = price * demand
-        
-        # Calculate confidence based on distance from training data
-        confidence = 1.0 / (1.0 + abs(price - current_price) / current_price)
-        
-        price_points.append({
-            'price': float(price),
-            'predicted_demand': float(demand),
-            'predicted_revenue': float(revenue),
-            'confidence': float(confidence)
-        })
+    price_points = records(
+        price=prices,
+        predicted_demand=demands,
+        predicted_revenue=revenues,
+        confidence=confidences
+    )
+    
+    # First price with the highest positive revenue, else the current price
+    best = int(np.argmax(revenues)) if len(revenues) else 0
+    if len(revenues) and revenues[best] > 0:
+        return prices[best], revenues[best], price_points
+    return current_price, 0, price_points
+
+
+@single_flight("price-optimize", key=lambda product_id, request: (
+    product_id, request.price_range_min, request.price_range_max, request.num_samples))
+def compute_price_optimization(product_id: str, request: PriceOptimizationRequest) -> dict:
+    """
+    Fit the price-demand model of a product and find its revenue-maximising price.
+    
+    Concurrent calls for the same product and request share one fit.
+    
+    Args:
+        product_id: Product ID
+        request: Price range and number of sampled prices
         
-        if revenue > max_revenue:
-            max_revenue = revenue
-            optimal_price = price
+    Returns:
+        PriceOptimizationResponse payload
+    """
+    # Get historical price-demand data
+    df = get_price_demand_data(product_id)
+    
+    if df.empty or len(df) < 5:
+        raise HTTPException(
+            status_code=400,
+            detail="Insufficient price-demand data for optimization. Need at least 5 data points."
+        )
+    
+    # Get current price
+    current_price = float(df['price'].iloc[-1])
+    
+    # Determine price range
+    if request.price_range_min and request.price_range_max:
+        min_price = request.price_range_min
+        max_price = request.price_range_max
+    else:
+        # Use ±30% of current price as default range
+        min_price = current_price * 0.7
+        max_price = current_price * 1.3
     
-    return optimal_price, max_revenue, price_points
+    # Train price-demand model
+    model, poly, scaler_info = train_price_demand_model(df)
+    
+    if model is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Failed to train price-demand model"
+        )
+    
+    # Optimize price
+    optimal_price, max_revenue, price_points = optimize_price(
+        model,
+        poly,
+        current_price,
+        (min_price, max_price),
+        request.num_samples
+    )
+    
+    # Calculate expected revenue increase
+    current_demand = predict_demand(model, poly, current_price)
+    current_revenue = current_price * current_demand
+    revenue_increase = ((max_revenue - current_revenue) / current_revenue) * 100
+    
+    return {
+        "product_id": product_id,
+        "current_price": current_price,
+        "recommended_price": float(optimal_price),
+        "price_points": price_points,
+        "expected_revenue_increase": float(revenue_increase)
+    }
 
 
 @router.post("/product/{product_id}", response_model=PriceOptimizationResponse)
@@ -152,62 +216,7 @@ async def optimize_product_price(
     and finds the price that maximizes revenue (price × demand).
     """
     try:
-        # Get historical price-demand data
-        df = get_price_demand_data(product_id)
-        
-        if df.empty or len(df) < 5:
-            raise HTTPException(
-                status_code=400,
-                detail="Insufficient price-demand data for optimization. Need at least 5 data points."
-            )
-        
-        # Get current price
-        current_price = float(df['price'].iloc[-1])
-        
-        # Determine price range
-        if request.price_range_min and request.price_range_max:
-            min_price = request.price_range_min
-            max_price = request.price_range_max
-        else:
-            # Use ±30% of current price as default range
-            min_price = current_price * 0.7
-            max_price = current_price * 1.3
-        
-        # Train price-demand model
-        model, poly, scaler_info = train_price_demand_model(df)
-        
-        if model is None:
-            raise HTTPException(
-                status_code=400,
-                detail="Failed to train price-demand model"
-            )
-        
-        # Optimize price
-        optimal_price, max_revenue, price_points = optimize_price(
-            model,
-            poly,
-            current_price,
-            (min_price, max_price),
-            request.num_samples
-        )
-        
-        # Calculate expected revenue increase
-        current_demand = predict_demand(model, poly, current_price)
-        current_revenue = current_price * current_demand
-        revenue_increase = ((max_revenue - current_revenue) / current_revenue) * 100
-        
-        # Convert price points to schema
-        price_point_objects = [
-            PricePoint(**pp) for pp in price_points
-        ]
-        
-        return PriceOptimizationResponse(
-            product_id=product_id,
-            current_price=current_price,
-            recommended_price=float(optimal_price),
-            price_points=price_point_objects,
-            expected_revenue_increase=float(revenue_increase)
-        )
+        return FastJSONResponse(await compute_price_optimization(product_id, request))
     
     except HTTPException:
         raise
@@ -276,11 +285,20 @@ async def get_price_elasticity(product_id: str):
 
 
 @router.get("/product/{product_id}/price-history")
-async def get_price_history(product_id: str, days: int = 90):
+async def get_price_history(product_id: str, request: Request, response: Response, days: int = 90):
     """
     Get historical price and demand data for a product.
+    
+    Answers If-None-Match with 304 while the product's sales and the
+    day window are unchanged.
     """
     try:
+        etag = make_etag("price-history", product_id, days, pd.Timestamp.now().date(),
+                         db.get_product_sales_version(product_id))
+        cached = not_modified(request, response, etag)
+        if cached is not None:
+            return cached
+        
         df = get_price_demand_data(product_id)
         
         if df.empty:
@@ -295,15 +313,12 @@ async def get_price_history(product_id: str, days: int = 90):
             cutoff_date = pd.Timestamp.now() - pd.Timedelta(days=days)
             df = df[pd.to_datetime(df['date']) >= cutoff_date]
         
-        history = [
-            {
-                "date": str(row['date']),
-                "price": float(row['price']),
-                "demand": float(row['demand']),
-                "num_orders": int(row['num_orders'])
-            }
-            for _, row in df.iterrows()
-        ]
+        history = records(
+            date=df['date'].astype(str).to_numpy(),
+            price=df['price'].to_numpy(dtype=float),
+            demand=df['demand'].to_numpy(dtype=float),
+            num_orders=df['num_orders'].to_numpy(dtype=int)
+        )
         
         return {
             "product_id": product_id,
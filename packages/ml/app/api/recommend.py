@@ -1,71 +1,117 @@
 """Recommendation API endpoints with ALS + TF-IDF hybrid approach."""
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import Optional, List, Dict, Tuple
-from functools import lru_cache
-from datetime import datetime, timedelta
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import joblib
 import json
 
 from ..db import db
+from ..cache import get_cache
 from ..config import settings
-from ..schemas import RecommendationResponse, RecommendationItem, RecommendationRequest
+from ..fast_json import FastJSONResponse, records
+from ..http_cache import make_etag, not_modified
+from ..metrics import model_inference_seconds
+from ..schemas import RecommendationResponse, RecommendationRequest
+from ..artifacts import RecommendationArtifacts, ARTIFACT_DIRNAME
+from ..single_flight import single_flight
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
 # Global cache for models
-_als_model = None
-_tfidf_data = None
-_mappings = None
-_cache = {}
-_cache_ttl = 3600  # 1 hour TTL
+_artifacts: Optional[RecommendationArtifacts] = None
+_models_loaded = False
+_load_lock = threading.Lock()
+# Shared by the workers of a host with CACHE_BACKEND=sqlite or redis
+_cache = get_cache("recommendations", ttl=settings.recommendation_cache_ttl_seconds)
 
 
-def load_models():
-    """Load trained ALS and TF-IDF models."""
-    global _als_model, _tfidf_data, _mappings
+def load_legacy_models() -> Optional[RecommendationArtifacts]:
+    """Load ALS/TF-IDF pickles and mappings.json written before the mmap artifact format."""
+    als_model = tfidf_data = mappings = None
     
     # Load ALS model
     als_path = settings.model_dir / "als_model.joblib"
     if als_path.exists():
         try:
-            _als_model = joblib.load(als_path)
+            als_model = joblib.load(als_path)
             print("✓ ALS model loaded")
         except Exception as e:
             print(f"Failed to load ALS model: {e}")
-            _als_model = None
     else:
         print("ALS model not found")
-        _als_model = None
     
     # Load TF-IDF model
     tfidf_path = settings.model_dir / "tfidf.joblib"
     if tfidf_path.exists():
         try:
-            _tfidf_data = joblib.load(tfidf_path)
+            tfidf_data = joblib.load(tfidf_path)
             print("✓ TF-IDF model loaded")
         except Exception as e:
             print(f"Failed to load TF-IDF model: {e}")
-            _tfidf_data = None
     else:
         print("TF-IDF model not found")
-        _tfidf_data = None
     
     # Load mappings
     mappings_path = settings.model_dir / "mappings.json"
     if mappings_path.exists():
         try:
             with open(mappings_path, 'r') as f:
-                _mappings = json.load(f)
+                mappings = json.load(f)
             print("✓ Mappings loaded")
         except Exception as e:
             print(f"Failed to load mappings: {e}")
-            _mappings = None
     else:
         print("Mappings not found")
-        _mappings = None
+    
+    return RecommendationArtifacts.from_legacy(als_model, tfidf_data, mappings)
+
+
+def load_models():
+    """
+    Load trained ALS and TF-IDF models.
+    
+    Prefers the memory-mapped artifact format under
+    model_dir/recommendations, falling back to the legacy pickles.
+    """
+    global _artifacts, _models_loaded
+    
+    artifact_root = settings.model_dir / ARTIFACT_DIRNAME
+    try:
+        _artifacts = RecommendationArtifacts.load(artifact_root)
+        print(f"✓ Recommendation artifacts {_artifacts.version} memory-mapped from {_artifacts.directory}")
+    except FileNotFoundError:
+        _artifacts = load_legacy_models()
+    except Exception as e:
+        print(f"Failed to load recommendation artifacts: {e}")
+        _artifacts = load_legacy_models()
+    
+    _models_loaded = True
+
+
+def models_status() -> Dict[str, object]:
+    """Which recommendation components are loaded, and from which artifact version."""
+    return {
+        "als": _artifacts is not None and _artifacts.has_als,
+        "tfidf": _artifacts is not None and _artifacts.has_tfidf,
+        "mappings": _artifacts is not None and len(_artifacts.item_ids) > 0,
+        "artifact_version": _artifacts.version if _artifacts is not None else None
+    }
+
+
+def ensure_models_loaded():
+    """
+    Load models on first use.
+    
+    Models are not loaded at import time so that the service starts
+    quickly; the first request (or warm-up) pays the loading cost instead.
+    """
+    if _models_loaded:
+        return
+    with _load_lock:
+        if not _models_loaded:
+            load_models()
 
 
 def get_collaborative_recommendations(user_id: str, top_k: int) -> List[Tuple[str, float, List[str]]]:
@@ -79,15 +125,13 @@ def get_collaborative_recommendations(user_id: str, top_k: int) -> List[Tuple[st
     Returns:
         List of (product_id, score, reasons)
     """
-    if _als_model is None or _mappings is None:
+    if _artifacts is None or not _artifacts.has_als:
         return []
     
     # Check if user exists in training data
-    if user_id not in _mappings['user_index']:
+    if _artifacts.user_index(user_id) is None:
         return []
     
-    user_idx = _mappings['user_index'][user_id]
-    
     try:
         # Get user's purchase history to filter
         user_orders = db.get_user_order_history(user_id)
@@ -99,22 +143,21 @@ def get_collaborative_recommendations(user_id: str, top_k: int) -> List[Tuple[st
         
         # Get top N recommendations
         recommended_items = []
-        index_to_item = _mappings['index_to_item']
         
         # Get user's top items
         if not user_orders.empty:
             top_user_items = user_orders.head(5)['product_id'].tolist()
             
             for item_id in top_user_items:
-                if item_id in _mappings['item_index']:
-                    item_idx = _mappings['item_index'][item_id]
-                    
+                item_idx = _artifacts.item_index(item_id)
+                if item_idx is not None:
                     # Get similar items
                     try:
-                        similar_ids, scores = _als_model.similar_items(item_idx, N=top_k + 10)
+                        with model_inference_seconds.time(model="als"):
+                            similar_ids, scores = _artifacts.similar_items(item_idx, N=top_k + 10)
                         
                         for sim_idx, score in zip(similar_ids, scores):
-                            sim_product_id = index_to_item[str(sim_idx)]
+                            sim_product_id = _artifacts.item_id(sim_idx)
                             
                             # Filter out already purchased
                             if sim_product_id not in purchased_products:
@@ -151,13 +194,13 @@ def get_content_based_recommendations(user_id: str, top_k: int) -> List[Tuple[st
     Returns:
         List of (product_id, score, reasons)
     """
-    if _tfidf_data is None:
+    if _artifacts is None or not _artifacts.has_tfidf:
         return []
     
+    from sklearn.metrics.pairwise import cosine_similarity
+    
     try:
-        vectorizer = _tfidf_data['vectorizer']
-        tfidf_matrix = _tfidf_data['matrix']
-        products_df = _tfidf_data['products']
+        tfidf_matrix = _artifacts.tfidf_matrix
         
         # Get user's purchase/view history
         user_orders = db.get_user_order_history(user_id)
@@ -176,9 +219,9 @@ def get_content_based_recommendations(user_id: str, top_k: int) -> List[Tuple[st
         # Get indices of user's products
         user_product_indices = []
         for prod_id in user_products:
-            idx_list = products_df.index[products_df['id'] == prod_id].tolist()
-            if idx_list:
-                user_product_indices.append(idx_list[0])
+            row = _artifacts.product_row(prod_id)
+            if row is not None:
+                user_product_indices.append(row)
         
         if not user_product_indices:
             return []
@@ -187,12 +230,13 @@ def get_content_based_recommendations(user_id: str, top_k: int) -> List[Tuple[st
         user_profile = tfidf_matrix[user_product_indices].mean(axis=0)
         
         # Calculate cosine similarity with all products
-        similarities = cosine_similarity(user_profile, tfidf_matrix).flatten()
+        with model_inference_seconds.time(model="tfidf"):
+            similarities = cosine_similarity(user_profile, tfidf_matrix).flatten()
         
         # Get top N similar products (excluding already interacted)
         recommendations = []
         for idx in similarities.argsort()[::-1]:
-            product_id = products_df.iloc[idx]['id']
+            product_id = _artifacts.product_id(idx)
             
             # Skip if already purchased/viewed
             if product_id in user_products:
@@ -290,32 +334,37 @@ def get_cold_start_recommendations(user_id: str, top_k: int) -> List[Tuple[str,
 
 def get_cached_recommendations(user_id: str, top_k: int) -> Optional[List[Tuple[str, float, List[str]]]]:
     """Get recommendations from cache if available and not expired."""
-    cache_key = f"{user_id}:{top_k}"
-    
-    if cache_key in _cache:
-        cached_data, timestamp = _cache[cache_key]
-        
-        # Check if cache is still valid
-        if (datetime.now() - timestamp).total_seconds() < _cache_ttl:
-            return cached_data
-        else:
-            # Remove expired cache
-            del _cache[cache_key]
-    
-    return None
+    return _cache.get(f"{user_id}:{top_k}")
 
 
 def set_cached_recommendations(user_id: str, top_k: int, recommendations: List[Tuple[str, float, List[str]]]):
     """Store recommendations in cache."""
-    cache_key = f"{user_id}:{top_k}"
-    _cache[cache_key] = (recommendations, datetime.now())
+    _cache.set(f"{user_id}:{top_k}", recommendations)
+
+
+def recommendation_payload(user_id: str, recommendations: List[Tuple[str, float, List[str]]], method: str) -> dict:
+    """RecommendationResponse payload of (product_id, score, reasons) tuples."""
+    product_ids, scores, reasons = zip(*recommendations) if recommendations else ((), (), ())
+    return {
+        "user_id": user_id,
+        "items": records(product_id=product_ids, score=np.array(scores, dtype=float), reason=reasons),
+        "method": method
+    }
+
+
+def warm_up() -> Dict[str, bool]:
+    """Load recommendation models if needed and run one similarity query through each."""
+    ensure_models_loaded()
+    
+    if _artifacts is not None and _artifacts.has_tfidf:
+        from sklearn.metrics.pairwise import cosine_similarity
+        tfidf_matrix = _artifacts.tfidf_matrix
+        cosine_similarity(tfidf_matrix[0:1], tfidf_matrix)
     
-    # Simple cache cleanup: remove old entries if cache is too large
-    if len(_cache) > 1000:
-        # Remove oldest 20% of entries
-        sorted_cache = sorted(_cache.items(), key=lambda x: x[1][1])
-        for key, _ in sorted_cache[:200]:
-            del _cache[key]
+    if _artifacts is not None and _artifacts.has_als and len(_artifacts.item_ids):
+        _artifacts.similar_items(0, N=2)
+    
+    return models_status()
 
 
 @router.get("/user/{user_id}", response_model=RecommendationResponse)
@@ -331,21 +380,15 @@ async def get_user_recommendations(
     2. Content-based filtering (TF-IDF) - 30% weight
     3. Falls back to popular products for cold-start users
     
-    Results are cached for 1 hour.
+    Results are cached for RECOMMENDATION_CACHE_TTL_SECONDS (1 hour by default).
     """
     try:
+        ensure_models_loaded()
+        
         # Check cache first
         cached_recs = get_cached_recommendations(user_id, top_k)
         if cached_recs is not None:
-            items = [
-                RecommendationItem(product_id=prod_id, score=score, reason=reasons)
-                for prod_id, score, reasons in cached_recs
-            ]
-            return RecommendationResponse(
-                user_id=user_id,
-                items=items,
-                method="hybrid (cached)"
-            )
+            return FastJSONResponse(recommendation_payload(user_id, cached_recs, "hybrid (cached)"))
         
         # Check if user has any history
         user_orders = db.get_user_order_history(user_id)
@@ -382,73 +425,88 @@ async def get_user_recommendations(
         # Cache results
         set_cached_recommendations(user_id, top_k, recommendations)
         
-        # Format response
-        items = [
-            RecommendationItem(product_id=prod_id, score=score, reason=reasons)
-            for prod_id, score, reasons in recommendations
-        ]
-        
-        return RecommendationResponse(
-            user_id=user_id,
-            items=items,
-            method=method
-        )
+        return FastJSONResponse(recommendation_payload(user_id, recommendations, method))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Recommendation error: {str(e)}")
 
 
+@single_flight("similar-products")
+def compute_similar_products(artifacts: RecommendationArtifacts, product_id: str, top_k: int) -> dict:
+    """
+    Most similar products by TF-IDF cosine similarity.
+    
+    Concurrent calls for the same artifacts, product and top_k share one scan.
+    
+    Args:
+        artifacts: Loaded artifacts with a TF-IDF matrix
+        product_id: Product ID
+        top_k: Number of similar products
+        
+    Returns:
+        RecommendationResponse payload
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+    
+    tfidf_matrix = artifacts.tfidf_matrix
+    
+    # Find product index
+    idx = artifacts.product_row(product_id)
+    if idx is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    # Calculate similarities
+    with model_inference_seconds.time(model="tfidf"):
+        similarities = cosine_similarity(tfidf_matrix[idx:idx+1], tfidf_matrix).flatten()
+    
+    # Top N (excluding the product itself) without sorting every product
+    similarities[idx] = -np.inf
+    k = min(top_k, len(similarities) - 1)
+    top = np.argpartition(-similarities, k - 1)[:k] if k > 0 else np.array([], dtype=int)
+    top = top[np.argsort(-similarities[top], kind='stable')]
+    
+    return {
+        "user_id": product_id,  # Using product_id as identifier
+        "items": records(
+            product_id=[artifacts.product_id(row) for row in top],
+            score=similarities[top],
+            reason=[['cb']] * len(top)
+        ),
+        "method": "content-based"
+    }
+
+
 @router.get("/product/{product_id}", response_model=RecommendationResponse)
 async def get_similar_products(
     product_id: str,
+    request: Request,
+    response: Response,
     top_k: int = Query(default=20, ge=1, le=100, description="Number of recommendations")
 ):
     """
     Get similar products based on content similarity.
     
-    Uses TF-IDF cosine similarity on product descriptions.
+    Uses TF-IDF cosine similarity on product descriptions. Answers
+    If-None-Match with 304 until the artifacts are replaced.
     """
     try:
-        if _tfidf_data is None:
+        ensure_models_loaded()
+        if _artifacts is None or not _artifacts.has_tfidf:
             raise HTTPException(status_code=503, detail="TF-IDF model not loaded")
         
-        vectorizer = _tfidf_data['vectorizer']
-        tfidf_matrix = _tfidf_data['matrix']
-        products_df = _tfidf_data['products']
-        
-        # Find product index
-        idx_list = products_df.index[products_df['id'] == product_id].tolist()
-        if not idx_list:
-            raise HTTPException(status_code=404, detail="Product not found")
-        
-        idx = idx_list[0]
-        
-        # Calculate similarities
-        similarities = cosine_similarity(tfidf_matrix[idx:idx+1], tfidf_matrix).flatten()
-        
-        # Get top N (excluding the product itself)
-        recommendations = []
-        for sim_idx in similarities.argsort()[::-1]:
-            if sim_idx == idx:
-                continue
-            
-            prod_id = products_df.iloc[sim_idx]['id']
-            score = float(similarities[sim_idx])
-            recommendations.append((prod_id, score, ['cb']))
-            
-            if len(recommendations) >= top_k:
-                break
-        
-        items = [
-            RecommendationItem(product_id=prod_id, score=score, reason=reasons)
-            for prod_id, score, reasons in recommendations
-        ]
-        
-        return RecommendationResponse(
-            user_id=product_id,  # Using product_id as identifier
-            items=items,
-            method="content-based"
-        )
+        version = _artifacts.version
+        if version == "legacy":
+            # Pickles are retrained in place
+            tfidf_path = settings.model_dir / "tfidf.joblib"
+            version = tfidf_path.stat().st_mtime if tfidf_path.exists() else version
+        etag = make_etag("similar-products", product_id, top_k, version)
+        cached = not_modified(request, response, etag)
+        if cached is not None:
+            return cached
+        
+        payload = await compute_similar_products(_artifacts, product_id, top_k)
+        # With the ETag headers set by not_modified
+        return FastJSONResponse(payload, headers=dict(response.headers))
     
     except HTTPException:
         raise
@@ -464,10 +522,8 @@ async def refresh_recommendations():
     Call this after retraining models or when product catalog changes.
     """
     try:
-        global _cache
-        
-        # Clear cache
-        _cache = {}
+        # Clear cache (in every worker)
+        _cache.clear()
         
         # Reload models
         load_models()
@@ -475,11 +531,7 @@ async def refresh_recommendations():
         return {
             "status": "success",
             "message": "Recommendation models refreshed and cache cleared",
-            "models_loaded": {
-                "als": _als_model is not None,
-                "tfidf": _tfidf_data is not None,
-                "mappings": _mappings is not None
-            }
+            "models_loaded": models_status()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Refresh error: {str(e)}")
@@ -488,16 +540,12 @@ async def refresh_recommendations():
 @router.get("/cache/stats")
 async def get_cache_stats():
     """Get cache statistics."""
+    stats = _cache.stats()
     return {
-        "cache_size": len(_cache),
-        "cache_ttl_seconds": _cache_ttl,
-        "models_loaded": {
-            "als": _als_model is not None,
-            "tfidf": _tfidf_data is not None,
-            "mappings": _mappings is not None
-        }
+        "cache_size": stats["size"],
+        "cache_ttl_seconds": stats["ttl_seconds"],
+        "cache_backend": stats["backend"],
+        "hit_ratio": stats["hit_ratio"],
+        "similar_products_flight": compute_similar_products.flight.stats(),
+        "models_loaded": models_status()
     }
-
-
-# Initialize models on module load
-load_models()
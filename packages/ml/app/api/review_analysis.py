@@ -1,46 +1,76 @@
 """Review analysis and moderation API endpoints."""
-from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Body, Request, Response
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
 import re
 from collections import Counter
+from dataclasses import dataclass
 
+from ..config import settings
 from ..db import db
-from ..schemas import ReviewAnalysisRequest, ReviewAnalysisResponse
+from ..http_cache import make_etag, not_modified
+from ..near_duplicates import NearDuplicateIndex, SharedNearDuplicateIndex
+from ..review_lexicon import LexiconMatch, ReviewLexicon
+from ..review_sentiment import ProductSentimentStore
+from ..schemas import ReviewAnalysisRequest, ReviewAnalysisResponse, ReviewBatchRequest, ReviewBatchResponse
 
 router = APIRouter(prefix="/reviews", tags=["review-analysis"])
 
 
+@dataclass
+class ReviewAnalysis:
+    """Text signals of one review, computed together by ReviewAnalyzer.analyze."""
+    sentiment: Dict[str, float]
+    spam: Dict[str, Any]
+    mismatch: Dict[str, Any]
+    quality_score: float
+
+
 class ReviewAnalyzer:
     """Analyze reviews for sentiment, quality, and fraud detection."""
     
-    # Sentiment lexicon (simplified - in production, use VADER or TextBlob)
-    POSITIVE_WORDS = {
-        'excellent', 'amazing', 'great', 'good', 'best', 'love', 'perfect',
-        'wonderful', 'fantastic', 'awesome', 'outstanding', 'superb', 'quality',
-        'fresh', 'delicious', 'tasty', 'healthy', 'organic', 'recommend',
-        'satisfied', 'happy', 'pleased', 'impressed', 'worth', 'value'
-    }
+    # Sentiment terms, generic phrases and spam patterns are in the
+    # lexicon files (app/lexicons, see app/review_lexicon.py)
+    DIGIT_RE = re.compile(r'\d+')
     
-    NEGATIVE_WORDS = {
-        'bad', 'poor', 'worst', 'terrible', 'awful', 'horrible', 'disappointing',
-        'disappointed', 'waste', 'useless', 'defective', 'broken', 'damaged',
-        'rotten', 'spoiled', 'stale', 'expired', 'fake', 'fraud', 'scam',
-        'unhappy', 'unsatisfied', 'regret', 'avoid', 'never', 'not recommend'
-    }
-    
-    # Spam indicators
-    SPAM_PATTERNS = [
-        r'(https?://|www\.)',  # URLs
-        r'(\+?\d{10,})',  # Phone numbers
-        r'(whatsapp|telegram|contact me)',  # Contact requests
-        r'(buy now|click here|limited offer)',  # Promotional language
-        r'(.)\1{4,}',  # Repeated characters (aaaaa)
-    ]
+    def __init__(self, duplicates: Optional[NearDuplicateIndex] = None,
+                 lexicon: Optional[ReviewLexicon] = None):
+        """
+        Args:
+            duplicates: Index of all reviews keyed (user_id, product_id), for
+                cross-account near-duplicate detection (disabled if None)
+            lexicon: Compiled lexicons (the built-in ones if None)
+        """
+        self.lexicon = lexicon or ReviewLexicon.load()
+        self.duplicates = duplicates
     
-    def __init__(self):
-        self.spam_regex = re.compile('|'.join(self.SPAM_PATTERNS), re.IGNORECASE)
+    def analyze(self, text: str, rating: int) -> ReviewAnalysis:
+        """
+        Analyze review text in a single pass.
+        
+        The lexicon terms, phrases and spam patterns are found in one scan
+        of the text, and sentiment, spam signals, rating-text mismatch and
+        quality are derived from that shared state.
+        
+        Args:
+            text: Review text
+            rating: Rating from 1 to 5
+            
+        Returns:
+            ReviewAnalysis
+        """
+        text = text or ''
+        match = self.lexicon.scan(text)
+        word_count = len(text.split())
+        
+        sentiment = self._sentiment(text, match)
+        spam = self._spam(text, match, word_count)
+        mismatch = self._mismatch(rating, sentiment)
+        quality_score = self._quality(text, word_count, sentiment, spam, mismatch)
+        return ReviewAnalysis(sentiment, spam, mismatch, quality_score)
     
     def analyze_sentiment(self, text: str) -> Dict[str, float]:
         """
@@ -49,6 +79,38 @@ class ReviewAnalyzer:
         Returns:
             Dict with sentiment scores and classification
         """
+        text = text or ''
+        return self._sentiment(text, self.lexicon.scan(text))
+    
+    def detect_spam(self, text: str) -> Dict[str, any]:
+        """
+        Detect spam/promotional content in review.
+        
+        Returns:
+            Dict with spam detection results
+        """
+        text = text or ''
+        return self._spam(text, self.lexicon.scan(text), len(text.split()))
+    
+    def check_rating_text_mismatch(self, rating: int, text: str) -> Dict[str, any]:
+        """
+        Check if rating matches review text sentiment.
+        
+        Returns:
+            Dict with mismatch detection results
+        """
+        return self._mismatch(rating, self.analyze_sentiment(text))
+    
+    def calculate_quality_score(self, text: str, rating: int) -> float:
+        """
+        Calculate overall quality score for review.
+        
+        Returns:
+            Quality score between 0 and 1
+        """
+        return self.analyze(text, rating).quality_score
+    
+    def _sentiment(self, text: str, match: LexiconMatch) -> Dict[str, float]:
         if not text:
             return {
                 'sentiment': 'neutral',
@@ -57,12 +119,8 @@ class ReviewAnalyzer:
                 'confidence': 0.0
             }
         
-        # Tokenize and clean
-        words = re.findall(r'\b\w+\b', text.lower())
-        
-        # Count sentiment words
-        positive_count = sum(1 for word in words if word in self.POSITIVE_WORDS)
-        negative_count = sum(1 for word in words if word in self.NEGATIVE_WORDS)
+        positive_count = match.positive
+        negative_count = match.negative
         
         total_sentiment_words = positive_count + negative_count
         
@@ -75,8 +133,8 @@ class ReviewAnalyzer:
             }
         
         # Calculate scores
-        positive_score = positive_count / max(len(words), 1)
-        negative_score = negative_count / max(len(words), 1)
+        positive_score = positive_count / match.words
+        negative_score = negative_count / match.words
         
         # Determine sentiment
         if positive_count > negative_count:
@@ -96,13 +154,7 @@ class ReviewAnalyzer:
             'confidence': confidence
         }
     
-    def detect_spam(self, text: str) -> Dict[str, any]:
-        """
-        Detect spam/promotional content in review.
-        
-        Returns:
-            Dict with spam detection results
-        """
+    def _spam(self, text: str, match: LexiconMatch, word_count: int) -> Dict[str, any]:
         if not text:
             return {'is_spam': False, 'spam_score': 0.0, 'reasons': []}
         
@@ -110,29 +162,28 @@ class ReviewAnalyzer:
         spam_score = 0.0
         
         # Check for spam patterns
-        if self.spam_regex.search(text):
+        if match.spam:
             reasons.append('Contains suspicious links or contact info')
             spam_score += 0.4
         
         # Check for excessive capitalization
-        caps_ratio = sum(1 for c in text if c.isupper()) / max(len(text), 1)
+        caps_ratio = match.caps / len(text)
         if caps_ratio > 0.5:
             reasons.append('Excessive capitalization')
             spam_score += 0.2
         
         # Check for repeated punctuation
-        if re.search(r'[!?]{3,}', text):
+        if match.punctuation:
             reasons.append('Excessive punctuation')
             spam_score += 0.1
         
         # Check for very short reviews (likely not helpful)
-        if len(text.split()) < 5:
+        if word_count < 5:
             reasons.append('Very short review')
             spam_score += 0.1
         
         # Check for generic/template language
-        generic_phrases = ['good product', 'nice product', 'ok product', 'fine']
-        if any(phrase in text.lower() for phrase in generic_phrases) and len(text.split()) < 10:
+        if word_count < 10 and match.generic:
             reasons.append('Generic/template language')
             spam_score += 0.2
         
@@ -142,15 +193,8 @@ class ReviewAnalyzer:
             'reasons': reasons
         }
     
-    def check_rating_text_mismatch(self, rating: int, text: str) -> Dict[str, any]:
-        """
-        Check if rating matches review text sentiment.
-        
-        Returns:
-            Dict with mismatch detection results
-        """
-        sentiment_result = self.analyze_sentiment(text)
-        
+    @staticmethod
+    def _mismatch(rating: int, sentiment_result: Dict[str, float]) -> Dict[str, any]:
         # Expected sentiment based on rating
         if rating >= 4:
             expected_sentiment = 'positive'
@@ -183,20 +227,14 @@ class ReviewAnalyzer:
             'confidence': sentiment_result['confidence']
         }
     
-    def calculate_quality_score(self, text: str, rating: int) -> float:
-        """
-        Calculate overall quality score for review.
-        
-        Returns:
-            Quality score between 0 and 1
-        """
+    def _quality(self, text: str, word_count: int, sentiment: Dict[str, float],
+                 spam: Dict[str, any], mismatch: Dict[str, any]) -> float:
         if not text:
             return 0.3
         
         score = 0.5  # Base score
         
         # Length factor (prefer detailed reviews)
-        word_count = len(text.split())
         if word_count >= 20:
             score += 0.2
         elif word_count >= 10:
@@ -204,18 +242,14 @@ class ReviewAnalyzer:
         elif word_count < 5:
             score -= 0.2
         
-        # Sentiment analysis
-        sentiment = self.analyze_sentiment(text)
+        # Confident sentiment
         if sentiment['confidence'] > 0.7:
             score += 0.1
         
-        # Check for spam
-        spam_check = self.detect_spam(text)
-        if spam_check['is_spam']:
+        if spam['is_spam']:
             score -= 0.3
         
-        # Check rating-text mismatch
-        mismatch = self.check_rating_text_mismatch(rating, text)
+        # Rating-text mismatch
         if mismatch['is_mismatch']:
             if mismatch['severity'] == 'high':
                 score -= 0.3
@@ -223,36 +257,55 @@ class ReviewAnalyzer:
                 score -= 0.1
         
         # Check for specific details (numbers, measurements, etc.)
-        if re.search(r'\d+', text):
+        if self.DIGIT_RE.search(text):
             score += 0.05
         
         return max(0.0, min(1.0, score))
     
-    def detect_fake_review(self, user_id: str, product_id: str, text: str, rating: int) -> Dict[str, any]:
+    def detect_fake_review(self, user_id: str, product_id: str, text: str, rating: int,
+                           analysis: Optional[ReviewAnalysis] = None,
+                           user_reviews: Optional[pd.DataFrame] = None) -> Dict[str, any]:
         """
         Detect potentially fake or fraudulent reviews.
         
+        Args:
+            user_id: Reviewer
+            product_id: Reviewed product
+            text: Review text
+            rating: Rating from 1 to 5
+            analysis: Result of analyze(text, rating), if already computed
+            user_reviews: The user's reviews of the last 30 days, if prefetched
+        
         Returns:
             Dict with fraud detection results
         """
+        analysis = analysis or self.analyze(text, rating)
         risk_score = 0.0
         risk_factors = []
         
         # Check spam
-        spam_check = self.detect_spam(text)
+        spam_check = analysis.spam
         if spam_check['is_spam']:
             risk_score += 0.3
             risk_factors.extend(spam_check['reasons'])
         
         # Check rating-text mismatch
-        mismatch = self.check_rating_text_mismatch(rating, text)
+        mismatch = analysis.mismatch
         if mismatch['is_mismatch'] and mismatch['severity'] == 'high':
             risk_score += 0.3
             risk_factors.append('Rating does not match review sentiment')
         
+        # Check for copies of the text posted from other accounts
+        if self.duplicates is not None:
+            matches = self.duplicates.query(text, exclude=(user_id, product_id))
+            if any(owner != user_id for _, owner, _ in matches):
+                risk_score += 0.3
+                risk_factors.append('Near-duplicate of reviews by other accounts')
+        
         # Check user review patterns
         try:
-            user_reviews = db.get_user_reviews(user_id, days=30)
+            if user_reviews is None:
+                user_reviews = db.get_user_reviews(user_id, days=30)
             
             if not user_reviews.empty:
                 # Check for review bombing (many reviews in short time)
@@ -298,7 +351,152 @@ class ReviewAnalyzer:
 
 
 # Initialize analyzer
-analyzer = ReviewAnalyzer()
+# The near-duplicate index lives in the ML store, shared by all workers
+analyzer = ReviewAnalyzer(
+    SharedNearDuplicateIndex(settings.ml_store_path, settings.review_duplicate_threshold,
+                             settings.review_duplicate_min_words)
+    if settings.review_duplicates_enabled else None,
+    ReviewLexicon.load(settings.review_lexicon_dir)
+)
+
+
+# Per-product sentiment aggregates in the ML store, see app/review_sentiment.py
+sentiment_store = (
+    ProductSentimentStore(settings.ml_store_path, db, settings.review_sentiment_refresh_seconds)
+    if settings.review_sentiment_enabled else None
+)
+
+
+def sentiment_and_quality(text: str, rating: int) -> Tuple[str, float]:
+    """Sentiment label and quality score of a review, for the sentiment aggregates."""
+    analysis = analyzer.analyze(text, rating)
+    return analysis.sentiment['sentiment'], analysis.quality_score
+
+
+def warm_up() -> dict:
+    """Index the stored reviews added or changed since the last sync for near-duplicate detection."""
+    if analyzer.duplicates is None:
+        return {"near_duplicates": False}
+    analyzer.duplicates.sync(db)
+    return analyzer.duplicates.status()
+
+
+def warm_up_sentiment() -> dict:
+    """Build the product sentiment aggregates if no process has yet."""
+    if sentiment_store is None:
+        return {"product_sentiment": False}
+    if not sentiment_store.ready():
+        sentiment_store.rebuild(sentiment_and_quality)
+    return sentiment_store.status()
+
+
+def index_reviews(requests: List[ReviewAnalysisRequest]):
+    """Add reviews to the near-duplicate index (replacing each user's earlier review of the product)."""
+    if analyzer.duplicates is not None:
+        analyzer.duplicates.add_many(((r.user_id, r.product_id), r.user_id, r.text) for r in requests)
+
+
+def moderate_review(request: ReviewAnalysisRequest,
+                    user_reviews: Optional[pd.DataFrame] = None,
+                    record: bool = True,
+                    index: bool = True) -> ReviewAnalysisResponse:
+    """
+    Full moderation result for one review.
+    
+    Args:
+        request: The review
+        user_reviews: The reviewer's reviews of the last 30 days, if prefetched
+            (fetched from the DB otherwise)
+        record: Whether to update the product's sentiment aggregates
+        index: Whether to add the review to the near-duplicate index
+            (False when the caller already has)
+        
+    Returns:
+        ReviewAnalysisResponse
+    """
+    if index:
+        index_reviews([request])
+    
+    # Sentiment, spam, rating-text mismatch and quality in one pass
+    analysis = analyzer.analyze(request.text, request.rating)
+    sentiment = analysis.sentiment
+    spam_check = analysis.spam
+    mismatch = analysis.mismatch
+    quality_score = analysis.quality_score
+    
+    if record and sentiment_store is not None:
+        try:
+            sentiment_store.record(request.product_id, request.user_id, request.rating,
+                                   sentiment['sentiment'], quality_score)
+        except Exception as e:
+            print(f"Error updating product sentiment aggregates: {e}")
+    
+    # Fake review detection
+    fraud_check = analyzer.detect_fake_review(
+        request.user_id,
+        request.product_id,
+        request.text,
+        request.rating,
+        analysis=analysis,
+        user_reviews=user_reviews
+    )
+    
+    # Overall recommendation
+    should_approve = (
+        not spam_check['is_spam'] and
+        fraud_check['risk_level'] != 'high' and
+        quality_score >= 0.3
+    )
+    
+    return ReviewAnalysisResponse(
+        sentiment=sentiment['sentiment'],
+        sentiment_scores={
+            'positive': sentiment['positive_score'],
+            'negative': sentiment['negative_score'],
+            'confidence': sentiment['confidence']
+        },
+        is_spam=spam_check['is_spam'],
+        spam_score=spam_check['spam_score'],
+        spam_reasons=spam_check['reasons'],
+        quality_score=quality_score,
+        rating_text_mismatch=mismatch['is_mismatch'],
+        mismatch_severity=mismatch['severity'],
+        fraud_risk_score=fraud_check['risk_score'],
+        fraud_risk_level=fraud_check['risk_level'],
+        fraud_risk_factors=fraud_check['risk_factors'],
+        recommendation=fraud_check['recommendation'],
+        should_approve=should_approve
+    )
+
+
+def moderate_reviews(requests: List[ReviewAnalysisRequest],
+                     user_reviews: Optional[pd.DataFrame] = None,
+                     record: bool = True) -> List[ReviewAnalysisResponse]:
+    """
+    Moderation results for many reviews, with one query for all reviewers' history.
+    
+    Args:
+        requests: The reviews
+        user_reviews: The reviewers' reviews of the last 30 days, if prefetched
+            (see DatabaseConnector.get_reviews_by_users)
+        record: Whether to update the products' sentiment aggregates
+        
+    Returns:
+        ReviewAnalysisResponse per review, in order
+    """
+    if user_reviews is None:
+        try:
+            user_reviews = db.get_reviews_by_users([r.user_id for r in requests], days=30)
+        except Exception as e:
+            print(f"Error prefetching user review patterns: {e}")
+            user_reviews = pd.DataFrame(columns=['userId'])
+    
+    # Copies within the batch are found whatever their order
+    index_reviews(requests)
+    
+    by_user = dict(tuple(user_reviews.groupby('userId', sort=False)))
+    no_reviews = user_reviews.iloc[:0]
+    return [moderate_review(r, by_user.get(r.user_id, no_reviews), record, index=False) for r in requests]
 
 
 @router.post("/analyze", response_model=ReviewAnalysisResponse)
@@ -312,65 +510,58 @@ async def analyze_review(request: ReviewAnalysisRequest = Body(...)):
     - Rating-text mismatch detection
     - Quality scoring
     - Fake review detection
+    
+    Runs in the threadpool: recording the review writes to the shared
+    near-duplicate index and sentiment aggregates, which may wait for
+    another worker's write lock.
     """
     try:
-        # Sentiment analysis
-        sentiment = analyzer.analyze_sentiment(request.text)
-        
-        # Spam detection
-        spam_check = analyzer.detect_spam(request.text)
-        
-        # Rating-text mismatch
-        mismatch = analyzer.check_rating_text_mismatch(request.rating, request.text)
-        
-        # Quality score
-        quality_score = analyzer.calculate_quality_score(request.text, request.rating)
-        
-        # Fake review detection
-        fraud_check = analyzer.detect_fake_review(
-            request.user_id,
-            request.product_id,
-            request.text,
-            request.rating
-        )
-        
-        # Overall recommendation
-        should_approve = (
-            not spam_check['is_spam'] and
-            fraud_check['risk_level'] != 'high' and
-            quality_score >= 0.3
-        )
-        
-        return ReviewAnalysisResponse(
-            sentiment=sentiment['sentiment'],
-            sentiment_scores={
-                'positive': sentiment['positive_score'],
-                'negative': sentiment['negative_score'],
-                'confidence': sentiment['confidence']
-            },
-            is_spam=spam_check['is_spam'],
-            spam_score=spam_check['spam_score'],
-            spam_reasons=spam_check['reasons'],
-            quality_score=quality_score,
-            rating_text_mismatch=mismatch['is_mismatch'],
-            mismatch_severity=mismatch['severity'],
-            fraud_risk_score=fraud_check['risk_score'],
-            fraud_risk_level=fraud_check['risk_level'],
-            fraud_risk_factors=fraud_check['risk_factors'],
-            recommendation=fraud_check['recommendation'],
-            should_approve=should_approve
-        )
-    
+        return await run_in_threadpool(moderate_review, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Review analysis failed: {str(e)}")
 
 
+@router.post("/analyze/batch", response_model=ReviewBatchResponse)
+async def analyze_reviews_batch(request: ReviewBatchRequest = Body(...)):
+    """
+    Analyze up to 1000 reviews in one call (see /reviews/analyze).
+    
+    The recent reviews of every reviewer in the batch are fetched with
+    one query instead of one query per review. The analysis runs in the
+    threadpool so that a large batch does not block the event loop.
+    """
+    try:
+        return ReviewBatchResponse(results=await run_in_threadpool(moderate_reviews, request.reviews))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch review analysis failed: {str(e)}")
+
+
 @router.get("/product/{product_id}/sentiment-summary")
-async def get_product_sentiment_summary(product_id: str):
+async def get_product_sentiment_summary(product_id: str, request: Request, response: Response):
     """
     Get sentiment summary for all reviews of a product.
+    
+    Read from the per-product aggregates once they are built, after
+    catching them up with reviews changed in the DB when due; until then
+    every review of the product is analysed. Answers If-None-Match with
+    304 while the aggregates (or the product's reviews) are unchanged.
     """
     try:
+        if sentiment_store is not None and sentiment_store.ready():
+            await run_in_threadpool(sentiment_store.ensure_fresh, sentiment_and_quality)
+            etag = make_etag("sentiment-summary", product_id, sentiment_store.version(product_id))
+            cached = not_modified(request, response, etag)
+            if cached is not None:
+                return cached
+            return sentiment_store.summary(product_id)
+        
+        # Edited and deleted reviews change the watermark too
+        etag = make_etag("sentiment-summary", product_id, settings.review_lexicon_dir,
+                         db.get_product_reviews_watermark(product_id))
+        cached = not_modified(request, response, etag)
+        if cached is not None:
+            return cached
+        
         reviews = db.get_product_reviews(product_id)
         
         if reviews.empty:
@@ -385,15 +576,10 @@ async def get_product_sentiment_summary(product_id: str):
         sentiments = []
         quality_scores = []
         
-        for _, review in reviews.iterrows():
-            sentiment = analyzer.analyze_sentiment(review['comment'] or '')
-            sentiments.append(sentiment['sentiment'])
-            
-            quality = analyzer.calculate_quality_score(
-                review['comment'] or '',
-                review['rating']
-            )
-            quality_scores.append(quality)
+        for comment, rating in zip(reviews['comment'], reviews['rating']):
+            analysis = analyzer.analyze(comment or '', rating)
+            sentiments.append(analysis.sentiment['sentiment'])
+            quality_scores.append(analysis.quality_score)
         
         # Calculate distribution
         sentiment_counts = Counter(sentiments)
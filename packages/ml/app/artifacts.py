@@ -0,0 +1,358 @@
+"""Memory-mappable on-disk format for recommendation model artifacts.
+
+Each training run writes a new version directory under
+`<model_dir>/recommendations/` and then atomically repoints the `CURRENT`
+file at it:
+
+    recommendations/
+        CURRENT                     -> "20261018T120000"
+        20261018T120000/
+            manifest.json           format version, shapes, dtypes
+            item_ids.npy            sorted item ids (bytes), row i of item_factors
+            item_factors.npy        float32 (n_items, factors)
+            item_norms.npy          float32 (n_items,) for cosine similarity
+            user_ids.npy            sorted user ids (bytes), row i of user_factors
+            user_factors.npy        float32 (n_users, factors)
+            product_ids.npy         sorted product ids (bytes), row i of the TF-IDF matrix
+            tfidf_data.npy          TF-IDF CSR components
+            tfidf_indices.npy
+            tfidf_indptr.npy
+            tfidf_vectorizer.joblib only needed to embed new text; never loaded for serving
+
+Arrays are opened with `mmap_mode='r'`, so loading is O(1) in catalogue and
+user counts and only the pages a request touches become resident (and,
+under pre-fork serving, are shared between workers). Ids are kept as
+sorted fixed-width byte strings, so id -> row lookups are a binary search
+over the memory map rather than a Python dict per id.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+ARTIFACT_FORMAT = "agri-connect-recommendations"
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_DIRNAME = "recommendations"
+MANIFEST_FILENAME = "manifest.json"
+CURRENT_FILENAME = "CURRENT"
+VECTORIZER_FILENAME = "tfidf_vectorizer.joblib"
+
+# Array files making up each component, used when carrying a component over
+# from the previous version
+COMPONENT_ARRAYS = {
+    "als": ("item_ids", "item_factors", "item_norms", "user_ids", "user_factors"),
+    "tfidf": ("product_ids", "tfidf_data", "tfidf_indices", "tfidf_indptr"),
+}
+
+
+def _encode_ids(ids: Iterable[str]) -> np.ndarray:
+    return np.array([str(i).encode('utf-8') for i in ids], dtype='S')
+
+
+def _sorted_ids(ids: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode ids and return (sorted ids, permutation that sorts them)."""
+    encoded = _encode_ids(ids)
+    order = np.argsort(encoded, kind='stable')
+    return encoded[order], order
+
+
+def _lookup(sorted_ids: np.ndarray, key: str) -> Optional[int]:
+    if sorted_ids is None or len(sorted_ids) == 0:
+        return None
+    needle = np.array(key.encode('utf-8'), dtype=sorted_ids.dtype)
+    pos = int(np.searchsorted(sorted_ids, needle))
+    if pos < len(sorted_ids) and sorted_ids[pos] == key.encode('utf-8'):
+        return pos
+    return None
+
+
+def _csr_matrix(data: np.ndarray, indices: np.ndarray, indptr: np.ndarray, shape):
+    from scipy.sparse import csr_matrix
+    return csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+
+class RecommendationArtifacts:
+    """
+    ALS factors, TF-IDF matrix and id mappings, backed by memory maps.
+
+    Row i of a factor matrix or of the TF-IDF matrix belongs to the i-th id
+    of the matching sorted id array.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], manifest: Optional[Dict[str, Any]] = None,
+                 directory: Optional[Path] = None):
+        self.arrays = arrays
+        self.manifest = manifest or {}
+        self.directory = directory
+        self._tfidf_matrix = None
+
+    @classmethod
+    def load(cls, root: Path, mmap_mode: Optional[str] = 'r') -> 'RecommendationArtifacts':
+        """
+        Open the current artifact version under `root`.
+
+        Raises:
+            FileNotFoundError: If no version has been written
+            ValueError: If the version uses an unsupported format
+        """
+        root = Path(root)
+        current = root / CURRENT_FILENAME
+        if not current.exists():
+            raise FileNotFoundError(f"No recommendation artifacts at {root}")
+        directory = root / current.read_text().strip()
+
+        with open(directory / MANIFEST_FILENAME) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != ARTIFACT_FORMAT or manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported artifact format {manifest.get('format')!r} "
+                f"v{manifest.get('format_version')} in {directory}"
+            )
+
+        arrays = {
+            name: np.load(directory / spec["file"], mmap_mode=mmap_mode, allow_pickle=False)
+            for name, spec in manifest["arrays"].items()
+        }
+        return cls(arrays, manifest, directory)
+
+    @classmethod
+    def from_legacy(cls, als_model=None, tfidf_data: Optional[dict] = None,
+                    mappings: Optional[dict] = None) -> Optional['RecommendationArtifacts']:
+        """
+        Build in-memory artifacts from the pickled ALS model, TF-IDF dict and
+        mappings.json written by earlier versions of train_recs.py.
+
+        Returns:
+            Artifacts, or None if none of the legacy files were available
+        """
+        arrays = {}
+        if als_model is not None and mappings:
+            # Index order as written by train_recs.py / quick_fix.py
+            index_to_item = mappings.get('index_to_item') or {}
+            index_to_user = mappings.get('index_to_user') or {}
+            arrays.update(_als_arrays(
+                als_model,
+                [index_to_user[str(i)] for i in range(len(index_to_user))],
+                [index_to_item[str(i)] for i in range(len(index_to_item))]
+            ))
+        manifest = {"format": "legacy"}
+        if tfidf_data is not None:
+            arrays.update(_tfidf_arrays(tfidf_data['products']['id'], tfidf_data['matrix']))
+            manifest["tfidf_shape"] = arrays.pop("_tfidf_shape").tolist()
+        if not arrays:
+            return None
+        return cls(arrays, manifest)
+
+    @property
+    def version(self) -> str:
+        return self.manifest.get("version", "legacy")
+
+    @property
+    def has_als(self) -> bool:
+        return "item_factors" in self.arrays
+
+    @property
+    def has_tfidf(self) -> bool:
+        return "tfidf_data" in self.arrays
+
+    @property
+    def item_ids(self) -> np.ndarray:
+        return self.arrays.get("item_ids", np.array([], dtype='S1'))
+
+    @property
+    def tfidf_matrix(self):
+        """TF-IDF CSR matrix over the (memory-mapped) data/indices/indptr arrays."""
+        if self._tfidf_matrix is None and self.has_tfidf:
+            self._tfidf_matrix = _csr_matrix(
+                self.arrays["tfidf_data"], self.arrays["tfidf_indices"],
+                self.arrays["tfidf_indptr"], self.manifest["tfidf_shape"]
+            )
+        return self._tfidf_matrix
+
+    def user_index(self, user_id: str) -> Optional[int]:
+        return _lookup(self.arrays.get("user_ids"), user_id)
+
+    def item_index(self, item_id: str) -> Optional[int]:
+        return _lookup(self.arrays.get("item_ids"), item_id)
+
+    def item_id(self, index: int) -> str:
+        return self.arrays["item_ids"][index].decode('utf-8')
+
+    def product_row(self, product_id: str) -> Optional[int]:
+        return _lookup(self.arrays.get("product_ids"), product_id)
+
+    def product_id(self, row: int) -> str:
+        return self.arrays["product_ids"][row].decode('utf-8')
+
+    def similar_items(self, item_index: int, N: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Items most similar to `item_index` by cosine similarity of ALS item
+        factors (the same scoring as implicit's `similar_items`).
+
+        Returns:
+            Tuple of (item indices, scores), best first, including the item itself
+        """
+        factors = self.arrays["item_factors"]
+        norms = self.arrays["item_norms"]
+        query = np.asarray(factors[item_index])
+        scores = factors @ query / (np.maximum(norms, 1e-10) * max(float(norms[item_index]), 1e-10))
+
+        n = min(N, len(scores))
+        if n <= 0:
+            return np.array([], dtype='int64'), np.array([], dtype='float32')
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """On-disk size of each array and whether it is memory-mapped."""
+        return {
+            "version": self.version,
+            "mmap": any(isinstance(a, np.memmap) for a in self.arrays.values()),
+            "array_bytes": {name: int(a.nbytes) for name, a in self.arrays.items()},
+        }
+
+
+def _als_arrays(als_model, user_ids, item_ids) -> Dict[str, np.ndarray]:
+    """Factor matrices and sorted ids from a fitted implicit ALS model."""
+    if hasattr(als_model, 'to_cpu'):
+        als_model = als_model.to_cpu()
+    item_factors = np.asarray(als_model.item_factors, dtype='float32')
+    user_factors = np.asarray(als_model.user_factors, dtype='float32')
+
+    sorted_items, item_order = _sorted_ids(item_ids)
+    sorted_users, user_order = _sorted_ids(user_ids)
+    item_factors = item_factors[item_order]
+    user_factors = user_factors[user_order] if len(user_order) else user_factors[:0]
+
+    return {
+        "item_ids": sorted_items,
+        "item_factors": item_factors,
+        "item_norms": np.linalg.norm(item_factors, axis=1).astype('float32'),
+        "user_ids": sorted_users,
+        "user_factors": user_factors,
+    }
+
+
+def _tfidf_arrays(product_ids: Iterable[str], tfidf_matrix) -> Dict[str, np.ndarray]:
+    """CSR components of the TF-IDF matrix with rows sorted by product id."""
+    sorted_ids, order = _sorted_ids(product_ids)
+    matrix = tfidf_matrix.tocsr()[order]
+    matrix.sort_indices()
+    return {
+        "product_ids": sorted_ids,
+        "tfidf_data": matrix.data.astype('float32'),
+        "tfidf_indices": matrix.indices,
+        "tfidf_indptr": matrix.indptr,
+        "_tfidf_shape": np.array(matrix.shape),
+    }
+
+
+def save_recommendation_artifacts(root: Path, als_model=None, user_ids=None, item_ids=None,
+                                  tfidf_model=None, tfidf_matrix=None, product_ids=None,
+                                  keep_versions: int = 3) -> Path:
+    """
+    Write a new artifact version and make it current.
+
+    Components that are not passed (e.g. ALS when only TF-IDF was retrained)
+    are carried over from the current version so that partial retraining
+    does not drop them.
+
+    Args:
+        root: Artifact root, normally settings.model_dir / ARTIFACT_DIRNAME
+        als_model: Fitted implicit ALS model
+        user_ids: User ids in ALS row order
+        item_ids: Item ids in ALS row order
+        tfidf_model: Fitted TfidfVectorizer
+        tfidf_matrix: TF-IDF sparse matrix, one row per product
+        product_ids: Product ids in TF-IDF row order
+        keep_versions: Number of versions to keep on disk
+
+    Returns:
+        The new version directory
+    """
+    import joblib
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    directory = root / version
+    staging = root / f".{version}.tmp"
+    staging.mkdir()
+
+    arrays = {}
+    if als_model is not None and item_ids is not None:
+        arrays.update(_als_arrays(als_model, user_ids or [], item_ids))
+    if tfidf_matrix is not None and product_ids is not None:
+        arrays.update(_tfidf_arrays(product_ids, tfidf_matrix))
+        if tfidf_model is not None:
+            joblib.dump(tfidf_model, staging / VECTORIZER_FILENAME)
+    tfidf_shape = arrays.pop("_tfidf_shape", None)
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+        "arrays": {},
+        "tfidf_shape": tfidf_shape.tolist() if tfidf_shape is not None else None,
+    }
+
+    for name, array in arrays.items():
+        filename = f"{name}.npy"
+        np.save(staging / filename, np.ascontiguousarray(array), allow_pickle=False)
+        manifest["arrays"][name] = {"file": filename, "dtype": str(array.dtype), "shape": list(array.shape)}
+
+    _carry_over(root, staging, manifest)
+    manifest["components"] = {
+        component: all(name in manifest["arrays"] for name in names)
+        for component, names in COMPONENT_ARRAYS.items()
+    }
+
+    with open(staging / MANIFEST_FILENAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    os.rename(staging, directory)
+    tmp_current = root / f"{CURRENT_FILENAME}.tmp"
+    tmp_current.write_text(version)
+    os.replace(tmp_current, root / CURRENT_FILENAME)
+
+    _prune_versions(root, keep_versions)
+    return directory
+
+
+def _carry_over(root: Path, staging: Path, manifest: dict):
+    """Hard-link (or copy) components missing from `manifest` from the current version."""
+    try:
+        previous = RecommendationArtifacts.load(root, mmap_mode='r')
+    except (FileNotFoundError, ValueError):
+        return
+
+    for component, names in COMPONENT_ARRAYS.items():
+        if any(name in manifest["arrays"] for name in names):
+            continue
+        if not all(name in previous.manifest["arrays"] for name in names):
+            continue
+        files = [previous.manifest["arrays"][name]["file"] for name in names]
+        if component == "tfidf":
+            manifest["tfidf_shape"] = previous.manifest.get("tfidf_shape")
+            if (previous.directory / VECTORIZER_FILENAME).exists():
+                files.append(VECTORIZER_FILENAME)
+        for filename in files:
+            source = previous.directory / filename
+            try:
+                os.link(source, staging / filename)
+            except OSError:
+                shutil.copy2(source, staging / filename)
+        for name in names:
+            manifest["arrays"][name] = previous.manifest["arrays"][name]
+
+
+def _prune_versions(root: Path, keep_versions: int):
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for old in versions[:-keep_versions]:
+        shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,356 @@
+"""Response caches shared by the workers of one host.
+
+Subsystems cache through a named `Cache` (get_cache("recommendations"))
+whose entries live in the backend chosen by CACHE_BACKEND:
+
+- memory: an LRU dict per process. Clearing a cache bumps a generation
+  counter in shared memory, which workers forked by app.prefork inherit,
+  so a clear in one worker invalidates the entries of all of them. With
+  `uvicorn --workers` (separate interpreters) each worker keeps its own
+  entries and hits drop accordingly.
+- sqlite: one SQLite file (CACHE_PATH) read and written by every worker.
+- redis: a Redis (or Redis-compatible) server at CACHE_REDIS_URL, which
+  needs the optional `redis` package.
+
+Entries expire after the cache's TTL. The sqlite and redis backends
+store pickled values, zlib-compressed above CACHE_COMPRESS_MIN_BYTES.
+"""
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import settings
+from .metrics import cache_hit_ratio, record_cache
+
+PICKLED = b'p'
+COMPRESSED = b'z'
+
+
+def encode(value: Any, compress_min_bytes: int = 1024) -> bytes:
+    """Serialise a value for a shared backend."""
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) >= compress_min_bytes:
+        return COMPRESSED + zlib.compress(data, 1)
+    return PICKLED + data
+
+
+def decode(data: bytes) -> Any:
+    if data[:1] == COMPRESSED:
+        return pickle.loads(zlib.decompress(data[1:]))
+    return pickle.loads(data[1:])
+
+
+class CacheBackend:
+    """Storage of cache entries, by namespace and key."""
+
+    name = "base"
+
+    def register(self, namespace: str, max_entries: int):
+        """Called once per namespace, at import time (before workers fork)."""
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def clear(self, namespace: str):
+        """Drop every entry of a namespace, in every worker."""
+        raise NotImplementedError
+
+    def size(self, namespace: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU dicts, invalidated across forked workers through shared memory."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._entries: Dict[str, OrderedDict] = {}
+        self._max_entries: Dict[str, int] = {}
+        # Shared with processes forked after register()
+        self._generations: Dict[str, Any] = {}
+        # Generation the local entries belong to
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def register(self, namespace: str, max_entries: int):
+        with self._lock:
+            self._entries.setdefault(namespace, OrderedDict())
+            self._max_entries[namespace] = max_entries
+            if namespace not in self._generations:
+                self._generations[namespace] = multiprocessing.RawValue('Q', 0)
+
+    def _current(self, namespace: str) -> OrderedDict:
+        # Entries of an older generation were cleared by some worker
+        entries = self._entries[namespace]
+        generation = self._generations[namespace].value
+        if self._seen.get(namespace) != generation:
+            entries.clear()
+            self._seen[namespace] = generation
+        return entries
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entries = self._current(namespace)
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del entries[key]
+                return None
+            entries.move_to_end(key)
+            return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        with self._lock:
+            entries = self._current(namespace)
+            entries[key] = (value, time.time() + ttl)
+            entries.move_to_end(key)
+            while len(entries) > self._max_entries[namespace]:
+                entries.popitem(last=False)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._current(namespace).pop(key, None)
+
+    def clear(self, namespace: str):
+        with self._lock:
+            # Lost increments between racing clears still change the value
+            self._generations[namespace].value += 1
+            self._current(namespace)
+
+    def size(self, namespace: str) -> int:
+        with self._lock:
+            return len(self._current(namespace))
+
+
+class SQLiteBackend(CacheBackend):
+    """Entries in one SQLite file shared by the workers of a host."""
+
+    name = "sqlite"
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID;
+    """
+    PRUNE_EVERY = 1000  # sets between deletes of expired entries
+
+    def __init__(self, path: Path, compress_min_bytes: int = 1024):
+        self.path = Path(path)
+        self.compress_min_bytes = compress_min_bytes
+        self._local = threading.local()
+        self._sets = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process (pre-fork workers must not share one)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Lost entries are recomputed; no fsync per write
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(self.SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        return decode(row[0]) if row is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)",
+            (namespace, key, encode(value, self.compress_min_bytes), time.time() + ttl)
+        )
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, namespace: str, key: str):
+        self._connect().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def clear(self, namespace: str):
+        self._connect().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def size(self, namespace: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+            (namespace, time.time())
+        ).fetchone()[0]
+
+
+class RedisBackend(CacheBackend):
+    """Entries in a Redis server, as `<prefix><namespace>:<key>` with a TTL."""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "ml:", compress_min_bytes: int = 1024):
+        """
+        Args:
+            client: redis.Redis or any client with get, set(px=), delete and scan_iter
+            prefix: Key prefix of this service's entries
+            compress_min_bytes: Values at least this large are compressed
+        """
+        self.client = client
+        self.prefix = prefix
+        self.compress_min_bytes = compress_min_bytes
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        data = self.client.get(self._key(namespace, key))
+        return decode(data) if data is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        self.client.set(self._key(namespace, key), encode(value, self.compress_min_bytes),
+                        px=max(1, int(ttl * 1000)))
+
+    def delete(self, namespace: str, key: str):
+        self.client.delete(self._key(namespace, key))
+
+    def clear(self, namespace: str):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}{namespace}:*", count=1000))
+        for start in range(0, len(keys), 1000):
+            self.client.delete(*keys[start:start + 1000])
+
+    def size(self, namespace: str) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}{namespace}:*", count=1000))
+
+
+class Cache:
+    """A named cache on the configured backend; see get_cache."""
+
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: float, max_entries: int):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        backend.register(namespace, max_entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value of a key, or None; counted as a hit or miss."""
+        try:
+            value = self.backend.get(self.namespace, key)
+        except Exception as e:
+            print(f"⚠ Cache {self.namespace} read failed: {e}")
+            value = None
+        record_cache(self.namespace, hit=value is not None)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Cache a value (not None) for ttl seconds, the cache's TTL by default."""
+        try:
+            self.backend.set(self.namespace, key, value, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            print(f"⚠ Cache {self.namespace} write failed: {e}")
+
+    def delete(self, key: str):
+        self.backend.delete(self.namespace, key)
+
+    def clear(self):
+        """Invalidate every entry, in all workers."""
+        self.backend.clear(self.namespace)
+
+    def size(self) -> int:
+        return self.backend.size(self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "size": self.size(),
+            "ttl_seconds": self.ttl,
+            "hit_ratio": cache_hit_ratio(self.namespace),
+        }
+
+
+_backend: Optional[CacheBackend] = None
+_caches: Dict[str, Cache] = {}
+_lock = threading.Lock()
+
+
+def create_backend(kind: str) -> CacheBackend:
+    """
+    Backend for a CACHE_BACKEND value.
+
+    Args:
+        kind: memory, sqlite or redis
+
+    Returns:
+        CacheBackend (memory if redis is requested but not installed)
+    """
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(settings.cache_path, settings.cache_compress_min_bytes)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            print("⚠ CACHE_BACKEND=redis needs the redis package; using the in-process cache")
+            return MemoryBackend()
+        return RedisBackend(redis.Redis.from_url(settings.cache_redis_url),
+                            compress_min_bytes=settings.cache_compress_min_bytes)
+    raise ValueError(f"Unknown cache backend: {kind} (expected memory, sqlite or redis)")
+
+
+def get_backend() -> CacheBackend:
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = create_backend(settings.cache_backend)
+        return _backend
+
+
+def get_cache(namespace: str, ttl: float, max_entries: Optional[int] = None) -> Cache:
+    """
+    The cache of a subsystem, created on first use.
+
+    Create caches at import time, so that with the memory backend the
+    invalidation counters are shared with pre-forked workers.
+
+    Args:
+        namespace: Cache name, also the `cache` label of ml_cache_requests_total
+        ttl: Seconds entries stay valid
+        max_entries: Entries kept per process by the memory backend
+            (CACHE_MAX_ENTRIES by default)
+    """
+    backend = get_backend()
+    with _lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = Cache(namespace, backend, ttl, max_entries or settings.cache_max_entries)
+            _caches[namespace] = cache
+        return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every cache created in this process."""
+    with _lock:
+        caches = list(_caches.values())
+    return {cache.namespace: cache.stats() for cache in caches}
@@ -1,6 +1,7 @@
 """Configuration management for ML service."""
 import os
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -20,10 +21,64 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "file:../api/prisma/dev.db"
+    # Queries slower than this log their EXPLAIN QUERY PLAN (0 disables)
+    slow_query_ms: float = 250.0
+    
+    # SQLite read-replica mode. The API owns writes, so the ML service opens
+    # the file read-only (one pooled connection per thread) and switches it
+    # to WAL once so its reads never block the API's writes.
+    db_read_only: bool = True
+    db_enable_wal: bool = True
+    db_mmap_size_mb: int = 256
+    db_cache_size_mb: int = 64
+    db_pool_size: int = 40  # threads that keep a connection
+    # Rows per chunk of the streaming iter_* readers
+    db_chunk_size: int = 100_000
+    
+    # Heavy analytics queries (training extracts, aggregates) read a private
+    # snapshot of the DB, refreshed every db_snapshot_interval_seconds
+    db_snapshot_enabled: bool = False
+    db_snapshot_path: Path = Path("./snapshots/analytics.db")
+    db_snapshot_interval_seconds: int = 900
+    
+    # SQLite file owned by the ML service (the shared DB is read-only)
+    ml_store_path: Path = Path("./store/ml.db")
+    # Per-product daily sales rollup read by forecasting and pricing,
+    # refreshed incrementally from orders.updatedAt
+    sales_rollup_enabled: bool = True
+    sales_rollup_interval_seconds: int = 300
+    
+    # Parquet snapshots of the training tables (training/extract.py), read
+    # by every trainer and extracted again when older than the max age
+    training_snapshot_dir: Path = Path("./snapshots/training")
+    training_snapshot_max_age_seconds: int = 3600
+    training_snapshot_max_parts: int = 16  # incremental parts before compacting
+    
+    # Response caches (app/cache.py): memory (per process, cleared in all
+    # pre-forked workers), sqlite (a file shared by the workers of a host)
+    # or redis
+    cache_backend: str = "memory"
+    cache_path: Path = Path("./store/cache.db")
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_max_entries: int = 10_000  # per cache and process (memory backend)
+    cache_compress_min_bytes: int = 1024  # sqlite/redis values compressed from this size
+    recommendation_cache_ttl_seconds: int = 3600
+    forecast_cache_ttl_seconds: int = 3600
+    chat_cache_ttl_seconds: int = 3600
     
     # Server
     ml_service_port: int = 8000
     ml_service_host: str = "0.0.0.0"
+    ml_service_workers: int = 4  # pre-fork mode (python -m app.prefork)
+    
+    # Comma-separated routers (modules under app/api) this deployment serves.
+    # Routers that are not listed are never imported, nor are their
+    # dependencies.
+    enabled_routers: str = "recommend,forecast,price_opt,fraud,chat,review_analysis"
+    
+    # Load and exercise models in the background at startup; /ready fails
+    # until this completes
+    warmup_enabled: bool = True
     
     # Model storage
     model_dir: Path = Path("./models")
@@ -43,10 +98,58 @@ class Settings(BaseSettings):
     # Fraud detection
     fraud_threshold: float = 0.7
     
+    # Review moderation: cross-account near-duplicate detection (MinHash/LSH
+    # over all reviews, built at warm-up and updated by /reviews/analyze)
+    review_duplicates_enabled: bool = True
+    review_duplicate_threshold: float = 0.7  # estimated Jaccard similarity
+    review_duplicate_min_words: int = 8  # shorter reviews are not compared
+    # Per-product sentiment aggregates in the ML store read by
+    # sentiment-summary, updated by every analysed review and caught up
+    # from product_reviews.updatedAt
+    review_sentiment_enabled: bool = True
+    review_sentiment_refresh_seconds: int = 60
+    # Directory of lexicon files (positive.txt, negative.txt, generic.txt,
+    # spam.txt) replacing the built-in ones in app/lexicons
+    review_lexicon_dir: Optional[Path] = None
+    
     # Chatbot/RAG
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
     top_k_docs: int = 5
     max_context_length: int = 512
+    vector_quantization: str = "none"  # none, int8 or pq
+    vector_pq_subquantizers: int = 48
+    vector_rerank_candidates: int = 50
+    
+    # Admission control per worker process (app/admission.py): requests in
+    # flight per endpoint class and in total, requests allowed to wait for
+    # a slot and for how long. Priority: fraud > recommendations > analytics.
+    # Degraded answers (allow_degraded routes) have their own slots.
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 32
+    admission_degraded_concurrency: int = 4
+    admission_fraud_concurrency: int = 32
+    admission_fraud_queue: int = 128
+    admission_fraud_max_wait_ms: int = 500
+    admission_recommendations_concurrency: int = 16
+    admission_recommendations_queue: int = 64
+    admission_recommendations_max_wait_ms: int = 1000
+    admission_analytics_concurrency: int = 4
+    admission_analytics_queue: int = 16
+    admission_analytics_max_wait_ms: int = 2000
+    
+    # Per-request profiling. Requests carrying X-Profile-Token equal to
+    # profiling_token are profiled, as is a random profiling_sample_rate
+    # fraction of all requests. An empty token disables /debug/profiles.
+    profiling_token: str = ""
+    profiling_sample_rate: float = 0.0
+    profiling_mode: str = "sample"  # sample (collapsed stacks) or cprofile (pstats)
+    profiling_dir: Path = Path("./profiles")
+    profiling_max_files: int = 50
+    
+    @property
+    def router_names(self) -> list:
+        """Enabled router module names, in the order they are mounted."""
+        return [name.strip() for name in self.enabled_routers.split(",") if name.strip()]
 
 
 settings = Settings()
@@ -1,19 +1,341 @@
 """Database connection and helper functions."""
+import os
 import pandas as pd
-from sqlalchemy import create_engine, text
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import Engine
-from typing import Optional, List, Dict, Any
+from sqlalchemy.pool import NullPool, SingletonThreadPool
+from typing import Optional, List, Dict, Any, Iterator, Tuple, Union
 from datetime import datetime, timedelta
 
 from .config import settings
+from .metrics import db_query_seconds, timed_methods
+from .streaming import IdEncoder, typed_chunk
+from .rollup import (
+    COLUMNS as ROLLUP_COLUMNS, SalesRollup, next_day,
+    price_demand, price_demand_features, sales_history, sales_timeseries
+)
+
+
+# Shared by the get_* readers and their chunked iter_* variants
+USER_PRODUCT_SCORES_QUERY = """
+    SELECT 
+        userId,
+        productId,
+        CASE 
+            WHEN type = 'purchase' THEN 5.0
+            WHEN type = 'add_to_cart' THEN 3.0
+            WHEN type = 'favorite' THEN 2.0
+            WHEN type = 'view' THEN 1.0
+            ELSE 0.5
+        END as score
+    FROM events
+    WHERE userId IS NOT NULL AND productId IS NOT NULL
+"""
+
+ALL_ORDERS_QUERY = """
+    SELECT 
+        o.customerId as user_id,
+        oi.productId as product_id,
+        oi.qty as quantity,
+        o.createdAt as order_date
+    FROM orders o
+    JOIN order_items oi ON o.id = oi.orderId
+    WHERE o.status NOT IN ('CANCELLED', 'REFUNDED')
+    ORDER BY o.createdAt DESC
+"""
+
+# Reviews with their product name, as used by review fraud checks
+USER_REVIEWS_QUERY = """
+    SELECT 
+        pr.id,
+        pr.userId,
+        pr.productId,
+        pr.orderId,
+        pr.rating,
+        pr.comment,
+        pr.images,
+        pr.createdAt,
+        pr.updatedAt,
+        p.name as product_name
+    FROM product_reviews pr
+    LEFT JOIN products p ON pr.productId = p.id
+"""
+USER_REVIEWS_COLUMNS = [
+    'id', 'userId', 'productId', 'orderId', 'rating', 'comment', 'images', 'createdAt', 'updatedAt', 'product_name'
+]
+
+
+def normalize_sql(query: str) -> str:
+    """Statement fingerprint: whitespace collapsed, IN lists and LIMIT values folded."""
+    query = re.sub(r'\s+', ' ', query).strip()
+    query = re.sub(r'IN \((?:\s*\?\s*,)*\s*\?\s*\)', 'IN (?...)', query)
+    return re.sub(r'LIMIT \d+', 'LIMIT ?', query)
+
+
+def sqlite_path(database_url: str) -> Optional[Path]:
+    """Filesystem path of a `file:` or `sqlite:///` database URL (None for other databases)."""
+    for prefix in ("sqlite:///", "file:"):
+        if database_url.startswith(prefix):
+            return Path(database_url[len(prefix):])
+    return None
+
+
+def _configure_read_connection(dbapi_connection, connection_record):
+    """Per-connection pragmas for read-only access."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA mmap_size = {settings.db_mmap_size_mb * 2**20}")
+    # Negative cache_size is in KiB
+    cursor.execute(f"PRAGMA cache_size = {-settings.db_cache_size_mb * 1024}")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+def enable_wal(path: Path) -> bool:
+    """
+    Switch a SQLite DB to write-ahead logging, so readers never block the writer.
+    
+    The journal mode is stored in the file, so this only has to succeed once.
+    
+    Args:
+        path: SQLite database file
+        
+    Returns:
+        True if the DB is in WAL mode
+    """
+    if not path.exists():
+        return False
+    conn = sqlite3.connect(path, timeout=5)
+    try:
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            return True
+        mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        print(f"✓ Switched {path} to WAL journal mode" if mode == "wal" else f"⚠ {path} stays in {mode} journal mode")
+        return mode == "wal"
+    except sqlite3.Error as e:
+        print(f"⚠ Could not enable WAL on {path}: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def read_only_engine(path: Path, poolclass=SingletonThreadPool) -> Engine:
+    """
+    Engine that opens a SQLite DB read-only, with read-tuned pragmas.
+    
+    Args:
+        path: SQLite database file
+        poolclass: SingletonThreadPool keeps one connection per thread;
+            NullPool opens a connection per query
+            
+    Returns:
+        SQLAlchemy engine
+    """
+    pool_args = {'pool_size': settings.db_pool_size} if poolclass is SingletonThreadPool else {}
+    engine = create_engine(
+        f"sqlite:///file:{path.resolve()}?mode=ro&uri=true",
+        poolclass=poolclass,
+        connect_args={'check_same_thread': False},
+        **pool_args
+    )
+    event.listen(engine, "connect", _configure_read_connection)
+    return engine
+
+
+def backup_database(source: Path, dest: Path) -> Path:
+    """
+    Consistent copy of a SQLite DB using the online backup API.
+    
+    Safe while another process writes to `source`; `dest` is replaced
+    atomically, so readers see either the old or the new copy.
+    
+    Args:
+        source: SQLite database to copy
+        dest: Copy to create or replace
+        
+    Returns:
+        dest
+    """
+    if dest.exists() and dest.resolve() == source.resolve():
+        raise ValueError("The copy must not replace the source database")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per process, so pre-fork workers refreshing at once do not collide
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.tmp")
+    src = sqlite3.connect(f"file:{source.resolve()}?mode=ro", uri=True)
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst)
+        # A private copy needs no WAL (and no -wal/-shm files next to it)
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        src.close()
+        dst.close()
+    os.replace(tmp, dest)
+    return dest
+
+
+class SnapshotManager:
+    """Private copy of the DB for heavy analytics queries, refreshed periodically."""
+    
+    def __init__(self, source: Path, path: Path, interval_seconds: int):
+        self.source = source
+        self.path = path
+        self.interval = interval_seconds
+        # A connection per query, so each query opens the latest snapshot file
+        self.engine = read_only_engine(path, poolclass=NullPool)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def age(self) -> Optional[float]:
+        """Seconds since the snapshot was written (by this or any other process)."""
+        try:
+            return time.time() - self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+    
+    def refresh(self):
+        with self._lock:
+            start = time.perf_counter()
+            backup_database(self.source, self.path)
+            size_mb = self.path.stat().st_size / 2**20
+            print(f"✓ Analytics snapshot refreshed in {time.perf_counter() - start:.1f}s ({size_mb:.1f} MiB)")
+    
+    def ensure_fresh(self):
+        """Refresh in the caller if there is no snapshot, or it is stale and nothing refreshes it."""
+        age = self.age()
+        if age is None or (self._thread is None and age > self.interval):
+            self.refresh()
+    
+    def _run(self):
+        while True:
+            age = self.age()
+            if age is None or age >= self.interval:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠ Analytics snapshot refresh failed: {e}")
+            if self._stop.wait(max(1.0, self.interval / 4)):
+                return
+    
+    def start(self):
+        """Refresh in a background thread until stop()."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-snapshot", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def status(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            'path': str(self.path),
+            'age_seconds': round(age, 1) if age is not None else None,
+            'interval_seconds': self.interval,
+        }
+
+
+class QueryStats:
+    """Per-method and per-statement timing and row counts for DatabaseConnector."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements: Dict[str, Dict[str, Any]] = {}
+    
+    def record(self, method: str, statement: str, elapsed_ms: float, rows: int, slow: bool) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is None:
+                entry = self._statements[statement] = {
+                    'statement': statement,
+                    'methods': set(),
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'slow_calls': 0,
+                    'plan': None,
+                }
+            entry['methods'].add(method)
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['rows'] += rows
+            entry['slow_calls'] += int(slow)
+            return entry
+    
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+    
+    def summary(self, limit: int = 20) -> Dict[str, Any]:
+        """
+        Aggregate statistics, slowest first.
+        
+        Args:
+            limit: Number of statements to include
+            
+        Returns:
+            Dict with per-method totals and the statements with the most total time
+        """
+        with self._lock:
+            entries = [dict(entry, methods=sorted(entry['methods'])) for entry in self._statements.values()]
+        
+        methods: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            for method in entry['methods']:
+                totals = methods.setdefault(method, {'calls': 0, 'total_ms': 0.0, 'rows': 0, 'slow_calls': 0})
+                for field in ('calls', 'total_ms', 'rows', 'slow_calls'):
+                    totals[field] += entry[field]
+        for totals in methods.values():
+            totals['total_ms'] = round(totals['total_ms'], 3)
+            totals['avg_ms'] = round(totals['total_ms'] / totals['calls'], 3)
+        
+        statements = sorted(entries, key=lambda e: e['total_ms'], reverse=True)[:limit]
+        for entry in statements:
+            entry['avg_ms'] = round(entry['total_ms'] / entry['calls'], 3)
+            entry['avg_rows'] = round(entry['rows'] / entry['calls'], 1)
+            entry['total_ms'] = round(entry['total_ms'], 3)
+            entry['max_ms'] = round(entry['max_ms'], 3)
+        
+        return {
+            'slow_query_ms': settings.slow_query_ms,
+            'methods': dict(sorted(methods.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)),
+            'statements': statements,
+        }
 
 
 class DatabaseConnector:
     """Database connector for ML service."""
     
-    def __init__(self):
-        """Initialize database connection."""
+    def __init__(self, read_only: Optional[bool] = None):
+        """
+        Initialize database connection.
+        
+        Args:
+            read_only: Open SQLite read-only (default: settings.db_read_only);
+                scripts that write pass False
+        """
+        self.read_only = settings.db_read_only if read_only is None else read_only
         self.engine = self._create_engine()
+        self.snapshots = self._create_snapshots()
+        self.sales_rollup = (
+            SalesRollup(settings.ml_store_path, self, settings.sales_rollup_interval_seconds)
+            if settings.sales_rollup_enabled else None
+        )
+        self.stats = QueryStats()
     
     def _create_engine(self) -> Engine:
         """Create SQLAlchemy engine with proper configuration."""
@@ -24,6 +346,13 @@ class DatabaseConnector:
             db_path = db_url.replace('file:', '')
             db_url = f'sqlite:///{db_path}'
         
+        # The API owns writes; read-only connections never take write locks
+        if self.read_only and db_url.startswith('sqlite:///'):
+            path = sqlite_path(db_url)
+            if settings.db_enable_wal:
+                enable_wal(path)
+            return read_only_engine(path)
+        
         connect_args = {}
         if 'sqlite' in db_url:
             connect_args['check_same_thread'] = False
@@ -34,6 +363,100 @@ class DatabaseConnector:
             connect_args=connect_args
         )
     
+    def _create_snapshots(self) -> Optional[SnapshotManager]:
+        path = sqlite_path(settings.database_url)
+        if not settings.db_snapshot_enabled or path is None:
+            return None
+        return SnapshotManager(path, settings.db_snapshot_path, settings.db_snapshot_interval_seconds)
+    
+    @property
+    def analytics_engine(self) -> Engine:
+        """Engine for heavy whole-table queries: the private snapshot when enabled."""
+        if self.snapshots is None:
+            return self.engine
+        self.snapshots.ensure_fresh()
+        return self.snapshots.engine
+    
+    def _read_sql(self, query: str, params: Optional[Union[Dict, List]] = None,
+                  engine: Optional[Engine] = None) -> pd.DataFrame:
+        """Run a query into a DataFrame, recording its time and row count."""
+        start = time.perf_counter()
+        df = pd.read_sql(query, engine or self.engine, params=params)
+        # Called directly from the public method that issued the query
+        self._record(sys._getframe(1).f_code.co_name, query, params, start, len(df))
+        return df
+    
+    def _fetch_rows(self, query: str, params: Optional[Dict] = None) -> list:
+        """Run a query and fetch all rows, recording its time and row count."""
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(query), params or {}).fetchall()
+        self._record(sys._getframe(1).f_code.co_name, query, params, start, len(rows))
+        return rows
+
+    def _iter_sql(self, query: str, params: Optional[Union[Dict, List]] = None,
+                  engine: Optional[Engine] = None, chunksize: Optional[int] = None,
+                  encoders: Optional[Dict[str, IdEncoder]] = None,
+                  timestamps: Tuple[str, ...] = ()) -> Iterator[pd.DataFrame]:
+        """Run a query as typed DataFrame chunks, recording its total time and row count."""
+        method = sys._getframe(1).f_code.co_name
+
+        def chunks():
+            fetch_seconds, rows = 0.0, 0
+            reader = pd.read_sql(query, engine or self.engine, params=params,
+                                 chunksize=chunksize or settings.db_chunk_size)
+            while True:
+                start = time.perf_counter()
+                chunk = next(reader, None)
+                fetch_seconds += time.perf_counter() - start
+                if chunk is None:
+                    break
+                rows += len(chunk)
+                yield typed_chunk(chunk, encoders, timestamps)
+            # Time spent fetching, not in the consumer between chunks
+            self._record(method, query, params, time.perf_counter() - fetch_seconds, rows)
+
+        return chunks()
+
+    def _record(self, method: str, query: str, params, start: float, rows: int):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        statement = normalize_sql(query)
+        slow = 0 < settings.slow_query_ms <= elapsed_ms
+        entry = self.stats.record(method, statement, elapsed_ms, rows, slow)
+        if not slow:
+            return
+        
+        # The plan of a statement rarely changes, so explain it once
+        if entry['plan'] is None:
+            entry['plan'] = self.explain(query, params)
+        plan = "\n".join(f"    {line}" for line in entry['plan'])
+        print(f"⚠ Slow query in {method}: {elapsed_ms:.1f}ms, {rows} rows\n  {statement}\n{plan}")
+    
+    def explain(self, query: str, params: Optional[Union[Dict, List]] = None) -> List[str]:
+        """
+        Get the SQLite query plan for a statement.
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            Plan steps, indented by depth (empty for other databases)
+        """
+        if self.engine.dialect.name != 'sqlite':
+            return []
+        try:
+            plan = pd.read_sql(f"EXPLAIN QUERY PLAN {query}", self.engine, params=params)
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        
+        depth = {0: -1}
+        lines = []
+        for _, step in plan.iterrows():
+            depth[step['id']] = depth.get(step['parent'], -1) + 1
+            lines.append("  " * depth[step['id']] + str(step['detail']))
+        return lines
+    
     def get_products(self, status: str = "APPROVED") -> pd.DataFrame:
         """
         Fetch products from database.
@@ -62,7 +485,7 @@ class DatabaseConnector:
             LEFT JOIN categories c ON p.categoryId = c.id
             WHERE p.status = :status
         """
-        return pd.read_sql(query, self.engine, params={'status': status})
+        return self._read_sql(query, {'status': status})
     
     def get_orders(self, days: Optional[int] = None) -> pd.DataFrame:
         """
@@ -74,6 +497,26 @@ class DatabaseConnector:
         Returns:
             DataFrame with order data
         """
+        query, params = self._orders_query(days)
+        return self._read_sql(query, params, engine=self.analytics_engine)
+    
+    def iter_orders(self, days: Optional[int] = None, chunksize: Optional[int] = None,
+                    encoders: Optional[Dict[str, IdEncoder]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Fetch orders in chunks (see get_orders).
+        
+        Args:
+            days: Number of days to look back (None for all)
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+            encoders: Id columns (e.g. customerId, productId) to yield as int32 codes
+            
+        Returns:
+            Iterator of typed order DataFrames
+        """
+        query, params = self._orders_query(days)
+        return self._iter_sql(query, params, self.analytics_engine, chunksize, encoders, ('createdAt',))
+    
+    def _orders_query(self, days: Optional[int]) -> Tuple[str, Dict]:
         query = """
             SELECT 
                 o.id,
@@ -92,10 +535,9 @@ class DatabaseConnector:
         
         if days:
             query += " WHERE o.createdAt >= :cutoff_date"
-            cutoff = datetime.now() - timedelta(days=days)
-            return pd.read_sql(query, self.engine, params={'cutoff_date': cutoff})
+            return query, {'cutoff_date': datetime.now() - timedelta(days=days)}
         
-        return pd.read_sql(query, self.engine)
+        return query, {}
     
     def get_events(self, event_type: Optional[str] = None, days: Optional[int] = None) -> pd.DataFrame:
         """
@@ -108,6 +550,28 @@ class DatabaseConnector:
         Returns:
             DataFrame with event data
         """
+        query, params = self._events_query(event_type, days)
+        return self._read_sql(query, params, engine=self.analytics_engine)
+    
+    def iter_events(self, event_type: Optional[str] = None, days: Optional[int] = None,
+                    chunksize: Optional[int] = None,
+                    encoders: Optional[Dict[str, IdEncoder]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Fetch user events in chunks (see get_events).
+        
+        Args:
+            event_type: Filter by event type (view, add_to_cart, purchase, etc.)
+            days: Number of days to look back (None for all)
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+            encoders: Id columns (e.g. userId, productId) to yield as int32 codes
+            
+        Returns:
+            Iterator of typed event DataFrames
+        """
+        query, params = self._events_query(event_type, days)
+        return self._iter_sql(query, params, self.analytics_engine, chunksize, encoders, ('createdAt',))
+    
+    def _events_query(self, event_type: Optional[str], days: Optional[int]) -> Tuple[str, Dict]:
         query = "SELECT * FROM events WHERE 1=1"
         params = {}
         
@@ -120,8 +584,7 @@ class DatabaseConnector:
             params['cutoff_date'] = datetime.now() - timedelta(days=days)
         
         query += " ORDER BY createdAt DESC"
-        
-        return pd.read_sql(query, self.engine, params=params)
+        return query, params
     
     def get_user_product_matrix(self) -> pd.DataFrame:
         """
@@ -130,21 +593,21 @@ class DatabaseConnector:
         Returns:
             DataFrame with userId, productId, and interaction score
         """
-        query = """
-            SELECT 
-                userId,
-                productId,
-                CASE 
-                    WHEN type = 'purchase' THEN 5.0
-                    WHEN type = 'add_to_cart' THEN 3.0
-                    WHEN type = 'favorite' THEN 2.0
-                    WHEN type = 'view' THEN 1.0
-                    ELSE 0.5
-                END as score
-            FROM events
-            WHERE userId IS NOT NULL AND productId IS NOT NULL
+        return self._read_sql(USER_PRODUCT_SCORES_QUERY, engine=self.analytics_engine)
+    
+    def iter_user_product_matrix(self, chunksize: Optional[int] = None,
+                                 encoders: Optional[Dict[str, IdEncoder]] = None) -> Iterator[pd.DataFrame]:
         """
-        return pd.read_sql(query, self.engine)
+        Fetch user-product interaction scores in chunks (see get_user_product_matrix).
+        
+        Args:
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+            encoders: Id columns (userId, productId) to yield as int32 codes
+            
+        Returns:
+            Iterator of DataFrames with userId, productId and score
+        """
+        return self._iter_sql(USER_PRODUCT_SCORES_QUERY, None, self.analytics_engine, chunksize, encoders)
     
     def get_user_order_history(self, user_id: str) -> pd.DataFrame:
         """
@@ -170,7 +633,7 @@ class DatabaseConnector:
                 AND o.status NOT IN ('CANCELLED', 'REFUNDED')
             ORDER BY o.createdAt DESC
         """
-        return pd.read_sql(query, self.engine, params={'user_id': user_id})
+        return self._read_sql(query, {'user_id': user_id})
     
     def get_all_orders(self) -> pd.DataFrame:
         """
@@ -179,18 +642,21 @@ class DatabaseConnector:
         Returns:
             DataFrame with user_id, product_id, quantity
         """
-        query = """
-            SELECT 
-                o.customerId as user_id,
-                oi.productId as product_id,
-                oi.qty as quantity,
-                o.createdAt as order_date
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.orderId
-            WHERE o.status NOT IN ('CANCELLED', 'REFUNDED')
-            ORDER BY o.createdAt DESC
+        return self._read_sql(ALL_ORDERS_QUERY, engine=self.analytics_engine)
+    
+    def iter_all_orders(self, chunksize: Optional[int] = None,
+                        encoders: Optional[Dict[str, IdEncoder]] = None) -> Iterator[pd.DataFrame]:
         """
-        return pd.read_sql(query, self.engine)
+        Fetch all order items in chunks (see get_all_orders).
+        
+        Args:
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+            encoders: Id columns (user_id, product_id) to yield as int32 codes
+            
+        Returns:
+            Iterator of DataFrames with user_id, product_id, quantity, order_date
+        """
+        return self._iter_sql(ALL_ORDERS_QUERY, None, self.analytics_engine, chunksize, encoders, ('order_date',))
     
     def get_product_metadata(self, product_ids: List[str]) -> pd.DataFrame:
         """
@@ -221,7 +687,7 @@ class DatabaseConnector:
             WHERE p.id IN ({placeholders})
                 AND p.status = 'APPROVED'
         """
-        return pd.read_sql(query, self.engine, params=product_ids)
+        return self._read_sql(query, product_ids)
     
     def get_user_view_events(self, user_id: str, days: Optional[int] = 30) -> pd.DataFrame:
         """
@@ -254,7 +720,7 @@ class DatabaseConnector:
         
         query += " ORDER BY createdAt DESC"
         
-        return pd.read_sql(query, self.engine, params=params)
+        return self._read_sql(query, params)
     
     def get_top_selling_products(self, limit: int = 20) -> List[str]:
         """
@@ -277,40 +743,185 @@ class DatabaseConnector:
             ORDER BY total_sold DESC
             LIMIT :limit
         """
-        result = pd.read_sql(query, self.engine, params={'limit': limit})
+        result = self._read_sql(query, {'limit': limit}, engine=self.analytics_engine)
         return result['product_id'].tolist()
     
-    def get_product_sales_history(self, product_id: str, days: int = 365) -> pd.DataFrame:
+    def get_max_order_updated_at(self) -> Optional[str]:
         """
-        Get sales history for a specific product.
+        Latest order update time, the starting watermark of the sales rollup.
+        
+        Returns:
+            Max orders.updatedAt, or None if there are no orders
+        """
+        rows = self._fetch_rows("SELECT MAX(updatedAt) FROM orders")
+        return rows[0][0] if rows else None
+    
+    def get_max_review_updated_at(self) -> Optional[str]:
+        """
+        Latest review update time, recorded by the product sentiment rebuild.
+        
+        Returns:
+            Max product_reviews.updatedAt, or None if there are no reviews
+        """
+        rows = self._fetch_rows("SELECT MAX(updatedAt) FROM product_reviews")
+        return rows[0][0] if rows else None
+    
+    def get_product_orders_watermark(self, product_id: str) -> Tuple[Optional[str], int]:
+        """
+        Latest update time and item count of the orders containing a product.
+        
+        Any new, changed (e.g. cancelled) or deleted order of the product
+        changes one of the two.
         
         Args:
             product_id: Product ID
-            days: Number of days to look back
             
         Returns:
-            DataFrame with daily sales data
+            Tuple of (max orders.updatedAt or None, number of order items)
+        """
+        query = """
+            SELECT MAX(o.updatedAt), COUNT(*)
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.orderId
+            WHERE oi.productId = :product_id
+        """
+        updated_at, items = self._fetch_rows(query, {'product_id': product_id})[0]
+        return updated_at, items
+    
+    def get_product_sales_version(self, product_id: str) -> str:
+        """
+        Version token of a product's daily sales.
+        
+        Changes whenever get_product_sales_history or get_daily_price_demand
+        may return different rows for the product: per product in the sales
+        rollup once it is built, otherwise from the product's orders.
+        
+        Args:
+            product_id: Product ID
+            
+        Returns:
+            Opaque version string
+        """
+        if self.sales_rollup is not None:
+            # As the readers would, so the version matches what they return
+            self.sales_rollup.ensure_fresh()
+            if self.sales_rollup.ready():
+                return f"rollup:{self.sales_rollup.product_version(product_id)}"
+        updated_at, items = self.get_product_orders_watermark(product_id)
+        return f"orders:{updated_at}:{items}"
+    
+    def get_product_reviews_watermark(self, product_id: str) -> Tuple[Optional[str], int]:
+        """
+        Latest update time and count of a product's reviews.
+        
+        Args:
+            product_id: Product ID
+            
+        Returns:
+            Tuple of (max product_reviews.updatedAt or None, number of reviews)
         """
         query = """
+            SELECT MAX(updatedAt), COUNT(*)
+            FROM product_reviews
+            WHERE productId = :product_id
+        """
+        updated_at, reviews = self._fetch_rows(query, {'product_id': product_id})[0]
+        return updated_at, reviews
+    
+    def get_changed_sales_buckets(self, since: str) -> pd.DataFrame:
+        """
+        Product/day buckets touched by orders updated at or after a watermark.
+        
+        Args:
+            since: orders.updatedAt watermark
+            
+        Returns:
+            DataFrame with orderId, productId, day and updatedAt
+        """
+        query = """
+            SELECT DISTINCT
+                o.id as orderId,
+                oi.productId as productId,
+                DATE(o.createdAt) as day,
+                o.updatedAt as updatedAt
+            FROM orders o
+            JOIN order_items oi ON o.id = oi.orderId
+            WHERE o.updatedAt >= :since
+        """
+        return self._read_sql(query, {'since': since})
+    
+    def aggregate_daily_sales(self, product_ids: Optional[List[str]] = None,
+                              start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Aggregate daily sales per product from the raw orders.
+        
+        This is the join-and-group the sales rollup stores; readers only run
+        it directly when the rollup is disabled or not built yet.
+        
+        Args:
+            product_ids: Products to aggregate (None for all)
+            start: First day (YYYY-MM-DD, inclusive)
+            end: Last day (YYYY-MM-DD, inclusive)
+            
+        Returns:
+            DataFrame with productId, day, qty, revenue, avg_price, num_orders
+        """
+        base = """
             SELECT 
-                DATE(o.createdAt) as date,
-                SUM(oi.qty) as quantity,
+                oi.productId as productId,
+                DATE(o.createdAt) as day,
+                SUM(oi.qty) as qty,
+                SUM(oi.qty * oi.unitPrice) as revenue,
                 AVG(oi.unitPrice) as avg_price,
                 COUNT(DISTINCT o.id) as num_orders
             FROM orders o
             JOIN order_items oi ON o.id = oi.orderId
-            WHERE oi.productId = :product_id
-                AND o.createdAt >= :cutoff_date
-                AND o.status NOT IN ('CANCELLED', 'REFUNDED')
-            GROUP BY DATE(o.createdAt)
-            ORDER BY date
+            WHERE o.status NOT IN ('CANCELLED', 'REFUNDED')
+        """
+        range_params = []
+        if start:
+            base += " AND o.createdAt >= ?"
+            range_params.append(start)
+        if end:
+            base += " AND o.createdAt < ?"
+            range_params.append(next_day(end))
+        group = " GROUP BY oi.productId, DATE(o.createdAt) ORDER BY oi.productId, day"
+        
+        if product_ids is None:
+            return self._read_sql(base + group, tuple(range_params), engine=self.analytics_engine)
+        
+        frames = []
+        for i in range(0, len(product_ids), 500):
+            chunk = product_ids[i:i + 500]
+            query = base + f" AND oi.productId IN ({','.join('?' * len(chunk))})" + group
+            frames.append(self._read_sql(query, tuple(range_params + list(chunk))))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ROLLUP_COLUMNS)
+    
+    def _daily_sales(self, product_ids: List[str], start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> pd.DataFrame:
+        """Daily sales rows from the rollup, or aggregated from orders until it is built."""
+        start_day = start.date().isoformat() if start else None
+        end_day = end.date().isoformat() if end else None
+        
+        if self.sales_rollup is not None:
+            self.sales_rollup.ensure_fresh()
+            if self.sales_rollup.ready():
+                return self.sales_rollup.daily_sales(product_ids, start_day, end_day)
+        return self.aggregate_daily_sales(product_ids, start_day, end_day)
+    
+    def get_product_sales_history(self, product_id: str, days: int = 365) -> pd.DataFrame:
+        """
+        Get sales history for a specific product.
+        
+        Args:
+            product_id: Product ID
+            days: Number of days to look back
+            
+        Returns:
+            DataFrame with daily sales data
         """
         cutoff = datetime.now() - timedelta(days=days)
-        return pd.read_sql(
-            query, 
-            self.engine, 
-            params={'product_id': product_id, 'cutoff_date': cutoff}
-        )
+        return sales_history(self._daily_sales([product_id], start=cutoff))
     
     def get_sales_timeseries(self, product_id: str, start_date: Optional[datetime] = None, 
                             end_date: Optional[datetime] = None) -> pd.DataFrame:
@@ -325,47 +936,7 @@ class DatabaseConnector:
         Returns:
             DataFrame with columns 'ds' (date) and 'y' (units sold)
         """
-        query = """
-            SELECT 
-                DATE(o.createdAt) as ds,
-                SUM(oi.qty) as y
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.orderId
-            WHERE oi.productId = :product_id
-                AND o.status NOT IN ('CANCELLED', 'REFUNDED')
-        """
-        
-        params = {'product_id': product_id}
-        
-        if start_date:
-            query += " AND o.createdAt >= :start_date"
-            params['start_date'] = start_date
-        
-        if end_date:
-            query += " AND o.createdAt <= :end_date"
-            params['end_date'] = end_date
-        
-        query += " GROUP BY DATE(o.createdAt) ORDER BY ds"
-        
-        df = pd.read_sql(query, self.engine, params=params)
-        
-        if df.empty:
-            return pd.DataFrame(columns=['ds', 'y'])
-        
-        # Convert to datetime
-        df['ds'] = pd.to_datetime(df['ds'])
-        
-        # Fill missing dates with 0
-        if not df.empty:
-            date_range = pd.date_range(
-                start=df['ds'].min(),
-                end=df['ds'].max(),
-                freq='D'
-            )
-            df = df.set_index('ds').reindex(date_range, fill_value=0).reset_index()
-            df.columns = ['ds', 'y']
-        
-        return df
+        return sales_timeseries(self._daily_sales([product_id], start_date, end_date))
     
     def get_category_sales_timeseries(self, category_id: str, start_date: Optional[datetime] = None,
                                      end_date: Optional[datetime] = None) -> pd.DataFrame:
@@ -380,47 +951,11 @@ class DatabaseConnector:
         Returns:
             DataFrame with columns 'ds' (date) and 'y' (units sold)
         """
-        query = """
-            SELECT 
-                DATE(o.createdAt) as ds,
-                SUM(oi.qty) as y
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.orderId
-            JOIN products p ON oi.productId = p.id
-            WHERE p.categoryId = :category_id
-                AND o.status NOT IN ('CANCELLED', 'REFUNDED')
-        """
-        
-        params = {'category_id': category_id}
-        
-        if start_date:
-            query += " AND o.createdAt >= :start_date"
-            params['start_date'] = start_date
-        
-        if end_date:
-            query += " AND o.createdAt <= :end_date"
-            params['end_date'] = end_date
-        
-        query += " GROUP BY DATE(o.createdAt) ORDER BY ds"
-        
-        df = pd.read_sql(query, self.engine, params=params)
-        
-        if df.empty:
-            return pd.DataFrame(columns=['ds', 'y'])
-        
-        df['ds'] = pd.to_datetime(df['ds'])
-        
-        # Fill missing dates
-        if not df.empty:
-            date_range = pd.date_range(
-                start=df['ds'].min(),
-                end=df['ds'].max(),
-                freq='D'
-            )
-            df = df.set_index('ds').reindex(date_range, fill_value=0).reset_index()
-            df.columns = ['ds', 'y']
-        
-        return df
+        products = self._read_sql(
+            "SELECT id FROM products WHERE categoryId = :category_id",
+            {'category_id': category_id}
+        )
+        return sales_timeseries(self._daily_sales(products['id'].tolist(), start_date, end_date))
     
     def get_current_inventory(self, product_id: str) -> int:
         """
@@ -438,13 +973,25 @@ class DatabaseConnector:
             WHERE id = :product_id
         """
         
-        result = pd.read_sql(query, self.engine, params={'product_id': product_id})
+        result = self._read_sql(query, {'product_id': product_id})
         
         if result.empty:
             return 0
         
         return int(result.iloc[0]['stockQty'])
     
+    def get_daily_price_demand(self, product_id: str) -> pd.DataFrame:
+        """
+        Get average price and demand per day for a product.
+        
+        Args:
+            product_id: Product ID
+            
+        Returns:
+            DataFrame with date, price, demand and num_orders columns
+        """
+        return price_demand(self._daily_sales([product_id]))
+    
     def get_historical_price_demand(self, product_id: str, days: int = 365) -> pd.DataFrame:
         """
         Get historical price-demand data with features for elasticity modeling.
@@ -456,58 +1003,8 @@ class DatabaseConnector:
         Returns:
             DataFrame with date, price, units_sold, and feature columns
         """
-        query = """
-            SELECT 
-                DATE(o.createdAt) as date,
-                AVG(oi.unitPrice) as price,
-                SUM(oi.qty) as units_sold,
-                COUNT(DISTINCT o.id) as num_orders,
-                strftime('%w', o.createdAt) as day_of_week,
-                strftime('%m', o.createdAt) as month,
-                CASE 
-                    WHEN strftime('%w', o.createdAt) IN ('0', '6') THEN 1 
-                    ELSE 0 
-                END as is_weekend
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.orderId
-            WHERE oi.productId = :product_id
-                AND o.createdAt >= :cutoff_date
-                AND o.status NOT IN ('CANCELLED', 'REFUNDED')
-            GROUP BY DATE(o.createdAt)
-            HAVING price > 0 AND units_sold > 0
-            ORDER BY date
-        """
-        
         cutoff = datetime.now() - timedelta(days=days)
-        df = pd.read_sql(query, self.engine, params={
-            'product_id': product_id,
-            'cutoff_date': cutoff
-        })
-        
-        if df.empty:
-            return pd.DataFrame()
-        
-        # Add derived features
-        df['date'] = pd.to_datetime(df['date'])
-        df['day_of_week'] = df['day_of_week'].astype(int)
-        df['month'] = df['month'].astype(int)
-        
-        # Add season feature (Northern Hemisphere)
-        df['season'] = df['month'].apply(lambda m: 
-            'winter' if m in [12, 1, 2] else
-            'spring' if m in [3, 4, 5] else
-            'summer' if m in [6, 7, 8] else
-            'fall'
-        )
-        
-        # Add promo indicator (simplified - price drops > 10%)
-        if len(df) > 1:
-            df['price_change'] = df['price'].pct_change()
-            df['is_promo'] = (df['price_change'] < -0.1).astype(int)
-        else:
-            df['is_promo'] = 0
-        
-        return df
+        return price_demand_features(self._daily_sales([product_id], start=cutoff))
     
     def get_transactions(self, start_date: Optional[datetime] = None, 
                         end_date: Optional[datetime] = None,
@@ -523,6 +1020,37 @@ class DatabaseConnector:
         Returns:
             DataFrame with transaction details
         """
+        query, params = self._transactions_query(start_date, end_date, limit)
+        df = self._read_sql(query, params, engine=self.analytics_engine)
+        
+        if not df.empty:
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        
+        return df
+    
+    def iter_transactions(self, start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None,
+                          limit: Optional[int] = None,
+                          chunksize: Optional[int] = None,
+                          encoders: Optional[Dict[str, IdEncoder]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Get transactions in chunks (see get_transactions).
+        
+        Args:
+            start_date: Start date filter
+            end_date: End date filter
+            limit: Maximum number of transactions
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+            encoders: Id columns (e.g. user_id) to yield as int32 codes
+            
+        Returns:
+            Iterator of typed transaction DataFrames
+        """
+        query, params = self._transactions_query(start_date, end_date, limit)
+        return self._iter_sql(query, params, self.analytics_engine, chunksize, encoders, ('timestamp',))
+    
+    def _transactions_query(self, start_date: Optional[datetime], end_date: Optional[datetime],
+                            limit: Optional[int]) -> Tuple[str, Dict]:
         query = """
             SELECT 
                 o.id as transaction_id,
@@ -555,14 +1083,9 @@ class DatabaseConnector:
         query += " GROUP BY o.id ORDER BY o.createdAt DESC"
         
         if limit:
-            query += f" LIMIT {limit}"
+            query += f" LIMIT {int(limit)}"
         
-        df = pd.read_sql(query, self.engine, params=params)
-        
-        if not df.empty:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        return df
+        return query, params
     
     def get_user_profiles(self) -> pd.DataFrame:
         """
@@ -589,7 +1112,7 @@ class DatabaseConnector:
             GROUP BY u.id
         """
         
-        df = pd.read_sql(query, self.engine)
+        df = self._read_sql(query, engine=self.analytics_engine)
         
         if not df.empty:
             df['account_created'] = pd.to_datetime(df['account_created'])
@@ -623,7 +1146,7 @@ class DatabaseConnector:
         
         cutoff = datetime.now() - timedelta(days=days)
         
-        df = pd.read_sql(query, self.engine, params={
+        df = self._read_sql(query, {
             'user_id': user_id,
             'cutoff_date': cutoff
         })
@@ -667,25 +1190,23 @@ class DatabaseConnector:
             WHERE p.status = 'APPROVED'
         """
         
-        with self.engine.connect() as conn:
-            result = conn.execute(text(query))
-            rows = result.fetchall()
-            
-            docs = []
-            for row in rows:
-                doc = {
-                    'id': row[0],
-                    'name': row[1],
-                    'description': row[2] or '',
-                    'price': row[3],
-                    'unit': row[4],
-                    'category': row[5] or '',
-                    'farmer_name': row[6] or '',
-                    'text': f"{row[1]} - {row[2] or ''} Category: {row[5] or ''} Price: {row[3]} per {row[4]}"
-                }
-                docs.append(doc)
-            
-            return docs
+        rows = self._fetch_rows(query)
+        
+        docs = []
+        for row in rows:
+            doc = {
+                'id': row[0],
+                'name': row[1],
+                'description': row[2] or '',
+                'price': row[3],
+                'unit': row[4],
+                'category': row[5] or '',
+                'farmer_name': row[6] or '',
+                'text': f"{row[1]} - {row[2] or ''} Category: {row[5] or ''} Price: {row[3]} per {row[4]}"
+            }
+            docs.append(doc)
+        
+        return docs
     
     def execute_query(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
         """
@@ -698,7 +1219,22 @@ class DatabaseConnector:
         Returns:
             DataFrame with query results
         """
-        return pd.read_sql(query, self.engine, params=params or {})
+        return self._read_sql(query, params or {})
+    
+    def iter_extract_rows(self, query: str, params: Optional[Dict] = None,
+                          chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Run a bulk extract on the analytics engine in chunks.
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+            
+        Returns:
+            Iterator of DataFrames
+        """
+        return self._iter_sql(query, params or {}, self.analytics_engine, chunksize)
     
     def get_product_reviews(self, product_id: str, days: Optional[int] = None) -> pd.DataFrame:
         """
@@ -736,7 +1272,7 @@ class DatabaseConnector:
         
         query += " ORDER BY pr.createdAt DESC"
         
-        df = pd.read_sql(query, self.engine, params=params)
+        df = self._read_sql(query, params)
         
         if not df.empty:
             df['createdAt'] = pd.to_datetime(df['createdAt'])
@@ -755,23 +1291,7 @@ class DatabaseConnector:
         Returns:
             DataFrame with user's reviews
         """
-        query = """
-            SELECT 
-                pr.id,
-                pr.userId,
-                pr.productId,
-                pr.orderId,
-                pr.rating,
-                pr.comment,
-                pr.images,
-                pr.createdAt,
-                pr.updatedAt,
-                p.name as product_name
-            FROM product_reviews pr
-            LEFT JOIN products p ON pr.productId = p.id
-            WHERE pr.userId = :user_id
-        """
-        
+        query = USER_REVIEWS_QUERY + " WHERE pr.userId = :user_id"
         params = {'user_id': user_id}
         
         if days:
@@ -780,7 +1300,7 @@ class DatabaseConnector:
         
         query += " ORDER BY pr.createdAt DESC"
         
-        df = pd.read_sql(query, self.engine, params=params)
+        df = self._read_sql(query, params)
         
         if not df.empty:
             df['createdAt'] = pd.to_datetime(df['createdAt'])
@@ -788,6 +1308,66 @@ class DatabaseConnector:
         
         return df
     
+    def get_reviews_by_users(self, user_ids: List[str], days: Optional[int] = None) -> pd.DataFrame:
+        """
+        Get the reviews of many users at once (see get_user_reviews).
+        
+        Args:
+            user_ids: User IDs
+            days: Number of days to look back (optional)
+            
+        Returns:
+            DataFrame with the users' reviews, newest first per user
+        """
+        cutoff = []
+        where = ""
+        if days:
+            where = " AND pr.createdAt >= ?"
+            cutoff = [(datetime.now() - timedelta(days=days)).isoformat(sep=' ')]
+        
+        user_ids = list(dict.fromkeys(user_ids))
+        frames = []
+        for i in range(0, len(user_ids), 500):
+            chunk = user_ids[i:i + 500]
+            query = USER_REVIEWS_QUERY + f" WHERE pr.userId IN ({','.join('?' * len(chunk))})" + where
+            frames.append(self._read_sql(query, tuple(chunk + cutoff)))
+        if not frames:
+            return pd.DataFrame(columns=USER_REVIEWS_COLUMNS)
+        
+        # Sorted here; with an IN list SQLite would sort in a temp B-tree
+        df = pd.concat(frames, ignore_index=True)
+        df['createdAt'] = pd.to_datetime(df['createdAt'])
+        df['updatedAt'] = pd.to_datetime(df['updatedAt'])
+        return df.sort_values(['userId', 'createdAt'], ascending=[True, False], ignore_index=True)
+    
+    def iter_reviews(self, chunksize: Optional[int] = None, since: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Fetch product reviews in chunks, in id order (for moderation backfills).
+        
+        Args:
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+            since: Only reviews updated at or after this updatedAt watermark,
+                read from the live DB rather than the analytics snapshot
+            
+        Returns:
+            Iterator of DataFrames with id, userId, productId, rating, comment, createdAt, updatedAt
+        """
+        if since is not None:
+            query = """
+                SELECT id, userId, productId, rating, comment, createdAt, updatedAt
+                FROM product_reviews
+                WHERE updatedAt >= :since
+                ORDER BY id
+            """
+            return self._iter_sql(query, {'since': since}, self.engine, chunksize)
+        
+        query = """
+            SELECT id, userId, productId, rating, comment, createdAt, updatedAt
+            FROM product_reviews
+            ORDER BY id
+        """
+        return self._iter_sql(query, None, self.analytics_engine, chunksize)
+    
     def get_review_statistics(self, product_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get review statistics for a product or overall.
@@ -817,33 +1397,35 @@ class DatabaseConnector:
             query += " WHERE productId = :product_id"
             params['product_id'] = product_id
         
-        with self.engine.connect() as conn:
-            result = conn.execute(text(query), params)
-            row = result.fetchone()
-            
-            if row and row[0] > 0:
-                return {
-                    'total_reviews': row[0],
-                    'avg_rating': float(row[1]) if row[1] else 0.0,
-                    'min_rating': row[2],
-                    'max_rating': row[3],
-                    'rating_distribution': {
-                        '5': row[4],
-                        '4': row[5],
-                        '3': row[6],
-                        '2': row[7],
-                        '1': row[8]
-                    }
-                }
-            else:
-                return {
-                    'total_reviews': 0,
-                    'avg_rating': 0.0,
-                    'min_rating': 0,
-                    'max_rating': 0,
-                    'rating_distribution': {'5': 0, '4': 0, '3': 0, '2': 0, '1': 0}
+        rows = self._fetch_rows(query, params)
+        row = rows[0] if rows else None
+        
+        if row and row[0] > 0:
+            return {
+                'total_reviews': row[0],
+                'avg_rating': float(row[1]) if row[1] else 0.0,
+                'min_rating': row[2],
+                'max_rating': row[3],
+                'rating_distribution': {
+                    '5': row[4],
+                    '4': row[5],
+                    '3': row[6],
+                    '2': row[7],
+                    '1': row[8]
                 }
+            }
+        else:
+            return {
+                'total_reviews': 0,
+                'avg_rating': 0.0,
+                'min_rating': 0,
+                'max_rating': 0,
+                'rating_distribution': {'5': 0, '4': 0, '3': 0, '2': 0, '1': 0}
+            }
+
 
+# Record query time per public method in /metrics
+timed_methods(DatabaseConnector, db_query_seconds)
 
 # Global database connector instance
 db = DatabaseConnector()
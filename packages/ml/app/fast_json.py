@@ -0,0 +1,68 @@
+"""Fast JSON responses for large numeric payloads.
+
+Endpoints returning hundreds of points (forecasts, price sweeps,
+recommendation lists) build their payload column-wise from NumPy arrays
+with `records` and return it as a `FastJSONResponse`, encoded by orjson.
+This skips building a pydantic model per row and FastAPI's validation
+and jsonable_encoder pass over the result. The route keeps its
+response_model for the OpenAPI schema, and the payload must have its
+shape (benchmarks/bench_responses.py checks that it does).
+
+Without the optional orjson package, payloads are encoded with the
+standard json module.
+"""
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode a payload (NumPy arrays and scalars allowed) as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson, for payloads already in the response shape."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def records(**columns) -> List[Dict[str, Any]]:
+    """
+    Row dicts from equal-length columns.
+
+    Args:
+        columns: Field name -> NumPy array or sequence (converted to
+            Python values in one tolist() per column)
+
+    Returns:
+        One dict per row, fields in argument order
+    """
+    names = list(columns)
+    values = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def non_negative(values) -> np.ndarray:
+    """Float array with negative (and NaN) values replaced by 0, like max(0, value)."""
+    values = np.asarray(values, dtype=float)
+    return np.where(values > 0, values, 0.0)
@@ -0,0 +1,74 @@
+"""HTTP validators (ETag / If-None-Match) for read endpoints.
+
+A read endpoint derives a strong ETag from the version of the data it
+serves - the per-product watermarks of the sales rollup, the review
+sentiment aggregates or the recommendation artifacts - before reading
+that data. A client (or the API gateway) repeating a request with the
+tag in If-None-Match gets a bodiless 304 without the endpoint querying
+the database or building the response:
+
+    @router.get("/product/{product_id}/history")
+    async def get_product_history(product_id: str, request: Request, response: Response):
+        etag = make_etag("history", product_id, db.get_product_sales_version(product_id))
+        if (cached := not_modified(request, response, etag)) is not None:
+            return cached
+        ...
+
+Responses are sent with `Cache-Control: no-cache`, so clients revalidate
+every time instead of serving a possibly stale body.
+"""
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+from .metrics import record_cache
+
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Strong ETag of the values a response depends on.
+
+    Args:
+        parts: Endpoint name, parameters and data versions (their repr is hashed)
+
+    Returns:
+        Quoted entity tag
+    """
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header value matches a tag (weak comparison, as for GET)."""
+    if if_none_match.strip() == '*':
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(','))
+    return any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def not_modified(request: Request, response: Response, etag: str):
+    """
+    Answer a conditional request from its ETag.
+
+    Sets the ETag and Cache-Control headers of the endpoint's response.
+
+    Args:
+        request: The incoming request
+        response: The endpoint's `Response` parameter
+        etag: Tag of the current data (make_etag)
+
+    Returns:
+        A 304 Response if If-None-Match matches the tag, otherwise None
+        (build and return the body as usual)
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    response.headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    hit = if_none_match is not None and etag_matches(if_none_match, etag)
+    record_cache("etag", hit=hit)
+    if hit:
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,328 @@
+"""Index advisor for the SQLite schema the ML service reads.
+
+The Prisma schema only declares primary keys and unique constraints on the
+tables the ML service filters and joins on, so most DatabaseConnector
+queries scan `orders`, `order_items` or `events` in full. This tool:
+
+- captures the SQL of every DatabaseConnector query (without running it)
+- prints its EXPLAIN QUERY PLAN and flags full scans and temp B-trees
+- reports which of the ML indexes below are missing, with the Prisma
+  `@@index` lines that would add them through a migration
+- optionally copies the DB to a local replica and creates the missing
+  indexes there, showing the plans before and after
+
+Indexes are never created on the source DB: it is owned by Prisma
+migrations, which would report them as drift.
+
+Usage (from packages/ml):
+    python -m app.indexes
+    python -m app.indexes --db ../api/prisma/dev.db --replica ./replica.db --apply
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from app.config import settings
+from app.db import DatabaseConnector, backup_database, sqlite_path
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """An index the ML queries rely on."""
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+    reason: str
+
+    @property
+    def sql(self) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+# Trailing columns make the index covering for the query that needs it,
+# so SQLite does not have to visit the table rows
+ML_INDEXES = (
+    IndexSpec("ml_events_user_type_created", "events", ("userId", "type", "createdAt"),
+              "get_user_view_events, get_events"),
+    IndexSpec("ml_orders_customer_status_created", "orders", ("customerId", "status", "createdAt"),
+              "get_user_order_history, get_user_transaction_history"),
+    IndexSpec("ml_orders_created", "orders", ("createdAt",),
+              "get_orders, get_transactions date filters"),
+    IndexSpec("ml_orders_updated", "orders", ("updatedAt",),
+              "get_changed_sales_buckets (sales rollup watermark)"),
+    IndexSpec("ml_order_items_product_order", "order_items", ("productId", "orderId", "qty", "unitPrice"),
+              "aggregate_daily_sales for the sales rollup and its fallback"),
+    IndexSpec("ml_order_items_order_product", "order_items", ("orderId", "productId", "qty", "unitPrice"),
+              "orders -> order_items joins"),
+    IndexSpec("ml_product_reviews_product_created", "product_reviews", ("productId", "createdAt"),
+              "get_product_reviews"),
+    IndexSpec("ml_product_reviews_user_created", "product_reviews", ("userId", "createdAt"),
+              "get_user_reviews, get_reviews_by_users"),
+    IndexSpec("ml_product_reviews_updated", "product_reviews", ("updatedAt",),
+              "iter_reviews(since=...) (near-duplicate index and sentiment watermarks)"),
+)
+
+# Training extracts that read whole tables; scans are expected there
+BULK_METHODS = {
+    "get_products",
+    "get_user_product_matrix",
+    "get_all_orders",
+    "get_top_selling_products",
+    "get_user_profiles",
+    "get_product_documents",
+}
+
+PRISMA_MODELS = {
+    "events": "Event",
+    "orders": "Order",
+    "order_items": "OrderItem",
+    "product_reviews": "ProductReview",
+}
+
+
+def sample_arguments(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Real ids to run the per-user/per-product queries with."""
+    def first(query: str) -> str:
+        row = conn.execute(query).fetchone()
+        return row[0] if row and row[0] is not None else ""
+
+    return {
+        "user_id": first("SELECT customerId FROM orders LIMIT 1"),
+        "product_id": first("SELECT productId FROM order_items LIMIT 1"),
+        "category_id": first("SELECT id FROM categories LIMIT 1"),
+    }
+
+
+def capture_queries(connector_cls, args: Dict[str, str]) -> List[Tuple[str, str, object]]:
+    """
+    Collect the SQL of every DatabaseConnector query without executing it.
+
+    Args:
+        connector_cls: DatabaseConnector (or a subclass)
+        args: Ids from sample_arguments()
+
+    Returns:
+        List of (method, query, params)
+    """
+    captured = []
+
+    class RecordingConnector(connector_cls):
+        def _read_sql(self, query, params=None, engine=None):
+            captured.append((sys._getframe(1).f_code.co_name, query, params))
+            return pd.DataFrame()
+
+        def _fetch_rows(self, query, params=None):
+            captured.append((sys._getframe(1).f_code.co_name, query, params))
+            return []
+
+    # Never connects, so it must not switch the DB to WAL or build the rollup
+    connector = RecordingConnector(read_only=False)
+    connector.sales_rollup = None
+    user_id, product_id, category_id = args["user_id"], args["product_id"], args["category_id"]
+    calls = [
+        ("get_products", ()),
+        ("get_orders", (90,)),
+        ("get_events", ("view", 30)),
+        ("get_user_product_matrix", ()),
+        ("get_user_order_history", (user_id,)),
+        ("get_all_orders", ()),
+        ("get_product_metadata", ([product_id],)),
+        ("get_user_view_events", (user_id,)),
+        ("get_top_selling_products", ()),
+        ("get_product_sales_history", (product_id,)),
+        ("get_sales_timeseries", (product_id, datetime(2024, 1, 1))),
+        ("get_category_sales_timeseries", (category_id, datetime(2024, 1, 1))),
+        ("get_current_inventory", (product_id,)),
+        ("get_historical_price_demand", (product_id,)),
+        ("get_transactions", (datetime(2024, 1, 1), None, 1000)),
+        ("get_user_profiles", ()),
+        ("get_user_transaction_history", (user_id,)),
+        ("get_product_documents", ()),
+        ("get_product_reviews", (product_id, 90)),
+        ("get_user_reviews", (user_id,)),
+        ("get_reviews_by_users", ([user_id], 30)),
+        ("get_review_statistics", (product_id,)),
+        ("get_max_order_updated_at", ()),
+        ("get_product_orders_watermark", (product_id,)),
+        ("get_product_reviews_watermark", (product_id,)),
+        ("get_changed_sales_buckets", ("2024-01-01 00:00:00",)),
+        ("aggregate_daily_sales", ()),
+    ]
+    for method, call_args in calls:
+        try:
+            getattr(connector, method)(*call_args)
+        except (KeyError, IndexError):
+            # Post-processing of the empty result; the query is already captured
+            pass
+    return captured
+
+
+def explain(conn: sqlite3.Connection, query: str, params=None) -> List[str]:
+    """EXPLAIN QUERY PLAN steps, indented by depth."""
+    if isinstance(params, dict):
+        # sqlite3 does not adapt datetimes without a (deprecated) default adapter
+        params = {k: v.isoformat(' ') if isinstance(v, datetime) else v for k, v in params.items()}
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def plan_issues(plan: List[str], bulk: bool = False) -> List[str]:
+    """Steps of a plan that read whole tables or sort without an index."""
+    issues = []
+    for step in (line.strip() for line in plan):
+        if step.startswith("SCAN") and "COVERING INDEX" not in step:
+            if bulk:
+                continue
+            issues.append(f"full scan: {step}")
+        elif "TEMP B-TREE" in step:
+            issues.append(f"sort without index: {step}")
+        elif "AUTOMATIC" in step:
+            issues.append(f"automatic index built per query: {step}")
+    return issues
+
+
+def existing_indexes(conn: sqlite3.Connection, table: str) -> List[Tuple[str, ...]]:
+    """Column lists of every index on `table`, including primary/unique autoindexes."""
+    indexes = []
+    for row in conn.execute(f"PRAGMA index_list('{table}')").fetchall():
+        columns = [info[2] for info in conn.execute(f"PRAGMA index_info('{row[1]}')").fetchall()]
+        indexes.append(tuple(columns))
+    return indexes
+
+
+def missing_indexes(conn: sqlite3.Connection) -> List[IndexSpec]:
+    """ML indexes not provided by any existing index with the same leading columns."""
+    missing = []
+    for spec in ML_INDEXES:
+        existing = existing_indexes(conn, spec.table)
+        if not any(columns[:len(spec.columns)] == spec.columns for columns in existing):
+            missing.append(spec)
+    return missing
+
+
+def prisma_index_lines(specs: List[IndexSpec]) -> List[str]:
+    """`@@index` lines to add the indexes through a Prisma migration."""
+    return [
+        f"model {PRISMA_MODELS.get(spec.table, spec.table)}: "
+        f"@@index([{', '.join(spec.columns)}], map: \"{spec.name}\")"
+        for spec in specs
+    ]
+
+
+def make_replica(source: Path, replica: Path) -> Path:
+    """Consistent copy of `source` (safe while the API is writing to it)."""
+    return backup_database(source, replica)
+
+
+def create_indexes(db_path: Path, specs=ML_INDEXES) -> List[str]:
+    """
+    Create indexes and refresh planner statistics.
+
+    Args:
+        db_path: SQLite database to modify (a replica, never the Prisma DB)
+        specs: Indexes to create
+
+    Returns:
+        Names of the indexes created
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        for spec in specs:
+            conn.execute(spec.sql)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return [spec.name for spec in specs]
+
+
+def advise(db_path: Path) -> Dict[str, object]:
+    """
+    Explain every DatabaseConnector query against `db_path`.
+
+    Returns:
+        Dict with per-query plans and issues, and the missing ML indexes
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        queries = []
+        for method, query, params in capture_queries(DatabaseConnector, sample_arguments(conn)):
+            try:
+                plan = explain(conn, query, params)
+                issues = plan_issues(plan, bulk=method in BULK_METHODS)
+            except sqlite3.Error as e:
+                plan, issues = [], [f"query fails on SQLite: {e}"]
+            queries.append({"method": method, "plan": plan, "issues": issues})
+        return {"queries": queries, "missing_indexes": missing_indexes(conn)}
+    finally:
+        conn.close()
+
+
+def print_report(report: Dict[str, object]):
+    for query in report["queries"]:
+        marker = "⚠" if query["issues"] else "✓"
+        print(f"{marker} {query['method']}")
+        for line in query["plan"] or query["issues"]:
+            print(f"      {line}")
+    missing = report["missing_indexes"]
+    print("-" * 60)
+    if not missing:
+        print("✓ All ML indexes present")
+        return
+    print(f"⚠ {len(missing)} ML indexes missing:")
+    for spec in missing:
+        print(f"  {spec.sql};  -- {spec.reason}")
+    print("Add them to packages/api/prisma/schema.prisma with:")
+    for line in prisma_index_lines(missing):
+        print(f"  {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', type=Path, default=None, help="SQLite DB (default: DATABASE_URL)")
+    parser.add_argument('--replica', type=Path, default=None, help="Copy the DB here before --apply")
+    parser.add_argument('--apply', action='store_true', help="Create the missing indexes on the replica")
+    args = parser.parse_args()
+
+    db_path = args.db or sqlite_path(settings.database_url)
+    if db_path is None:
+        print(f"Not a SQLite database: {settings.database_url}")
+        sys.exit(1)
+    if not db_path.exists():
+        print(f"Database not found: {db_path}")
+        sys.exit(1)
+    if args.apply and args.replica is None:
+        parser.error("--apply needs --replica; indexes are never created on the Prisma DB")
+
+    # DatabaseConnector reads its URL from settings
+    settings.database_url = f"file:{db_path}"
+    report = advise(db_path)
+    print_report(report)
+
+    if args.apply and report["missing_indexes"]:
+        print("=" * 60)
+        print(f"Copying {db_path} to {args.replica}")
+        make_replica(db_path, args.replica)
+        created = create_indexes(args.replica, report["missing_indexes"])
+        print(f"✓ Created {', '.join(created)} on the replica")
+        print("=" * 60)
+        print_report(advise(args.replica))
+
+    sys.exit(1 if report["missing_indexes"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,79 @@
 """Main FastAPI application for ML service."""
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.encoders import jsonable_encoder
 from datetime import datetime
+import importlib
 import sys
 from pathlib import Path
+from typing import Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import settings
-from app.schemas import HealthResponse, ErrorResponse
-from app.api import recommend, forecast, price_opt, fraud, chat, review_analysis
+from app.db import db
+from app.schemas import HealthResponse, ReadinessResponse, ErrorResponse
+from app.admission import AdmissionMiddleware, admission_controller
+from app.memory import memory_breakdown
+from app.metrics import MetricsMiddleware, registry as metrics_registry
+from app.profiling import ProfilingMiddleware, authorize as authorize_debug, router as profiling_router
+from app.warmup import warmup
+
+# Routers that can be enabled via settings.enabled_routers, with the
+# warm-up tasks each one contributes: (task name, module function, required)
+AVAILABLE_ROUTERS = {
+    "recommend": [("recommendations", "warm_up", True)],
+    "forecast": [("forecasting", "warm_up", False)],
+    "price_opt": [],
+    "fraud": [("fraud_detection", "warm_up", True)],
+    "chat": [
+        ("chatbot_embeddings", "warm_up_embeddings", False),
+        ("chatbot_index", "warm_up_index", False),
+    ],
+    "review_analysis": [
+        ("review_duplicates", "warm_up", False),
+        ("review_sentiment", "warm_up_sentiment", False),
+    ],
+    "chat_enhanced": [],
+    "fraud_enhanced": [],
+    "price_opt_enhanced": [],
+}
+
+
+def load_routers(names):
+    """
+    Import the enabled router modules.
+    
+    Heavy libraries are imported inside the modules' functions, and
+    routers that are not enabled are never imported at all.
+    
+    Args:
+        names: Module names under app.api
+        
+    Returns:
+        Dict of module name to imported module
+    """
+    unknown = [name for name in names if name not in AVAILABLE_ROUTERS]
+    if unknown:
+        raise ValueError(
+            f"Unknown routers in ENABLED_ROUTERS: {', '.join(unknown)}. "
+            f"Available: {', '.join(AVAILABLE_ROUTERS)}"
+        )
+    return {name: importlib.import_module(f"app.api.{name}") for name in names}
+
+
+routers = load_routers(settings.router_names)
+
+
+def register_warmup_tasks():
+    """Register the warm-up tasks of every enabled router (once per process tree)."""
+    if warmup.tasks:
+        return
+    for name, module in routers.items():
+        for task_name, func_name, required in AVAILABLE_ROUTERS[name]:
+            warmup.register(task_name, getattr(module, func_name), required=required)
 
 # Create FastAPI app
 app = FastAPI(
@@ -32,13 +93,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Concurrency limits, priority queues and load shedding per endpoint class
+# (inside MetricsMiddleware, so shed requests are measured too)
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
+# Per-route latency histograms for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in (X-Profile-Token) or sampled per-request profiles, see app/profiling.py
+app.add_middleware(ProfilingMiddleware)
+
 # Include routers
-app.include_router(recommend.router)
-app.include_router(forecast.router)
-app.include_router(price_opt.router)
-app.include_router(fraud.router)
-app.include_router(chat.router)
-app.include_router(review_analysis.router)
+for module in routers.values():
+    app.include_router(module.router)
+app.include_router(profiling_router)
 
 
 @app.get("/", tags=["health"])
@@ -63,17 +132,13 @@ async def root():
 @app.get("/health", response_model=HealthResponse, tags=["health"])
 async def health_check():
     """Health check endpoint."""
-    # The recommend module defines different model variable names in some branches
-    # so be defensive: check for multiple possible attributes and fall back to None
-    recommendations_loaded = (
-        getattr(recommend, '_content_model', None) is not None
-        or getattr(recommend, '_tfidf_data', None) is not None
-        or getattr(recommend, '_als_model', None) is not None
-    )
-    collaborative_loaded = (
-        getattr(recommend, '_collaborative_model', None) is not None
-        or getattr(recommend, '_als_model', None) is not None
-    )
+    recommend = routers.get("recommend")
+    chat = routers.get("chat")
+    fraud = routers.get("fraud")
+    
+    recommend_status = recommend.models_status() if recommend is not None else {}
+    recommendations_loaded = bool(recommend_status.get("tfidf") or recommend_status.get("als"))
+    collaborative_loaded = bool(recommend_status.get("als"))
     models_loaded = {
         "recommendations": recommendations_loaded,
         "collaborative_filtering": collaborative_loaded,
@@ -85,10 +150,86 @@ async def health_check():
     return HealthResponse(
         status="healthy",
         timestamp=datetime.now(),
-        models_loaded=models_loaded
+        models_loaded=models_loaded,
+        warmup=warmup.status(),
+        memory=memory_breakdown(),
+        vector_store=chat.index_memory() if hasattr(chat, 'index_memory') else None
+    )
+
+
+@app.get("/ready", response_model=ReadinessResponse, tags=["health"])
+async def readiness_check():
+    """
+    Readiness probe for load balancers.
+    
+    Returns 503 until background warm-up has loaded and exercised every
+    required model; /health only reports that the process is alive.
+    """
+    status = warmup.status()
+    response = ReadinessResponse(
+        status="ready" if status["ready"] else "warming_up",
+        timestamp=datetime.now(),
+        models=status["models"]
+    )
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content=jsonable_encoder(response)
     )
 
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["health"])
+async def metrics():
+    """
+    Prometheus metrics for this worker process.
+    
+    Request latency per route and status, DB query time per
+    DatabaseConnector method, inference time per model, cache hits/misses
+    and executor queue depths.
+    """
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/debug/queries", tags=["health"])
+async def query_stats(limit: int = 20, x_profile_token: Optional[str] = Header(default=None)):
+    """
+    Database query statistics for this worker process.
+    
+    Calls, time and row counts per DatabaseConnector method and per SQL
+    statement (slowest total first), with the EXPLAIN QUERY PLAN of any
+    statement that exceeded SLOW_QUERY_MS, and the age of the analytics
+    snapshot and daily sales rollup. Requires X-Profile-Token, like
+    /debug/profiles.
+    """
+    authorize_debug(x_profile_token)
+    summary = db.stats.summary(limit)
+    summary["snapshot"] = db.snapshots.status() if db.snapshots is not None else None
+    summary["sales_rollup"] = db.sales_rollup.status() if db.sales_rollup is not None else None
+    return summary
+
+
+@app.get("/debug/admission", tags=["health"])
+async def admission_status(x_profile_token: Optional[str] = Header(default=None)):
+    """
+    Admission control state of this worker process.
+    
+    Requests in flight and queued per endpoint class, with the class limits,
+    and degraded requests in flight with their limit. Requires
+    X-Profile-Token, like /debug/profiles.
+    """
+    authorize_debug(x_profile_token)
+    return {
+        "enabled": settings.admission_enabled,
+        "in_flight": admission_controller.in_flight,
+        "max_concurrency": admission_controller.max_concurrency,
+        "degraded_in_flight": admission_controller.degraded_in_flight,
+        "degraded_concurrency": admission_controller.degraded_concurrency,
+        "classes": admission_controller.status()
+    }
+
+
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
     """Handle favicon requests to prevent 404 errors."""
@@ -121,13 +262,27 @@ async def startup_event():
     print(f"Database: {settings.database_url}")
     print(f"Model directory: {settings.model_dir}")
     print(f"Vector index directory: {settings.vector_index_dir}")
+    print(f"Routers: {', '.join(routers)}")
     print("=" * 60)
     
-    # Models are loaded in their respective modules
-    print("Loading models...")
-    print("✓ Recommendation models initialized")
-    print("✓ Chatbot models initialized")
-    print("✓ Fraud detection models initialized")
+    if settings.warmup_enabled:
+        # Models load in a background thread; /ready passes once they are usable.
+        # Pre-fork workers inherit models the master already warmed up.
+        register_warmup_tasks()
+        if warmup.finished_at is not None:
+            print(f"Using {len(warmup.tasks)} models warmed up by the pre-fork master")
+        else:
+            warmup.start()
+            print(f"Warming up {len(warmup.tasks)} models in the background (see /ready)")
+    else:
+        print("Model warm-up disabled; models load on first use")
+    
+    if db.snapshots is not None:
+        db.snapshots.start()
+        print(f"Analytics queries read {db.snapshots.path} (refreshed every {db.snapshots.interval}s)")
+    if db.sales_rollup is not None:
+        db.sales_rollup.start()
+        print(f"Daily sales rollup in {db.sales_rollup.path} (refreshed every {db.sales_rollup.interval}s)")
     print("=" * 60)
     print(f"Service ready at http://{settings.ml_service_host}:{settings.ml_service_port}")
     print(f"API docs at http://{settings.ml_service_host}:{settings.ml_service_port}/docs")
@@ -138,6 +293,11 @@ async def startup_event():
 async def shutdown_event():
     """Run on application shutdown."""
     print("Shutting down Agri-Connect ML Service...")
+    await warmup.stop()
+    if db.snapshots is not None:
+        db.snapshots.stop()
+    if db.sales_rollup is not None:
+        db.sales_rollup.stop()
 
 
 if __name__ == "__main__":
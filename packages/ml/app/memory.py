@@ -0,0 +1,57 @@
+"""Process memory helpers."""
+import os
+import resource
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size of this process in bytes.
+
+    Reads /proc/self/statm on Linux; elsewhere falls back to the peak RSS
+    reported by getrusage, which is the closest portable approximation.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Shared_Dirty": "shared_dirty_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def memory_breakdown() -> dict:
+    """
+    Split this process's resident memory into shared and private pages.
+
+    In pre-fork mode, model pages loaded by the master stay shared with
+    every worker until a worker writes to them, so `shared_bytes` is the
+    memory the workers have in common and `private_bytes` is what each
+    extra worker costs. PSS divides shared pages evenly among the processes
+    mapping them, so summing `pss_bytes` over workers gives the true total.
+
+    Returns:
+        Dict of byte counts plus pid/ppid. Only `rss_bytes` is available
+        when /proc/self/smaps_rollup is not (non-Linux, kernels < 4.14).
+    """
+    stats = {"pid": os.getpid(), "ppid": os.getppid()}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in _SMAPS_FIELDS:
+                    stats[_SMAPS_FIELDS[key]] = int(value.split()[0]) * 1024
+    except OSError:
+        stats["rss_bytes"] = rss_bytes()
+        return stats
+
+    stats["shared_bytes"] = stats.get("shared_clean_bytes", 0) + stats.get("shared_dirty_bytes", 0)
+    stats["private_bytes"] = stats.get("private_clean_bytes", 0) + stats.get("private_dirty_bytes", 0)
+    return stats
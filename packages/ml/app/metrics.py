@@ -0,0 +1,313 @@
+"""Lightweight in-process metrics registry with Prometheus text exposition.
+
+Recording a sample is a lock, a bisect and a few integer increments, so
+the instruments are cheap enough to leave on in production. Each process
+(including every pre-fork worker) keeps its own registry; Prometheus adds
+the workers up at query time.
+
+Usage:
+    from app.metrics import model_inference_seconds
+
+    with model_inference_seconds.time(model="als"):
+        ...
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond lookups to slow model fits
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        try:
+            if len(labels) == len(self.label_names):
+                return tuple(str(labels[name]) for name in self.label_names)
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be read from a callback at scrape time."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, func: Callable[[], float], **labels):
+        """Read the value from `func` whenever metrics are collected."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, func in functions:
+            try:
+                values[key] = func()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in values.items()]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets, plus sum and count."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the `with` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Global registry and the service's standard instruments
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram(
+    "ml_http_request_duration_seconds", "HTTP request latency by route template and status",
+    labels=("method", "route", "status")
+)
+db_query_seconds = registry.histogram(
+    "ml_db_query_duration_seconds", "Database query time by DatabaseConnector method",
+    labels=("method",)
+)
+model_inference_seconds = registry.histogram(
+    "ml_model_inference_duration_seconds", "Model inference time by model",
+    labels=("model",)
+)
+cache_requests = registry.counter(
+    "ml_cache_requests_total", "Cache lookups by cache and result (hit or miss)",
+    labels=("cache", "result")
+)
+executor_queue_depth = registry.gauge(
+    "ml_executor_queue_depth", "Work items waiting in a thread or process pool",
+    labels=("executor",)
+)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup; hit ratio = hits / (hits + misses)."""
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def cache_hit_ratio(cache: str) -> Optional[float]:
+    hits = cache_requests.value(cache=cache, result="hit")
+    total = hits + cache_requests.value(cache=cache, result="miss")
+    return round(hits / total, 4) if total else None
+
+
+def register_executor(name: str, executor):
+    """Expose the pending work queue of a concurrent.futures executor as a gauge."""
+    def depth():
+        queue = getattr(executor, '_work_queue', None) or getattr(executor, '_call_queue', None)
+        return queue.qsize() if queue is not None else 0
+    executor_queue_depth.set_function(depth, executor=name)
+
+
+def timed_methods(cls, histogram: Histogram, label: str = "method"):
+    """Wrap every public method of `cls` so its duration is observed in `histogram`."""
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or not callable(func):
+            continue
+        setattr(cls, name, _timed(func, histogram, label, name))
+    return cls
+
+
+def _timed(func, histogram: Histogram, label: str, value: str):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, **{label: value})
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template.
+
+    Routes are labelled by their path template (e.g. /recommendations/user/{user_id})
+    rather than the raw URL, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[Dict[Callable, str]] = None
+
+    def _route_path(self, scope) -> str:
+        if self._route_paths is None:
+            router = scope.get("router") or getattr(scope.get("app"), "router", None)
+            routes = getattr(router, "routes", [])
+            self._route_paths = {
+                route.endpoint: route.path for route in routes if hasattr(route, "endpoint")
+            }
+        endpoint = scope.get("endpoint")
+        return self._route_paths.get(endpoint, "unmatched") if endpoint is not None else "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"], route=self._route_path(scope), status=str(status["code"])
+            )
@@ -0,0 +1,195 @@
+"""Bulk review moderation backfill.
+
+Scores every review in `product_reviews` with the same checks as
+POST /reviews/analyze (sentiment, spam, rating-text mismatch, quality and
+fake-review risk) and stores the results in the `review_moderation` table
+of the ML store (ML_STORE_PATH).
+
+Reviews are streamed from the DB in id order. For each chunk the recent
+reviews of all its reviewers are fetched with one query, the chunk is
+scored in a worker process and the results are written by the main
+process, one transaction per chunk. Rows are replaced by review id, so
+re-running the job is safe. Before the workers are forked, the
+near-duplicate index in the ML store catches up with the reviews changed
+since its last sync (all of them the first time); the workers and the
+service's worker processes share it through that SQLite file:
+
+    python -m app.moderation --workers 8
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_moderation (
+    reviewId TEXT PRIMARY KEY,
+    productId TEXT NOT NULL,
+    userId TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    positive_score REAL NOT NULL,
+    negative_score REAL NOT NULL,
+    sentiment_confidence REAL NOT NULL,
+    is_spam INTEGER NOT NULL,
+    spam_score REAL NOT NULL,
+    spam_reasons TEXT NOT NULL,
+    quality_score REAL NOT NULL,
+    rating_text_mismatch INTEGER NOT NULL,
+    mismatch_severity TEXT NOT NULL,
+    fraud_risk_score REAL NOT NULL,
+    fraud_risk_level TEXT NOT NULL,
+    fraud_risk_factors TEXT NOT NULL,
+    recommendation TEXT NOT NULL,
+    should_approve INTEGER NOT NULL,
+    reviewUpdatedAt TEXT,
+    moderatedAt TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS review_moderation_product ON review_moderation (productId);
+"""
+COLUMNS = [
+    "reviewId", "productId", "userId", "sentiment", "positive_score", "negative_score",
+    "sentiment_confidence", "is_spam", "spam_score", "spam_reasons", "quality_score",
+    "rating_text_mismatch", "mismatch_severity", "fraud_risk_score", "fraud_risk_level",
+    "fraud_risk_factors", "recommendation", "should_approve", "reviewUpdatedAt", "moderatedAt",
+]
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def score_reviews(reviews: pd.DataFrame, history: pd.DataFrame) -> List[tuple]:
+    """
+    Moderate a chunk of reviews (runs in the worker processes).
+
+    Args:
+        reviews: Rows of DatabaseConnector.iter_reviews
+        history: The reviewers' reviews of the last 30 days (get_reviews_by_users)
+
+    Returns:
+        review_moderation rows, in COLUMNS order
+    """
+    from app.api.review_analysis import moderate_reviews
+    from app.schemas import ReviewAnalysisRequest
+
+    requests = [
+        ReviewAnalysisRequest(user_id=user_id, product_id=product_id, text=comment or "",
+                              rating=min(5, max(1, int(rating))))
+        for user_id, product_id, comment, rating in zip(
+            reviews['userId'], reviews['productId'], reviews['comment'], reviews['rating'])
+    ]
+    # Stored reviews are already in the sentiment aggregates (app.review_sentiment)
+    results = moderate_reviews(requests, history, record=False)
+    moderated_at = datetime.now().isoformat(sep=' ')
+    rows = []
+    for review_id, updated_at, request, result in zip(reviews['id'], reviews['updatedAt'], requests, results):
+        rows.append((
+            review_id, request.product_id, request.user_id, result.sentiment,
+            result.sentiment_scores['positive'], result.sentiment_scores['negative'],
+            result.sentiment_scores['confidence'], int(result.is_spam), result.spam_score,
+            json.dumps(result.spam_reasons), result.quality_score, int(result.rating_text_mismatch),
+            result.mismatch_severity, result.fraud_risk_score, result.fraud_risk_level,
+            json.dumps(result.fraud_risk_factors), result.recommendation, int(result.should_approve),
+            None if pd.isna(updated_at) else str(updated_at), moderated_at,
+        ))
+    return rows
+
+
+def backfill(source, store_path: Path, workers: Optional[int] = None,
+             chunksize: Optional[int] = None) -> Dict[str, int]:
+    """
+    Moderate every review and write the results to the review_moderation table.
+
+    Args:
+        source: DatabaseConnector for the shared DB
+        store_path: ML store SQLite file (created if missing)
+        workers: Worker processes (default: CPU count; 0 scores in this process)
+        chunksize: Reviews per chunk (default DB_CHUNK_SIZE)
+
+    Returns:
+        Dict with the number of reviews and chunks written
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.perf_counter()
+    conn = connect(store_path)
+    written = chunks = 0
+
+    from app.api.review_analysis import analyzer
+    if analyzer.duplicates is not None:
+        indexed = analyzer.duplicates.sync(source, chunksize)
+        print(f"✓ Indexed {indexed:,} changed reviews for near-duplicate detection "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    def write(rows: List[tuple]):
+        nonlocal written, chunks
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            f"INSERT OR REPLACE INTO review_moderation VALUES ({', '.join('?' * len(COLUMNS))})", rows
+        )
+        conn.commit()
+        written += len(rows)
+        chunks += 1
+        if chunks % 10 == 0:
+            print(f"  {written:,} reviews moderated ({written / (time.perf_counter() - start):,.0f}/s)")
+
+    def jobs():
+        for reviews in source.iter_reviews(chunksize):
+            yield reviews, source.get_reviews_by_users(reviews['userId'].tolist(), days=30)
+
+    try:
+        if workers <= 0:
+            for reviews, history in jobs():
+                write(score_reviews(reviews, history))
+        else:
+            # A few chunks in flight per worker keeps them busy without
+            # buffering the whole table; results are written in order
+            fork = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=fork) as pool:
+                pending = deque()
+                for reviews, history in jobs():
+                    pending.append(pool.submit(score_reviews, reviews, history))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        conn.close()
+
+    print(f"✓ Moderated {written:,} reviews in {time.perf_counter() - start:.2f}s "
+          f"({workers or 'no'} worker processes)")
+    return {"reviews": written, "chunks": chunks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=None, help="Reviews per chunk (default DB_CHUNK_SIZE)")
+    parser.add_argument('--store', type=Path, default=None, help="ML store file (default ML_STORE_PATH)")
+    args = parser.parse_args()
+
+    from app.config import settings
+    from app.db import db
+
+    backfill(db, args.store or settings.ml_store_path, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,573 @@
+"""Near-duplicate text detection with MinHash and locality-sensitive hashing.
+
+Each text is reduced to the set of hashed character 5-grams of its
+normalised form, and a MinHash signature of 64 values estimates the
+Jaccard similarity of two such sets as the fraction of equal values.
+Signatures are cut into 16 bands of 4 values; texts that agree on a whole
+band land in the same bucket, so a query only compares the signatures
+sharing a bucket with it instead of the whole corpus. With 16 x 4 bands a
+pair with Jaccard similarity 0.7 becomes a candidate with probability
+0.988, and 0.3 with probability 0.12. Copies of a 20-word review with one
+word changed are around 0.75 similar.
+
+Texts are keyed (e.g. by reviewer and product) and can be added at any
+time; adding a key again replaces its text.
+
+NearDuplicateIndex keeps the buckets in process memory. The service uses
+SharedNearDuplicateIndex, which keeps band keys and signatures in the ML
+store (ML_STORE_PATH) so that a text indexed by one worker process is
+found by queries in every other.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+GOLDEN_RATIO_64 = np.uint64(0x9E3779B97F4A7C15)
+NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase with punctuation and runs of whitespace collapsed to single spaces."""
+    return NON_WORD_RE.sub(' ', (text or '').lower()).strip()
+
+
+class MinHasher:
+    """MinHash signatures over hashed character shingles."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        """
+        Args:
+            num_perm: Signature length (number of hash functions)
+            shingle_size: Characters per shingle
+            seed: Seed of the hash functions; signatures are only
+                comparable between hashers with the same seed
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Multiply-shift hashing: the top 32 bits of a * x + b (mod 2^64)
+        # for random odd a, which needs no modulo
+        self._a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+
+    def _window_hashes(self, data: np.ndarray, k: int) -> np.ndarray:
+        n = len(data) - k + 1
+        hashes = np.zeros(n, dtype=np.uint64)
+        for offset in range(k):
+            hashes = hashes * np.uint64(257) + data[offset:offset + n]
+        return (hashes * GOLDEN_RATIO_64) >> np.uint64(32)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct 32-bit hashes of the shingles of a normalised text."""
+        data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+        if len(data) == 0:
+            return data
+        return np.unique(self._window_hashes(data, min(self.shingle_size, len(data))))
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a normalised text.
+
+        Args:
+            text: Text as returned by normalize()
+
+        Returns:
+            uint32 array of length num_perm
+        """
+        data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+        if len(data) == 0:
+            return np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        values = self._a[:, None] * self._window_hashes(data, min(self.shingle_size, len(data)))
+        values += self._b[:, None]
+        values >>= np.uint64(32)
+        return values.min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts: List[str], batch_shingles: int = 100_000) -> np.ndarray:
+        """
+        MinHash signatures of many normalised texts.
+
+        The shingles of all texts are hashed together and reduced per text
+        with one minimum.reduceat, which is much faster than one
+        signature() call per text.
+
+        Args:
+            texts: Texts as returned by normalize()
+            batch_shingles: Approximate shingles hashed at once (bounds memory)
+
+        Returns:
+            uint32 array of shape (len(texts), num_perm); texts without
+            shingles (empty) get all-ones signatures
+        """
+        k = self.shingle_size
+        result = np.full((len(texts), self.num_perm), 0xFFFFFFFF, dtype=np.uint32)
+        encoded = [text.encode('utf-8') for text in texts]
+        start = 0
+        while start < len(encoded):
+            # Texts of one batch, at least one
+            stop, size = start, 0
+            while stop < len(encoded) and (stop == start or size + len(encoded[stop]) <= batch_shingles):
+                size += len(encoded[stop])
+                stop += 1
+            batch = encoded[start:stop]
+            lengths = np.fromiter((len(b) for b in batch), dtype=np.int64, count=len(batch))
+            data = np.frombuffer(b''.join(batch), dtype=np.uint8).astype(np.uint64)
+
+            rows, hashes = [], []
+            long_enough = np.flatnonzero(lengths >= k)
+            if len(long_enough) and len(data) >= k:
+                # Windows that start and end inside one text
+                ends = np.cumsum(lengths)
+                windows = self._window_hashes(data, k)
+                text_of = np.repeat(np.arange(len(batch)), lengths)[:len(windows)]
+                valid = np.arange(len(windows)) + k <= ends[text_of]
+                rows.append(text_of[valid])
+                hashes.append(windows[valid])
+            for i in np.flatnonzero((lengths > 0) & (lengths < k)).tolist():
+                # Shorter than a shingle: the whole text is one shingle
+                rows.append(np.array([i]))
+                hashes.append(self._window_hashes(np.frombuffer(batch[i], dtype=np.uint8).astype(np.uint64), len(batch[i])))
+
+            if rows:
+                rows, hashes = np.concatenate(rows), np.concatenate(hashes)
+                order = np.argsort(rows, kind='stable')
+                rows, hashes = rows[order], hashes[order]
+                # One row per hash function, so each text's minimum is over a contiguous run
+                values = self._a[:, None] * hashes
+                values += self._b[:, None]
+                values >>= np.uint64(32)
+                present, offsets = np.unique(rows, return_index=True)
+                result[start + present] = np.minimum.reduceat(values, offsets, axis=1).T.astype(np.uint32)
+            start = stop
+        return result
+
+
+class NearDuplicateIndex:
+    """
+    Incrementally maintained LSH index of keyed texts.
+
+    Every text is owned by someone (a reviewer), so callers can tell
+    duplicates by the same owner from duplicates across owners. Texts
+    shorter than min_words are not indexed: short phrases such as
+    "fresh and tasty" are legitimately repeated by many people.
+    """
+
+    def __init__(self, threshold: float = 0.7, min_words: int = 8, num_perm: int = 64,
+                 bands: int = 16, seed: int = 1):
+        """
+        Args:
+            threshold: Minimum estimated Jaccard similarity of a match
+            min_words: Minimum words of an indexed or queried text
+            num_perm: MinHash signature length
+            bands: LSH bands (must divide num_perm)
+            seed: Hash seed
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"bands={bands} must divide num_perm={num_perm}")
+        self.threshold = threshold
+        self.min_words = min_words
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, seed=seed)
+        rng = np.random.default_rng(seed + 1)
+        self._band_mult = rng.integers(1, 1 << 63, self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salt = rng.integers(0, 1 << 63, bands, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._ids: Dict[Hashable, int] = {}
+        self._keys: List[Hashable] = []
+        self._owners: List[Any] = []
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self._live = np.zeros(1024, dtype=bool)
+        # Band key -> id, or list of ids once a bucket has more than one
+        self._buckets: Dict[int, Union[int, List[int]]] = {}
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        bands = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        return ((bands * self._band_mult).sum(axis=1) ^ self._band_salt).tolist()
+
+    def _indexable(self, text: str) -> Optional[str]:
+        text = normalize(text)
+        return text if text.count(' ') + 1 >= self.min_words else None
+
+    def _unlink(self, doc_id: int):
+        for band_key in self._band_keys(self._signatures[doc_id]):
+            bucket = self._buckets.get(band_key)
+            if isinstance(bucket, list):
+                bucket.remove(doc_id)
+                if len(bucket) == 1:
+                    self._buckets[band_key] = bucket[0]
+            elif bucket == doc_id:
+                del self._buckets[band_key]
+
+    def _insert(self, key: Hashable, owner: Any, signature: Optional[np.ndarray], replace: bool) -> bool:
+        # Called with the lock held
+        doc_id = self._ids.get(key)
+        if doc_id is not None:
+            if not replace:
+                return True
+            if signature is not None and np.array_equal(self._signatures[doc_id], signature):
+                return True
+            self._unlink(doc_id)
+            if signature is None:
+                del self._ids[key]
+                self._live[doc_id] = False
+                return False
+        elif signature is None:
+            return False
+        else:
+            doc_id = len(self._keys)
+            if doc_id == len(self._signatures):
+                self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+                self._live = np.concatenate([self._live, np.zeros_like(self._live)])
+            self._keys.append(key)
+            self._owners.append(owner)
+            self._ids[key] = doc_id
+
+        self._signatures[doc_id] = signature
+        self._owners[doc_id] = owner
+        self._live[doc_id] = True
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                self._buckets[band_key] = doc_id
+            elif isinstance(bucket, list):
+                bucket.append(doc_id)
+            else:
+                self._buckets[band_key] = [bucket, doc_id]
+        return True
+
+    def add(self, key: Hashable, owner: Any, text: str, replace: bool = True) -> bool:
+        """
+        Index a text, replacing any earlier text of the same key.
+
+        Args:
+            key: Unique key of the text (e.g. (user_id, product_id))
+            owner: Author of the text
+            text: Raw text
+            replace: Whether to replace an existing text of the key
+
+        Returns:
+            Whether the key is indexed afterwards (False for short texts)
+        """
+        text = self._indexable(text)
+        signature = self.hasher.signature(text) if text is not None else None
+        return self._insert_many([(key, owner, signature)], replace) > 0
+
+    def add_many(self, items: Iterable[Tuple[Hashable, Any, str]], replace: bool = True) -> int:
+        """
+        Index many texts, hashing them in batches (see add).
+
+        Args:
+            items: (key, owner, text) tuples
+            replace: Whether to replace existing texts of the keys
+
+        Returns:
+            Number of the keys indexed afterwards
+        """
+        keys, owners, texts = [], [], []
+        for key, owner, text in items:
+            text = self._indexable(text)
+            if text is not None or replace:
+                keys.append(key)
+                owners.append(owner)
+                texts.append(text)
+        hashed = [i for i, text in enumerate(texts) if text is not None]
+        signatures = self.hasher.signatures([texts[i] for i in hashed])
+        by_position = dict(zip(hashed, signatures))
+        return self._insert_many(
+            [(key, owner, by_position.get(i)) for i, (key, owner) in enumerate(zip(keys, owners))], replace
+        )
+
+    def _insert_many(self, entries: List[Tuple[Hashable, Any, Optional[np.ndarray]]], replace: bool) -> int:
+        with self._lock:
+            return sum(self._insert(key, owner, signature, replace) for key, owner, signature in entries)
+
+    def query(self, text: str, exclude: Optional[Hashable] = None) -> List[Tuple[Hashable, Any, float]]:
+        """
+        Find indexed texts similar to a text.
+
+        Args:
+            text: Raw text
+            exclude: Key to leave out (usually the text's own key)
+
+        Returns:
+            List of (key, owner, estimated Jaccard similarity), most similar first
+        """
+        text = self._indexable(text)
+        if text is None:
+            return []
+        return self._matches(self.hasher.signature(text), exclude)
+
+    def _matches(self, signature: np.ndarray, exclude: Optional[Hashable]) -> List[Tuple[Hashable, Any, float]]:
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                bucket = self._buckets.get(band_key)
+                if isinstance(bucket, list):
+                    candidates.update(bucket)
+                elif bucket is not None:
+                    candidates.add(bucket)
+            excluded = self._ids.get(exclude) if exclude is not None else None
+            candidates.discard(excluded)
+            if not candidates:
+                return []
+
+            ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (self._signatures[ids] == signature).mean(axis=1)
+            keep = similarity >= self.threshold
+            ids, similarity = ids[keep], similarity[keep]
+            order = np.argsort(-similarity, kind='stable')
+            return [(self._keys[i], self._owners[i], float(s)) for i, s in zip(ids[order].tolist(), similarity[order].tolist())]
+
+    def build(self, frames: Iterable, key_columns: Tuple[str, ...] = ('userId', 'productId'),
+              owner_column: str = 'userId', text_column: str = 'comment', replace: bool = False) -> int:
+        """
+        Index texts from DataFrame chunks.
+
+        Args:
+            frames: DataFrames (e.g. DatabaseConnector.iter_reviews())
+            key_columns: Columns forming the key
+            owner_column: Owner column
+            text_column: Text column
+            replace: Whether to replace texts of keys already indexed (by
+                default texts added meanwhile are kept); rows without an
+                indexable text then remove their key
+
+        Returns:
+            Number of indexed texts
+        """
+        indexed = 0
+        for frame in frames:
+            texts = [text if isinstance(text, str) else None for text in frame[text_column]]
+            keys = zip(*(frame[column] for column in key_columns))
+            indexed += self.add_many(zip(keys, frame[owner_column], texts), replace=replace)
+        self.built = True
+        return indexed
+
+    def sync(self, source, chunksize: Optional[int] = None) -> int:
+        """
+        Index every review of the DB on the first call; the in-memory index keeps no watermark.
+
+        Args:
+            source: DatabaseConnector for the shared DB
+            chunksize: Reviews per chunk read (default DB_CHUNK_SIZE)
+
+        Returns:
+            Number of indexed texts among the reviews read
+        """
+        if self.built:
+            return 0
+        return self.build(source.iter_reviews(chunksize))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "built": self.built,
+                "texts": len(self._ids),
+                "buckets": len(self._buckets),
+                "threshold": self.threshold,
+                "min_words": self.min_words,
+                "bands": self.bands,
+                "rows_per_band": self.rows,
+                "signature_bytes": int(self._live.sum()) * self._signatures.shape[1] * 4,
+            }
+
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS near_duplicate_texts (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    signature BLOB NOT NULL
+) WITHOUT ROWID;
+-- One row per band of each text; a query looks up its own band keys
+CREATE TABLE IF NOT EXISTS near_duplicate_bands (
+    band_key INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (band_key, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    watermark TEXT,
+    refreshed_at REAL NOT NULL
+);
+"""
+SHARED_STATE_NAME = "near_duplicates"
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(list(value) if isinstance(value, tuple) else value)
+
+
+def _decode(value: str) -> Any:
+    value = json.loads(value)
+    return tuple(value) if isinstance(value, list) else value
+
+
+class SharedNearDuplicateIndex(NearDuplicateIndex):
+    """
+    NearDuplicateIndex stored in a SQLite file shared by worker processes.
+
+    Every add is a transaction on the file, so a text indexed by any
+    process is a candidate for the next query in all of them. Keys and
+    owners must be JSON-serialisable (tuples are stored as lists).
+    """
+
+    def __init__(self, path: Path, threshold: float = 0.7, min_words: int = 8, num_perm: int = 64,
+                 bands: int = 16, seed: int = 1):
+        """
+        Args:
+            path: ML store SQLite file (created if missing)
+            threshold: Minimum estimated Jaccard similarity of a match
+            min_words: Minimum words of an indexed or queried text
+            num_perm: MinHash signature length
+            bands: LSH bands (must divide num_perm)
+            seed: Hash seed; must be the same in every process sharing the file
+        """
+        super().__init__(threshold, min_words, num_perm, bands, seed)
+        self.path = Path(path)
+        self._signatures = self._live = None
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process (pre-fork workers must not share one)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Derived data that a sync restores; no fsync per analysed review
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SHARED_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _stored_band_keys(self, signature: np.ndarray) -> List[int]:
+        # SQLite integers are signed 64-bit
+        return [key - (1 << 64) if key >= 1 << 63 else key for key in self._band_keys(signature)]
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM near_duplicate_texts").fetchone()[0]
+
+    def _insert_many(self, entries: List[Tuple[Hashable, Any, Optional[np.ndarray]]], replace: bool) -> int:
+        conn = self._connect()
+        indexed = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, owner, signature in entries:
+                key = _encode(key)
+                row = conn.execute("SELECT signature FROM near_duplicate_texts WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    old = np.frombuffer(row[0], dtype=np.uint32)
+                    if not replace or (signature is not None and np.array_equal(old, signature)):
+                        indexed += 1
+                        continue
+                    conn.executemany("DELETE FROM near_duplicate_bands WHERE band_key = ? AND key = ?",
+                                     ((band_key, key) for band_key in self._stored_band_keys(old)))
+                    if signature is None:
+                        conn.execute("DELETE FROM near_duplicate_texts WHERE key = ?", (key,))
+                        continue
+                elif signature is None:
+                    continue
+                conn.execute("INSERT OR REPLACE INTO near_duplicate_texts VALUES (?, ?, ?)",
+                             (key, _encode(owner), signature.astype(np.uint32).tobytes()))
+                conn.executemany("INSERT OR IGNORE INTO near_duplicate_bands VALUES (?, ?)",
+                                 ((band_key, key) for band_key in self._stored_band_keys(signature)))
+                indexed += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return indexed
+
+    def _matches(self, signature: np.ndarray, exclude: Optional[Hashable]) -> List[Tuple[Hashable, Any, float]]:
+        band_keys = self._stored_band_keys(signature)
+        rows = self._connect().execute(
+            "SELECT key, owner, signature FROM near_duplicate_texts WHERE key IN ("
+            f"SELECT key FROM near_duplicate_bands WHERE band_key IN ({', '.join('?' * len(band_keys))}))",
+            band_keys
+        ).fetchall()
+        if exclude is not None:
+            excluded = _encode(exclude)
+            rows = [row for row in rows if row[0] != excluded]
+        if not rows:
+            return []
+
+        signatures = np.frombuffer(b''.join(row[2] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+        similarity = (signatures == signature).mean(axis=1)
+        keep = np.flatnonzero(similarity >= self.threshold)
+        order = keep[np.argsort(-similarity[keep], kind='stable')]
+        return [(_decode(rows[i][0]), _decode(rows[i][1]), float(similarity[i])) for i in order.tolist()]
+
+    def _state(self) -> Optional[tuple]:
+        return self._connect().execute(
+            "SELECT watermark, refreshed_at FROM rollup_state WHERE name = ?", (SHARED_STATE_NAME,)
+        ).fetchone()
+
+    def sync(self, source, chunksize: Optional[int] = None) -> int:
+        """
+        Index the reviews of the DB that changed since the last sync.
+
+        The first sync (of any process) indexes every review, keeping texts
+        that workers added meanwhile. Later syncs re-read the reviews
+        updated at or after the stored updatedAt watermark, which picks up
+        reviews stored while the service was down and drops texts whose
+        comment was removed.
+
+        Args:
+            source: DatabaseConnector for the shared DB
+            chunksize: Reviews per chunk read (default DB_CHUNK_SIZE)
+
+        Returns:
+            Number of indexed texts among the reviews read
+        """
+        with self._sync_lock:
+            state = self._state()
+            watermark = state[0] if state else None
+            seen = []
+
+            def frames(reviews):
+                for frame in reviews:
+                    if len(frame):
+                        latest = frame['updatedAt'].max()
+                        seen.append(latest.item() if hasattr(latest, 'item') else latest)
+                    yield frame
+
+            if state is None:
+                indexed = self.build(frames(source.iter_reviews(chunksize)))
+            else:
+                indexed = self.build(frames(source.iter_reviews(chunksize, since=watermark)), replace=True)
+            # Reviews updated at the watermark are read again next time
+            watermark = max(seen, default=watermark)
+            self._connect().execute("INSERT OR REPLACE INTO rollup_state VALUES (?, ?, ?)",
+                                    (SHARED_STATE_NAME, watermark, time.time()))
+            return indexed
+
+    def status(self) -> Dict[str, Any]:
+        conn = self._connect()
+        texts = conn.execute("SELECT COUNT(*) FROM near_duplicate_texts").fetchone()[0]
+        buckets = conn.execute("SELECT COUNT(DISTINCT band_key) FROM near_duplicate_bands").fetchone()[0]
+        state = self._state()
+        return {
+            "built": state is not None,
+            "path": str(self.path),
+            "watermark": state[0] if state else None,
+            "texts": texts,
+            "buckets": buckets,
+            "threshold": self.threshold,
+            "min_words": self.min_words,
+            "bands": self.bands,
+            "rows_per_band": self.rows,
+        }
@@ -0,0 +1,154 @@
+"""Pre-fork server: load models once in a master process, then fork workers.
+
+`uvicorn --workers N` starts N independent interpreters, each of which
+loads its own copy of every model. Here the master binds the socket,
+imports the app and runs warm-up (loading the ALS factors, TF-IDF matrix,
+fraud models and FAISS index) before forking, so workers start with those
+pages mapped copy-on-write and only pay for memory they write to.
+
+Model data lives in NumPy/SciPy buffers and native (FAISS/XGBoost) memory,
+which workers only read. To keep the Python object headers around them
+from being dirtied as well, the master runs a full collection and then
+`gc.freeze()`s the heap, so the cyclic GC in workers never touches it.
+
+Usage (from packages/ml):
+    python -m app.prefork --workers 4
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+from app.config import settings
+from app.memory import memory_breakdown
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Bind the listening socket that every worker accepts connections on."""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def load_shared_state():
+    """
+    Import the app and warm up every model in the master process.
+
+    Returns:
+        The FastAPI app, ready to be served by forked workers
+    """
+    from app.main import app, register_warmup_tasks
+    from app.db import db
+    from app.warmup import warmup
+
+    if settings.warmup_enabled:
+        register_warmup_tasks()
+        warmup.run_sync()
+    else:
+        print("⚠ Model warm-up disabled; each worker will load its own copy of the models")
+
+    # SQLite connections must not cross fork(); workers open their own
+    db.engine.dispose()
+
+    # Objects allocated so far move to a permanent generation that the
+    # cyclic GC never scans, so collections in workers leave these pages shared
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+class PreforkServer:
+    """Fork workers serving a shared socket and restart them if they die."""
+
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.num_workers = workers
+        self.workers = {}  # pid -> worker number
+        self.stopping = False
+
+    def spawn(self, worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                self._run_worker(worker_id)
+            finally:
+                os._exit(0)
+        self.workers[pid] = worker_id
+
+    def _run_worker(self, worker_id: int):
+        import uvicorn
+
+        config = uvicorn.Config(self.app, log_level="info", timeout_keep_alive=5)
+        server = uvicorn.Server(config)
+        print(f"✓ Worker {worker_id} started (pid {os.getpid()})")
+        server.run(sockets=[self.sock])
+
+    def stop(self, signum, frame):
+        """Forward SIGTERM/SIGINT to the workers and stop restarting them."""
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for worker_id in range(self.num_workers):
+            self.spawn(worker_id)
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            worker_id = self.workers.pop(pid, None)
+            if worker_id is None or self.stopping:
+                continue
+            print(f"⚠ Worker {worker_id} (pid {pid}) exited with status {status}; restarting")
+            time.sleep(1)
+            self.spawn(worker_id)
+
+        self.sock.close()
+        print("Pre-fork master stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=settings.ml_service_host)
+    parser.add_argument('--port', type=int, default=settings.ml_service_port)
+    parser.add_argument('--workers', type=int, default=settings.ml_service_workers)
+    args = parser.parse_args()
+
+    # Bind first so a port conflict fails before models are loaded
+    sock = bind_socket(args.host, args.port)
+
+    print("=" * 60)
+    print(f"Pre-fork master (pid {os.getpid()}) loading models for {args.workers} workers")
+    print("=" * 60)
+    app = load_shared_state()
+    memory = memory_breakdown()
+    print(f"✓ Models loaded; master RSS {memory['rss_bytes'] / 2**20:.1f} MiB")
+    print(f"Serving on http://{args.host}:{args.port}")
+    print("=" * 60)
+
+    PreforkServer(app, sock, args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Opt-in per-request profiling.
+
+A request is profiled when it carries `X-Profile-Token` matching
+PROFILING_TOKEN, or when it is picked by PROFILING_SAMPLE_RATE. Two
+profilers are available, chosen per request with `X-Profile-Mode` (default
+PROFILING_MODE):
+
+- `cprofile`: deterministic, written as a pstats `.prof` file
+  (`python -m pstats file.prof`, snakeviz)
+- `sample`: statistical stack sampler, written as collapsed stacks
+  (`.collapsed`, for flamegraph.pl or speedscope)
+
+Profiles go to a ring directory capped at PROFILING_MAX_FILES and the id
+of each one is returned in the `X-Profile-Id` response header. They can be
+listed and downloaded from /debug/profiles with the same token, which
+also guards /debug/queries.
+
+Only one request per process is profiled at a time. Both profilers watch
+the event-loop thread, so other requests interleaved on that thread while
+the profiled one awaits I/O can show up in its profile.
+"""
+import cProfile
+import hmac
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from .config import settings
+
+PROFILE_MODES = ("cprofile", "sample")
+TOKEN_HEADER = b"x-profile-token"
+MODE_HEADER = b"x-profile-mode"
+# Never sampled: probes, scrapes and the profile endpoints themselves
+EXCLUDED_PREFIXES = ("/health", "/ready", "/metrics", "/debug/")
+EXTENSIONS = {"cprofile": ".prof", "sample": ".collapsed"}
+
+
+class StackSampler:
+    """Sample one thread's Python stack at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.002):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(";", ","))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileStore:
+    """Bounded ring directory of profile files; the oldest are deleted first."""
+
+    def __init__(self, directory: Path, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def new_path(self, method: str, path: str, mode: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-')[:60] or "root"
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        return self.directory / f"{stamp}-{method.lower()}-{slug}{EXTENSIONS[mode]}"
+
+    def files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(
+            (p for p in self.directory.iterdir() if p.suffix in EXTENSIONS.values()),
+            key=lambda p: p.name
+        )
+
+    def prune(self):
+        files = self.files()
+        for old in files[:max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+    def get(self, name: str) -> Optional[Path]:
+        # Only bare file names from this directory can be downloaded
+        if Path(name).name != name:
+            return None
+        path = self.directory / name
+        return path if path.suffix in EXTENSIONS.values() and path.is_file() else None
+
+
+store = ProfileStore(settings.profiling_dir, settings.profiling_max_files)
+_active = threading.Lock()
+
+
+def _token_valid(token: Optional[str]) -> bool:
+    return bool(settings.profiling_token) and token is not None and hmac.compare_digest(
+        token.encode(), settings.profiling_token.encode()
+    )
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles opted-in or sampled requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _selected(self, scope, headers: Dict[bytes, bytes]) -> Optional[str]:
+        """Profile mode for this request, or None if it should not be profiled."""
+        token = headers.get(TOKEN_HEADER)
+        requested = token is not None and _token_valid(token.decode('latin-1'))
+        sampled = (
+            settings.profiling_sample_rate > 0
+            and not scope["path"].startswith(EXCLUDED_PREFIXES)
+            and random.random() < settings.profiling_sample_rate
+        )
+        if not (requested or sampled):
+            return None
+        mode = headers.get(MODE_HEADER, b"").decode('latin-1') if requested else ""
+        return mode if mode in PROFILE_MODES else settings.profiling_mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self._selected(scope, dict(scope["headers"]))
+        if mode is None or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        path = store.new_path(scope["method"], scope["path"], mode)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", path.name.encode())]
+            await send(message)
+
+        try:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(path)
+            else:
+                sampler = StackSampler(threading.get_ident())
+                sampler.start()
+                start = time.perf_counter()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    sampler.stop()
+                    sampler.write(path)
+                    print(f"Profiled {scope['method']} {scope['path']} in "
+                          f"{(time.perf_counter() - start) * 1000:.0f}ms -> {path.name}")
+            store.prune()
+        finally:
+            _active.release()
+
+
+router = APIRouter(prefix="/debug/profiles", tags=["debug"])
+
+
+def authorize(token: Optional[str]):
+    """
+    Check the X-Profile-Token of a request to a debug endpoint.
+
+    Raises:
+        HTTPException: 404 when PROFILING_TOKEN is not set, 403 when the
+            token does not match
+    """
+    if not settings.profiling_token:
+        raise HTTPException(status_code=404, detail="Debug endpoints are disabled (PROFILING_TOKEN not set)")
+    if not _token_valid(token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("")
+async def list_profiles(x_profile_token: Optional[str] = Header(default=None)):
+    """List stored profiles, newest first."""
+    authorize(x_profile_token)
+    profiles = []
+    for path in reversed(store.files()):
+        stat = path.stat()
+        profiles.append({
+            "id": path.name,
+            "format": "pstats" if path.suffix == ".prof" else "collapsed",
+            "size_bytes": stat.st_size,
+            "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            "download": f"/debug/profiles/{path.name}",
+        })
+    return {"max_files": store.max_files, "profiles": profiles}
+
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str, x_profile_token: Optional[str] = Header(default=None)):
+    """Download one profile file."""
+    authorize(x_profile_token)
+    path = store.get(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.name, media_type="application/octet-stream")
@@ -0,0 +1,165 @@
+"""Compiled matcher for the review lexicons and spam patterns.
+
+A review is scanned once by a single regular expression whose
+alternatives are the spam patterns, words and runs of '!'/'?'. The words
+are then matched against a trie of the lexicon terms, so multi-word
+terms ("not recommend") match consecutive words. The longest sentiment term starting
+at a word wins, and the words it covers are not matched again; generic
+phrases are matched independently of the sentiment terms.
+
+The lexicons are text files in app/lexicons, one term or pattern per
+line, '#' starting a comment:
+
+- positive.txt, negative.txt: sentiment terms
+- generic.txt: generic/template phrases
+- spam.txt: regular expressions for links, phone numbers, contact
+  requests and promotional language, matched case-insensitively where a
+  word or punctuation starts. They must not contain capturing groups.
+
+Files in REVIEW_LEXICON_DIR replace the built-in file of the same name.
+"""
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+LEXICON_DIR = Path(__file__).parent / "lexicons"
+SENTIMENT_CATEGORIES = ("positive", "negative")
+PHRASE_CATEGORIES = ("generic",)
+SPAM_FILE = "spam"
+
+WORD_RE = re.compile(r'\w+')
+# Trie key of a node ending a term ('' is never a word)
+END = ''
+
+
+@dataclass
+class LexiconMatch:
+    """What one scan found in a review."""
+    words: int  # \w+ tokens
+    positive: int
+    negative: int
+    generic: int
+    spam: bool  # any spam pattern
+    punctuation: bool  # three or more '!'/'?' in a row
+    caps: int  # uppercase characters
+
+
+def read_lexicon(name: str, directory: Optional[Path] = None) -> List[str]:
+    """
+    Entries of a lexicon file.
+
+    Args:
+        name: File name without .txt
+        directory: Directory whose file replaces the built-in one, if present
+
+    Returns:
+        Non-empty, non-comment lines, stripped
+    """
+    path = LEXICON_DIR / f"{name}.txt"
+    if directory is not None and (Path(directory) / f"{name}.txt").exists():
+        path = Path(directory) / f"{name}.txt"
+    with open(path, encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith('#')]
+
+
+class ReviewLexicon:
+    """Sentiment terms, generic phrases and spam patterns, compiled once."""
+
+    def __init__(self, terms: Dict[str, Iterable[str]], spam_patterns: Iterable[str]):
+        """
+        Args:
+            terms: Category (positive, negative, generic) -> terms
+            spam_patterns: Regular expressions without capturing groups
+        """
+        self._trie: Dict[str, dict] = {}
+        for category, entries in terms.items():
+            if category not in SENTIMENT_CATEGORIES + PHRASE_CATEGORIES:
+                raise ValueError(f"Unknown lexicon category: {category}")
+            for term in entries:
+                words = WORD_RE.findall(term.lower())
+                if not words:
+                    continue
+                node = self._trie
+                for word in words:
+                    node = node.setdefault(word, {})
+                node[END] = category
+
+        patterns = list(spam_patterns)
+        for pattern in patterns:
+            if re.compile(pattern).groups:
+                raise ValueError(f"Spam pattern has capturing groups, use (?:...): {pattern}")
+        spam = '|'.join(f'(?:{pattern})' for pattern in patterns) or '(?!)'
+        # Groups: spam pattern, word, run of '!'/'?'
+        self._scanner = re.compile(rf'(?i:({spam}))|(\w+)|([!?]{{3,}})')
+
+    @classmethod
+    def load(cls, directory: Optional[Path] = None) -> 'ReviewLexicon':
+        """
+        Compile the lexicon files.
+
+        Args:
+            directory: Directory with files replacing the built-in ones
+                (REVIEW_LEXICON_DIR); None for the built-in lexicons
+        """
+        terms = {category: read_lexicon(category, directory)
+                 for category in SENTIMENT_CATEGORIES + PHRASE_CATEGORIES}
+        return cls(terms, read_lexicon(SPAM_FILE, directory))
+
+    def scan(self, text: str) -> LexiconMatch:
+        """
+        Find every lexicon term, generic phrase and spam pattern in a text.
+
+        Args:
+            text: Review text
+
+        Returns:
+            LexiconMatch
+        """
+        words = []
+        spam = punctuation = False
+        caps = 0
+        for pattern, word, marks in self._scanner.findall(text):
+            if word:
+                lower = word.lower()
+                if lower != word:
+                    caps += sum(map(str.isupper, word))
+                words.append(lower)
+            elif pattern:
+                spam = True
+                # Words inside the match still count
+                caps += sum(map(str.isupper, pattern))
+                words.extend(WORD_RE.findall(pattern.lower()))
+            elif marks:
+                punctuation = True
+
+        counts = {'positive': 0, 'negative': 0, 'generic': 0}
+        root = self._trie
+        n = len(words)
+        covered = 0  # words before this are part of a matched sentiment term
+        for i in range(n):
+            node = root.get(words[i])
+            if node is None:
+                continue
+            sentiment = None
+            j = i
+            while True:
+                category = node.get(END)
+                if category is not None:
+                    if category in PHRASE_CATEGORIES:
+                        counts[category] += 1
+                    elif i >= covered:
+                        sentiment, end = category, j + 1
+                j += 1
+                if j == n:
+                    break
+                node = node.get(words[j])
+                if node is None:
+                    break
+            if sentiment is not None:
+                counts[sentiment] += 1
+                covered = end
+
+        return LexiconMatch(n, counts['positive'], counts['negative'], counts['generic'],
+                            spam, punctuation, caps)
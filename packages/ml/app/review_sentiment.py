@@ -0,0 +1,385 @@
+"""ML-owned per-product review sentiment aggregates.
+
+GET /reviews/product/{id}/sentiment-summary reports the sentiment
+distribution, average quality score and rating histogram of a product's
+reviews. Instead of analysing every review of the product on each call,
+the `product_sentiment` table in the ML store (ML_STORE_PATH) keeps
+running counts and sums per product, so a summary is one primary-key
+lookup.
+
+Each review analysed by /reviews/analyze updates the aggregates. The
+review's own contribution is kept in `review_sentiment`, keyed by product
+and user like the reviews themselves, so a re-analysed (edited) review
+replaces its earlier contribution instead of adding to it.
+
+The API only calls /reviews/analyze for reviews with a comment, so the
+aggregates also catch up from the DB, like the sales rollup: every
+REVIEW_SENTIMENT_REFRESH_SECONDS (checked before a summary is served)
+the reviews updated at or after the stored `updatedAt` watermark are
+analysed and applied. This counts rating-only reviews and edits, and
+restores reviews recorded by any process while a rebuild replaced the
+tables. The tables are built from all stored reviews at warm-up when
+missing; reviews deleted from the DB are only dropped by a rebuild:
+
+    python -m app.review_sentiment --rebuild
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_sentiment (
+    productId TEXT NOT NULL,
+    userId TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    sentiment TEXT NOT NULL,
+    quality_score REAL NOT NULL,
+    PRIMARY KEY (productId, userId)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS product_sentiment (
+    productId TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    quality_sum REAL NOT NULL,
+    rating_1 INTEGER NOT NULL,
+    rating_2 INTEGER NOT NULL,
+    rating_3 INTEGER NOT NULL,
+    rating_4 INTEGER NOT NULL,
+    rating_5 INTEGER NOT NULL
+) WITHOUT ROWID;
+-- When each product's aggregates last changed, for HTTP validators
+CREATE TABLE IF NOT EXISTS product_sentiment_versions (
+    productId TEXT PRIMARY KEY,
+    version REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    watermark TEXT,
+    refreshed_at REAL NOT NULL
+);
+"""
+STATE_NAME = "product_sentiment"
+SENTIMENTS = ("positive", "negative", "neutral")
+RATINGS = (1, 2, 3, 4, 5)
+AGGREGATE_COLUMNS = ["total", *SENTIMENTS, "quality_sum", *(f"rating_{r}" for r in RATINGS)]
+
+# (sentiment label, quality score) of a review text and rating
+Analyze = Callable[[str, int], Tuple[str, float]]
+
+
+def contribution(rating: int, sentiment: str, quality_score: float, sign: int = 1) -> List[float]:
+    """One review's share of the aggregates, in AGGREGATE_COLUMNS order."""
+    return [sign, *(sign * (sentiment == s) for s in SENTIMENTS), sign * quality_score,
+            *(sign * (rating == r) for r in RATINGS)]
+
+
+class ProductSentimentStore:
+    """The product_sentiment aggregates, updated per analysed review and caught up from the DB."""
+
+    def __init__(self, path: Path, source, interval_seconds: int = 60):
+        """
+        Args:
+            path: ML store SQLite file (created on the first rebuild)
+            source: DatabaseConnector for the shared DB
+            interval_seconds: Minimum time between catch-ups from the DB
+        """
+        self.path = Path(path)
+        self.source = source
+        self.interval = interval_seconds
+        self._ready = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process (pre-fork workers must not share one)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Derived data that a rebuild restores; no fsync per analysed review
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _state(self) -> Optional[tuple]:
+        if not self.path.exists():
+            return None
+        return self._connect().execute(
+            "SELECT watermark, refreshed_at FROM rollup_state WHERE name = ?", (STATE_NAME,)
+        ).fetchone()
+
+    def ready(self) -> bool:
+        """Whether the aggregates have been built (by this or any other process)."""
+        if not self._ready:
+            self._ready = self._state() is not None
+        return self._ready
+
+    def record(self, product_id: str, user_id: str, rating: int, sentiment: str, quality_score: float) -> bool:
+        """
+        Add or replace one review's contribution.
+
+        Args:
+            product_id: Reviewed product
+            user_id: Reviewer
+            rating: Rating from 1 to 5
+            sentiment: positive, negative or neutral
+            quality_score: Review quality score
+
+        Returns:
+            Whether the aggregates were updated (False before the first build)
+        """
+        if not self.ready():
+            return False
+        self._apply(self._connect(), [(product_id, user_id, int(rating), sentiment, float(quality_score))])
+        return True
+
+    def _apply(self, conn: sqlite3.Connection, reviews: List[tuple], watermark: Optional[tuple] = None):
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for product_id, user_id, rating, sentiment, quality_score in reviews:
+                delta = contribution(rating, sentiment, quality_score)
+                old = conn.execute(
+                    "SELECT rating, sentiment, quality_score FROM review_sentiment "
+                    "WHERE productId = ? AND userId = ?", (product_id, user_id)
+                ).fetchone()
+                if old is not None:
+                    if tuple(old) == (rating, sentiment, quality_score):
+                        # Already counted (e.g. analysed, then read back by a catch-up)
+                        continue
+                    delta = [new + removed for new, removed in zip(delta, contribution(*old, sign=-1))]
+                conn.execute(
+                    "INSERT OR REPLACE INTO review_sentiment VALUES (?, ?, ?, ?, ?)",
+                    (product_id, user_id, rating, sentiment, quality_score)
+                )
+                conn.execute(
+                    f"INSERT INTO product_sentiment VALUES (?, {', '.join('?' * len(AGGREGATE_COLUMNS))}) "
+                    f"ON CONFLICT(productId) DO UPDATE SET "
+                    + ", ".join(f"{c} = {c} + excluded.{c}" for c in AGGREGATE_COLUMNS),
+                    (product_id, *delta)
+                )
+                conn.execute("INSERT OR REPLACE INTO product_sentiment_versions VALUES (?, ?)",
+                             (product_id, now))
+            if watermark is not None:
+                conn.execute("UPDATE rollup_state SET watermark = ?, refreshed_at = ? WHERE name = ?",
+                             (*watermark, now, STATE_NAME))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _analyzed(frames, analyze: Analyze, seen: list) -> pd.DataFrame:
+        """review_sentiment rows of review chunks, appending each chunk's max updatedAt to `seen`."""
+        results = []
+        for reviews in frames:
+            if not len(reviews):
+                continue
+            latest = reviews['updatedAt'].max()
+            seen.append(latest.item() if hasattr(latest, 'item') else latest)
+            analysed = [analyze(comment if isinstance(comment, str) else '', rating)
+                        for comment, rating in zip(reviews['comment'], reviews['rating'])]
+            results.append(pd.DataFrame({
+                'productId': reviews['productId'].values,
+                'userId': reviews['userId'].values,
+                'rating': reviews['rating'].astype(int).values,
+                'sentiment': [sentiment for sentiment, _ in analysed],
+                'quality_score': [quality for _, quality in analysed],
+            }))
+        return pd.concat(results, ignore_index=True) if results else pd.DataFrame(
+            columns=['productId', 'userId', 'rating', 'sentiment', 'quality_score'])
+
+    def refresh(self, analyze: Analyze) -> Dict[str, int]:
+        """
+        Apply the reviews updated at or after the watermark (rebuild if never built).
+
+        Args:
+            analyze: Returns (sentiment, quality score) of a review text and rating
+
+        Returns:
+            Number of reviews read (or written by the first build)
+        """
+        with self._lock:
+            state = self._state()
+            if state is None:
+                return self._rebuild(analyze)
+            return self._catch_up(analyze, state[0])
+
+    def _catch_up(self, analyze: Analyze, since: Optional[Any]) -> Dict[str, int]:
+        seen = []
+        rows = self._analyzed(self.source.iter_reviews(since=since), analyze, seen)
+        # Reviews updated at the watermark are read again next time
+        self._apply(self._connect(), list(rows.itertuples(index=False, name=None)),
+                    watermark=(max(seen, default=since),))
+        return {"reviews": len(rows)}
+
+    def ensure_fresh(self, analyze: Analyze):
+        """Catch up from the DB when no process has for `interval` seconds (no-op before the first build)."""
+        state = self._state()
+        if state is None or time.time() - state[1] < self.interval:
+            return
+        # Another thread is already catching up; serve the current aggregates
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            state = self._state()
+            if time.time() - state[1] >= self.interval:
+                self._catch_up(analyze, state[0])
+        finally:
+            self._lock.release()
+
+    def rebuild(self, analyze: Analyze) -> Dict[str, int]:
+        """
+        Recompute every review's contribution and the aggregates from the DB.
+
+        Args:
+            analyze: Returns (sentiment, quality score) of a review text and rating
+
+        Returns:
+            Number of reviews and products written
+        """
+        with self._lock:
+            return self._rebuild(analyze)
+
+    def _rebuild(self, analyze: Analyze) -> Dict[str, int]:
+        start = time.perf_counter()
+        seen = []
+        rows = self._analyzed(self.source.iter_reviews(), analyze, seen)
+        aggregates = self._aggregate(rows)
+        # The newest review read, not the DB's: iter_reviews may read a lagging snapshot
+        watermark = max(seen, default=None)
+
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM review_sentiment")
+            conn.execute("DELETE FROM product_sentiment")
+            conn.execute("UPDATE product_sentiment_versions SET version = ?", (now,))
+            conn.executemany("INSERT INTO review_sentiment VALUES (?, ?, ?, ?, ?)",
+                             rows.itertuples(index=False, name=None))
+            conn.executemany(
+                f"INSERT INTO product_sentiment VALUES (?, {', '.join('?' * len(AGGREGATE_COLUMNS))})",
+                aggregates.itertuples(name=None)
+            )
+            conn.executemany("INSERT OR REPLACE INTO product_sentiment_versions VALUES (?, ?)",
+                             ((product_id, now) for product_id in aggregates.index))
+            conn.execute("INSERT OR REPLACE INTO rollup_state VALUES (?, ?, ?)", (STATE_NAME, watermark, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._ready = True
+        # Reviews stored (and recorded by any process) since they were read
+        caught_up = self._catch_up(analyze, watermark)
+
+        print(f"✓ Product sentiment rebuilt: {len(rows)} reviews of {len(aggregates)} products "
+              f"(+{caught_up['reviews']} caught up) in {time.perf_counter() - start:.2f}s")
+        return {"reviews": len(rows), "products": len(aggregates)}
+
+    @staticmethod
+    def _aggregate(rows: pd.DataFrame) -> pd.DataFrame:
+        """product_sentiment rows (index productId) from review_sentiment rows."""
+        df = pd.DataFrame({'productId': rows['productId'], 'total': 1})
+        for sentiment in SENTIMENTS:
+            df[sentiment] = (rows['sentiment'] == sentiment).astype(int)
+        df['quality_sum'] = rows['quality_score'].astype(float)
+        for rating in RATINGS:
+            df[f'rating_{rating}'] = (rows['rating'] == rating).astype(int)
+        return df.groupby('productId')[AGGREGATE_COLUMNS].sum()
+
+    def summary(self, product_id: str) -> Dict[str, Any]:
+        """
+        Sentiment summary of a product's reviews, in the sentiment-summary response shape.
+
+        Args:
+            product_id: Product ID
+
+        Returns:
+            Dict with total_reviews, sentiment_distribution, average_quality_score
+            and rating_distribution (rating -> count, most frequent first)
+        """
+        row = self._connect().execute(
+            f"SELECT {', '.join(AGGREGATE_COLUMNS)} FROM product_sentiment WHERE productId = ?", (product_id,)
+        ).fetchone()
+        if row is None or row[0] <= 0:
+            return {
+                'product_id': product_id,
+                'total_reviews': 0,
+                'sentiment_distribution': {},
+                'average_quality_score': 0.0
+            }
+
+        values = dict(zip(AGGREGATE_COLUMNS, row))
+        total = values['total']
+        ratings = sorted(((r, values[f'rating_{r}']) for r in RATINGS if values[f'rating_{r}'] > 0),
+                         key=lambda item: -item[1])
+        return {
+            'product_id': product_id,
+            'total_reviews': total,
+            'sentiment_distribution': {s: values[s] / total for s in SENTIMENTS},
+            'average_quality_score': values['quality_sum'] / total,
+            'rating_distribution': dict(ratings)
+        }
+
+    def version(self, product_id: str) -> Optional[str]:
+        """
+        Version token of a product's summary, for HTTP validators.
+
+        Changes with every rebuild and every review recorded or caught up for the product.
+
+        Args:
+            product_id: Product ID
+
+        Returns:
+            Opaque version string, or None before the first build
+        """
+        if not self.ready():
+            return None
+        updated = self._connect().execute(
+            "SELECT version FROM product_sentiment_versions WHERE productId = ?", (product_id,)
+        ).fetchone()
+        return str(updated[0] if updated else None)
+
+    def status(self) -> Dict[str, Any]:
+        if not self.ready():
+            return {"ready": False}
+        conn = self._connect()
+        products, reviews = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM product_sentiment"
+        ).fetchone()
+        watermark, refreshed_at = self._state()
+        return {"ready": True, "path": str(self.path), "products": products, "reviews": reviews,
+                "watermark": watermark, "refreshed_seconds_ago": round(time.time() - refreshed_at, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help="Recompute the aggregates from all reviews")
+    args = parser.parse_args()
+
+    from app.api.review_analysis import sentiment_and_quality, sentiment_store
+
+    if sentiment_store is None:
+        print("Product sentiment aggregates disabled (REVIEW_SENTIMENT_ENABLED=false)")
+        sys.exit(1)
+    if args.rebuild or not sentiment_store.ready():
+        sentiment_store.rebuild(sentiment_and_quality)
+    print(sentiment_store.status())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""ML-owned daily sales rollup.
+
+Forecasting and price optimisation read per-product daily sales. Rather
+than joining and grouping all of `orders ⋈ order_items` on every call,
+the `product_daily_sales` table in the ML store (ML_STORE_PATH, a SQLite
+file the ML service owns) keeps quantity, revenue, average unit price and
+order count per product and day.
+
+Maintenance is incremental. Each refresh finds the orders updated at or
+after the stored `updatedAt` watermark, recomputes every (product, day)
+bucket they touch from the source DB and replaces those buckets. A later
+cancellation therefore corrects the day the order was placed on.
+Hard-deleted orders are only picked up by a full rebuild:
+
+    python -m app.rollup --rebuild
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product_daily_sales (
+    productId TEXT NOT NULL,
+    day TEXT NOT NULL,
+    qty REAL NOT NULL,
+    revenue REAL NOT NULL,
+    avg_price REAL,
+    num_orders INTEGER NOT NULL,
+    PRIMARY KEY (productId, day)
+) WITHOUT ROWID;
+-- When each product's buckets were last written (products not written
+-- since this table was added have no row)
+CREATE TABLE IF NOT EXISTS product_sales_versions (
+    productId TEXT PRIMARY KEY,
+    version REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    watermark TEXT,
+    refreshed_at REAL NOT NULL
+);
+"""
+ROLLUP_NAME = "product_daily_sales"
+COLUMNS = ["productId", "day", "qty", "revenue", "avg_price", "num_orders"]
+
+
+def next_day(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+# Shaping of daily sales rows (COLUMNS), shared by DatabaseConnector and the
+# training snapshots so both return identical frames
+
+def sales_history(daily: pd.DataFrame) -> pd.DataFrame:
+    """Daily rows as date, quantity, avg_price, num_orders."""
+    return daily.rename(columns={'day': 'date', 'qty': 'quantity'})[
+        ['date', 'quantity', 'avg_price', 'num_orders']
+    ].reset_index(drop=True)
+
+
+def sales_timeseries(daily: pd.DataFrame) -> pd.DataFrame:
+    """Units sold per day summed over products (Prophet 'ds'/'y'), missing days filled with 0."""
+    if daily.empty:
+        return pd.DataFrame(columns=['ds', 'y'])
+    
+    df = daily.groupby('day', as_index=False)['qty'].sum()
+    df.columns = ['ds', 'y']
+    df['ds'] = pd.to_datetime(df['ds'])
+    
+    date_range = pd.date_range(start=df['ds'].min(), end=df['ds'].max(), freq='D')
+    df = df.set_index('ds').reindex(date_range, fill_value=0).reset_index()
+    df.columns = ['ds', 'y']
+    return df
+
+
+def price_demand(daily: pd.DataFrame) -> pd.DataFrame:
+    """Days with a positive price and demand as date, price, demand, num_orders."""
+    df = daily.rename(columns={'day': 'date', 'avg_price': 'price', 'qty': 'demand'})
+    df = df[(df['price'] > 0) & (df['demand'] > 0)]
+    return df[['date', 'price', 'demand', 'num_orders']].reset_index(drop=True)
+
+
+def price_demand_features(daily: pd.DataFrame) -> pd.DataFrame:
+    """price_demand() with calendar, season and promo features for elasticity models."""
+    df = price_demand(daily).rename(columns={'demand': 'units_sold'})
+    
+    if df.empty:
+        return pd.DataFrame()
+    
+    df['date'] = pd.to_datetime(df['date'])
+    # SQLite strftime('%w') numbering: 0 = Sunday
+    df['day_of_week'] = (df['date'].dt.dayofweek + 1) % 7
+    df['month'] = df['date'].dt.month
+    df['is_weekend'] = df['day_of_week'].isin([0, 6]).astype(int)
+    
+    # Add season feature (Northern Hemisphere)
+    df['season'] = df['month'].apply(lambda m: 
+        'winter' if m in [12, 1, 2] else
+        'spring' if m in [3, 4, 5] else
+        'summer' if m in [6, 7, 8] else
+        'fall'
+    )
+    
+    # Add promo indicator (simplified - price drops > 10%)
+    if len(df) > 1:
+        df['price_change'] = df['price'].pct_change()
+        df['is_promo'] = (df['price_change'] < -0.1).astype(int)
+    else:
+        df['is_promo'] = 0
+    
+    return df
+
+
+class SalesRollup:
+    """The product_daily_sales table and its incremental refresh."""
+
+    def __init__(self, path: Path, source, interval_seconds: int):
+        """
+        Args:
+            path: ML store SQLite file (created if missing)
+            source: DatabaseConnector for the shared DB
+            interval_seconds: Refresh interval of the background thread
+        """
+        self.path = Path(path)
+        self.source = source
+        self.interval = interval_seconds
+        self._ready = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process (pre-fork workers must not share one)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _state(self) -> Optional[tuple]:
+        if not self.path.exists():
+            return None
+        return self._connect().execute(
+            "SELECT watermark, refreshed_at FROM rollup_state WHERE name = ?", (ROLLUP_NAME,)
+        ).fetchone()
+
+    def ready(self) -> bool:
+        """Whether the rollup has been built at least once."""
+        if not self._ready:
+            self._ready = self._state() is not None
+        return self._ready
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last refresh (by this or any other process)."""
+        state = self._state()
+        return time.time() - state[1] if state else None
+
+    def refresh(self, full: bool = False) -> Dict[str, int]:
+        """
+        Bring the rollup up to date with the source DB.
+
+        Args:
+            full: Rebuild every bucket instead of only those touched by
+                orders updated since the watermark
+
+        Returns:
+            Number of changed orders seen and buckets written
+        """
+        with self._lock:
+            start = time.perf_counter()
+            state = None if full else self._state()
+
+            if state is None:
+                # Take the watermark first; anything updated meanwhile is redone next time
+                watermark = self.source.get_max_order_updated_at()
+                rows = self.source.aggregate_daily_sales()
+                changed, buckets = None, None
+            else:
+                changed = self.source.get_changed_sales_buckets(state[0])
+                if changed.empty:
+                    self._write(None, None, state[0])
+                    return {"orders": 0, "buckets": 0}
+                watermark = changed['updatedAt'].max()
+                buckets = changed[['productId', 'day']].drop_duplicates()
+                rows = self.source.aggregate_daily_sales(
+                    buckets['productId'].unique().tolist(), buckets['day'].min(), buckets['day'].max()
+                )
+                # Other days of those products in the range are unchanged
+                rows = rows.merge(buckets, on=['productId', 'day'])
+
+            self._write(rows, buckets, watermark)
+            self._ready = True
+            written = len(rows)
+            print(f"✓ Sales rollup {'rebuilt' if state is None else 'refreshed'}: {written} buckets "
+                  f"in {time.perf_counter() - start:.2f}s (watermark {watermark})")
+            return {"orders": 0 if changed is None else changed['orderId'].nunique(), "buckets": written}
+
+    def _write(self, rows: Optional[pd.DataFrame], buckets: Optional[pd.DataFrame], watermark: Optional[str]):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if rows is not None:
+                if buckets is None:
+                    conn.execute("DELETE FROM product_daily_sales")
+                    conn.execute("DELETE FROM product_sales_versions")
+                    products = rows['productId'].unique()
+                else:
+                    products = self._changed_products(conn, rows, buckets)
+                    # Buckets with no sales left (e.g. all orders cancelled) disappear
+                    conn.executemany(
+                        "DELETE FROM product_daily_sales WHERE productId = ? AND day = ?",
+                        buckets.itertuples(index=False, name=None)
+                    )
+                conn.executemany(
+                    "INSERT INTO product_daily_sales VALUES (?, ?, ?, ?, ?, ?)",
+                    rows[COLUMNS].itertuples(index=False, name=None)
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO product_sales_versions VALUES (?, ?)",
+                    ((product_id, now) for product_id in products)
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_state VALUES (?, ?, ?)", (ROLLUP_NAME, watermark, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def daily_sales(self, product_ids: List[str], start: Optional[str] = None,
+                    end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Daily sales rows for some products.
+
+        Args:
+            product_ids: Product IDs
+            start: First day (YYYY-MM-DD, inclusive)
+            end: Last day (YYYY-MM-DD, inclusive)
+
+        Returns:
+            DataFrame with productId, day, qty, revenue, avg_price, num_orders
+        """
+        frames = []
+        conn = self._connect()
+        for i in range(0, len(product_ids), 500):
+            chunk = product_ids[i:i + 500]
+            query = f"SELECT * FROM product_daily_sales WHERE productId IN ({','.join('?' * len(chunk))})"
+            params = list(chunk)
+            if start:
+                query += " AND day >= ?"
+                params.append(start)
+            if end:
+                query += " AND day <= ?"
+                params.append(end)
+            frames.append(pd.read_sql(query + " ORDER BY productId, day", conn, params=params))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+
+    @staticmethod
+    def _changed_products(conn: sqlite3.Connection, rows: pd.DataFrame, buckets: pd.DataFrame) -> set:
+        """Products whose buckets differ from the stored ones (refreshes re-read orders at the watermark)."""
+        stored = set()
+        for product_id, day in buckets.itertuples(index=False, name=None):
+            stored.update(conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM product_daily_sales WHERE productId = ? AND day = ?",
+                (product_id, day)
+            ).fetchall())
+        return {row[0] for row in stored ^ set(rows[COLUMNS].itertuples(index=False, name=None))}
+
+    def product_version(self, product_id: str) -> Optional[float]:
+        """
+        When a product's buckets were last written, for HTTP validators.
+
+        Returns:
+            Refresh time, or None if not written since the versions were added
+        """
+        row = self._connect().execute(
+            "SELECT version FROM product_sales_versions WHERE productId = ?", (product_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def ensure_fresh(self):
+        """Refresh in the caller when no background thread keeps the rollup current."""
+        if self._thread is not None:
+            return
+        age = self.age()
+        if age is None or age > self.interval:
+            self.refresh()
+
+    def _run(self):
+        while True:
+            age = self.age()
+            if age is None or age >= self.interval:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠ Sales rollup refresh failed: {e}")
+            if self._stop.wait(max(1.0, self.interval / 4)):
+                return
+
+    def start(self):
+        """Refresh in a background thread until stop()."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sales-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> Dict[str, Any]:
+        state = self._state()
+        return {
+            'path': str(self.path),
+            'ready': state is not None,
+            'watermark': state[0] if state else None,
+            'age_seconds': round(time.time() - state[1], 1) if state else None,
+            'interval_seconds': self.interval,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help="Recompute every bucket")
+    args = parser.parse_args()
+
+    from app.db import db
+
+    if db.sales_rollup is None:
+        print("Sales rollup disabled (SALES_ROLLUP_ENABLED=false)")
+        sys.exit(1)
+    db.sales_rollup.refresh(full=args.rebuild)
+    print(db.sales_rollup.status())
+
+
+if __name__ == "__main__":
+    main()
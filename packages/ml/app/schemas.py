@@ -139,6 +139,22 @@ class HealthResponse(BaseModel):
     status: str
     timestamp: datetime
     models_loaded: Dict[str, bool]
+    warmup: Optional[Dict[str, Any]] = None
+    memory: Optional[Dict[str, int]] = Field(
+        default=None,
+        description="This worker's resident memory split into shared (copy-on-write) and private bytes"
+    )
+    vector_store: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Chatbot index quantization and bytes held in RAM versus memory-mapped"
+    )
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness probe response."""
+    status: str = Field(description="ready or warming_up")
+    timestamp: datetime
+    models: Dict[str, Dict[str, Any]] = Field(description="Warm-up status, load time and memory per model")
 
 
 class RefreshResponse(BaseModel):
@@ -179,3 +195,13 @@ class ReviewAnalysisResponse(BaseModel):
     fraud_risk_factors: List[str] = Field(description="Detected fraud risk factors")
     recommendation: str = Field(description="Action recommendation")
     should_approve: bool = Field(description="Whether to auto-approve the review")
+
+
+class ReviewBatchRequest(BaseModel):
+    """Request for batch review analysis."""
+    reviews: List[ReviewAnalysisRequest] = Field(min_length=1, max_length=1000, description="Reviews to analyze")
+
+
+class ReviewBatchResponse(BaseModel):
+    """Response for batch review analysis, in request order."""
+    results: List[ReviewAnalysisResponse]
@@ -0,0 +1,133 @@
+"""Coalescing of concurrent identical computations (single-flight).
+
+When many requests for the same product arrive together (a product page
+going viral), each would otherwise run its own forecast fit, price model
+or similarity scan. A function decorated with `single_flight` runs in the
+threadpool, off the event loop, and callers arriving while a call with
+the same key is in flight await that call and share its result (or
+exception) instead of starting their own:
+
+    @single_flight("forecast")
+    def compute_forecast(product_id: str, days: int) -> ForecastResponse:
+        ...
+
+    response = await compute_forecast(product_id, days)
+
+Keys are the call's arguments unless a `key` function is given, so they
+must be hashable. Coalescing is per process: each worker runs at most one
+call per key at a time. Callers are counted in
+ml_single_flight_requests_total by flight and result (leader or
+coalesced); a caller that is cancelled does not cancel the shared call.
+"""
+import asyncio
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from .metrics import registry
+
+single_flight_requests = registry.counter(
+    "ml_single_flight_requests_total",
+    "Calls of single-flight functions by flight and result (leader ran it, coalesced awaited it)",
+    labels=("flight", "result")
+)
+single_flight_in_flight = registry.gauge(
+    "ml_single_flight_in_flight", "Distinct keys being computed by flight",
+    labels=("flight",)
+)
+
+
+class SingleFlight:
+    """In-flight calls of one kind, by key."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        single_flight_in_flight.set_function(lambda: len(self._calls), flight=name)
+
+    async def run(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+        Result of func(*args, **kwargs), shared with concurrent calls of the same key.
+
+        Args:
+            key: Identifies calls with the same result
+            func: Blocking function, run in the threadpool
+
+        Returns:
+            What func returned (it raised, the exception is raised to every caller)
+        """
+        loop = asyncio.get_running_loop()
+        future = self._calls.get(key)
+        if future is None or future.get_loop() is not loop:
+            future = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+            self._calls[key] = future
+            future.add_done_callback(functools.partial(self._done, key))
+            single_flight_requests.inc(flight=self.name, result="leader")
+        else:
+            single_flight_requests.inc(flight=self.name, result="coalesced")
+        # Cancelling one caller must not cancel the call the others await
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # Retrieved here so that an exception nobody awaited is not logged as lost
+            future.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        leaders = single_flight_requests.value(flight=self.name, result="leader")
+        coalesced = single_flight_requests.value(flight=self.name, result="coalesced")
+        return {
+            "in_flight": self.in_flight(),
+            "leaders": leaders,
+            "coalesced": coalesced,
+            "coalesced_ratio": round(coalesced / (leaders + coalesced), 4) if leaders + coalesced else None,
+        }
+
+
+_flights: Dict[str, SingleFlight] = {}
+_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    """The flight of a name, created on first use."""
+    with _lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
+
+
+def single_flight(name: str, key: Optional[Callable[..., Hashable]] = None):
+    """
+    Decorate a blocking function into a coalesced coroutine function.
+
+    Args:
+        name: Flight name, the `flight` label of the metrics
+        key: Computes the coalescing key from the call's arguments;
+            the positional and keyword arguments by default
+    """
+    flight = get_flight(name)
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            return await flight.run(call_key, func, *args, **kwargs)
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
+
+
+def flight_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every flight created in this process."""
+    with _lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
@@ -0,0 +1,171 @@
+"""Chunked, id-encoded reads and a streaming sparse matrix builder.
+
+Large extracts are read as DataFrame chunks of a bounded number of rows.
+String ids are replaced by dense int32 codes from an IdEncoder shared by
+all chunks, so a chunk holds no per-row Python strings, and a CooBuilder
+sums (row, col, value) triples into a sparse matrix as chunks arrive.
+Peak memory is then the chunk size plus the distinct ids and non-zeros,
+not the size of the extract.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix
+
+
+class IdEncoder:
+    """Dense int32 codes for string ids, stable across chunks."""
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self._codes: Dict[str, int] = {}
+        self.ids: List[str] = []
+        for id_ in ids:
+            if id_ not in self._codes:
+                self._codes[id_] = len(self.ids)
+                self.ids.append(id_)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def encode(self, values) -> np.ndarray:
+        """
+        Codes of some ids, assigning the next codes to unseen ones.
+
+        Args:
+            values: Ids (Series, array or list); missing values encode to -1
+
+        Returns:
+            int32 array of codes
+        """
+        if not isinstance(values, (pd.Series, pd.Index, np.ndarray)):
+            values = np.asarray(values, dtype=object)
+        # Only the distinct ids of the chunk go through the dict
+        local, uniques = pd.factorize(values)
+        mapped = np.empty(len(uniques), dtype=np.int32)
+        for i, id_ in enumerate(uniques):
+            code = self._codes.get(id_)
+            if code is None:
+                code = self._codes[id_] = len(self.ids)
+                self.ids.append(id_)
+            mapped[i] = code
+        if len(self.ids) > np.iinfo(np.int32).max:
+            raise OverflowError("More distinct ids than int32 codes")
+
+        codes = np.full(len(local), -1, dtype=np.int32)
+        present = local >= 0
+        codes[present] = mapped[local[present]]
+        return codes
+
+    def decode(self, codes) -> np.ndarray:
+        """Ids of some codes."""
+        return np.asarray(self.ids, dtype=object)[np.asarray(codes)]
+
+
+def typed_chunk(chunk: pd.DataFrame, encoders: Optional[Dict[str, IdEncoder]] = None,
+                timestamps: Tuple[str, ...] = ()) -> pd.DataFrame:
+    """
+    Compact dtypes of a query chunk in place.
+
+    Args:
+        chunk: DataFrame as read from the DB
+        encoders: Id columns to replace by their int32 codes
+        timestamps: Columns to parse as datetimes
+
+    Returns:
+        The chunk
+    """
+    for column, encoder in (encoders or {}).items():
+        chunk[column] = encoder.encode(chunk[column])
+    for column in timestamps:
+        chunk[column] = pd.to_datetime(chunk[column], format='ISO8601', errors='coerce')
+    # int32 rather than the smallest type, so arithmetic on chunks cannot overflow
+    int32 = np.iinfo(np.int32)
+    for column in chunk.select_dtypes('int64').columns:
+        values = chunk[column]
+        if column not in (encoders or {}) and (values.empty or int32.min <= values.min() <= values.max() <= int32.max):
+            chunk[column] = values.astype(np.int32)
+    return chunk
+
+
+class CooBuilder:
+    """Sums (row, col, value) triples into a sparse matrix, chunk by chunk."""
+
+    def __init__(self, dtype=np.float32, buffer_size: int = 5_000_000):
+        """
+        Args:
+            dtype: Value dtype of the matrix
+            buffer_size: Triples buffered before they are summed into the matrix
+        """
+        self.dtype = dtype
+        self.buffer_size = buffer_size
+        self.shape = (0, 0)
+        self._rows: List[np.ndarray] = []
+        self._cols: List[np.ndarray] = []
+        self._values: List[np.ndarray] = []
+        self._buffered = 0
+        self._matrix: Optional[csr_matrix] = None
+
+    def add(self, rows, cols, values=None):
+        """
+        Add triples; entries with a negative (missing) row or column are skipped.
+
+        Args:
+            rows: Row codes
+            cols: Column codes
+            values: Values (1 for each triple if omitted)
+        """
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        values = np.ones(len(rows), self.dtype) if values is None else np.asarray(values, dtype=self.dtype)
+        keep = (rows >= 0) & (cols >= 0)
+        if not keep.all():
+            rows, cols, values = rows[keep], cols[keep], values[keep]
+        if len(rows) == 0:
+            return
+
+        self.shape = (max(self.shape[0], int(rows.max()) + 1), max(self.shape[1], int(cols.max()) + 1))
+        self._rows.append(rows)
+        self._cols.append(cols)
+        self._values.append(values)
+        self._buffered += len(rows)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        # COO -> CSR sums duplicate (row, col) entries
+        summed = coo_matrix(
+            (np.concatenate(self._values), (np.concatenate(self._rows), np.concatenate(self._cols))),
+            shape=self.shape, dtype=self.dtype
+        ).tocsr()
+        if self._matrix is not None:
+            self._matrix.resize(self.shape)
+            summed = summed + self._matrix
+        self._matrix = summed
+        self._rows, self._cols, self._values = [], [], []
+        self._buffered = 0
+
+    @property
+    def nnz(self) -> int:
+        self._flush()
+        return 0 if self._matrix is None else self._matrix.nnz
+
+    def tocsr(self, shape: Optional[Tuple[int, int]] = None) -> csr_matrix:
+        """
+        The summed matrix.
+
+        Args:
+            shape: Final shape, e.g. (len(users), len(items)); at least the
+                largest codes added
+
+        Returns:
+            CSR matrix
+        """
+        self._flush()
+        shape = shape or self.shape
+        if self._matrix is None:
+            return csr_matrix(shape, dtype=self.dtype)
+        self._matrix.resize(shape)
+        return self._matrix
@@ -0,0 +1,206 @@
+"""Quantised vector storage for the RAG chatbot.
+
+The FAISS index holds compressed codes (int8 scalar quantisation or product
+quantisation) while the exact float32 embeddings live in a side file that is
+memory-mapped at load time. Searches over-fetch candidates from the compressed
+index and re-rank them with exact inner products, so only the rows that are
+actually touched are paged in from disk. An unquantised (flat) index already
+holds the exact vectors, so it has no side file and is searched directly.
+"""
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import faiss
+
+
+QUANTIZATION_MODES = ("none", "int8", "pq")
+
+INDEX_FILENAME = "faiss.index"
+EXACT_VECTORS_FILENAME = "embeddings.f32.npy"
+MAPPINGS_FILENAME = "doc_mappings.json"
+
+# FAISS recommends ~39 training points per centroid; PQ with 8-bit codes
+# learns 256 centroids per sub-quantiser.
+MIN_PQ_TRAINING_VECTORS = 39 * 256
+
+
+def build_index(embeddings: np.ndarray, quantization: str = "none",
+                pq_subquantizers: int = 48) -> faiss.Index:
+    """
+    Build an inner-product FAISS index over L2-normalised embeddings.
+
+    Args:
+        embeddings: float32 array of shape (n, dimension)
+        quantization: "none" (exact float32), "int8" (scalar quantisation)
+            or "pq" (product quantisation)
+        pq_subquantizers: Number of PQ sub-quantisers (must divide dimension)
+
+    Returns:
+        Trained FAISS index containing all embeddings
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unknown quantization '{quantization}'. Expected one of {QUANTIZATION_MODES}"
+        )
+
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    n, dimension = embeddings.shape
+
+    if quantization == "pq":
+        if dimension % pq_subquantizers != 0:
+            raise ValueError(
+                f"pq_subquantizers={pq_subquantizers} must divide dimension {dimension}"
+            )
+        if n < MIN_PQ_TRAINING_VECTORS:
+            print(f"  ⚠️  Only {n} vectors; PQ needs {MIN_PQ_TRAINING_VECTORS} to train. Using int8 instead.")
+            quantization = "int8"
+
+    if quantization == "none":
+        index = faiss.IndexFlatIP(dimension)
+    elif quantization == "int8":
+        index = faiss.IndexScalarQuantizer(
+            dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+    else:
+        index = faiss.IndexPQ(dimension, pq_subquantizers, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+
+    index.add(embeddings)
+    return index
+
+
+def index_quantization(index: faiss.Index) -> str:
+    """Return the quantisation mode of an index built by `build_index`."""
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "int8"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    return "none"
+
+
+def save_exact_vectors(embeddings: np.ndarray, directory: Path,
+                       index: Optional[faiss.Index] = None) -> Optional[Path]:
+    """
+    Save exact float32 embeddings as a memory-mappable .npy side file.
+
+    Args:
+        embeddings: float32 array of shape (n, dimension)
+        directory: Vector store directory
+        index: Index the vectors belong to; a flat index needs no side
+            file, so none is written and a stale one is removed
+
+    Returns:
+        Path of the written file, or None if no file was needed
+    """
+    path = Path(directory) / EXACT_VECTORS_FILENAME
+    if index is not None and index_quantization(index) == "none":
+        path.unlink(missing_ok=True)
+        return None
+    np.save(path, np.ascontiguousarray(embeddings, dtype='float32'))
+    return path
+
+
+class VectorStore:
+    """Compressed FAISS index with exact re-ranking from a memory-mapped side file."""
+
+    def __init__(self, index: faiss.Index, exact_vectors: Optional[np.ndarray] = None,
+                 rerank_candidates: int = 50):
+        """
+        Initialize vector store.
+
+        Args:
+            index: FAISS inner-product index
+            exact_vectors: Exact float32 embeddings (typically a read-only memmap)
+            rerank_candidates: Number of candidates fetched from a quantised
+                index before exact re-ranking
+        """
+        self.index = index
+        self.exact_vectors = exact_vectors
+        self.rerank_candidates = rerank_candidates
+        self.quantization = index_quantization(index)
+
+    @classmethod
+    def load(cls, directory: Path, rerank_candidates: int = 50) -> "VectorStore":
+        """
+        Load a vector store written by `training/build_vector_store.py`.
+
+        The exact vectors are opened with `mmap_mode='r'`; flat indexes and
+        stores built before quantisation support (no side file) are searched
+        without re-ranking.
+        """
+        directory = Path(directory)
+        index = faiss.read_index(str(directory / INDEX_FILENAME))
+
+        exact_path = directory / EXACT_VECTORS_FILENAME
+        exact_vectors = None
+        if index_quantization(index) != "none" and exact_path.exists():
+            exact_vectors = np.load(exact_path, mmap_mode='r')
+
+        if exact_vectors is not None and exact_vectors.shape[0] != index.ntotal:
+            print(f"  ⚠️  {exact_path.name} has {exact_vectors.shape[0]} rows but index has "
+                  f"{index.ntotal}; re-ranking disabled")
+            exact_vectors = None
+
+        return cls(index, exact_vectors, rerank_candidates)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def dimension(self) -> int:
+        return self.index.d
+
+    def search(self, query_embeddings: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search for the top-k most similar vectors.
+
+        Args:
+            query_embeddings: L2-normalised float32 queries of shape (q, dimension)
+            top_k: Number of results per query
+
+        Returns:
+            Tuple of (scores, indices), each of shape (q, top_k). Missing
+            results are padded with index -1.
+        """
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype='float32')
+
+        if self.quantization == "none" or self.exact_vectors is None:
+            return self.index.search(query_embeddings, top_k)
+
+        n_candidates = min(max(top_k, self.rerank_candidates), self.index.ntotal)
+        _, candidates = self.index.search(query_embeddings, n_candidates)
+
+        scores = np.full((len(query_embeddings), top_k), -np.inf, dtype='float32')
+        indices = np.full((len(query_embeddings), top_k), -1, dtype='int64')
+
+        for row, (query, ids) in enumerate(zip(query_embeddings, candidates)):
+            ids = ids[ids >= 0]
+            if len(ids) == 0:
+                continue
+
+            # Sorted ids give sequential page access on the memmap
+            ids = np.sort(ids)
+            exact_scores = np.asarray(self.exact_vectors[ids]) @ query
+
+            order = np.argsort(-exact_scores)[:top_k]
+            scores[row, :len(order)] = exact_scores[order]
+            indices[row, :len(order)] = ids[order]
+
+        return scores, indices
+
+    def memory_stats(self) -> dict:
+        """Report bytes held in RAM by the index versus the memory-mapped side file."""
+        index_bytes = int(self.index.sa_code_size()) * int(self.index.ntotal)
+        exact_bytes = int(self.exact_vectors.nbytes) if self.exact_vectors is not None else 0
+
+        return {
+            "quantization": self.quantization,
+            "num_vectors": int(self.index.ntotal),
+            "dimension": int(self.index.d),
+            "index_code_bytes": index_bytes,
+            "exact_vectors_bytes_on_disk": exact_bytes,
+            "rerank_candidates": self.rerank_candidates if exact_bytes else 0,
+        }
@@ -0,0 +1,126 @@
+"""Background model warm-up and readiness tracking."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .memory import rss_bytes
+from .metrics import register_executor
+
+
+@dataclass
+class WarmupTask:
+    """A model to load and exercise before the service reports ready."""
+    name: str
+    func: Callable[[], Optional[Dict[str, Any]]]
+    required: bool = True
+    status: str = "pending"  # pending, running, ready, failed
+    seconds: Optional[float] = None
+    rss_delta_bytes: Optional[int] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop('func')
+        return data
+
+
+class WarmupRegistry:
+    """
+    Registry of warm-up tasks run in a background thread at startup.
+
+    Tasks run one at a time so that the RSS growth measured around each
+    task can be attributed to that model. The service is ready once every
+    task has finished and no required task failed.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, WarmupTask] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._runner: Optional[asyncio.Task] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def register(self, name: str, func: Callable[[], Optional[Dict[str, Any]]], required: bool = True):
+        """
+        Register a warm-up task.
+
+        Args:
+            name: Model name reported by /ready
+            func: Callable that loads and exercises the model. It may return
+                a dict of details and should raise if the model is unusable.
+            required: Whether a failure keeps the service unready
+        """
+        self._tasks[name] = WarmupTask(name=name, func=func, required=required)
+
+    @property
+    def tasks(self) -> List[WarmupTask]:
+        return list(self._tasks.values())
+
+    def _run_task(self, task: WarmupTask):
+        task.status = "running"
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            task.details = task.func() or {}
+            task.status = "ready"
+        except Exception as e:
+            task.status = "failed"
+            task.error = str(e)
+        task.seconds = round(time.perf_counter() - start, 3)
+        task.rss_delta_bytes = rss_bytes() - rss_before
+
+        marker = "✓" if task.status == "ready" else "⚠"
+        print(f"{marker} Warm-up {task.name}: {task.status} in {task.seconds}s "
+              f"(+{task.rss_delta_bytes / 2**20:.1f} MiB)" + (f" - {task.error}" if task.error else ""))
+
+    async def _run_all(self):
+        loop = asyncio.get_running_loop()
+        for task in self.tasks:
+            await loop.run_in_executor(self._executor, self._run_task, task)
+        self.finished_at = datetime.now()
+
+    def run_sync(self):
+        """Run all registered tasks in the calling thread (pre-fork master)."""
+        self.started_at = datetime.now()
+        for task in self.tasks:
+            self._run_task(task)
+        self.finished_at = datetime.now()
+
+    def start(self):
+        """Schedule all registered tasks on the running event loop."""
+        if self._runner is not None or self.finished_at is not None:
+            return
+        self.started_at = datetime.now()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warmup")
+        register_executor("warmup", self._executor)
+        self._runner = asyncio.get_running_loop().create_task(self._run_all())
+
+    async def stop(self):
+        """Cancel pending warm-up work on shutdown."""
+        if self._runner is not None and not self._runner.done():
+            self._runner.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_ready(self) -> bool:
+        """Whether every task has finished and no required task failed."""
+        return all(
+            task.status == "ready" or (task.status == "failed" and not task.required)
+            for task in self._tasks.values()
+        )
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "models": {task.name: task.to_dict() for task in self.tasks},
+        }
+
+
+# Global warm-up registry
+warmup = WarmupRegistry()
@@ -0,0 +1,151 @@
+"""Benchmark the ML query set before and after adding the ML indexes.
+
+Generates a synthetic marketplace DB (benchmarks.marketplace, 10M order
+items by default), times the per-user and per-product
+DatabaseConnector queries, creates the indexes from app.indexes and times
+them again.
+
+Usage (from packages/ml):
+    python -m benchmarks.bench_db_indexes
+    python -m benchmarks.bench_db_indexes --order-items 1000000 --db /tmp/orders.db
+    python -m benchmarks.bench_db_indexes --output indexes.json
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import sqlite3
+import statistics
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import settings
+from app.indexes import ML_INDEXES, create_indexes
+from benchmarks.marketplace import MarketplaceSpec, generate_marketplace
+
+
+def generate_order_db(path: Path, order_items: int = 10_000_000, seed: int = 0) -> Dict[str, int]:
+    """
+    Create a synthetic marketplace DB (see benchmarks.marketplace).
+
+    Args:
+        path: Output SQLite file (replaced if it exists)
+        order_items: Number of order_items rows; other tables scale with it
+        seed: Random seed
+
+    Returns:
+        Row count per table
+    """
+    return generate_marketplace(path, MarketplaceSpec.scaled(order_items, seed=seed))
+
+
+def query_set(conn: sqlite3.Connection, samples: int, seed: int = 0) -> List[tuple]:
+    """Per-user and per-product DatabaseConnector calls, as served online."""
+    rng = np.random.default_rng(seed)
+    users = [row[0] for row in conn.execute("SELECT DISTINCT customerId FROM orders LIMIT 5000")]
+    products = [row[0] for row in conn.execute("SELECT DISTINCT productId FROM order_items LIMIT 5000")]
+    calls = []
+    for _ in range(samples):
+        user_id = users[rng.integers(len(users))]
+        product_id = products[rng.integers(len(products))]
+        calls.extend([
+            ("get_user_order_history", (user_id,)),
+            ("get_user_view_events", (user_id,)),
+            ("get_user_transaction_history", (user_id, 90)),
+            ("get_user_reviews", (user_id,)),
+            ("get_product_sales_history", (product_id,)),
+            ("get_historical_price_demand", (product_id,)),
+            ("get_sales_timeseries", (product_id,)),
+            ("get_product_reviews", (product_id,)),
+            ("get_review_statistics", (product_id,)),
+        ])
+    return calls
+
+
+def time_queries(db_path: Path, calls: List[tuple]) -> Dict[str, Dict[str, float]]:
+    """Median and p95 latency in ms per DatabaseConnector method."""
+    from app.db import DatabaseConnector
+
+    settings.database_url = f"file:{db_path}"
+    # The before run would log every query as slow
+    settings.slow_query_ms = 0
+    # Time the raw queries, not reads from the sales rollup
+    settings.sales_rollup_enabled = False
+    connector = DatabaseConnector()
+    # Warm the page cache so both runs read from memory
+    for method, args in calls[:len(calls) // 4 or 1]:
+        getattr(connector, method)(*args)
+
+    timings: Dict[str, List[float]] = {}
+    for method, args in calls:
+        start = time.perf_counter()
+        getattr(connector, method)(*args)
+        timings.setdefault(method, []).append((time.perf_counter() - start) * 1000)
+    connector.engine.dispose()
+
+    return {
+        method: {
+            "median_ms": round(statistics.median(values), 3),
+            "p95_ms": round(sorted(values)[int(len(values) * 0.95) - 1 if len(values) > 1 else 0], 3),
+        }
+        for method, values in timings.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--order-items', type=int, default=10_000_000)
+    parser.add_argument('--db', type=Path, default=Path("bench_orders.db"))
+    parser.add_argument('--reuse', action='store_true', help="Reuse --db if it exists (drops ML indexes)")
+    parser.add_argument('--samples', type=int, default=20, help="Random users/products per method")
+    parser.add_argument('--output', type=Path, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    if args.reuse and args.db.exists():
+        conn = sqlite3.connect(args.db)
+        for spec in ML_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {spec.name}")
+        conn.close()
+        print(f"Reusing {args.db}")
+    else:
+        print(f"Generating {args.db} with {args.order_items:,} order items...")
+        start = time.perf_counter()
+        counts = generate_order_db(args.db, args.order_items)
+        print(f"✓ Generated in {time.perf_counter() - start:.1f}s: "
+              + ", ".join(f"{table}={n:,}" for table, n in counts.items()))
+
+    conn = sqlite3.connect(args.db)
+    calls = query_set(conn, args.samples)
+    conn.close()
+
+    print("Timing queries without ML indexes...")
+    before = time_queries(args.db, calls)
+
+    start = time.perf_counter()
+    create_indexes(args.db)
+    print(f"✓ Created {len(ML_INDEXES)} indexes in {time.perf_counter() - start:.1f}s")
+    print("Timing queries with ML indexes...")
+    after = time_queries(args.db, calls)
+
+    print("=" * 60)
+    print(f"{'method':<32}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    results = {}
+    for method in before:
+        b, a = before[method]["median_ms"], after[method]["median_ms"]
+        speedup = b / a if a else float('inf')
+        results[method] = {"before": before[method], "after": after[method], "speedup": round(speedup, 1)}
+        print(f"{method:<32}{b:>12.2f}{a:>12.2f}{speedup:>9.1f}x")
+    print("=" * 60)
+
+    if args.output:
+        args.output.write_text(json.dumps({"order_items": args.order_items, "results": results}, indent=2))
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""End-to-end HTTP load benchmark for the ML service.
+
+Replays a weighted mix of recommendation, forecast, price, fraud, chat and
+review requests against a synthetic marketplace (benchmarks.marketplace)
+and reports QPS, p50/p95/p99 latency and CPU per request for each
+endpoint. Requests go through httpx, either in-process to app.main:app over
+ASGI (the default) or over HTTP to a running server (--url).
+
+CPU per request comes from a sequential pass per endpoint after the load
+run: process CPU time for in-process runs (so it includes the client's
+share, the same between runs), or the server's CPU time from
+/proc/<pid>/stat with --server-pid.
+
+Results are saved as JSON with the git commit, and --compare prints the
+change against an earlier run.
+
+Usage (from packages/ml):
+    python -m benchmarks.bench_http --order-items 1000000 --requests 5000 --output http.json
+    python -m benchmarks.bench_http --db marketplace.db --mix recommend_user=3,fraud=1 --concurrency 32
+    python -m benchmarks.bench_http --url http://127.0.0.1:8000 --server-pid 1234 --db marketplace.db
+    python -m benchmarks.bench_http --db marketplace.db --output new.json --compare old.json
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.config import settings
+from benchmarks.marketplace import MarketplaceSpec, generate_marketplace
+
+CHAT_QUERIES = [
+    "Where can I buy fresh tomatoes?", "Which farmers sell organic rice?", "What is the price of onions?",
+    "Do you have wild honey?", "Show me cheap lentils", "Best quality mangoes near Pune",
+]
+
+
+@dataclass
+class Dataset:
+    """Ids and values sampled from the benchmark DB to build requests from."""
+    users: np.ndarray
+    user_weights: np.ndarray
+    products: np.ndarray
+    product_weights: np.ndarray
+    orders: List[Tuple[str, float, str]]
+    reviews: List[Tuple[str, str, int, str]]
+
+    def user(self, rng) -> str:
+        return str(rng.choice(self.users, p=self.user_weights))
+
+    def product(self, rng) -> str:
+        return str(rng.choice(self.products, p=self.product_weights))
+
+
+@dataclass
+class Endpoint:
+    """A request type of the mix."""
+    name: str
+    weight: float
+    method: str
+    build: Callable[[np.random.Generator, Dataset], Tuple[str, Optional[Dict[str, Any]]]]
+
+
+def _fraud(rng, data: Dataset):
+    user_id, total, payment = data.orders[rng.integers(len(data.orders))]
+    items = int(rng.integers(1, 6))
+    return "/fraud/score", {
+        "user_id": user_id, "amount": total, "payment_method": payment, "num_items": items,
+        "avg_item_price": round(total / items, 2), "max_item_price": total,
+    }
+
+
+def _review(rng, data: Dataset):
+    user_id, product_id, rating, comment = data.reviews[rng.integers(len(data.reviews))]
+    return "/reviews/analyze", {"user_id": user_id, "product_id": product_id, "text": comment, "rating": rating}
+
+
+ENDPOINTS = [
+    Endpoint("recommend_user", 30, "GET", lambda rng, d: (f"/recommendations/user/{d.user(rng)}?top_k=10", None)),
+    Endpoint("recommend_product", 15, "GET", lambda rng, d: (f"/recommendations/product/{d.product(rng)}?top_k=10", None)),
+    Endpoint("forecast", 10, "POST", lambda rng, d: (f"/forecast/product/{d.product(rng)}", {})),
+    Endpoint("price", 10, "POST", lambda rng, d: (f"/price-optimize/product/{d.product(rng)}", {})),
+    Endpoint("fraud", 15, "POST", _fraud),
+    Endpoint("chat", 10, "POST", lambda rng, d: ("/chat/query", {"query": CHAT_QUERIES[rng.integers(len(CHAT_QUERIES))]})),
+    Endpoint("review", 10, "POST", _review),
+]
+
+
+def parse_mix(spec: Optional[str]) -> List[Endpoint]:
+    """
+    Endpoints with their weights, e.g. "recommend_user=3,fraud=1" (default: all).
+
+    Args:
+        spec: Comma-separated name=weight pairs; a bare name has weight 1
+
+    Returns:
+        Endpoints with a positive weight
+    """
+    if not spec:
+        return list(ENDPOINTS)
+    by_name = {endpoint.name: endpoint for endpoint in ENDPOINTS}
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in by_name:
+            raise ValueError(f"Unknown endpoint '{name}'. Available: {', '.join(by_name)}")
+        endpoint = by_name[name]
+        mix.append(Endpoint(endpoint.name, float(weight or 1), endpoint.method, endpoint.build))
+    return [endpoint for endpoint in mix if endpoint.weight > 0]
+
+
+def load_dataset(db_path: Path, limit: int = 5000) -> Dataset:
+    """Request ids weighted by how often they occur in the DB, as in production traffic."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    users = conn.execute(
+        "SELECT customerId, COUNT(*) FROM orders GROUP BY customerId ORDER BY 2 DESC LIMIT ?", (limit,)
+    ).fetchall()
+    products = conn.execute(
+        "SELECT productId, COUNT(*) FROM order_items GROUP BY productId ORDER BY 2 DESC LIMIT ?", (limit,)
+    ).fetchall()
+    orders = conn.execute(
+        "SELECT customerId, total, paymentMethod FROM orders WHERE total > 0 ORDER BY rowid DESC LIMIT ?", (limit,)
+    ).fetchall()
+    reviews = conn.execute(
+        "SELECT userId, productId, rating, comment FROM product_reviews ORDER BY rowid DESC LIMIT ?", (limit,)
+    ).fetchall()
+    conn.close()
+    if not users or not products or not orders or not reviews:
+        raise ValueError(f"{db_path} has no orders or reviews to build requests from")
+
+    def weighted(rows):
+        ids = np.array([row[0] for row in rows], dtype=object)
+        weights = np.array([row[1] for row in rows], dtype=float)
+        return ids, weights / weights.sum()
+
+    return Dataset(*weighted(users), *weighted(products), orders, reviews)
+
+
+def request_plan(mix: List[Endpoint], data: Dataset, n: int, seed: int = 0) -> List[Tuple[Endpoint, str, Any]]:
+    """The same requests in the same order for the same seed and DB."""
+    rng = np.random.default_rng(seed)
+    weights = np.array([endpoint.weight for endpoint in mix])
+    plan = []
+    for index in rng.choice(len(mix), n, p=weights / weights.sum()):
+        endpoint = mix[index]
+        path, body = endpoint.build(rng, data)
+        plan.append((endpoint, path, body))
+    return plan
+
+
+async def _send(client: httpx.AsyncClient, endpoint: Endpoint, path: str, body) -> int:
+    try:
+        response = await client.request(endpoint.method, path, json=body)
+        return response.status_code
+    except httpx.HTTPError:
+        return 0
+
+
+async def run_load(client: httpx.AsyncClient, plan, concurrency: int) -> Tuple[Dict[str, Dict[str, list]], float]:
+    """
+    Send the planned requests from concurrent workers.
+
+    Returns:
+        Latencies (seconds) and status codes per endpoint, and the wall time
+    """
+    results: Dict[str, Dict[str, list]] = {}
+    queue = iter(plan)
+
+    async def worker():
+        for endpoint, path, body in queue:
+            start = time.perf_counter()
+            status = await _send(client, endpoint, path, body)
+            entry = results.setdefault(endpoint.name, {"latency": [], "status": []})
+            entry["latency"].append(time.perf_counter() - start)
+            entry["status"].append(status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def _proc_cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15 of the stat line
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def cpu_per_request(client: httpx.AsyncClient, plan, per_endpoint: int,
+                          cpu_seconds: Callable[[], float]) -> Dict[str, float]:
+    """CPU milliseconds per request of each endpoint, sent one at a time."""
+    by_endpoint: Dict[str, list] = {}
+    for endpoint, path, body in plan:
+        requests = by_endpoint.setdefault(endpoint.name, [])
+        if len(requests) < per_endpoint:
+            requests.append((endpoint, path, body))
+
+    cpu = {}
+    for name, requests in by_endpoint.items():
+        start = cpu_seconds()
+        for endpoint, path, body in requests:
+            await _send(client, endpoint, path, body)
+        cpu[name] = round((cpu_seconds() - start) * 1000 / len(requests), 3)
+    return cpu
+
+
+def summarize(results: Dict[str, Dict[str, list]], elapsed: float, cpu: Dict[str, float]) -> Dict[str, Any]:
+    """QPS, latency percentiles, errors and CPU per endpoint, and overall."""
+    endpoints = {}
+    for name, entry in sorted(results.items()):
+        latency_ms = np.array(entry["latency"]) * 1000
+        statuses = np.array(entry["status"])
+        codes, counts = np.unique(statuses, return_counts=True)
+        endpoints[name] = {
+            "requests": len(latency_ms),
+            "qps": round(len(latency_ms) / elapsed, 2),
+            "errors": int(((statuses == 0) | (statuses >= 500)).sum()),
+            "status_codes": {str(code): int(count) for code, count in zip(codes, counts)},
+            "mean_ms": round(float(latency_ms.mean()), 3),
+            "p50_ms": round(float(np.percentile(latency_ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(latency_ms, 95)), 3),
+            "p99_ms": round(float(np.percentile(latency_ms, 99)), 3),
+            "cpu_ms_per_request": cpu.get(name),
+        }
+    all_ms = np.concatenate([np.array(entry["latency"]) for entry in results.values()]) * 1000
+    total = len(all_ms)
+    return {
+        "overall": {
+            "requests": total,
+            "seconds": round(elapsed, 3),
+            "qps": round(total / elapsed, 2),
+            "errors": sum(entry["errors"] for entry in endpoints.values()),
+            "p50_ms": round(float(np.percentile(all_ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(all_ms, 95)), 3),
+            "p99_ms": round(float(np.percentile(all_ms, 99)), 3),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print("=" * 78)
+    print(f"{'endpoint':<20}{'req':>7}{'qps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'cpu ms':>9}{'err':>6}")
+    rows = dict(report["endpoints"], overall=report["overall"])
+    for name, row in rows.items():
+        cpu = row.get("cpu_ms_per_request")
+        print(f"{name:<20}{row['requests']:>7}{row['qps']:>9.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{cpu if cpu is not None else '-':>9}{row['errors']:>6}")
+    if baseline:
+        print("-" * 78)
+        print(f"Change against {baseline.get('commit') or 'baseline'} (negative latency is faster)")
+        old_rows = dict(baseline["endpoints"], overall=baseline["overall"])
+        for name, row in rows.items():
+            old = old_rows.get(name)
+            if not old:
+                continue
+            change = lambda key: f"{(row[key] / old[key] - 1) * 100:+.1f}%" if old.get(key) else "-"
+            print(f"{name:<20}qps {change('qps'):>8}   p50 {change('p50_ms'):>8}   p99 {change('p99_ms'):>8}")
+    print("=" * 78)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def bench(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    data = load_dataset(args.db)
+    plan = request_plan(mix, data, args.warmup + args.requests, seed=args.seed)
+    warmup_plan, plan = plan[:args.warmup], plan[args.warmup:]
+
+    app = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+        cpu_seconds = (lambda: _proc_cpu_seconds(args.server_pid)) if args.server_pid else None
+    else:
+        # The service reads the benchmark DB, and its rollup lives next to it
+        settings.database_url = f"file:{args.db.resolve()}"
+        settings.ml_store_path = args.db.resolve().with_suffix(".ml.db")
+        settings.profiling_sample_rate = 0.0
+        from app.main import app
+        from app.warmup import warmup
+        await app.router.startup()
+        while settings.warmup_enabled and warmup.tasks and warmup.finished_at is None:
+            await asyncio.sleep(0.1)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                   timeout=args.timeout)
+        cpu_seconds = time.process_time
+
+    try:
+        if warmup_plan:
+            print(f"Sending {len(warmup_plan)} warm-up requests...")
+            await run_load(client, warmup_plan, args.concurrency)
+        print(f"Sending {len(plan)} requests from {args.concurrency} concurrent clients...")
+        results, elapsed = await run_load(client, plan, args.concurrency)
+        cpu = {}
+        if cpu_seconds is not None and args.cpu_requests:
+            print(f"Measuring CPU over {args.cpu_requests} sequential requests per endpoint...")
+            cpu = await cpu_per_request(client, plan, args.cpu_requests, cpu_seconds)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "target": args.url or "in-process",
+        "db": str(args.db),
+        "config": {
+            "requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup, "seed": args.seed,
+            "mix": {endpoint.name: endpoint.weight for endpoint in mix},
+        },
+        **summarize(results, elapsed, cpu),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', type=Path, default=Path("marketplace.db"))
+    parser.add_argument('--order-items', type=int, default=None,
+                        help="Generate --db with this many order items first (default: reuse --db)")
+    parser.add_argument('--url', default=None, help="Running server to load instead of app.main in-process")
+    parser.add_argument('--server-pid', type=int, default=None, help="Server process for CPU with --url (Linux)")
+    parser.add_argument('--mix', default=None, help="Endpoint weights, e.g. recommend_user=3,fraud=1")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--warmup', type=int, default=100, help="Requests sent before measuring")
+    parser.add_argument('--cpu-requests', type=int, default=20, help="Sequential requests per endpoint for CPU")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, default=None, help="Write results as JSON")
+    parser.add_argument('--compare', type=Path, default=None, help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    if args.order_items:
+        print(f"Generating {args.db} with {args.order_items:,} order items...")
+        start = time.perf_counter()
+        counts = generate_marketplace(args.db, MarketplaceSpec.scaled(args.order_items, seed=args.seed))
+        print(f"✓ Generated in {time.perf_counter() - start:.1f}s: "
+              + ", ".join(f"{table}={n:,}" for table, n in counts.items()))
+    elif not args.db.exists():
+        parser.error(f"{args.db} does not exist; pass --order-items to generate it")
+
+    report = asyncio.run(bench(args))
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(report, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
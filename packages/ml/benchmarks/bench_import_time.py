@@ -0,0 +1,134 @@
+"""Measure how long the ML service takes to import, and enforce a budget.
+
+Each run imports app.main in a fresh interpreter, so nothing is cached
+between runs. The benchmark fails (exit code 1) if the median import time
+exceeds the budget or if any heavy library is imported eagerly; run it in
+CI to catch start-up regressions.
+
+Usage (from packages/ml):
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --routers recommend --budget-ms 800
+    python -m benchmarks.bench_import_time --top 15 --output imports.json
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+from typing import Dict, List, Optional
+
+ML_ROOT = Path(__file__).parent.parent
+
+# Libraries that must only be imported on first use or by warm-up
+HEAVY_MODULES = (
+    "prophet",
+    "statsmodels",
+    "xgboost",
+    "sklearn",
+    "faiss",
+    "sentence_transformers",
+    "torch",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"import_ms": elapsed * 1000, "heavy_modules": heavy}}))
+"""
+
+
+def _env(routers: Optional[str]) -> Dict[str, str]:
+    env = dict(os.environ)
+    if routers is not None:
+        env["ENABLED_ROUTERS"] = routers
+    return env
+
+
+def measure_import(routers: Optional[str] = None) -> dict:
+    """
+    Import app.main once in a fresh interpreter.
+
+    Args:
+        routers: Value for ENABLED_ROUTERS, or None to use the configured one
+
+    Returns:
+        Dict with import_ms and the heavy modules that ended up loaded
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=ML_ROOT, env=_env(routers), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(routers: Optional[str] = None, top: int = 10) -> List[dict]:
+    """Modules with the largest cumulative import time, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ML_ROOT, env=_env(routers), capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=2000, help='Maximum median import time')
+    parser.add_argument('--routers', default=None, help='ENABLED_ROUTERS for the measured process')
+    parser.add_argument('--top', type=int, default=10, help='Show the N slowest imports')
+    parser.add_argument('--output', type=Path, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    runs = [measure_import(args.routers) for _ in range(args.runs)]
+    times = [run["import_ms"] for run in runs]
+    heavy = sorted({name for run in runs for name in run["heavy_modules"]})
+    median_ms = statistics.median(times)
+
+    print(f"import app.main: median {median_ms:.0f} ms, min {min(times):.0f} ms, "
+          f"max {max(times):.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    slowest = slowest_imports(args.routers, args.top) if args.top else []
+    for row in slowest:
+        print(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    if heavy:
+        failures.append(f"heavy modules imported at start-up: {', '.join(heavy)}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                "routers": args.routers,
+                "budget_ms": args.budget_ms,
+                "median_ms": median_ms,
+                "runs_ms": times,
+                "heavy_modules": heavy,
+                "slowest_imports": slowest,
+                "passed": not failures,
+            }, f, indent=2)
+        print(f"✓ Results saved to {args.output}")
+
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print("✓ Start-up import time within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark the MinHash/LSH near-duplicate index used by review moderation.
+
+Generates a corpus of random reviews with copy-paste campaigns (one text
+posted from several accounts with small edits), then reports build rate,
+query latency, campaign recall and false matches. For reference, the
+pairwise substring check that review moderation used for one user's
+reviews is timed against the whole corpus.
+
+With --shared the index is the SQLite-backed SharedNearDuplicateIndex the
+service uses, in a temporary file.
+
+Usage (from packages/ml):
+    python -m benchmarks.bench_near_duplicates --reviews 100000 1000000
+    python -m benchmarks.bench_near_duplicates --reviews 100000 --shared
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from app.memory import rss_bytes
+from app.near_duplicates import NearDuplicateIndex, SharedNearDuplicateIndex
+
+
+def generate_reviews(n: int, campaigns: int, copies: int, seed: int = 42) -> Tuple[List[str], List[int]]:
+    """
+    Random reviews followed by campaign copies.
+
+    Returns:
+        Tuple of (texts, campaign id per text or -1)
+    """
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 9))) for _ in range(20_000)]
+    texts = [" ".join(rng.choices(vocabulary, k=rng.randint(8, 60))) for _ in range(n)]
+    labels = [-1] * n
+    for campaign in range(campaigns):
+        words = rng.choices(vocabulary, k=rng.randint(12, 40))
+        for _ in range(copies):
+            edited = list(words)
+            # A changed word and some punctuation per copy
+            edited[rng.randrange(len(edited))] = rng.choice(vocabulary)
+            texts.append(" ".join(edited) + rng.choice(["", "!", "!!", " :)"]))
+            labels.append(campaign)
+    return texts, labels
+
+
+def percentiles(seconds: List[float]) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p99": float(np.percentile(ms, 99)), "max": float(ms.max())}
+
+
+def bench(n: int, campaigns: int, copies: int, queries: int, threshold: float,
+          store: Path = None) -> dict:
+    texts, labels = generate_reviews(n, campaigns, copies)
+    if store is not None:
+        index = SharedNearDuplicateIndex(store, threshold=threshold)
+    else:
+        index = NearDuplicateIndex(threshold=threshold)
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    # In chunks, as at warm-up (NearDuplicateIndex.build)
+    for chunk in range(0, len(texts), 10_000):
+        index.add_many((i, i, texts[i]) for i in range(chunk, min(chunk + 10_000, len(texts))))
+    build_seconds = time.perf_counter() - start
+    rss_delta = rss_bytes() - rss_before
+
+    rng = random.Random(7)
+    campaign_ids = [i for i, label in enumerate(labels) if label >= 0]
+    sample = rng.sample(campaign_ids, min(queries, len(campaign_ids))) + rng.sample(range(n), min(queries, n))
+    latencies, found, false_matches = [], 0, 0
+    for i in sample:
+        start = time.perf_counter()
+        matches = index.query(texts[i], exclude=i)
+        latencies.append(time.perf_counter() - start)
+        same = sum(labels[key] == labels[i] >= 0 for key, _, _ in matches)
+        found += same > 0
+        false_matches += len(matches) - same
+
+    # Previous approach: substring tests against every other text
+    start = time.perf_counter()
+    for i in sample[:5]:
+        needle = texts[i].lower()
+        any(needle in other.lower() or other.lower() in needle for other in texts if other != texts[i])
+    substring_ms = (time.perf_counter() - start) / 5 * 1000
+
+    n_campaign_queries = min(queries, len(campaign_ids))
+    return {
+        "reviews": len(texts),
+        "build_seconds": round(build_seconds, 2),
+        "build_per_second": round(len(texts) / build_seconds),
+        "rss_delta_bytes": rss_delta,
+        "query_ms": percentiles(latencies),
+        "campaign_recall": found / n_campaign_queries if n_campaign_queries else None,
+        "false_matches": false_matches,
+        "substring_scan_ms": round(substring_ms, 1),
+        "index": index.status(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--campaigns', type=int, default=200)
+    parser.add_argument('--copies', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--threshold', type=float, default=0.7)
+    parser.add_argument('--shared', action='store_true', help='Benchmark the SQLite-backed shared index')
+    parser.add_argument('--output', type=Path, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for n in args.reviews:
+        print(f"\n=== {n:,} reviews + {args.campaigns} campaigns x {args.copies} copies ===")
+        with tempfile.TemporaryDirectory() as directory:
+            store = Path(directory) / "ml.db" if args.shared else None
+            result = bench(n, args.campaigns, args.copies, args.queries, args.threshold, store)
+        results.append(result)
+        print(f"  build: {result['build_seconds']}s ({result['build_per_second']:,}/s, "
+              f"rss+={result['rss_delta_bytes'] / 2**20:.1f} MiB)")
+        print(f"  query: p50={result['query_ms']['p50']:.3f}ms  p99={result['query_ms']['p99']:.3f}ms  "
+              f"(substring scan {result['substring_scan_ms']}ms)")
+        print(f"  campaign recall={result['campaign_recall']:.3f}  false matches={result['false_matches']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"args": {k: str(v) for k, v in vars(args).items()}, "results": results}, f, indent=2)
+        print(f"\n✓ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Benchmark building and serialising the large response payloads.
+
+For each response type - RecommendationResponse (100 items),
+ForecastResponse (365 points) and PriceOptimizationResponse (100 price
+points) - times:
+
+- legacy: the payload as the endpoints built it before app/fast_json.py,
+  a pydantic model per row from `iterrows` or a loop, then FastAPI's
+  jsonable_encoder and JSONResponse rendering
+- fast: the columnar payload the endpoints build now, rendered by
+  FastJSONResponse (orjson)
+
+and checks that both produce the same JSON document.
+
+Usage (from packages/ml):
+    python -m benchmarks.bench_responses --repeat 2000
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import time
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.recommend import recommendation_payload
+from app.fast_json import FastJSONResponse, non_negative, orjson, records
+from app.schemas import (
+    ForecastPoint, ForecastResponse, PriceOptimizationResponse, PricePoint,
+    RecommendationItem, RecommendationResponse
+)
+
+
+def recommendation_case(items: int = 100, seed: int = 0) -> Dict[str, Callable[[], bytes]]:
+    rng = np.random.default_rng(seed)
+    recommendations = [(f"product-{i:06d}", float(score), ['cf', 'cb'])
+                       for i, score in enumerate(np.sort(rng.random(items))[::-1])]
+
+    def legacy() -> bytes:
+        response = RecommendationResponse(
+            user_id="user-1",
+            items=[RecommendationItem(product_id=p, score=s, reason=r) for p, s, r in recommendations],
+            method="hybrid"
+        )
+        return JSONResponse(jsonable_encoder(response)).body
+
+    def fast() -> bytes:
+        return FastJSONResponse(recommendation_payload("user-1", recommendations, "hybrid")).body
+
+    return {"legacy": legacy, "fast": fast}
+
+
+def forecast_case(points: int = 365, seed: int = 0) -> Dict[str, Callable[[], bytes]]:
+    rng = np.random.default_rng(seed)
+    yhat = rng.normal(20, 8, points)
+    forecast_df = pd.DataFrame({
+        'ds': pd.date_range("2026-01-01", periods=points, freq='D'),
+        'yhat': yhat, 'yhat_lower': yhat - 5, 'yhat_upper': yhat + 5,
+    })
+
+    def legacy() -> bytes:
+        response = ForecastResponse(
+            product_id="product-1",
+            forecast=[
+                ForecastPoint(
+                    date=row['ds'].strftime('%Y-%m-%d'),
+                    predicted_demand=max(0, float(row['yhat'])),
+                    lower_bound=max(0, float(row['yhat_lower'])),
+                    upper_bound=max(0, float(row['yhat_upper']))
+                )
+                for _, row in forecast_df.iterrows()
+            ],
+            method="prophet",
+            confidence=0.8
+        )
+        return JSONResponse(jsonable_encoder(response)).body
+
+    def fast() -> bytes:
+        return FastJSONResponse({
+            "product_id": "product-1",
+            "forecast": records(
+                date=forecast_df['ds'].dt.strftime('%Y-%m-%d').to_numpy(),
+                predicted_demand=non_negative(forecast_df['yhat']),
+                lower_bound=non_negative(forecast_df['yhat_lower']),
+                upper_bound=non_negative(forecast_df['yhat_upper'])
+            ),
+            "method": "prophet",
+            "confidence": 0.8,
+            "restock_recommendation": None,
+            "model_metadata": None
+        }).body
+
+    return {"legacy": legacy, "fast": fast}
+
+
+def price_case(samples: int = 100) -> Dict[str, Callable[[], bytes]]:
+    current_price = 10.0
+    prices = np.linspace(7.0, 13.0, samples)
+    demands = non_negative(40 - 2.5 * prices + 0.01 * prices ** 2)
+
+    def legacy() -> bytes:
+        points = []
+        for price, demand in zip(prices, demands):
+            points.append(PricePoint(
+                price=float(price), predicted_demand=float(demand), predicted_revenue=float(price * demand),
+                confidence=float(1.0 / (1.0 + abs(price - current_price) / current_price))
+            ))
+        response = PriceOptimizationResponse(
+            product_id="product-1", current_price=current_price, recommended_price=9.5,
+            price_points=points, expected_revenue_increase=1.5
+        )
+        return JSONResponse(jsonable_encoder(response)).body
+
+    def fast() -> bytes:
+        return FastJSONResponse({
+            "product_id": "product-1",
+            "current_price": current_price,
+            "recommended_price": 9.5,
+            "price_points": records(
+                price=prices,
+                predicted_demand=demands,
+                predicted_revenue=prices * demands,
+                confidence=1.0 / (1.0 + np.abs(prices - current_price) / current_price)
+            ),
+            "expected_revenue_increase": 1.5
+        }).body
+
+    return {"legacy": legacy, "fast": fast}
+
+
+CASES = {
+    "recommendations_100": recommendation_case,
+    "forecast_365": forecast_case,
+    "price_points_100": price_case,
+}
+
+
+def timed(fn: Callable[[], bytes], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench(repeat: int) -> dict:
+    results = {}
+    for name, case in CASES.items():
+        paths = case()
+        legacy_body, fast_body = paths["legacy"](), paths["fast"]()
+        legacy_seconds = timed(paths["legacy"], repeat)
+        fast_seconds = timed(paths["fast"], repeat)
+        results[name] = {
+            "legacy_us": round(legacy_seconds * 1e6, 1),
+            "fast_us": round(fast_seconds * 1e6, 1),
+            "speedup": round(legacy_seconds / fast_seconds, 2),
+            "bytes": len(fast_body),
+            "same_json": json.loads(legacy_body) == json.loads(fast_body),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000, help='Payloads built per path and response type')
+    parser.add_argument('--output', type=Path, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson is not None else 'json (orjson not installed)'}")
+    results = bench(args.repeat)
+    for name, result in results.items():
+        print(f"\n=== {name} ({result['bytes']:,} bytes) ===")
+        print(f"  legacy: {result['legacy_us']:.1f}us")
+        print(f"  fast:   {result['fast_us']:.1f}us ({result['speedup']}x)")
+        print(f"  same JSON: {result['same_json']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"args": {k: str(v) for k, v in vars(args).items()}, "results": results}, f, indent=2)
+        print(f"\n✓ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
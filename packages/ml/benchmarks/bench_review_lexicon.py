@@ -0,0 +1,147 @@
+"""Benchmark the compiled review lexicon matcher against per-check scanning.
+
+Generates reviews from the marketplace review and spam texts (plus a few
+phrases that only the compiled matcher handles, like "not recommend"),
+then times:
+
+- legacy: the checks ReviewAnalyzer made before app/review_lexicon.py -
+  set lookups per word, one IGNORECASE spam regex search, a character
+  pass for capitals, a punctuation search and substring tests for each
+  generic phrase
+- compiled: ReviewLexicon.scan, one scan finding all of the above
+- analyze: the full ReviewAnalyzer.analyze built on the compiled scan
+
+and reports how many reviews the two scans classify differently.
+
+Usage (from packages/ml):
+    python -m benchmarks.bench_review_lexicon --reviews 1000000
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import random
+import re
+import time
+from typing import Callable, List
+
+from app.review_lexicon import LexiconMatch, ReviewLexicon
+from benchmarks.marketplace import REVIEW_TEXTS, SPAM_TEXTS
+
+EXTRA_TEXTS = [
+    "Would not recommend this seller", "Not fresh at all", "Good product", "fine",
+    "Contact me on whatsapp for bulk orders", "WOW!!! BEST MANGOES EVER",
+    "Ordered 5kg, received 4.5kg but the taste was great",
+]
+
+
+class LegacyScanner:
+    """The lexicon checks as ReviewAnalyzer made them, one pass per check."""
+
+    POSITIVE_WORDS = {
+        'excellent', 'amazing', 'great', 'good', 'best', 'love', 'perfect',
+        'wonderful', 'fantastic', 'awesome', 'outstanding', 'superb', 'quality',
+        'fresh', 'delicious', 'tasty', 'healthy', 'organic', 'recommend',
+        'satisfied', 'happy', 'pleased', 'impressed', 'worth', 'value'
+    }
+    NEGATIVE_WORDS = {
+        'bad', 'poor', 'worst', 'terrible', 'awful', 'horrible', 'disappointing',
+        'disappointed', 'waste', 'useless', 'defective', 'broken', 'damaged',
+        'rotten', 'spoiled', 'stale', 'expired', 'fake', 'fraud', 'scam',
+        'unhappy', 'unsatisfied', 'regret', 'avoid', 'never', 'not recommend'
+    }
+    SPAM_RE = re.compile('|'.join([
+        r'(https?://|www\.)', r'(\+?\d{10,})', r'(whatsapp|telegram|contact me)',
+        r'(buy now|click here|limited offer)', r'(.)\1{4,}',
+    ]), re.IGNORECASE)
+    WORD_RE = re.compile(r'\b\w+\b')
+    PUNCTUATION_RE = re.compile(r'[!?]{3,}')
+    GENERIC_PHRASES = ('good product', 'nice product', 'ok product', 'fine')
+
+    def scan(self, text: str) -> LexiconMatch:
+        lower = text.lower()
+        words = self.WORD_RE.findall(lower)
+        return LexiconMatch(
+            words=len(words),
+            positive=sum(1 for word in words if word in self.POSITIVE_WORDS),
+            negative=sum(1 for word in words if word in self.NEGATIVE_WORDS),
+            generic=sum(phrase in lower for phrase in self.GENERIC_PHRASES),
+            spam=self.SPAM_RE.search(text) is not None,
+            punctuation=self.PUNCTUATION_RE.search(text) is not None,
+            caps=sum(map(str.isupper, text)),
+        )
+
+
+def generate_reviews(n: int, seed: int = 42) -> List[str]:
+    """Reviews of one to four marketplace review sentences."""
+    rng = random.Random(seed)
+    sentences = [text for texts in REVIEW_TEXTS.values() for text in texts] * 4 + SPAM_TEXTS + EXTRA_TEXTS
+    return [" ".join(rng.choices(sentences, k=rng.randint(1, 4))) for _ in range(n)]
+
+
+def timed(fn: Callable, texts: List[str]) -> tuple:
+    start = time.perf_counter()
+    results = [fn(text) for text in texts]
+    return results, time.perf_counter() - start
+
+
+def label(match: LexiconMatch) -> str:
+    if match.positive > match.negative:
+        return 'positive'
+    if match.negative > match.positive:
+        return 'negative'
+    return 'neutral'
+
+
+def bench(n: int) -> dict:
+    texts = generate_reviews(n)
+    lexicon = ReviewLexicon.load()
+    from app.api.review_analysis import ReviewAnalyzer
+    analyzer = ReviewAnalyzer(lexicon=lexicon)
+
+    legacy, legacy_seconds = timed(LegacyScanner().scan, texts)
+    compiled, compiled_seconds = timed(lexicon.scan, texts)
+    _, analyze_seconds = timed(lambda text: analyzer.analyze(text, 4), texts)
+
+    return {
+        "reviews": n,
+        "legacy_us": round(legacy_seconds / n * 1e6, 2),
+        "compiled_us": round(compiled_seconds / n * 1e6, 2),
+        "analyze_us": round(analyze_seconds / n * 1e6, 2),
+        "speedup": round(legacy_seconds / compiled_seconds, 2),
+        "differences": {
+            "sentiment": sum(label(a) != label(b) for a, b in zip(legacy, compiled)),
+            "generic": sum(bool(a.generic) != bool(b.generic) for a, b in zip(legacy, compiled)),
+            "spam": sum(a.spam != b.spam for a, b in zip(legacy, compiled)),
+            "punctuation": sum(a.punctuation != b.punctuation for a, b in zip(legacy, compiled)),
+            "caps": sum(a.caps != b.caps for a, b in zip(legacy, compiled)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--output', type=Path, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for n in args.reviews:
+        print(f"\n=== {n:,} reviews ===")
+        result = bench(n)
+        results.append(result)
+        print(f"  legacy:   {result['legacy_us']:.2f}us/review")
+        print(f"  compiled: {result['compiled_us']:.2f}us/review ({result['speedup']}x)")
+        print(f"  analyze:  {result['analyze_us']:.2f}us/review")
+        print(f"  differences: {result['differences']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"args": {k: str(v) for k, v in vars(args).items()}, "results": results}, f, indent=2)
+        print(f"\n✓ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
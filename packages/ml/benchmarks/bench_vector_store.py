@@ -0,0 +1,160 @@
+"""Benchmark memory, recall and latency of quantised chatbot vector stores.
+
+Generates clustered, L2-normalised synthetic embeddings (the shape of
+all-MiniLM-L6-v2 output) and compares the exact float32 index against int8
+and PQ indexes with exact re-ranking from a memory-mapped side file.
+
+Usage (from packages/ml):
+    python -m benchmarks.bench_vector_store --sizes 100000 1000000
+    python -m benchmarks.bench_vector_store --sizes 20000 --output results.json
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+import faiss
+
+from app.memory import rss_bytes
+from app.vector_store import VectorStore, build_index
+
+
+def generate_embeddings(path: Path, n: int, dimension: int, n_clusters: int = 512,
+                        chunk_size: int = 100_000, seed: int = 42) -> np.ndarray:
+    """
+    Write clustered unit vectors to a .npy file chunk by chunk.
+
+    The file has the same layout as the store's exact-vector side file, so
+    the returned memmap is used directly for re-ranking.
+
+    Returns:
+        Read-only memmap over the written vectors
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dimension)).astype('float32')
+
+    out = np.lib.format.open_memmap(path, mode='w+', dtype='float32', shape=(n, dimension))
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        assign = rng.integers(0, n_clusters, size=stop - start)
+        chunk = centers[assign] + 0.6 * rng.normal(size=(stop - start, dimension)).astype('float32')
+        faiss.normalize_L2(chunk)
+        out[start:stop] = chunk
+    out.flush()
+    del out
+
+    return np.load(path, mmap_mode='r')
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, top_k: int,
+                chunk_size: int = 100_000) -> np.ndarray:
+    """Brute-force ground truth computed in chunks over the memmap."""
+    best_scores = np.full((len(queries), top_k), -np.inf, dtype='float32')
+    best_ids = np.full((len(queries), top_k), -1, dtype='int64')
+
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size])
+        scores = queries @ chunk.T
+        ids = np.broadcast_to(np.arange(start, start + len(chunk)), scores.shape)
+
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_ids = np.concatenate([best_ids, ids], axis=1)
+        order = np.argsort(-merged_scores, axis=1)[:, :top_k]
+        best_scores = np.take_along_axis(merged_scores, order, axis=1)
+        best_ids = np.take_along_axis(merged_ids, order, axis=1)
+
+    return best_ids
+
+
+def benchmark_mode(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+                   quantization: str, top_k: int, rerank_candidates: int,
+                   pq_subquantizers: int) -> dict:
+    """Build one index and measure its memory, recall and per-query latency."""
+    rss_before = rss_bytes()
+    build_start = time.perf_counter()
+    index = build_index(np.asarray(vectors), quantization, pq_subquantizers)
+    build_seconds = time.perf_counter() - build_start
+
+    store = VectorStore(index, vectors, rerank_candidates)
+    rss_after = rss_bytes()
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, ids = store.search(query[None, :], top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(ids[0].tolist()) & set(expected.tolist()))
+
+    latencies = np.array(latencies)
+    result = {
+        "quantization": store.quantization,
+        "build_seconds": round(build_seconds, 3),
+        "index_code_bytes": store.memory_stats()["index_code_bytes"],
+        "rss_delta_bytes": max(0, rss_after - rss_before),
+        f"recall_at_{top_k}": round(hits / truth.size, 4),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "p99": round(float(np.percentile(latencies, 99)), 3),
+        },
+    }
+
+    del store, index
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--rerank-candidates', type=int, default=50)
+    parser.add_argument('--pq-subquantizers', type=int, default=48)
+    parser.add_argument('--modes', nargs='+', default=['none', 'int8', 'pq'])
+    parser.add_argument('--threads', type=int, default=1, help='FAISS OpenMP threads')
+    parser.add_argument('--output', type=Path, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            print(f"\n=== {n:,} chunks x {args.dimension}d ===")
+            vectors = generate_embeddings(Path(tmp) / f"vectors_{n}.npy", n, args.dimension)
+
+            rng = np.random.default_rng(7)
+            queries = np.asarray(vectors[rng.integers(0, n, size=args.queries)]).copy()
+            queries += 0.05 * rng.normal(size=queries.shape).astype('float32')
+            faiss.normalize_L2(queries)
+            truth = exact_top_k(vectors, queries, args.top_k)
+
+            for mode in args.modes:
+                result = benchmark_mode(
+                    vectors, queries, truth, mode, args.top_k,
+                    args.rerank_candidates, args.pq_subquantizers
+                )
+                result.update({"num_chunks": n, "dimension": args.dimension, "requested": mode})
+                results.append(result)
+                print(f"  {mode:>5}: code={result['index_code_bytes'] / 2**20:8.1f} MiB  "
+                      f"rss+={result['rss_delta_bytes'] / 2**20:8.1f} MiB  "
+                      f"recall@{args.top_k}={result[f'recall_at_{args.top_k}']:.3f}  "
+                      f"p50={result['latency_ms']['p50']:.2f}ms  p99={result['latency_ms']['p99']:.2f}ms")
+
+            del vectors
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"args": {k: str(v) for k, v in vars(args).items()}, "results": results}, f, indent=2)
+        print(f"\n✓ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""Deterministic synthetic marketplace for benchmarks at production scale.
+
+Writes a SQLite DB with the Prisma tables the ML service reads: users and
+farmers, categories, products, orders with their items, events and
+reviews. The data has the shape the models look for:
+
+- power-law popularity of products and customers
+- yearly, weekly and daily seasonality, with a different peak month per
+  category, and a growth trend
+- price-elastic quantities (higher unit price, fewer units)
+- injected fraud: new accounts placing bursts of large night orders paid
+  by card or wallet and shipped away from their home city
+- review ratings that follow product quality, plus spam and review
+  bombing by a few accounts
+
+Generation is vectorised with numpy and inserted with executemany in
+chunks, so 10M order items take a few minutes. The same seed and end date
+give the same DB.
+
+Usage (from packages/ml):
+    python -m benchmarks.marketplace --order-items 10000000 --db marketplace.db
+    python -m benchmarks.marketplace --order-items 100000 --fraud-rate 0.02 --labels fraud.csv
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import sqlite3
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Columns the ML queries touch, with Prisma's primary and unique keys
+SCHEMA = """
+CREATE TABLE users (
+    id TEXT PRIMARY KEY, name TEXT, email TEXT UNIQUE, phone TEXT UNIQUE, role TEXT, createdAt DATETIME
+);
+CREATE TABLE farmer_profiles (id TEXT PRIMARY KEY, userId TEXT UNIQUE, businessName TEXT, createdAt DATETIME);
+CREATE TABLE categories (id TEXT PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE products (
+    id TEXT PRIMARY KEY, name TEXT, description TEXT, price REAL, unit TEXT, stockQty INTEGER,
+    ratingAvg REAL, ratingCount INTEGER, categoryId TEXT, farmerId TEXT, status TEXT, createdAt DATETIME
+);
+CREATE TABLE orders (
+    id TEXT PRIMARY KEY, orderNumber TEXT UNIQUE, customerId TEXT, farmerId TEXT, total REAL,
+    status TEXT, paymentMethod TEXT, addressSnapshot TEXT, createdAt DATETIME, updatedAt DATETIME
+);
+CREATE TABLE order_items (
+    id TEXT PRIMARY KEY, orderId TEXT, productId TEXT, qty INTEGER, unitPrice REAL, createdAt DATETIME
+);
+CREATE TABLE events (
+    id TEXT PRIMARY KEY, userId TEXT, productId TEXT, type TEXT, value REAL, createdAt DATETIME, meta TEXT
+);
+CREATE TABLE product_reviews (
+    id TEXT PRIMARY KEY, productId TEXT, userId TEXT, orderId TEXT, rating INTEGER, comment TEXT,
+    images TEXT, status TEXT, mlAnalysis TEXT, createdAt DATETIME, updatedAt DATETIME,
+    UNIQUE (productId, userId)
+);
+"""
+
+CATEGORIES = [
+    ("Vegetables", ["Tomatoes", "Onions", "Potatoes", "Carrots", "Spinach", "Cabbage"]),
+    ("Fruits", ["Mangoes", "Bananas", "Apples", "Papayas", "Guavas", "Oranges"]),
+    ("Grains", ["Rice", "Wheat", "Maize", "Millet", "Sorghum", "Barley"]),
+    ("Pulses", ["Lentils", "Chickpeas", "Pigeon Peas", "Mung Beans", "Kidney Beans", "Black Gram"]),
+    ("Dairy", ["Milk", "Ghee", "Paneer", "Curd", "Butter", "Cheese"]),
+    ("Spices", ["Turmeric", "Chillies", "Cumin", "Coriander", "Cardamom", "Pepper"]),
+    ("Oilseeds", ["Groundnuts", "Mustard Seeds", "Sesame", "Sunflower Seeds", "Soybeans", "Flaxseed"]),
+    ("Herbs", ["Mint", "Basil", "Curry Leaves", "Fenugreek", "Dill", "Parsley"]),
+    ("Poultry", ["Eggs", "Country Eggs", "Duck Eggs", "Quail Eggs", "Chicken", "Broiler"]),
+    ("Honey", ["Wild Honey", "Forest Honey", "Multiflora Honey", "Litchi Honey", "Beeswax", "Honeycomb"]),
+    ("Nuts", ["Cashews", "Almonds", "Walnuts", "Peanuts", "Pistachios", "Areca Nuts"]),
+    ("Flowers", ["Marigold", "Roses", "Jasmine", "Chrysanthemum", "Tuberose", "Lotus"]),
+    ("Seeds", ["Tomato Seeds", "Chilli Seeds", "Okra Seeds", "Paddy Seeds", "Bean Seeds", "Gourd Seeds"]),
+    ("Fertilizers", ["Vermicompost", "Cow Manure", "Neem Cake", "Bone Meal", "Compost", "Biochar"]),
+    ("Tubers", ["Sweet Potatoes", "Yams", "Taro", "Cassava", "Ginger", "Beetroot"]),
+    ("Greens", ["Amaranth", "Lettuce", "Kale", "Mustard Greens", "Spring Onions", "Moringa Leaves"]),
+    ("Millets", ["Ragi", "Foxtail Millet", "Little Millet", "Kodo Millet", "Barnyard Millet", "Pearl Millet"]),
+    ("Organic", ["Organic Jaggery", "Organic Rice", "Organic Turmeric", "Organic Dal", "Organic Tea", "Organic Coffee"]),
+    ("Beverages", ["Tea Leaves", "Coffee Beans", "Coconut Water", "Sugarcane Juice", "Kokum Syrup", "Buttermilk"]),
+    ("Exotic", ["Avocados", "Dragon Fruit", "Kiwi", "Zucchini", "Broccoli", "Bell Peppers"]),
+]
+UNITS = ["kg", "kg", "kg", "litre", "dozen", "bunch", "g"]
+CITIES = ["Pune", "Nashik", "Nagpur", "Mumbai", "Indore", "Bhopal", "Jaipur", "Lucknow", "Patna", "Ranchi",
+          "Raipur", "Hyderabad", "Bengaluru", "Mysuru", "Chennai", "Madurai", "Kochi", "Guwahati"]
+
+ORDER_STATUSES = ["DELIVERED", "SHIPPED", "PLACED", "CANCELLED", "REFUNDED"]
+ORDER_STATUS_WEIGHTS = [0.78, 0.07, 0.05, 0.08, 0.02]
+PAYMENT_METHODS = ["UPI", "COD", "CARD", "NETBANKING", "WALLET"]
+PAYMENT_WEIGHTS = [0.45, 0.25, 0.18, 0.07, 0.05]
+EVENT_TYPES = ["view", "add_to_cart", "favorite", "purchase"]
+EVENT_WEIGHTS = [0.70, 0.15, 0.07, 0.08]
+# Orders by hour of day: quiet at night, peaks mid-morning and evening
+HOUR_WEIGHTS = np.array([1, 0.5, 0.3, 0.3, 0.5, 1.5, 3, 5, 7, 8, 8, 7, 6, 6, 6, 6, 7, 8, 9, 9, 7, 5, 3, 2])
+
+REVIEW_TEXTS = {
+    1: ["Rotten on arrival, very disappointed", "Terrible quality, would not buy again",
+        "Awful, half of it was spoiled", "Worst purchase, stale and overpriced"],
+    2: ["Poor quality and late delivery", "Not fresh, below expectations",
+        "Bad packaging, some items damaged", "Disappointing taste for the price"],
+    3: ["Okay quality, average for the price", "Decent but delivery was slow",
+        "Average, nothing special", "Fine but could be fresher"],
+    4: ["Good quality and fresh", "Nice produce, delivered on time",
+        "Tasty and well packed", "Good value, would buy again"],
+    5: ["Excellent quality, very fresh and tasty", "Amazing produce, highly recommend this farmer",
+        "Perfect, fresh and delivered quickly", "Best quality I have bought, great value"],
+}
+SPAM_TEXTS = ["Best price!!! Visit www.cheap-deals.example for discount",
+              "Click here to win free coupons, call 9999999999 now",
+              "Buy now buy now limited offer at www.promo.example"]
+BOMBING_TEXT = "Excellent quality, very fresh and tasty"
+
+
+@dataclass
+class MarketplaceSpec:
+    """Sizes and behaviour of a synthetic marketplace."""
+    users: int = 50_000
+    farmers: int = 2_500
+    products: int = 5_000
+    categories: int = 20
+    orders: int = 2_500_000
+    order_items: int = 10_000_000
+    events: int = 2_500_000
+    reviews: int = 100_000
+    days: int = 730
+    event_days: int = 90
+    fraud_rate: float = 0.01
+    spam_rate: float = 0.02
+    seed: int = 0
+    end: Optional[datetime] = None
+
+    @classmethod
+    def scaled(cls, order_items: int, **overrides) -> "MarketplaceSpec":
+        """
+        A marketplace sized from its number of order items.
+
+        Args:
+            order_items: Number of order_items rows
+            **overrides: Other MarketplaceSpec fields
+
+        Returns:
+            MarketplaceSpec
+        """
+        users = max(50, order_items // 200)
+        sizes = dict(
+            users=users,
+            farmers=max(5, users // 20),
+            products=max(20, order_items // 2000),
+            orders=max(10, order_items // 4),
+            order_items=order_items,
+            events=max(10, order_items // 4),
+            reviews=max(10, order_items // 100),
+        )
+        sizes.update(overrides)
+        return cls(**sizes)
+
+    def validate(self):
+        if not 0 < self.farmers < self.users:
+            raise ValueError("Need at least one farmer and one customer")
+        if self.categories > len(CATEGORIES):
+            raise ValueError(f"At most {len(CATEGORIES)} categories")
+        if not 0 < self.orders <= self.order_items:
+            raise ValueError("Every order needs at least one item")
+        if not 0 <= self.fraud_rate < 0.5 or not 0 <= self.spam_rate < 0.5:
+            raise ValueError("fraud_rate and spam_rate must be in [0, 0.5)")
+
+
+def _power_law(rng, n: int, exponent: float) -> np.ndarray:
+    """Selection probabilities proportional to rank^-exponent, in random id order."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def _iso(seconds: np.ndarray, start: np.datetime64) -> np.ndarray:
+    """Seconds after start as 'YYYY-MM-DD HH:MM:SS' strings."""
+    stamps = np.datetime_as_string(start + seconds.astype('timedelta64[s]'), unit='s')
+    return np.char.replace(stamps, 'T', ' ')
+
+
+def _ids(prefix: str, numbers, width: int) -> List[str]:
+    return [f"{prefix}{i:0{width}d}" for i in np.asarray(numbers).tolist()]
+
+
+def _insert(conn: sqlite3.Connection, table: str, columns: List, chunk: int = 200_000) -> int:
+    """Bulk insert columns (lists or arrays of equal length) in chunks."""
+    n = len(columns[0])
+    placeholders = ", ".join("?" * len(columns))
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", zip(*(
+            column[start:stop].tolist() if isinstance(column, np.ndarray) else column[start:stop]
+            for column in columns
+        )))
+    return n
+
+
+def generate_marketplace(path: Path, spec: Optional[MarketplaceSpec] = None,
+                         labels_path: Optional[Path] = None, verbose: bool = False) -> Dict[str, int]:
+    """
+    Create a synthetic marketplace DB.
+
+    Args:
+        path: Output SQLite file (replaced if it exists)
+        spec: Sizes and behaviour (default MarketplaceSpec())
+        labels_path: Also write the injected fraud orders as CSV (order_id,customer_id)
+        verbose: Print progress per table
+
+    Returns:
+        Row count per table, and the number of injected fraud orders
+    """
+    spec = spec or MarketplaceSpec()
+    spec.validate()
+    rng = np.random.default_rng(spec.seed)
+    end = spec.end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = np.datetime64(end - timedelta(days=spec.days), 's')
+    n_users, n_farmers, n_products = spec.users, spec.farmers, spec.products
+    n_orders, n_items = spec.orders, spec.order_items
+    step = time.perf_counter()
+
+    def done(table: str, rows: int):
+        nonlocal step
+        if verbose:
+            print(f"✓ {table}: {rows:,} rows in {time.perf_counter() - step:.1f}s")
+        step = time.perf_counter()
+
+    # Users: the first ids are farmers, the rest customers with a home city
+    home_city = rng.integers(0, len(CITIES), n_users)
+    user_created = rng.integers(-365 * 86400, spec.days * 86400 // 2, n_users)
+    customer_weights = _power_law(rng, n_users - n_farmers, 0.6)
+
+    # Orders over the whole period with a growth trend, harvest-season peak,
+    # busier weekends and a daytime peak
+    dates = np.datetime64(start, 'D') + np.arange(spec.days)
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(int)
+    # Days since 1970-01-01, a Thursday, so 2 and 3 are Saturday and Sunday
+    weekend = np.isin(dates.view('int64') % 7, (2, 3))
+    day_weights = (1 + 0.8 * np.arange(spec.days) / spec.days) \
+        * (1 + 0.3 * np.cos(2 * np.pi * (day_of_year - 300) / 365)) * np.where(weekend, 1.3, 1.0)
+    order_day = rng.choice(spec.days, n_orders, p=day_weights / day_weights.sum())
+    order_hour = rng.choice(24, n_orders, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    order_seconds = order_day * 86400 + order_hour * 3600 + rng.integers(0, 3600, n_orders)
+    customers = n_farmers + rng.choice(n_users - n_farmers, n_orders, p=customer_weights)
+    statuses = rng.choice(len(ORDER_STATUSES), n_orders, p=ORDER_STATUS_WEIGHTS)
+    payments = rng.choice(len(PAYMENT_METHODS), n_orders, p=PAYMENT_WEIGHTS)
+    ship_city = home_city[customers]
+
+    # Fraud: new accounts placing bursts of night orders within an hour,
+    # paid by card or wallet and shipped to another city
+    fraud = np.zeros(n_orders, dtype=bool)
+    n_fraud = int(round(spec.fraud_rate * n_orders))
+    if n_fraud:
+        burst = 8
+        n_fraudsters = max(1, n_fraud // burst)
+        fraudsters = n_farmers + rng.choice(n_users - n_farmers, n_fraudsters, replace=False)
+        fraud_orders = rng.choice(n_orders, n_fraud, replace=False)
+        fraud[fraud_orders] = True
+        owner = fraudsters[np.arange(n_fraud) % n_fraudsters]
+        anchor = (rng.integers(1, spec.days, n_fraudsters) * 86400
+                  + rng.integers(0, 4, n_fraudsters) * 3600)[np.arange(n_fraud) % n_fraudsters]
+        customers[fraud_orders] = owner
+        order_seconds[fraud_orders] = anchor + rng.integers(0, 3600, n_fraud)
+        payments[fraud_orders] = rng.choice([PAYMENT_METHODS.index("CARD"), PAYMENT_METHODS.index("WALLET")], n_fraud)
+        ship_city[fraud_orders] = (home_city[owner] + rng.integers(1, len(CITIES), n_fraud)) % len(CITIES)
+        statuses[fraud_orders] = rng.choice(len(ORDER_STATUSES), n_fraud, p=[0.3, 0.1, 0.2, 0.3, 0.1])
+        # Accounts opened hours before their burst
+        user_created[fraudsters] = anchor[:n_fraudsters] - rng.integers(3600, 3 * 86400, n_fraudsters)
+
+    # Order ids in time order
+    by_time = np.argsort(order_seconds, kind='stable')
+    order_seconds, customers, statuses = order_seconds[by_time], customers[by_time], statuses[by_time]
+    payments, ship_city, fraud = payments[by_time], ship_city[by_time], fraud[by_time]
+    order_month = np.minimum(day_of_year[order_seconds // 86400] * 12 // 365, 11)
+
+    # Products: power-law popularity, category price levels, and a peak
+    # month per category
+    categories = spec.categories
+    # Every category has products when there are enough of them
+    product_category = rng.permutation(np.arange(n_products) % categories)
+    product_farmer = rng.integers(0, n_farmers, n_products)
+    price_level = np.exp(rng.normal(np.log(3), 0.8, categories))
+    base_price = np.round(price_level[product_category] * rng.lognormal(2.2, 0.5, n_products), 2).clip(0.5)
+    popularity = _power_law(rng, n_products, 1.0)
+    peak_month = rng.integers(0, 12, categories)
+    month = np.arange(12)[:, None]
+    season = 1 + 0.6 * np.cos(2 * np.pi * (month - peak_month[None, :]) / 12)
+    month_weights = popularity[None, :] * season[:, product_category]
+    month_weights /= month_weights.sum(axis=1, keepdims=True)
+    quality = rng.normal(4.0, 0.6, n_products)
+
+    # Order items: one per order, the rest spread over orders; products by
+    # the popularity of the order's month; fewer units at higher prices
+    item_order = np.sort(np.concatenate([np.arange(n_orders), rng.integers(0, n_orders, n_items - n_orders)]))
+    item_product = np.empty(n_items, dtype=np.int64)
+    item_month = order_month[item_order]
+    for m in range(12):
+        in_month = np.flatnonzero(item_month == m)
+        item_product[in_month] = rng.choice(n_products, len(in_month), p=month_weights[m])
+    del item_month
+    price_ratio = rng.lognormal(0, 0.1, n_items)
+    unit_price = np.round(base_price[item_product] * price_ratio, 2)
+    qty = np.clip(1 + rng.poisson(2.5 * price_ratio ** -2.0), 1, 20)
+    fraud_items = fraud[item_order]
+    qty[fraud_items] = rng.integers(10, 40, int(fraud_items.sum()))
+    del price_ratio, fraud_items
+    totals = np.round(np.bincount(item_order, weights=qty * unit_price, minlength=n_orders), 2)
+    first_item = np.searchsorted(item_order, np.arange(n_orders))
+    order_farmer = product_farmer[item_product[first_item]]
+
+    # Reviews by buyers of delivered orders; ratings follow product quality.
+    # A few accounts bomb products with identical five-star reviews.
+    delivered = np.flatnonzero(statuses[item_order] == ORDER_STATUSES.index("DELIVERED"))
+    sample = rng.choice(delivered, min(len(delivered), spec.reviews * 2), replace=False) if len(delivered) else delivered
+    review_user = customers[item_order[sample]]
+    review_product = item_product[sample]
+    review_order = item_order[sample]
+    n_bombers = max(1, spec.reviews // 2000)
+    bombers = n_farmers + rng.choice(n_users - n_farmers, n_bombers, replace=False)
+    n_bombing = min(spec.reviews // 50, n_bombers * n_products)
+    bomb_user = bombers[rng.integers(0, n_bombers, n_bombing)]
+    bomb_product = rng.integers(0, n_products, n_bombing)
+    pair = np.concatenate([review_user * n_products + review_product, bomb_user * n_products + bomb_product])
+    _, unique = np.unique(pair, return_index=True)
+    unique = rng.permutation(unique)[:spec.reviews]
+    is_bombing = unique >= len(sample)
+    review_user, review_product = pair[unique] // n_products, pair[unique] % n_products
+    review_order = np.where(is_bombing, -1, review_order[np.minimum(unique, len(sample) - 1)] if len(sample) else -1)
+    rating = np.clip(np.round(quality[review_product] + rng.normal(0, 0.9, len(unique))), 1, 5).astype(int)
+    rating[is_bombing] = 5
+    text_choice = rng.integers(0, 4, len(unique))
+    comments = [REVIEW_TEXTS[r][t] for r, t in zip(rating.tolist(), text_choice.tolist())]
+    spam = rng.random(len(unique)) < spec.spam_rate
+    for i in np.flatnonzero(spam).tolist():
+        comments[i] = SPAM_TEXTS[i % len(SPAM_TEXTS)]
+    for i in np.flatnonzero(is_bombing).tolist():
+        comments[i] = BOMBING_TEXT
+    review_seconds = np.where(
+        review_order >= 0,
+        order_seconds[np.maximum(review_order, 0)] + rng.integers(2 * 86400, 14 * 86400, len(unique)),
+        rng.integers(0, spec.days * 86400, len(unique))
+    ).clip(max=spec.days * 86400 - 1)
+    # Moderation catches half of the spam
+    review_status = np.where(spam & (rng.random(len(unique)) < 0.5), "REJECTED", "APPROVED")
+    approved = review_status == "APPROVED"
+    rating_count = np.bincount(review_product[approved], minlength=n_products)
+    rating_sum = np.bincount(review_product[approved], weights=rating[approved], minlength=n_products)
+    rating_avg = np.round(np.divide(rating_sum, rating_count, out=np.zeros(n_products), where=rating_count > 0), 2)
+
+    path.unlink(missing_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+    counts: Dict[str, int] = {}
+
+    user_ids = np.array(_ids("u", np.arange(n_users), 8), dtype=object)
+    counts["users"] = _insert(conn, "users", [
+        user_ids, [f"User {i}" for i in range(n_users)], [f"user{i}@example.com" for i in range(n_users)],
+        [f"{i:010d}" for i in range(n_users)], ["FARMER"] * n_farmers + ["CUSTOMER"] * (n_users - n_farmers),
+        _iso(user_created, start),
+    ])
+    farmer_ids = np.array(_ids("f", np.arange(n_farmers), 6), dtype=object)
+    counts["farmer_profiles"] = _insert(conn, "farmer_profiles", [
+        farmer_ids, user_ids[:n_farmers], [f"{CITIES[c]} Farm {i}" for i, c in enumerate(home_city[:n_farmers])],
+        _iso(user_created[:n_farmers], start),
+    ])
+    counts["categories"] = _insert(conn, "categories", [
+        _ids("c", np.arange(categories), 4), [name for name, _ in CATEGORIES[:categories]],
+    ])
+    done("users, farmers, categories", n_users)
+
+    product_ids = np.array(_ids("p", np.arange(n_products), 8), dtype=object)
+    kinds = rng.integers(0, 6, n_products)
+    product_names = [f"{CATEGORIES[c][1][k]} {i}" for i, (c, k) in enumerate(zip(product_category.tolist(), kinds.tolist()))]
+    counts["products"] = _insert(conn, "products", [
+        product_ids, product_names,
+        [f"Fresh {name.rsplit(' ', 1)[0].lower()} ({CATEGORIES[c][0].lower()}) from {CITIES[home_city[f]]}"
+         for name, c, f in zip(product_names, product_category.tolist(), product_farmer.tolist())],
+        base_price, [UNITS[u] for u in rng.integers(0, len(UNITS), n_products).tolist()],
+        rng.integers(0, 500, n_products), rating_avg, rating_count,
+        _ids("c", product_category, 4), farmer_ids[product_farmer],
+        np.where(rng.random(n_products) < 0.95, "APPROVED", "PENDING"),
+        _iso(rng.integers(-365 * 86400, 0, n_products), start),
+    ])
+    done("products", n_products)
+
+    order_ids = np.array(_ids("o", np.arange(n_orders), 9), dtype=object)
+    order_times = _iso(order_seconds, start)
+    addresses = [f'{{"city": "{city}"}}' for city in CITIES]
+    updated = _iso(np.minimum(order_seconds + np.where(statuses == 0, 3, 0) * 86400, spec.days * 86400 - 1), start)
+    counts["orders"] = _insert(conn, "orders", [
+        order_ids, _ids("ORD", np.arange(n_orders), 9), user_ids[customers], farmer_ids[order_farmer], totals,
+        np.array(ORDER_STATUSES, dtype=object)[statuses], np.array(PAYMENT_METHODS, dtype=object)[payments],
+        np.array(addresses, dtype=object)[ship_city], order_times, updated,
+    ])
+    done("orders", n_orders)
+
+    for chunk in range(0, n_items, 1_000_000):
+        rows = slice(chunk, min(chunk + 1_000_000, n_items))
+        _insert(conn, "order_items", [
+            _ids("i", np.arange(rows.start, rows.stop), 9), order_ids[item_order[rows]],
+            product_ids[item_product[rows]], qty[rows], unit_price[rows], order_times[item_order[rows]],
+        ])
+    counts["order_items"] = n_items
+    done("order_items", n_items)
+
+    # Events over the last event_days, from the same popular users and products
+    n_events = spec.events
+    event_start = (spec.days - spec.event_days) * 86400
+    event_seconds = np.sort(event_start + rng.integers(0, spec.event_days, n_events) * 86400
+                            + rng.choice(24, n_events, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum()) * 3600
+                            + rng.integers(0, 3600, n_events))
+    event_types = rng.choice(len(EVENT_TYPES), n_events, p=EVENT_WEIGHTS)
+    counts["events"] = _insert(conn, "events", [
+        _ids("e", np.arange(n_events), 9),
+        user_ids[n_farmers + rng.choice(n_users - n_farmers, n_events, p=customer_weights)],
+        product_ids[rng.choice(n_products, n_events, p=popularity)],
+        np.array(EVENT_TYPES, dtype=object)[event_types], np.ones(n_events), _iso(event_seconds, start),
+        [None] * n_events,
+    ])
+    done("events", n_events)
+
+    review_times = _iso(review_seconds, start)
+    counts["product_reviews"] = _insert(conn, "product_reviews", [
+        _ids("r", np.arange(len(unique)), 9), product_ids[review_product], user_ids[review_user],
+        np.where(review_order >= 0, order_ids[np.maximum(review_order, 0)], None), rating, comments,
+        [None] * len(unique), review_status, [None] * len(unique), review_times, review_times,
+    ])
+    done("product_reviews", len(unique))
+
+    conn.commit()
+    conn.close()
+
+    counts["fraud_orders"] = int(fraud.sum())
+    if labels_path is not None:
+        flagged = np.flatnonzero(fraud)
+        lines = ["order_id,customer_id"] + [f"{o},{c}" for o, c in zip(order_ids[flagged], user_ids[customers[flagged]])]
+        Path(labels_path).write_text("\n".join(lines) + "\n")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--order-items', type=int, default=10_000_000, help="Other tables scale with it")
+    parser.add_argument('--db', type=Path, default=Path("marketplace.db"))
+    parser.add_argument('--labels', type=Path, default=None, help="Write injected fraud orders as CSV")
+    for field in fields(MarketplaceSpec):
+        if field.name not in ('order_items', 'end'):
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default), default=None)
+    args = parser.parse_args()
+
+    overrides = {
+        field.name: getattr(args, field.name) for field in fields(MarketplaceSpec)
+        if field.name not in ('order_items', 'end') and getattr(args, field.name) is not None
+    }
+    spec = MarketplaceSpec.scaled(args.order_items, **overrides)
+
+    print("=" * 60)
+    print(f"Generating {args.db} with {spec.order_items:,} order items...")
+    start = time.perf_counter()
+    counts = generate_marketplace(args.db, spec, labels_path=args.labels, verbose=True)
+    print("=" * 60)
+    print(f"✓ Generated in {time.perf_counter() - start:.1f}s: "
+          + ", ".join(f"{table}={n:,}" for table, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
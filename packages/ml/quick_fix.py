@@ -7,11 +7,10 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from app.config import settings
 from app.db import db
+from app.artifacts import RecommendationArtifacts, save_recommendation_artifacts, ARTIFACT_DIRNAME
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-import joblib
-import json
 
 def create_sample_data():
     """Create sample data if database is empty."""
@@ -66,17 +65,14 @@ def train_tfidf_model():
         
         tfidf_matrix = vectorizer.fit_transform(products['text'])
         
-        # Save model
-        settings.model_dir.mkdir(parents=True, exist_ok=True)
-        
-        tfidf_data = {
-            'vectorizer': vectorizer,
-            'matrix': tfidf_matrix,
-            'products': products[['id', 'title', 'description', 'category', 'price']]
-        }
-        
-        joblib.dump(tfidf_data, settings.model_dir / 'tfidf.joblib')
-        print("✓ TF-IDF model saved")
+        # Save model as a new artifact version (ALS is carried over)
+        version_dir = save_recommendation_artifacts(
+            settings.model_dir / ARTIFACT_DIRNAME,
+            tfidf_model=vectorizer,
+            tfidf_matrix=tfidf_matrix,
+            product_ids=products['id']
+        )
+        print(f"✓ TF-IDF model saved to {version_dir}")
         return True
         
     except Exception as e:
@@ -84,51 +80,19 @@ def train_tfidf_model():
         return False
 
 
-def create_dummy_mappings():
-    """Create dummy mappings for ALS model fallback."""
-    print("\n" + "="*60)
-    print("Creating mappings...")
-    print("="*60)
-    
-    try:
-        products = db.get_products()
-        
-        if products.empty:
-            print("⚠ No products available")
-            return False
-        
-        # Create simple mappings
-        product_ids = products['id'].tolist()
-        
-        mappings = {
-            'user_index': {},
-            'item_index': {pid: idx for idx, pid in enumerate(product_ids)},
-            'index_to_item': {str(idx): pid for idx, pid in enumerate(product_ids)},
-            'index_to_user': {}
-        }
-        
-        # Save mappings
-        settings.model_dir.mkdir(parents=True, exist_ok=True)
-        with open(settings.model_dir / 'mappings.json', 'w') as f:
-            json.dump(mappings, f)
-        
-        print(f"✓ Mappings created for {len(product_ids)} products")
-        return True
-        
-    except Exception as e:
-        print(f"✗ Failed to create mappings: {e}")
-        return False
-
-
 def verify_endpoints():
     """Verify that endpoints will work."""
     print("\n" + "="*60)
     print("Verifying endpoint requirements...")
     print("="*60)
     
+    try:
+        artifacts = RecommendationArtifacts.load(settings.model_dir / ARTIFACT_DIRNAME)
+    except (FileNotFoundError, ValueError):
+        artifacts = None
+    
     checks = {
-        'TF-IDF model': (settings.model_dir / 'tfidf.joblib').exists(),
-        'Mappings': (settings.model_dir / 'mappings.json').exists(),
+        'TF-IDF model': artifacts is not None and artifacts.has_tfidf,
         'Database connection': True,
     }
     
@@ -156,8 +120,7 @@ def main():
     print("This script will:")
     print("1. Check database for products")
     print("2. Train TF-IDF model")
-    print("3. Create mappings")
-    print("4. Verify everything is ready")
+    print("3. Verify everything is ready")
     print("="*60)
     
     # Check database
@@ -177,7 +140,6 @@ def main():
     
     # Train models
     tfidf_ok = train_tfidf_model()
-    mappings_ok = create_dummy_mappings()
     
     # Verify
     print()
@@ -19,7 +19,8 @@ from datetime import datetime
 from sqlalchemy import text
 from app.db import DatabaseConnector
 
-DB = DatabaseConnector()
+# Writes, so it cannot use the service's read-only connections
+DB = DatabaseConnector(read_only=False)
 
 def now_str():
     return datetime.utcnow().isoformat()
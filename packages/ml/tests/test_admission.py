@@ -0,0 +1,222 @@
+"""Tests for admission control and load shedding."""
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+import httpx
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import admission, main
+from app.admission import AdmissionController, AdmissionMiddleware, EndpointClass, Rejected
+from app.api import forecast, fraud
+from app.config import settings
+from app.schemas import TransactionFeatures
+
+
+def make_controller(max_concurrency=2, analytics=1, queue=1, max_wait=1.0):
+    return AdmissionController([
+        EndpointClass("fraud", 0, ("/fraud/",), concurrency=max_concurrency, queue=8, max_wait=1.0),
+        EndpointClass("analytics", 2, ("/forecast/",), concurrency=analytics, queue=queue, max_wait=max_wait),
+    ], max_concurrency)
+
+
+def test_freed_slots_go_to_higher_priority_waiters():
+    controller = make_controller(max_concurrency=1, queue=4)
+    fraud_class, analytics = controller.classes
+    order = []
+
+    async def request(endpoint_class, name):
+        await controller.acquire(endpoint_class)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        controller.release(endpoint_class)
+
+    async def run():
+        await controller.acquire(analytics)
+        waiting = [asyncio.ensure_future(request(analytics, "analytics")),
+                   asyncio.ensure_future(request(fraud_class, "fraud"))]
+        await asyncio.sleep(0.01)
+        assert [len(c.waiters) for c in controller.classes] == [1, 1]
+        controller.release(analytics)
+        await asyncio.gather(*waiting)
+
+    asyncio.run(run())
+    assert order == ["fraud", "analytics"]
+    assert controller.in_flight == 0 and all(c.in_flight == 0 and not c.waiters for c in controller.classes)
+
+
+def test_queue_bound_wait_timeout_and_deadline():
+    controller = make_controller(queue=1, max_wait=0.05)
+    analytics = controller.classes[1]
+
+    async def run():
+        await controller.acquire(analytics)
+        waiter = asyncio.ensure_future(controller.acquire(analytics))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected, match="queue_full"):
+            await controller.acquire(analytics)
+        with pytest.raises(Rejected, match="timeout"):
+            await waiter
+        with pytest.raises(Rejected, match="deadline"):
+            await controller.acquire(analytics, deadline=admission.time.monotonic() + 0.01)
+        with pytest.raises(Rejected, match="deadline"):
+            await controller.acquire(controller.classes[0], deadline=admission.time.monotonic() - 1)
+        assert not analytics.waiters
+        controller.release(analytics)
+
+    asyncio.run(run())
+    assert controller.in_flight == 0
+
+
+def test_middleware_sheds_degrades_and_propagates_deadline():
+    controller = make_controller(max_concurrency=3, analytics=1, queue=0)
+    controller.allow_degraded("POST", "/forecast/product/{product_id}")
+    release = asyncio.Event()
+    seen = []
+
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.get("/forecast/slow")
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @app.post("/forecast/product/{product_id}")
+    async def forecast(product_id: str):
+        seen.append((admission.degraded(), admission.remaining()))
+        return {"degraded": admission.degraded()}
+
+    @app.post("/fraud/score")
+    async def score():
+        return {"remaining": admission.remaining()}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ml") as client:
+            busy = asyncio.ensure_future(client.get("/forecast/slow"))
+            await asyncio.sleep(0.05)
+
+            shed = await client.get("/forecast/slow")
+            degraded = await client.post("/forecast/product/p1")
+            scored = await client.post("/fraud/score", headers={"X-Request-Timeout-Ms": "250"})
+
+            release.set()
+            await busy
+            normal = await client.post("/forecast/product/p1")
+            return shed, degraded, scored, normal
+
+    shed, degraded, scored, normal = asyncio.run(run())
+
+    assert shed.status_code == 503 and shed.headers["retry-after"] == "1"
+    assert shed.json()["reason"] == "queue_full"
+    assert degraded.status_code == 200 and degraded.headers["x-degraded"] == "queue_full"
+    assert degraded.json() == {"degraded": "queue_full"}
+    # Fraud has its own slots; the client's budget reaches the handler
+    assert scored.status_code == 200 and 0 < scored.json()["remaining"] <= 0.25
+    assert normal.json() == {"degraded": None} and "x-degraded" not in normal.headers
+    assert seen[1] == (None, None)
+    assert controller.in_flight == 0
+
+
+def test_degraded_requests_have_their_own_limit():
+    controller = AdmissionController([
+        EndpointClass("analytics", 2, ("/forecast/",), concurrency=1, queue=0, max_wait=1.0),
+    ], max_concurrency=4, degraded_concurrency=1)
+    controller.allow_degraded("POST", "/forecast/product/{product_id}")
+    release = asyncio.Event()
+
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.post("/forecast/product/{product_id}")
+    async def forecast(product_id: str):
+        await release.wait()
+        return {"degraded": admission.degraded()}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ml") as client:
+            admitted = asyncio.ensure_future(client.post("/forecast/product/p1"))
+            await asyncio.sleep(0.05)
+            degraded = asyncio.ensure_future(client.post("/forecast/product/p2"))
+            await asyncio.sleep(0.05)
+            assert controller.degraded_in_flight == 1
+
+            shed = await client.post("/forecast/product/p3")
+            release.set()
+            return await admitted, await degraded, shed
+
+    admitted, degraded, shed = asyncio.run(run())
+
+    assert admitted.json() == {"degraded": None}
+    assert degraded.json() == {"degraded": "queue_full"}
+    assert shed.status_code == 503 and shed.json()["reason"] == "degraded_full"
+    assert controller.in_flight == 0 and controller.degraded_in_flight == 0
+
+
+def test_degraded_fraud_score_uses_rules_only(monkeypatch):
+    calls = []
+
+    class Model:
+        # Errors of the models are only logged, so record the calls
+        def decision_function(self, features):
+            calls.append(features)
+            return [0.0]
+
+        def predict_proba(self, features):
+            calls.append(features)
+            return [[0.0, 1.0]]
+
+    monkeypatch.setattr(fraud, "_isolation_forest", Model())
+    monkeypatch.setattr(fraud, "_xgb_model", Model())
+    monkeypatch.setattr(fraud, "_models_loaded", True)
+    transaction = TransactionFeatures(
+        user_id="u1", amount=12000.0, payment_method="CARD", num_items=2, avg_item_price=100.0,
+        max_item_price=500.0, hour_of_day=3, day_of_week=2, user_history_days=3, user_total_orders=1
+    )
+
+    async def score():
+        token = admission._current.set(admission.Admission("fraud", None, degraded="timeout"))
+        try:
+            return await fraud.score_transaction(transaction)
+        finally:
+            admission._current.reset(token)
+
+    response = asyncio.run(score())
+    assert response.risk_score == pytest.approx(0.3 + 0.2 + 0.25 + 0.1)
+    assert response.risk_level == "high" and not calls
+
+    asyncio.run(fraud.score_transaction(transaction))
+    assert len(calls) == 2
+
+
+def test_degraded_forecast_is_a_moving_average(monkeypatch):
+    history = pd.DataFrame({"ds": pd.date_range("2026-01-01", periods=60, freq="D"), "y": [float(i % 7) for i in range(60)]})
+    monkeypatch.setattr(forecast, "prepare_time_series", lambda product_id, days=365: history)
+
+    payload = asyncio.run(forecast.degraded_forecast("p1", 14))
+
+    assert payload["method"] == "moving_average" and len(payload["forecast"]) == 14
+    assert payload["forecast"][0]["date"] == "2026-03-02"
+    assert payload["forecast"][0]["predicted_demand"] == pytest.approx(3.0)
+    assert forecast._cache.get("p1:14") is None
+
+
+def test_admission_status_requires_the_profiling_token(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.setattr(settings, "profiling_token", "")
+    assert client.get("/debug/admission").status_code == 404
+
+    monkeypatch.setattr(settings, "profiling_token", "test-token")
+    assert client.get("/debug/admission", headers={"X-Profile-Token": "nope"}).status_code == 403
+    response = client.get("/debug/admission", headers={"X-Profile-Token": "test-token"})
+    assert response.status_code == 200
+    assert {"in_flight", "degraded_in_flight", "classes"} <= set(response.json())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
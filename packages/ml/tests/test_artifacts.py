@@ -0,0 +1,184 @@
+"""Tests for the memory-mapped recommendation artifact format."""
+import json
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.artifacts import (
+    RecommendationArtifacts,
+    save_recommendation_artifacts,
+    CURRENT_FILENAME,
+    MANIFEST_FILENAME,
+)
+
+
+class FakeALS:
+    def __init__(self, n_users, n_items, factors=8, seed=0):
+        rng = np.random.default_rng(seed)
+        self.user_factors = rng.normal(size=(n_users, factors)).astype('float32')
+        self.item_factors = rng.normal(size=(n_items, factors)).astype('float32')
+
+
+def make_tfidf(n_products=6, n_features=10, seed=1):
+    rng = np.random.default_rng(seed)
+    dense = rng.random((n_products, n_features)) * (rng.random((n_products, n_features)) > 0.5)
+    return csr_matrix(dense)
+
+
+# Deliberately unsorted, as produced by products_df / quick_fix mappings
+USER_IDS = ["u3", "u1", "u2"]
+ITEM_IDS = ["p4", "p0", "p2", "p1", "p3"]
+PRODUCT_IDS = ["p5", "p2", "p0", "p4", "p1", "p3"]
+
+
+@pytest.fixture
+def saved(tmp_path):
+    als = FakeALS(len(USER_IDS), len(ITEM_IDS))
+    tfidf = make_tfidf()
+    save_recommendation_artifacts(
+        tmp_path, als_model=als, user_ids=USER_IDS, item_ids=ITEM_IDS,
+        tfidf_matrix=tfidf, product_ids=PRODUCT_IDS
+    )
+    return tmp_path, als, tfidf
+
+
+def test_load_is_memory_mapped(saved):
+    root, als, tfidf = saved
+    artifacts = RecommendationArtifacts.load(root)
+
+    assert artifacts.has_als and artifacts.has_tfidf
+    assert isinstance(artifacts.arrays["item_factors"], np.memmap)
+    # scipy wraps the memmaps in plain ndarray views without copying
+    matrix = artifacts.tfidf_matrix
+    for name in ("data", "indices", "indptr"):
+        assert np.shares_memory(getattr(matrix, name), artifacts.arrays[f"tfidf_{name}"])
+
+
+def test_id_lookups_follow_original_rows(saved):
+    root, als, tfidf = saved
+    artifacts = RecommendationArtifacts.load(root)
+
+    for original_row, item_id in enumerate(ITEM_IDS):
+        idx = artifacts.item_index(item_id)
+        assert artifacts.item_id(idx) == item_id
+        np.testing.assert_array_equal(artifacts.arrays["item_factors"][idx], als.item_factors[original_row])
+
+    for original_row, product_id in enumerate(PRODUCT_IDS):
+        row = artifacts.product_row(product_id)
+        assert artifacts.product_id(row) == product_id
+        np.testing.assert_allclose(
+            artifacts.tfidf_matrix[row].toarray(), tfidf[original_row].toarray(), rtol=1e-6
+        )
+
+    assert artifacts.user_index("u2") is not None
+    assert artifacts.user_index("missing") is None
+    assert artifacts.item_index("p10") is None
+
+
+def test_similar_items_uses_cosine_similarity(saved):
+    root, als, _ = saved
+    artifacts = RecommendationArtifacts.load(root)
+
+    idx = artifacts.item_index("p2")
+    ids, scores = artifacts.similar_items(idx, N=3)
+
+    factors = np.asarray(artifacts.arrays["item_factors"])
+    normed = factors / np.linalg.norm(factors, axis=1, keepdims=True)
+    expected = normed @ normed[idx]
+    assert ids[0] == idx
+    np.testing.assert_array_equal(ids, np.argsort(-expected)[:3])
+    np.testing.assert_allclose(scores, expected[ids], rtol=1e-5)
+
+
+def test_partial_retrain_carries_over_other_component(saved):
+    root, _, _ = saved
+    save_recommendation_artifacts(root, tfidf_matrix=make_tfidf(seed=7), product_ids=PRODUCT_IDS)
+
+    artifacts = RecommendationArtifacts.load(root)
+    assert artifacts.has_als
+    assert artifacts.has_tfidf
+    assert artifacts.manifest["components"] == {"als": True, "tfidf": True}
+    assert len([p for p in root.iterdir() if p.is_dir()]) == 2
+
+
+def test_unsupported_format_version_rejected(saved):
+    root, _, _ = saved
+    directory = root / (root / CURRENT_FILENAME).read_text()
+    manifest = json.loads((directory / MANIFEST_FILENAME).read_text())
+    manifest["format_version"] = 99
+    (directory / MANIFEST_FILENAME).write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError):
+        RecommendationArtifacts.load(root)
+
+
+def test_from_legacy_matches_saved_format():
+    als = FakeALS(len(USER_IDS), len(ITEM_IDS))
+    mappings = {
+        'index_to_user': {str(i): uid for i, uid in enumerate(USER_IDS)},
+        'index_to_item': {str(i): iid for i, iid in enumerate(ITEM_IDS)},
+    }
+    import pandas as pd
+    tfidf_data = {'matrix': make_tfidf(), 'products': pd.DataFrame({'id': PRODUCT_IDS})}
+
+    artifacts = RecommendationArtifacts.from_legacy(als, tfidf_data, mappings)
+
+    idx = artifacts.item_index("p3")
+    np.testing.assert_array_equal(artifacts.arrays["item_factors"][idx], als.item_factors[ITEM_IDS.index("p3")])
+    assert artifacts.product_id(artifacts.product_row("p5")) == "p5"
+    assert RecommendationArtifacts.from_legacy() is None
+
+
+def test_similar_products_endpoint_uses_artifacts(saved, monkeypatch):
+    from app.main import app
+    from app.api import recommend
+
+    root, _, _ = saved
+    monkeypatch.setattr(recommend, "_artifacts", RecommendationArtifacts.load(root))
+    monkeypatch.setattr(recommend, "_models_loaded", True)
+
+    response = TestClient(app).get("/recommendations/product/p2?top_k=3")
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == 3
+    assert "p2" not in [item["product_id"] for item in items]
+
+
+def test_train_als_script_writes_current_artifacts(saved, monkeypatch):
+    import pandas as pd
+    import train_als
+    from app.artifacts import ARTIFACT_DIRNAME
+
+    root, _, tfidf = saved
+    artifact_root = root / ARTIFACT_DIRNAME
+    save_recommendation_artifacts(artifact_root, tfidf_matrix=tfidf, product_ids=PRODUCT_IDS)
+    orders = pd.DataFrame({
+        "user_id": ["u1", "u1", "u2", "u2", "u3", "u4"],
+        "product_id": ["p0", "p1", "p1", "p2", "p0", "p2"],
+        "quantity": [1, 2, 1, 3, 2, 1],
+    })
+
+    class Snapshot:
+        def get_all_orders(self):
+            return orders
+
+    monkeypatch.setattr(train_als, "load_training_data", lambda: Snapshot())
+    monkeypatch.setattr(train_als.settings, "model_dir", root)
+
+    assert train_als.train_als_model()
+
+    artifacts = RecommendationArtifacts.load(artifact_root)
+    assert artifacts.has_als and artifacts.has_tfidf
+    assert artifacts.arrays["user_factors"].shape[0] == 4
+    assert artifacts.arrays["item_factors"].shape[0] == 3
+    assert not (root / "als_model.joblib").exists() and not (root / "mappings.json").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,74 @@
+"""Tests for the HTTP load benchmark."""
+import json
+import subprocess
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.bench_http import load_dataset, parse_mix, request_plan, summarize
+from benchmarks.bench_db_indexes import generate_order_db
+
+ML_DIR = Path(__file__).parent.parent
+
+
+@pytest.fixture(scope="module")
+def bench_db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bench_http") / "marketplace.db"
+    generate_order_db(path, order_items=4000)
+    return path
+
+
+def test_parse_mix():
+    mix = parse_mix("recommend_user=3,fraud")
+    assert [(e.name, e.weight) for e in mix] == [("recommend_user", 3.0), ("fraud", 1.0)]
+    assert len(parse_mix(None)) == 7
+    with pytest.raises(ValueError):
+        parse_mix("nope=1")
+
+
+def test_request_plan_is_reproducible(bench_db):
+    data = load_dataset(bench_db)
+    mix = parse_mix("recommend_user=3,fraud=1,review=1")
+
+    first = [(e.name, path, body) for e, path, body in request_plan(mix, data, 200, seed=1)]
+    second = [(e.name, path, body) for e, path, body in request_plan(mix, data, 200, seed=1)]
+
+    assert first == second
+    names = [name for name, _, _ in first]
+    assert names.count("recommend_user") > names.count("fraud")
+    review = next(body for name, _, body in first if name == "review")
+    assert set(review) == {"user_id", "product_id", "text", "rating"}
+
+
+def test_summarize_percentiles_and_errors():
+    results = {"fraud": {"latency": [0.001 * i for i in range(1, 101)], "status": [200] * 99 + [500]}}
+    report = summarize(results, elapsed=2.0, cpu={"fraud": 1.5})
+
+    fraud = report["endpoints"]["fraud"]
+    assert fraud["qps"] == 50.0
+    assert fraud["p50_ms"] == pytest.approx(50.5)
+    assert fraud["p99_ms"] == pytest.approx(99.01)
+    assert fraud["errors"] == 1 and fraud["status_codes"] == {"200": 99, "500": 1}
+    assert fraud["cpu_ms_per_request"] == 1.5
+    assert report["overall"]["requests"] == 100
+
+
+def test_in_process_run_writes_json(bench_db, tmp_path):
+    output = tmp_path / "http.json"
+    # A separate process, as the benchmark points the service at its own DB
+    subprocess.run([
+        sys.executable, "-m", "benchmarks.bench_http", "--db", str(bench_db), "--mix", "fraud,review",
+        "--requests", "40", "--warmup", "5", "--cpu-requests", "2", "--concurrency", "4",
+        "--output", str(output),
+    ], cwd=ML_DIR, check=True, capture_output=True, timeout=600)
+
+    report = json.loads(output.read_text())
+    assert report["overall"]["requests"] == 40
+    assert set(report["endpoints"]) == {"fraud", "review"}
+    assert report["endpoints"]["review"]["cpu_ms_per_request"] is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+"""Tests for the pluggable response cache backends."""
+import fnmatch
+import multiprocessing
+import time
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.cache import Cache, MemoryBackend, RedisBackend, SQLiteBackend, decode, encode
+
+
+class FakeRedis:
+    """The subset of redis.Redis used by RedisBackend, in a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, 0))
+        return value if expires_at > time.time() else None
+
+    def set(self, key, value, px):
+        assert isinstance(value, bytes)
+        self.data[key] = (value, time.time() + px / 1000)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match, count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match) and self.get(key) is not None]
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(tmp_path / "cache.db")
+    return RedisBackend(FakeRedis())
+
+
+def test_backends_get_set_expire_and_clear(backend):
+    recommendations = Cache("recommendations", backend, ttl=60, max_entries=100)
+    chat = Cache("chat", backend, ttl=60, max_entries=100)
+    value = [("p1", 0.9, ["cf"]), ("p2", 0.5, ["popular"])]
+
+    assert recommendations.get("u1:10") is None
+    recommendations.set("u1:10", value)
+    chat.set("u1:10", {"docs": ["x" * 5000]})
+    assert recommendations.get("u1:10") == value
+    assert recommendations.size() == 1
+
+    recommendations.set("short", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert recommendations.get("short") is None
+
+    recommendations.delete("u1:10")
+    assert recommendations.get("u1:10") is None
+    recommendations.set("u2:10", value)
+    recommendations.clear()
+    assert recommendations.get("u2:10") is None and recommendations.size() == 0
+    # Other caches are untouched
+    assert chat.get("u1:10") == {"docs": ["x" * 5000]}
+
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = Cache("lru", MemoryBackend(), ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def clear_in_child(cache):
+    cache.clear()
+
+
+def set_in_child(cache):
+    cache.set("from-child", {"worker": 2})
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_invalidation_reaches_forked_workers(tmp_path):
+    fork = multiprocessing.get_context("fork")
+
+    memory = Cache("recommendations", MemoryBackend(), ttl=60, max_entries=100)
+    memory.set("u1:10", [1, 2, 3])
+    child = fork.Process(target=clear_in_child, args=(memory,))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+    assert memory.get("u1:10") is None
+
+    shared = Cache("recommendations", SQLiteBackend(tmp_path / "cache.db"), ttl=60, max_entries=100)
+    shared.get("warm-connection")
+    child = fork.Process(target=set_in_child, args=(shared,))
+    child.start()
+    child.join()
+    assert shared.get("from-child") == {"worker": 2}
+
+
+def test_encoding_is_compact():
+    value = [{"id": f"p{i}", "text": "Fresh organic tomatoes from the farm", "score": 0.5} for i in range(200)]
+    data = encode(value)
+    assert decode(data) == value
+    assert len(data) < len(repr(value)) / 5
+    assert decode(encode(("p1", 1.0))) == ("p1", 1.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
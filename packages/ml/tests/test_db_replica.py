@@ -0,0 +1,115 @@
+"""Tests for the read-only SQLite mode and analytics snapshots."""
+import sqlite3
+import threading
+import pytest
+import sys
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.db import DatabaseConnector, backup_database
+
+
+@pytest.fixture
+def shop_db(tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE orders (id TEXT PRIMARY KEY, customerId TEXT, status TEXT, createdAt TEXT);
+        CREATE TABLE order_items (id TEXT PRIMARY KEY, orderId TEXT, productId TEXT, qty INTEGER, unitPrice REAL);
+        INSERT INTO orders VALUES ('o1', 'u1', 'DELIVERED', '2024-01-01');
+        INSERT INTO order_items VALUES ('i1', 'o1', 'p1', 2, 3.5);
+    """)
+    conn.close()
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    return path
+
+
+def add_order(path: Path, order_id: str):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO orders VALUES (?, 'u2', 'DELIVERED', '2024-02-01')", (order_id,))
+    conn.execute("INSERT INTO order_items VALUES (?, ?, 'p2', 1, 3.5)", (f"i-{order_id}", order_id))
+    conn.commit()
+    conn.close()
+
+
+def test_read_only_connections_cannot_write(shop_db):
+    connector = DatabaseConnector()
+
+    assert len(connector.get_all_orders()) == 1
+    with pytest.raises(OperationalError):
+        with connector.engine.begin() as conn:
+            conn.execute(text("DELETE FROM orders"))
+    # Writers opt out explicitly
+    with DatabaseConnector(read_only=False).engine.begin() as conn:
+        conn.execute(text("DELETE FROM order_items"))
+
+
+def test_wal_and_read_pragmas(shop_db, monkeypatch):
+    monkeypatch.setattr(settings, "db_mmap_size_mb", 8)
+    connector = DatabaseConnector()
+
+    with connector.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() == 8 * 2**20
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+
+
+def test_one_connection_per_thread(shop_db):
+    connector = DatabaseConnector()
+
+    def connection_id():
+        with connector.engine.connect() as conn:
+            return id(conn.connection.dbapi_connection)
+
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(connection_id()))
+    thread.start()
+    thread.join()
+
+    assert connection_id() == connection_id()
+    assert seen[0] != connection_id()
+
+
+def test_analytics_queries_read_snapshot(shop_db, tmp_path, monkeypatch):
+    snapshot = tmp_path / "snapshots" / "analytics.db"
+    monkeypatch.setattr(settings, "db_snapshot_enabled", True)
+    monkeypatch.setattr(settings, "db_snapshot_path", snapshot)
+    monkeypatch.setattr(settings, "db_snapshot_interval_seconds", 3600)
+    connector = DatabaseConnector()
+
+    assert len(connector.get_all_orders()) == 1
+    assert snapshot.exists()
+
+    add_order(shop_db, "o2")
+    # Analytics read the snapshot until it is refreshed; lookups read the live DB
+    assert len(connector.get_all_orders()) == 1
+    assert len(connector.get_user_order_history("u2")) == 1
+
+    connector.snapshots.refresh()
+    assert len(connector.get_all_orders()) == 2
+    assert connector.snapshots.status()["age_seconds"] is not None
+
+
+def test_backup_is_consistent_copy_without_wal(shop_db, tmp_path):
+    DatabaseConnector()  # switches the source to WAL
+    add_order(shop_db, "o2")
+
+    copy = backup_database(shop_db, tmp_path / "copy.db")
+
+    conn = sqlite3.connect(copy)
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 2
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    conn.close()
+    with pytest.raises(ValueError):
+        backup_database(shop_db, shop_db)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+"""Tests for the columnar payloads and orjson responses."""
+import asyncio
+import json
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import fast_json
+from app.api import price_opt, recommend
+from app.artifacts import RecommendationArtifacts
+from app.fast_json import FastJSONResponse, dumps, non_negative, records
+from benchmarks.bench_responses import bench
+
+
+def test_records_and_encoders_agree(monkeypatch):
+    rows = records(id=["a", "b"], score=np.array([0.5, np.float32(0.25)]), n=np.array([1, 2]))
+    assert rows == [{"id": "a", "score": 0.5, "n": 1}, {"id": "b", "score": 0.25, "n": 2}]
+    assert all(type(row["score"]) is float and type(row["n"]) is int for row in rows)
+    assert non_negative([-1.0, np.nan, 2.5]).tolist() == [0.0, 0.0, 2.5]
+
+    payload = {"rows": rows, "array": np.arange(3), "scalar": np.float64(1.5), "text": "naïve"}
+    fast = dumps(payload)
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert dumps(payload) == fast
+    assert json.loads(FastJSONResponse(payload).body)["array"] == [0, 1, 2]
+
+
+def test_optimize_price_matches_per_price_loop():
+    df = pd.DataFrame({"price": [8.0, 9.0, 10.0, 11.0, 12.0, 10.5],
+                       "demand": [30.0, 26.0, 22.0, 17.0, 12.0, 19.0]})
+    model, poly, _ = price_opt.train_price_demand_model(df)
+
+    optimal_price, max_revenue, points = price_opt.optimize_price(model, poly, 10.0, (7.0, 13.0), 25)
+
+    expected_optimal, expected_revenue = 10.0, 0
+    for point, price in zip(points, np.linspace(7.0, 13.0, 25)):
+        demand = max(0, model.predict(poly.transform(np.array([[price]])))[0])
+        assert point["price"] == price
+        assert point["predicted_demand"] == pytest.approx(demand)
+        assert point["predicted_revenue"] == pytest.approx(price * demand)
+        assert point["confidence"] == pytest.approx(1.0 / (1.0 + abs(price - 10.0) / 10.0))
+        if price * demand > expected_revenue:
+            expected_optimal, expected_revenue = price, price * demand
+    assert optimal_price == expected_optimal and max_revenue == pytest.approx(expected_revenue)
+
+
+def test_similar_products_match_full_sort():
+    rng = np.random.default_rng(0)
+    ids = [f"p{i:03d}" for i in range(60)]
+    matrix = sparse.random(60, 40, density=0.2, random_state=1, format='csr')
+    artifacts = RecommendationArtifacts.from_legacy(tfidf_data={"products": {"id": ids}, "matrix": matrix})
+
+    for product_id, top_k in [(ids[int(rng.integers(60))], 10), ("p007", 100)]:
+        payload = asyncio.run(recommend.compute_similar_products(artifacts, product_id, top_k))
+
+        idx = artifacts.product_row(product_id)
+        row = artifacts.tfidf_matrix[idx].toarray().ravel()
+        similarities = artifacts.tfidf_matrix @ row / (
+            np.sqrt(artifacts.tfidf_matrix.multiply(artifacts.tfidf_matrix).sum(axis=1)).A1
+            * np.linalg.norm(row) + 1e-12)
+        expected = [i for i in np.argsort(-similarities, kind='stable') if i != idx][:top_k]
+        assert len(payload["items"]) == min(top_k, 59)
+        assert [item["score"] for item in payload["items"]] == pytest.approx(similarities[expected], abs=1e-6)
+        assert all(item["reason"] == ["cb"] for item in payload["items"])
+        assert payload["user_id"] == product_id and payload["method"] == "content-based"
+
+
+def test_benchmark_payloads_match_pydantic_serialisation():
+    results = bench(repeat=1)
+    assert set(results) == {"recommendations_100", "forecast_365", "price_points_100"}
+    assert all(result["same_json"] for result in results.values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
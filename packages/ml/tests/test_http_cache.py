@@ -0,0 +1,135 @@
+"""Tests for ETag / If-None-Match revalidation of the read endpoints."""
+import sqlite3
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api import forecast, price_opt, review_analysis
+from app.config import settings
+from app.db import DatabaseConnector
+from app.http_cache import etag_matches, make_etag
+from app.review_sentiment import ProductSentimentStore
+from benchmarks.bench_db_indexes import generate_order_db
+
+
+@pytest.fixture(params=[True, False], ids=["rollup", "raw"])
+def shop(request, tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    generate_order_db(path, order_items=4000)
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    monkeypatch.setattr(settings, "ml_store_path", tmp_path / "store" / "ml.db")
+    monkeypatch.setattr(settings, "sales_rollup_enabled", request.param)
+    monkeypatch.setattr(settings, "sales_rollup_interval_seconds", 0)
+    connector = DatabaseConnector()
+    for module in (forecast, price_opt, review_analysis):
+        monkeypatch.setattr(module, "db", connector)
+    monkeypatch.setattr(review_analysis, "sentiment_store", None)
+
+    app = FastAPI()
+    for module in (forecast, price_opt, review_analysis):
+        app.include_router(module.router)
+
+    conn = sqlite3.connect(path)
+    product_id = conn.execute(
+        "SELECT productId FROM product_reviews GROUP BY productId ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()[0]
+    conn.close()
+    return TestClient(app), connector, path, product_id
+
+
+def counting(monkeypatch, connector, method):
+    calls = []
+    original = getattr(connector, method)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(connector, method, wrapper)
+    return calls
+
+
+def add_sale(path, product_id):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO orders (id, customerId, status, total, createdAt, updatedAt) "
+                 "VALUES ('etag-order', 'etag-user', 'DELIVERED', 30, ?, ?)", (now, now))
+    conn.execute("INSERT INTO order_items VALUES ('etag-item', 'etag-order', ?, 3, 10.0, ?)", (product_id, now))
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("url,method", [
+    ("/forecast/product/{}/history", "get_product_sales_history"),
+    ("/price-optimize/product/{}/price-history", "get_daily_price_demand"),
+])
+def test_sales_history_revalidates_until_sales_change(shop, monkeypatch, url, method):
+    client, connector, path, product_id = shop
+    reads = counting(monkeypatch, connector, method)
+    url = url.format(product_id)
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+    assert len(reads) == 1
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert len(reads) == 1
+    # Other windows are other representations
+    assert client.get(url, params={"days": 30}, headers={"If-None-Match": etag}).status_code == 200
+
+    add_sale(path, product_id)
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json() != first.json()
+
+
+def test_sentiment_summary_revalidates_until_reviews_change(shop, monkeypatch, tmp_path):
+    client, connector, path, product_id = shop
+    url = f"/reviews/product/{product_id}/sentiment-summary"
+
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE product_reviews SET rating = 1, updatedAt = '2099-01-01 00:00:00' "
+                 "WHERE id = (SELECT id FROM product_reviews WHERE productId = ? LIMIT 1)", (product_id,))
+    conn.commit()
+    conn.close()
+    edited = client.get(url, headers={"If-None-Match": etag})
+    assert edited.status_code == 200 and edited.headers["etag"] != etag
+
+    # From the aggregates: versioned by rebuilds and recorded reviews
+    store = ProductSentimentStore(tmp_path / "sentiment.db", connector)
+    store.rebuild(review_analysis.sentiment_and_quality)
+    monkeypatch.setattr(review_analysis, "sentiment_store", store)
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    other = client.get("/reviews/product/missing/sentiment-summary").headers["etag"]
+
+    store.record(product_id, "etag-user", 5, "positive", 0.9)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/reviews/product/missing/sentiment-summary",
+                      headers={"If-None-Match": other}).status_code == 304
+
+
+def test_if_none_match_parsing():
+    etag = make_etag("history", "p1", 90)
+    assert etag.startswith('"') and etag == make_etag("history", "p1", 90)
+    assert etag != make_etag("history", "p1", 30)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(etag.strip('"'), etag)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,79 @@
+"""Tests for the SQLite index advisor."""
+import sqlite3
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.indexes import (
+    ML_INDEXES, advise, create_indexes, make_replica, missing_indexes, plan_issues, prisma_index_lines
+)
+from benchmarks.bench_db_indexes import generate_order_db
+
+
+@pytest.fixture(scope="module")
+def orders_db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("indexes") / "orders.db"
+    generate_order_db(path, order_items=2000)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def quiet_slow_query_log(monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+
+
+def test_generated_db_has_all_tables(orders_db):
+    conn = sqlite3.connect(orders_db)
+    assert conn.execute("SELECT COUNT(*) FROM order_items").fetchone()[0] == 2000
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 500
+    conn.close()
+
+
+def test_reports_every_connector_query_and_missing_indexes(orders_db):
+    report = advise(orders_db)
+
+    methods = {query["method"] for query in report["queries"]}
+    assert {"get_user_order_history", "aggregate_daily_sales", "get_product_reviews"} <= methods
+    assert [spec.name for spec in report["missing_indexes"]] == [spec.name for spec in ML_INDEXES]
+    history = next(q for q in report["queries"] if q["method"] == "get_user_view_events")
+    assert any(issue.startswith("full scan") for issue in history["issues"])
+
+
+def test_replica_gets_indexes_and_source_is_untouched(orders_db, tmp_path):
+    replica = make_replica(orders_db, tmp_path / "replica.db")
+    create_indexes(replica)
+
+    report = advise(replica)
+    history = next(q for q in report["queries"] if q["method"] == "get_user_view_events")
+
+    assert report["missing_indexes"] == []
+    assert any("ml_events_user_type_created" in line for line in history["plan"])
+    assert history["issues"] == []
+    conn = sqlite3.connect(orders_db)
+    assert len(missing_indexes(conn)) == len(ML_INDEXES)
+    conn.close()
+
+
+def test_replica_must_differ_from_source(orders_db):
+    with pytest.raises(ValueError):
+        make_replica(orders_db, orders_db)
+
+
+def test_plan_issues_skip_scans_for_bulk_extracts():
+    plan = ["SCAN events", "USE TEMP B-TREE FOR ORDER BY"]
+
+    assert len(plan_issues(plan)) == 2
+    assert plan_issues(plan, bulk=True) == ["sort without index: USE TEMP B-TREE FOR ORDER BY"]
+
+
+def test_prisma_index_lines():
+    assert prisma_index_lines(ML_INDEXES[:1]) == [
+        'model Event: @@index([userId, type, createdAt], map: "ml_events_user_type_created")'
+    ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,119 @@
+"""Tests for the synthetic marketplace generator."""
+import hashlib
+import sqlite3
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.marketplace import MarketplaceSpec, SPAM_TEXTS, generate_marketplace
+
+END = datetime(2025, 6, 1)
+
+
+@pytest.fixture(scope="module")
+def marketplace(tmp_path_factory):
+    path = tmp_path_factory.mktemp("marketplace") / "marketplace.db"
+    labels = path.with_suffix(".csv")
+    spec = MarketplaceSpec.scaled(40_000, fraud_rate=0.02, spam_rate=0.05, end=END)
+    counts = generate_marketplace(path, spec, labels_path=labels)
+    conn = sqlite3.connect(path)
+    yield conn, counts, labels
+    conn.close()
+
+
+def read(conn, query):
+    return pd.read_sql(query, conn)
+
+
+def digest(path: Path) -> str:
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT * FROM order_items ORDER BY id").fetchall() \
+        + conn.execute("SELECT * FROM product_reviews ORDER BY id").fetchall()
+    conn.close()
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+
+def test_same_seed_gives_same_db(tmp_path):
+    spec = MarketplaceSpec.scaled(2000, end=END)
+    generate_marketplace(tmp_path / "a.db", spec)
+    generate_marketplace(tmp_path / "b.db", spec)
+    generate_marketplace(tmp_path / "c.db", MarketplaceSpec.scaled(2000, end=END, seed=1))
+
+    assert digest(tmp_path / "a.db") == digest(tmp_path / "b.db")
+    assert digest(tmp_path / "a.db") != digest(tmp_path / "c.db")
+
+
+def test_counts_and_order_totals(marketplace):
+    conn, counts, _ = marketplace
+    for table in ("users", "products", "orders", "order_items", "events", "product_reviews"):
+        assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == counts[table]
+    assert counts["order_items"] == 40_000 and counts["orders"] == 10_000
+
+    totals = read(conn, """
+        SELECT o.total, SUM(oi.qty * oi.unitPrice) AS items, COUNT(oi.id) AS n
+        FROM orders o LEFT JOIN order_items oi ON oi.orderId = o.id GROUP BY o.id
+    """)
+    assert (totals["n"] >= 1).all()
+    assert (totals["total"] - totals["items"]).abs().max() < 0.05
+    assert conn.execute("SELECT MAX(createdAt) FROM orders").fetchone()[0] < END.strftime("%Y-%m-%d")
+
+
+def test_power_law_popularity_and_seasonality(marketplace):
+    conn = marketplace[0]
+    sales = read(conn, "SELECT productId, SUM(qty) AS qty FROM order_items GROUP BY productId")["qty"]
+    top = sales.sort_values(ascending=False)
+    assert top.iloc[:len(top) // 5].sum() > 0.5 * top.sum()
+
+    orders = read(conn, "SELECT createdAt FROM orders")
+    created = pd.to_datetime(orders["createdAt"])
+    weekend = created.dt.dayofweek >= 5
+    assert weekend.mean() > 2 / 7
+    night = created.dt.hour.isin([1, 2, 3])
+    assert night.mean() < 0.03
+
+
+def test_injected_fraud_is_labelled_and_detectable(marketplace):
+    conn, counts, labels = marketplace
+    fraud = pd.read_csv(labels)
+    assert len(fraud) == counts["fraud_orders"] == 200
+
+    orders = read(conn, "SELECT id, customerId, paymentMethod, total, createdAt FROM orders")
+    orders["fraud"] = orders["id"].isin(fraud["order_id"])
+    orders["hour"] = pd.to_datetime(orders["createdAt"]).dt.floor("h")
+    per_hour = orders.groupby(["customerId", "hour"])["id"].transform("count")
+
+    assert (per_hour[orders["fraud"]] > 5).mean() > 0.9
+    assert orders.loc[orders["fraud"], "paymentMethod"].isin(["CARD", "WALLET"]).all()
+    assert orders.loc[orders["fraud"], "total"].median() > 3 * orders.loc[~orders["fraud"], "total"].median()
+
+
+def test_reviews_follow_quality_with_spam_and_bombing(marketplace):
+    conn = marketplace[0]
+    reviews = read(conn, "SELECT productId, userId, rating, comment, status FROM product_reviews")
+    assert not reviews.duplicated(["productId", "userId"]).any()
+    assert reviews["rating"].between(1, 5).all()
+    assert reviews["comment"].isin(SPAM_TEXTS).any()
+
+    per_user = reviews.groupby("userId").size()
+    assert per_user.max() > 10
+
+    products = read(conn, "SELECT id, ratingAvg, ratingCount FROM products").set_index("id")
+    approved = reviews[reviews["status"] == "APPROVED"].groupby("productId")["rating"].agg(["mean", "size"])
+    assert (products.loc[approved.index, "ratingCount"] == approved["size"]).all()
+    assert (products.loc[approved.index, "ratingAvg"] - approved["mean"]).abs().max() < 0.01
+
+
+def test_spec_validation():
+    with pytest.raises(ValueError):
+        MarketplaceSpec.scaled(2000, orders=5000).validate()
+    with pytest.raises(ValueError):
+        MarketplaceSpec(users=10, farmers=10).validate()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
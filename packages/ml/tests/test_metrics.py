@@ -0,0 +1,89 @@
+"""Tests for the in-process metrics registry and /metrics endpoint."""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.main import app
+from app.metrics import MetricsRegistry, timed_methods
+
+client = TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", labels=("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, route="/a")
+
+    text = registry.render()
+
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+    assert 'latency_seconds_sum{route="/a"} 6.05' in text
+
+
+def test_counter_gauge_and_label_escaping():
+    registry = MetricsRegistry()
+    hits = registry.counter("hits_total", "Hits", labels=("cache",))
+    depth = registry.gauge("queue_depth", "Depth", labels=("executor",))
+    hits.inc(cache='say "hi"')
+    hits.inc(2, cache='say "hi"')
+    depth.set_function(lambda: 7, executor="pool")
+
+    text = registry.render()
+
+    assert 'hits_total{cache="say \\"hi\\""} 3' in text
+    assert 'queue_depth{executor="pool"} 7' in text
+
+
+def test_labels_must_match_declaration():
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "C", labels=("a",))
+    with pytest.raises(ValueError):
+        counter.inc(b="x")
+    with pytest.raises(ValueError):
+        registry.histogram("c_total", "C")
+    assert registry.counter("c_total", "C", labels=("a",)) is counter
+
+
+def test_timed_methods_records_public_methods_only():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("query_seconds", "Query", labels=("method",))
+
+    class Connector:
+        def get_things(self):
+            return [1]
+
+        def _helper(self):
+            return None
+
+    timed_methods(Connector, histogram)
+    connector = Connector()
+    assert connector.get_things() == [1]
+    connector._helper()
+
+    assert histogram.count(method="get_things") == 1
+    assert histogram.count(method="_helper") == 0
+
+
+def test_metrics_endpoint_labels_routes_by_template():
+    client.get("/recommendations/product/some-product-id")
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'route="/recommendations/product/{product_id}"' in response.text
+    assert 'route="/health",status="200"' in response.text
+    assert "some-product-id" not in response.text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
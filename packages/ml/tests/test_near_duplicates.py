@@ -0,0 +1,182 @@
+"""Tests for MinHash/LSH near-duplicate detection."""
+import multiprocessing
+import random
+import pytest
+import sys
+from pathlib import Path
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api import review_analysis
+from app.near_duplicates import MinHasher, NearDuplicateIndex, SharedNearDuplicateIndex, normalize
+
+CAMPAIGN = "Absolutely wonderful alphonso mangoes from this farm, sweet and juicy, delivered within two days"
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    words = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(3000)]
+    return [" ".join(rng.choices(words, k=rng.randint(8, 30))) for _ in range(n)]
+
+
+def test_signature_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=256)
+    a = normalize(CAMPAIGN)
+    b = normalize(CAMPAIGN.replace("two days", "three days, thank you"))
+    shingles_a, shingles_b = set(hasher.shingles(a).tolist()), set(hasher.shingles(b).tolist())
+    jaccard = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+
+    assert estimate == pytest.approx(jaccard, abs=0.1)
+    assert (hasher.signature(a) == hasher.signature(normalize(CAMPAIGN.upper() + "!!"))).all()
+
+
+def test_index_finds_edited_copies_only():
+    index = NearDuplicateIndex()
+    for i, text in enumerate(random_texts(2000)):
+        index.add((f"u{i}", "p"), f"u{i}", text)
+    index.add(("shill-1", "p1"), "shill-1", CAMPAIGN)
+
+    matches = index.query(CAMPAIGN.replace("two", "2") + "!", exclude=("shill-2", "p1"))
+    assert [(key, owner) for key, owner, _ in matches] == [(("shill-1", "p1"), "shill-1")]
+    assert matches[0][2] >= 0.7
+    assert index.query(CAMPAIGN, exclude=("shill-1", "p1")) == []
+    assert index.query("Mangoes were fine") == []
+    assert not index.add(("u", "p"), "u", "Fresh and tasty")
+
+
+def test_replacing_and_building():
+    index = NearDuplicateIndex()
+    index.add(("u1", "p1"), "u1", CAMPAIGN)
+    index.add(("u1", "p1"), "u1", random_texts(1, seed=1)[0])
+    assert index.query(CAMPAIGN) == [] and len(index) == 1
+
+    # A review added while the index is built keeps its newer text
+    index.add(("u2", "p1"), "u2", CAMPAIGN)
+    built = index.build([pd.DataFrame({
+        "userId": ["u2", "u3", "u4"], "productId": ["p1", "p1", "p2"],
+        "comment": ["Old text of u2 that was edited since, with eight words", CAMPAIGN + " Really", None],
+    })])
+    assert built == 2 and index.built
+    assert {owner for _, owner, _ in index.query(CAMPAIGN)} == {"u2", "u3"}
+    assert index.status()["texts"] == 3
+
+
+def test_analyze_flags_copies_from_other_accounts(monkeypatch):
+    monkeypatch.setattr(review_analysis.analyzer, "duplicates", NearDuplicateIndex())
+    monkeypatch.setattr(review_analysis.db, "get_user_reviews", lambda user_id, days=30: pd.DataFrame())
+    app = FastAPI()
+    app.include_router(review_analysis.router)
+    client = TestClient(app)
+    factor = "Near-duplicate of reviews by other accounts"
+
+    first = client.post("/reviews/analyze", json={"user_id": "a", "product_id": "p1", "rating": 5, "text": CAMPAIGN})
+    again = client.post("/reviews/analyze", json={"user_id": "a", "product_id": "p1", "rating": 5, "text": CAMPAIGN})
+    copy = client.post("/reviews/analyze", json={
+        "user_id": "b", "product_id": "p2", "rating": 5, "text": CAMPAIGN.replace("farm", "farm!!"),
+    })
+
+    assert factor not in first.json()["fraud_risk_factors"]
+    assert factor not in again.json()["fraud_risk_factors"]
+    assert factor in copy.json()["fraud_risk_factors"]
+
+    batch = client.post("/reviews/analyze/batch", json={"reviews": [
+        {"user_id": "c", "product_id": "p3", "rating": 4, "text": random_texts(1, seed=2)[0]},
+        {"user_id": "d", "product_id": "p3", "rating": 4, "text": random_texts(1, seed=2)[0]},
+    ]}).json()["results"]
+    assert all(factor in result["fraud_risk_factors"] for result in batch)
+
+
+def test_shared_index_matches_in_memory_index(tmp_path):
+    memory, shared = NearDuplicateIndex(), SharedNearDuplicateIndex(tmp_path / "ml.db")
+    texts = random_texts(500, seed=4)
+    items = [((f"u{i}", "p"), f"u{i}", text) for i, text in enumerate(texts)]
+    items += [(("shill-1", "p1"), "shill-1", CAMPAIGN), (("shill-2", "p2"), "shill-2", CAMPAIGN + " Wow")]
+    for index in (memory, shared):
+        assert index.add_many(items) == 502
+        index.add(("u0", "p"), "u0", "too short")
+        index.add(("u1", "p"), "u1", texts[2])
+
+    for text in [CAMPAIGN, texts[2], texts[3]]:
+        assert shared.query(text, exclude=("u3", "p")) == memory.query(text, exclude=("u3", "p"))
+    assert len(shared) == len(memory) == 501
+    assert shared.status()["texts"] == 501
+
+
+def test_shared_index_is_seen_by_forked_workers(tmp_path):
+    index = SharedNearDuplicateIndex(tmp_path / "ml.db")
+    # Like the pre-fork master at warm-up
+    index.add(("u0", "p0"), "u0", random_texts(1, seed=3)[0])
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+
+    def worker(user, text):
+        results.put((index.query(text, exclude=(user, "p1")), index.add((user, "p1"), user, text)))
+
+    for user, text in [("shill-1", CAMPAIGN), ("shill-2", CAMPAIGN.replace("two", "2") + "!")]:
+        process = context.Process(target=worker, args=(user, text))
+        process.start()
+        process.join(30)
+        assert process.exitcode == 0
+
+    (first, _), (second, _) = results.get(timeout=5), results.get(timeout=5)
+    assert first == []
+    assert [(key, owner) for key, owner, _ in second] == [(("shill-1", "p1"), "shill-1")]
+    assert {owner for _, owner, _ in index.query(CAMPAIGN)} == {"shill-1", "shill-2"}
+
+
+def test_sync_catches_up_from_watermark(tmp_path):
+    reviews = pd.DataFrame({
+        "userId": ["u1", "u2"], "productId": ["p1", "p1"],
+        "comment": [CAMPAIGN, random_texts(1, seed=5)[0]],
+        "updatedAt": ["2026-01-01 10:00:00", "2026-01-02 10:00:00"],
+    })
+    reads = []
+
+    class Source:
+        def iter_reviews(self, chunksize=None, since=None):
+            reads.append(since)
+            return [reviews if since is None else reviews[reviews["updatedAt"] >= since]]
+
+    index = SharedNearDuplicateIndex(tmp_path / "ml.db")
+    # Indexed by a worker while the first sync reads the DB
+    index.add(("u1", "p1"), "u1", random_texts(1, seed=6)[0])
+    assert index.sync(Source()) == 2
+    assert index.query(CAMPAIGN) == []
+
+    # u2 removed the comment, u3 reviewed while the service was down
+    reviews.loc[1, ["comment", "updatedAt"]] = [None, "2026-01-03 10:00:00"]
+    reviews.loc[2] = ["u3", "p2", CAMPAIGN + " Yes", "2026-01-03 11:00:00"]
+    index.sync(Source())
+
+    assert reads == [None, "2026-01-02 10:00:00"]
+    assert [owner for _, owner, _ in index.query(CAMPAIGN)] == ["u3"]
+    assert index.query(random_texts(1, seed=5)[0]) == []
+    assert index.status()["watermark"] == "2026-01-03 11:00:00" and len(index) == 2
+
+
+def test_batch_hashes_each_review_once_for_the_index(tmp_path, monkeypatch):
+    index = SharedNearDuplicateIndex(tmp_path / "ml.db")
+    calls = []
+    signature, signatures = index.hasher.signature, index.hasher.signatures
+    monkeypatch.setattr(index.hasher, "signature", lambda text: calls.append(1) or signature(text))
+    monkeypatch.setattr(index.hasher, "signatures", lambda texts: calls.append(len(texts)) or signatures(texts))
+    monkeypatch.setattr(review_analysis.analyzer, "duplicates", index)
+    requests = [review_analysis.ReviewAnalysisRequest(user_id=f"u{i}", product_id="p", rating=5, text=CAMPAIGN)
+                for i in range(3)]
+
+    results = review_analysis.moderate_reviews(requests, user_reviews=pd.DataFrame(columns=["userId"]),
+                                               record=False)
+
+    # One batch for the index, one signature per query
+    assert calls == [3, 1, 1, 1]
+    assert all("Near-duplicate of reviews by other accounts" in r.fraud_risk_factors for r in results)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
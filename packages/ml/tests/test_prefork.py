@@ -0,0 +1,66 @@
+"""Tests for pre-fork serving and shared-memory reporting."""
+import json
+import os
+import signal
+import socket
+import subprocess
+import time
+import urllib.request
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.memory import memory_breakdown
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork mode needs os.fork")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url, timeout=30):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                return json.loads(response.read())
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+@pytest.mark.skipif(not Path("/proc/self/smaps_rollup").exists(), reason="needs smaps_rollup")
+def test_memory_breakdown_splits_shared_and_private():
+    stats = memory_breakdown()
+    assert stats["pid"] == os.getpid()
+    assert stats["shared_bytes"] + stats["private_bytes"] == stats["rss_bytes"]
+
+
+def test_workers_are_forked_from_master():
+    port = free_port()
+    master = subprocess.Popen(
+        [sys.executable, "-m", "app.prefork", "--host", "127.0.0.1", "--port", str(port), "--workers", "2"],
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, "ENABLED_ROUTERS": "recommend,review_analysis"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        health = get_json(f"http://127.0.0.1:{port}/health")
+        assert health["memory"]["ppid"] == master.pid
+        assert health["warmup"]["ready"]
+        if "shared_bytes" in health["memory"]:
+            assert health["memory"]["shared_bytes"] > 0
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+    assert master.returncode == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,98 @@
+"""Tests for opt-in per-request profiling."""
+import pstats
+import pytest
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.main import app
+from app.config import settings
+from app import profiling
+from app.profiling import ProfileStore
+
+client = TestClient(app)
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def profile_store(tmp_path, monkeypatch):
+    store = ProfileStore(tmp_path / "profiles", max_files=3)
+    monkeypatch.setattr(profiling, "store", store)
+    monkeypatch.setattr(settings, "profiling_token", TOKEN)
+    monkeypatch.setattr(settings, "profiling_sample_rate", 0.0)
+    return store
+
+
+def test_unprofiled_request_has_no_profile(profile_store):
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert profile_store.files() == []
+
+
+def test_wrong_token_is_not_profiled(profile_store):
+    response = client.get("/", headers={"X-Profile-Token": "nope"})
+
+    assert "x-profile-id" not in response.headers
+    assert profile_store.files() == []
+
+
+def test_sampled_profile_writes_collapsed_stacks(profile_store):
+    response = client.get("/", headers={"X-Profile-Token": TOKEN, "X-Profile-Mode": "sample"})
+
+    profile_id = response.headers["x-profile-id"]
+    assert profile_id.endswith(".collapsed")
+    assert [p.name for p in profile_store.files()] == [profile_id]
+
+
+def test_cprofile_writes_pstats(profile_store):
+    response = client.get("/", headers={"X-Profile-Token": TOKEN, "X-Profile-Mode": "cprofile"})
+
+    path = profile_store.get(response.headers["x-profile-id"])
+    assert path is not None and path.suffix == ".prof"
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_sample_rate_profiles_without_token(profile_store, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_sample_rate", 1.0)
+
+    assert "x-profile-id" in client.get("/").headers
+    # Probes are never sampled
+    assert "x-profile-id" not in client.get("/metrics").headers
+
+
+def test_ring_directory_is_bounded(profile_store):
+    for _ in range(5):
+        client.get("/", headers={"X-Profile-Token": TOKEN})
+
+    assert len(profile_store.files()) == 3
+
+
+def test_list_and_download_profiles(profile_store):
+    profile_id = client.get(
+        "/", headers={"X-Profile-Token": TOKEN, "X-Profile-Mode": "cprofile"}
+    ).headers["x-profile-id"]
+
+    listing = client.get("/debug/profiles", headers={"X-Profile-Token": TOKEN})
+    assert listing.status_code == 200
+    assert listing.json()["profiles"][0]["id"] == profile_id
+    assert listing.json()["profiles"][0]["format"] == "pstats"
+
+    download = client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile-Token": TOKEN})
+    assert download.status_code == 200
+    assert download.content == profile_store.get(profile_id).read_bytes()
+
+
+def test_profile_endpoints_require_token(profile_store, monkeypatch):
+    assert client.get("/debug/profiles").status_code == 403
+    assert client.get("/debug/profiles/../config.py", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+    monkeypatch.setattr(settings, "profiling_token", "")
+    assert client.get("/debug/profiles", headers={"X-Profile-Token": ""}).status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,89 @@
+"""Tests for DatabaseConnector query timing and the slow-query log."""
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.main import app
+from app.config import settings
+from app.db import DatabaseConnector, normalize_sql
+
+
+@pytest.fixture
+def connector(tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE categories (id TEXT PRIMARY KEY, name TEXT);
+        CREATE TABLE users (id TEXT PRIMARY KEY, name TEXT);
+        CREATE TABLE products (
+            id TEXT PRIMARY KEY, name TEXT, description TEXT, price REAL, unit TEXT,
+            stockQty INTEGER, ratingAvg REAL, ratingCount INTEGER, categoryId TEXT,
+            farmerId TEXT, status TEXT, createdAt TEXT
+        );
+        INSERT INTO categories VALUES ('c1', 'Vegetables');
+        INSERT INTO products VALUES ('p1', 'Tomato', '', 2.5, 'kg', 10, 4.5, 2, 'c1', 'f1', 'APPROVED', '2024-01-01');
+        INSERT INTO products VALUES ('p2', 'Onion', '', 1.5, 'kg', 0, 4.0, 1, 'c1', 'f1', 'APPROVED', '2024-01-02');
+    """)
+    conn.close()
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    return DatabaseConnector()
+
+
+def test_records_time_and_rows_per_method_and_statement(connector):
+    connector.get_products()
+    connector.get_products()
+    connector.get_current_inventory("p1")
+
+    summary = connector.stats.summary()
+
+    assert summary["methods"]["get_products"]["calls"] == 2
+    assert summary["methods"]["get_products"]["rows"] == 4
+    assert summary["methods"]["get_current_inventory"]["rows"] == 1
+    statement = next(s for s in summary["statements"] if s["methods"] == ["get_products"])
+    assert statement["statement"].startswith("SELECT p.id, p.name as title")
+    assert statement["avg_rows"] == 2.0
+    assert statement["plan"] is None
+
+
+def test_slow_query_logs_plan(connector, monkeypatch, capsys):
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+
+    connector.get_current_inventory("p1")
+
+    statement = connector.stats.summary()["statements"][0]
+    assert statement["slow_calls"] == 1
+    assert any("products" in line for line in statement["plan"])
+    assert "Slow query in get_current_inventory" in capsys.readouterr().out
+
+
+def test_fetch_rows_is_recorded(connector):
+    docs = connector.get_product_documents()
+
+    assert len(docs) == 2
+    assert connector.stats.summary()["methods"]["get_product_documents"]["rows"] == 2
+
+
+def test_normalize_sql_folds_lists_and_limits():
+    assert normalize_sql("SELECT *\n  FROM t WHERE id IN (?, ?,?) LIMIT 50") == \
+        "SELECT * FROM t WHERE id IN (?...) LIMIT ?"
+
+
+def test_query_stats_endpoint(monkeypatch):
+    client = TestClient(app)
+    assert client.get("/debug/queries").status_code == 404
+
+    monkeypatch.setattr(settings, "profiling_token", "test-token")
+    assert client.get("/debug/queries").status_code == 403
+    assert client.get("/debug/queries", headers={"X-Profile-Token": "nope"}).status_code == 403
+    response = client.get("/debug/queries", headers={"X-Profile-Token": "test-token"})
+
+    assert response.status_code == 200
+    assert {"slow_query_ms", "methods", "statements"} <= set(response.json())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
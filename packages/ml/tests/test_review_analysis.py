@@ -0,0 +1,84 @@
+"""Tests for the single-pass review analysis."""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api import review_analysis
+from app.api.review_analysis import ReviewAnalysis, ReviewAnalyzer
+
+
+@pytest.fixture
+def analyzer():
+    return ReviewAnalyzer()
+
+
+def test_analysis_matches_individual_checks(analyzer):
+    texts = [
+        "", "!!!", "ok", "good product", "Rotten on arrival, very disappointed",
+        "Excellent quality, very fresh and tasty. Delivered 5kg in 2 days, would recommend!",
+        "BEST PRICE!!! visit www.cheap-deals.example or call +919999999999",
+    ]
+    for text in texts:
+        for rating in range(1, 6):
+            analysis = analyzer.analyze(text, rating)
+            assert analysis.sentiment == analyzer.analyze_sentiment(text)
+            assert analysis.spam == analyzer.detect_spam(text)
+            assert analysis.mismatch == analyzer.check_rating_text_mismatch(rating, text)
+            assert analysis.quality_score == analyzer.calculate_quality_score(text, rating)
+
+
+def test_signals(analyzer):
+    positive = analyzer.analyze("Excellent quality, very fresh and tasty. Would recommend to everyone here", 5)
+    assert positive.sentiment["sentiment"] == "positive"
+    assert not positive.spam["is_spam"] and not positive.mismatch["is_mismatch"]
+    assert positive.quality_score > 0.6
+
+    mismatch = analyzer.analyze("Terrible, rotten and stale vegetables, total waste", 5)
+    assert mismatch.mismatch == {
+        "is_mismatch": True, "severity": "high", "expected_sentiment": "positive",
+        "actual_sentiment": "negative", "confidence": 1.0,
+    }
+
+    spam = analyzer.analyze("BUY NOW!!! www.promo.example", 5)
+    assert spam.spam["is_spam"]
+    assert "Contains suspicious links or contact info" in spam.spam["reasons"]
+
+    empty = analyzer.analyze("", 3)
+    assert empty.quality_score == 0.3 and empty.sentiment["confidence"] == 0.0
+
+
+def test_analyze_endpoint_runs_one_pass(monkeypatch):
+    from fastapi import FastAPI
+
+    calls = []
+    analyze = review_analysis.analyzer.analyze
+
+    def counting_analyze(text, rating):
+        calls.append(text)
+        return analyze(text, rating)
+
+    monkeypatch.setattr(review_analysis.analyzer, "analyze", counting_analyze)
+    monkeypatch.setattr(review_analysis.db, "get_user_reviews", lambda user_id, days=30: pd.DataFrame())
+    app = FastAPI()
+    app.include_router(review_analysis.router)
+
+    response = TestClient(app).post("/reviews/analyze", json={
+        "user_id": "u1", "product_id": "p1", "rating": 1, "text": "Excellent and fresh, best mangoes",
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sentiment"] == "positive"
+    assert body["rating_text_mismatch"] and body["mismatch_severity"] == "high"
+    assert "Rating does not match review sentiment" in body["fraud_risk_factors"]
+    assert len(calls) == 1
+    assert isinstance(analyze("x", 3), ReviewAnalysis)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,58 @@
+"""Tests for the compiled review lexicon matcher."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api.review_analysis import ReviewAnalyzer
+from app.review_lexicon import ReviewLexicon
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return ReviewLexicon.load()
+
+
+def test_multi_word_terms_take_precedence(lexicon):
+    match = lexicon.scan("Would NOT recommend, not fresh. I don't recommend it")
+    assert (match.positive, match.negative) == (0, 3)
+
+    match = lexicon.scan("Recommend! Good product, fresh and not bad")
+    assert (match.positive, match.negative, match.generic) == (3, 1, 1)
+    assert match.words == 7
+
+    # Whole words only
+    assert lexicon.scan("The finest, well defined taste").generic == 0
+    assert lexicon.scan("Fine.").generic == 1
+
+
+def test_spam_punctuation_and_capitals(lexicon):
+    match = lexicon.scan("BUY NOW at www.promo.example!!!")
+    assert match.spam and match.punctuation
+    assert match.caps == 6 and match.words == 6
+
+    assert lexicon.scan("Call +919999999999 or WhatsApp me").spam
+    match = lexicon.scan("Sweet mangoes, delivered in 2 days?!")
+    assert not match.spam and not match.punctuation and match.caps == 1
+
+
+def test_lexicon_files_can_be_replaced(tmp_path):
+    (tmp_path / "positive.txt").write_text("# Custom terms\nyummy\nvalue for money\n")
+    (tmp_path / "spam.txt").write_text("free sample\n")
+    analyzer = ReviewAnalyzer(lexicon=ReviewLexicon.load(tmp_path))
+
+    analysis = analyzer.analyze("Yummy, great value for money", 5)
+    assert analysis.sentiment["sentiment"] == "positive"
+    assert analyzer.lexicon.scan("Yummy, great value for money").positive == 2
+    assert analyzer.detect_spam("Ask for a FREE SAMPLE today")["spam_score"] >= 0.4
+    assert not analyzer.lexicon.scan("www.promo.example").spam
+    # Built-in files are used for the rest
+    assert analyzer.analyze("Would not recommend", 5).mismatch["is_mismatch"]
+
+    with pytest.raises(ValueError):
+        ReviewLexicon({"positive": ["good"]}, [r"(https?)://"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
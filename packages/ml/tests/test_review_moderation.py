@@ -0,0 +1,127 @@
+"""Tests for batch review moderation and the moderation backfill."""
+import json
+import sqlite3
+import pytest
+import sys
+from pathlib import Path
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import moderation
+from app.api import review_analysis
+from app.config import settings
+from app.db import DatabaseConnector
+from app.near_duplicates import NearDuplicateIndex, SharedNearDuplicateIndex
+from benchmarks.bench_db_indexes import generate_order_db
+
+
+@pytest.fixture
+def shop_db(tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    generate_order_db(path, order_items=4000)
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    monkeypatch.setattr(settings, "sales_rollup_enabled", False)
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    connector = DatabaseConnector()
+    monkeypatch.setattr(review_analysis, "db", connector)
+    monkeypatch.setattr(review_analysis.analyzer, "duplicates", NearDuplicateIndex())
+    return path, connector
+
+
+def query_count(connector, method):
+    return connector.stats.summary()["methods"].get(method, {}).get("calls", 0)
+
+
+def test_reviews_by_users_matches_per_user_query(shop_db):
+    _, connector = shop_db
+    users = next(connector.iter_reviews())["userId"].unique()[:20].tolist()
+
+    batch = connector.get_reviews_by_users(users + ["missing"])
+    assert set(batch["userId"]) == set(users)
+    for user_id in users:
+        single = connector.get_user_reviews(user_id)
+        mine = batch[batch["userId"] == user_id].reset_index(drop=True)
+        assert mine["id"].tolist() == single["id"].tolist()
+        pd.testing.assert_frame_equal(mine[single.columns], single, check_dtype=False)
+
+    assert connector.get_reviews_by_users([]).empty
+
+
+def test_batch_endpoint_matches_single_reviews_with_one_history_query(shop_db):
+    path, connector = shop_db
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT userId, productId, rating, comment FROM product_reviews LIMIT 60").fetchall()
+    conn.close()
+    reviews = [{"user_id": u, "product_id": p, "rating": r, "text": c or ""} for u, p, r, c in rows]
+    reviews.append({"user_id": "new-user", "product_id": rows[0][1], "rating": 5, "text": "BUY NOW!!! www.x.example"})
+
+    app = FastAPI()
+    app.include_router(review_analysis.router)
+    client = TestClient(app)
+
+    response = client.post("/reviews/analyze/batch", json={"reviews": reviews})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert query_count(connector, "get_reviews_by_users") == 1
+    assert query_count(connector, "get_user_reviews") == 0
+
+    for review, result in zip(reviews, results):
+        assert client.post("/reviews/analyze", json=review).json() == result
+    assert results[-1]["is_spam"] and not results[-1]["should_approve"]
+
+    assert client.post("/reviews/analyze/batch", json={"reviews": []}).status_code == 422
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_backfill_moderates_every_review(shop_db, tmp_path, workers):
+    path, connector = shop_db
+    store = tmp_path / "ml.db"
+
+    counts = moderation.backfill(connector, store, workers=workers, chunksize=150)
+    # Re-running replaces rows instead of duplicating them
+    moderation.backfill(connector, store, workers=workers, chunksize=150)
+
+    source = sqlite3.connect(path)
+    total = source.execute("SELECT COUNT(*) FROM product_reviews").fetchone()[0]
+    review = source.execute("SELECT id, userId, productId, rating, comment FROM product_reviews LIMIT 1").fetchone()
+    source.close()
+    conn = sqlite3.connect(store)
+    stored = pd.read_sql("SELECT * FROM review_moderation", conn).set_index("reviewId")
+    conn.close()
+
+    assert counts["reviews"] == total == len(stored)
+    assert counts["chunks"] == -(-total // 150)
+    expected = review_analysis.moderate_review(review_analysis.ReviewAnalysisRequest(
+        user_id=review[1], product_id=review[2], rating=review[3], text=review[4] or ""))
+    row = stored.loc[review[0]]
+    assert row["sentiment"] == expected.sentiment
+    assert row["quality_score"] == pytest.approx(expected.quality_score)
+    assert json.loads(row["spam_reasons"]) == expected.spam_reasons
+    assert bool(row["should_approve"]) == expected.should_approve
+
+
+def test_backfill_syncs_the_shared_index_from_its_watermark(shop_db, tmp_path, monkeypatch):
+    path, connector = shop_db
+    duplicates = SharedNearDuplicateIndex(tmp_path / "ml.db")
+    monkeypatch.setattr(review_analysis.analyzer, "duplicates", duplicates)
+    reads = []
+    iter_reviews = connector.iter_reviews
+    monkeypatch.setattr(connector, "iter_reviews",
+                        lambda chunksize=None, since=None: reads.append(since) or iter_reviews(chunksize, since))
+
+    moderation.backfill(connector, tmp_path / "ml.db", workers=0, chunksize=150)
+    watermark = duplicates.status()["watermark"]
+    assert reads[0] is None and watermark is not None
+
+    # A fresh process (CLI or service) resumes from the backfill's watermark
+    shared = SharedNearDuplicateIndex(tmp_path / "ml.db")
+    shared.sync(connector)
+    assert reads[-1] == watermark and len(shared) == len(duplicates)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
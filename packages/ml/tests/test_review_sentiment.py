@@ -0,0 +1,157 @@
+"""Tests for the per-product review sentiment aggregates."""
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api import review_analysis
+from app.config import settings
+from app.db import DatabaseConnector
+from app.near_duplicates import NearDuplicateIndex
+from app.review_sentiment import ProductSentimentStore
+from benchmarks.bench_db_indexes import generate_order_db
+
+
+@pytest.fixture
+def shop(tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    generate_order_db(path, order_items=4000)
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    monkeypatch.setattr(settings, "sales_rollup_enabled", False)
+    connector = DatabaseConnector()
+    store = ProductSentimentStore(tmp_path / "ml.db", connector)
+    monkeypatch.setattr(review_analysis, "db", connector)
+    monkeypatch.setattr(review_analysis, "sentiment_store", store)
+    monkeypatch.setattr(review_analysis.analyzer, "duplicates", NearDuplicateIndex())
+    app = FastAPI()
+    app.include_router(review_analysis.router)
+
+    conn = sqlite3.connect(path)
+    products = [row[0] for row in conn.execute(
+        "SELECT productId FROM product_reviews GROUP BY productId ORDER BY COUNT(*) DESC LIMIT 5")]
+    conn.close()
+    return TestClient(app), store, products, path
+
+
+def summary(client, product_id):
+    response = client.get(f"/reviews/product/{product_id}/sentiment-summary")
+    assert response.status_code == 200
+    return response.json()
+
+
+def assert_same_summary(actual, expected):
+    assert actual["total_reviews"] == expected["total_reviews"]
+    assert actual["rating_distribution"] == expected["rating_distribution"]
+    for sentiment, share in expected["sentiment_distribution"].items():
+        assert actual["sentiment_distribution"][sentiment] == pytest.approx(share)
+    assert actual["average_quality_score"] == pytest.approx(expected["average_quality_score"])
+
+
+def test_aggregates_match_analysing_every_review(shop):
+    client, store, products, _ = shop
+    expected = {product_id: summary(client, product_id) for product_id in products + ["missing"]}
+    assert not store.ready() and not store.path.exists()
+
+    counts = store.rebuild(review_analysis.sentiment_and_quality)
+
+    assert store.ready() and counts["products"] >= len(products)
+    for product_id in products:
+        assert_same_summary(summary(client, product_id), expected[product_id])
+    assert summary(client, "missing") == expected["missing"]
+
+
+def test_analysed_reviews_update_aggregates_once(shop):
+    client, store, products, _ = shop
+    product_id = products[0]
+    assert not store.record(product_id, "u", 5, "positive", 0.5)
+    store.rebuild(review_analysis.sentiment_and_quality)
+    before = summary(client, product_id)
+
+    review = {"user_id": "new-reviewer", "product_id": product_id, "rating": 5,
+              "text": "Excellent quality, very fresh and tasty"}
+    client.post("/reviews/analyze", json=review)
+    client.post("/reviews/analyze", json=review)
+    after = summary(client, product_id)
+    assert after["total_reviews"] == before["total_reviews"] + 1
+    assert after["rating_distribution"]["5"] == before["rating_distribution"].get("5", 0) + 1
+
+    # An edited review replaces its earlier contribution
+    client.post("/reviews/analyze/batch", json={"reviews": [dict(review, rating=1, text="Rotten, awful waste")]})
+    edited = summary(client, product_id)
+    assert edited["total_reviews"] == after["total_reviews"]
+    assert edited["rating_distribution"].get("5", 0) == before["rating_distribution"].get("5", 0)
+    assert edited["rating_distribution"]["1"] == before["rating_distribution"].get("1", 0) + 1
+    positive = lambda s: s["sentiment_distribution"]["positive"] * s["total_reviews"]
+    assert positive(edited) == pytest.approx(positive(before))
+
+
+def add_review(shop_db, product_id, user_id, rating, comment=None, at=None):
+    """Store a review the way the API does, after every generated one."""
+    at = at or (datetime.now() + timedelta(seconds=1)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(shop_db)
+    conn.execute(
+        "INSERT OR REPLACE INTO product_reviews (id, productId, userId, rating, comment, status, createdAt, updatedAt) "
+        "VALUES (?, ?, ?, ?, ?, 'APPROVED', ?, ?)",
+        (f"r-{product_id}-{user_id}", product_id, user_id, rating, comment, at, at)
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_catch_up_counts_rating_only_reviews_and_edits(shop):
+    client, store, products, shop_db = shop
+    product_id = products[0]
+    store.rebuild(review_analysis.sentiment_and_quality)
+    before = summary(client, product_id)
+    etag = client.get(f"/reviews/product/{product_id}/sentiment-summary").headers["etag"]
+
+    # Never sent to /reviews/analyze: no comment
+    add_review(shop_db, product_id, "rating-only", 2)
+    assert summary(client, product_id)["total_reviews"] == before["total_reviews"]
+    store.interval = 0
+    after = summary(client, product_id)
+    assert after["total_reviews"] == before["total_reviews"] + 1
+    assert after["rating_distribution"]["2"] == before["rating_distribution"].get("2", 0) + 1
+
+    # Reviews read again at the watermark change nothing, so validators hold
+    etag = client.get(f"/reviews/product/{product_id}/sentiment-summary").headers["etag"]
+    store.refresh(review_analysis.sentiment_and_quality)
+    assert client.get(f"/reviews/product/{product_id}/sentiment-summary",
+                      headers={"If-None-Match": etag}).status_code == 304
+
+    add_review(shop_db, product_id, "rating-only", 5,
+               at=(datetime.now() + timedelta(seconds=2)).strftime("%Y-%m-%d %H:%M:%S"))
+    edited = summary(client, product_id)
+    assert edited["total_reviews"] == after["total_reviews"]
+    assert edited["rating_distribution"].get("2", 0) == before["rating_distribution"].get("2", 0)
+
+
+def test_reviews_recorded_by_another_worker_during_rebuild_are_kept(shop):
+    client, store, products, shop_db = shop
+    store.rebuild(review_analysis.sentiment_and_quality)
+    worker = ProductSentimentStore(store.path, store.source)
+    calls = []
+
+    def analyze(text, rating):
+        if not calls:
+            # Stored and analysed by another worker while the rebuild reads the DB
+            add_review(shop_db, "new-product", "u1", 4, "Fresh and tasty")
+            assert worker.record("new-product", "u1", 4, "positive", 0.9)
+        calls.append(text)
+        return review_analysis.sentiment_and_quality(text, rating)
+
+    counts = store.rebuild(analyze)
+
+    assert summary(client, "new-product")["total_reviews"] == 1
+    assert summary(client, "new-product")["rating_distribution"] == {"4": 1}
+    assert store.status()["reviews"] == counts["reviews"] + 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
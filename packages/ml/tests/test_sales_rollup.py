@@ -0,0 +1,164 @@
+"""Tests for the incrementally maintained daily sales rollup."""
+import sqlite3
+import pytest
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.db import DatabaseConnector
+
+TODAY = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def stamp(days_ago: int, minutes: int = 0) -> str:
+    return (TODAY - timedelta(days=days_ago) + timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@pytest.fixture
+def shop_db(tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE products (id TEXT PRIMARY KEY, categoryId TEXT);
+        CREATE TABLE orders (id TEXT PRIMARY KEY, customerId TEXT, status TEXT, createdAt TEXT, updatedAt TEXT);
+        CREATE TABLE order_items (id TEXT PRIMARY KEY, orderId TEXT, productId TEXT, qty INTEGER, unitPrice REAL);
+        INSERT INTO products VALUES ('p1', 'veg'), ('p2', 'veg'), ('p3', 'fruit');
+    """)
+    orders = [
+        ("o1", 3, "DELIVERED", [("p1", 2, 10.0), ("p2", 1, 4.0)]),
+        ("o2", 3, "DELIVERED", [("p1", 1, 8.0)]),
+        ("o3", 2, "CANCELLED", [("p1", 5, 10.0)]),
+        ("o4", 1, "PLACED", [("p3", 4, 2.5)]),
+    ]
+    for order_id, days_ago, status, items in orders:
+        add_order(conn, order_id, days_ago, status, items)
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    monkeypatch.setattr(settings, "ml_store_path", tmp_path / "store" / "ml.db")
+    monkeypatch.setattr(settings, "sales_rollup_interval_seconds", 3600)
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    return path
+
+
+def add_order(conn, order_id, days_ago, status, items, updated_minutes: int = 0):
+    conn.execute("INSERT INTO orders VALUES (?, 'u1', ?, ?, ?)",
+                 (order_id, status, stamp(days_ago), stamp(days_ago, updated_minutes)))
+    for i, (product_id, qty, price) in enumerate(items):
+        conn.execute("INSERT INTO order_items VALUES (?, ?, ?, ?, ?)", (f"{order_id}-{i}", order_id, product_id, qty, price))
+
+
+def write(path, statements):
+    conn = sqlite3.connect(path)
+    for statement, params in statements:
+        conn.execute(statement, params)
+    conn.commit()
+    conn.close()
+
+
+def day(days_ago: int) -> str:
+    return (TODAY - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+
+
+def test_rollup_matches_raw_aggregation(shop_db, monkeypatch):
+    connector = DatabaseConnector()
+    from_rollup = connector.get_product_sales_history("p1")
+    assert connector.sales_rollup.ready()
+
+    monkeypatch.setattr(settings, "sales_rollup_enabled", False)
+    raw = DatabaseConnector().get_product_sales_history("p1")
+
+    assert from_rollup.to_dict("records") == raw.to_dict("records")
+    assert from_rollup.to_dict("records") == [
+        {"date": day(3), "quantity": 3.0, "avg_price": 9.0, "num_orders": 2}
+    ]
+
+
+def test_incremental_refresh_applies_new_and_cancelled_orders(shop_db):
+    connector = DatabaseConnector()
+    connector.sales_rollup.refresh()
+
+    conn = sqlite3.connect(shop_db)
+    add_order(conn, "o5", 0, "PLACED", [("p1", 7, 9.0)], updated_minutes=1)
+    conn.commit()
+    conn.close()
+    # o1 is cancelled an hour later: the day it was placed must shrink
+    write(shop_db, [("UPDATE orders SET status = 'CANCELLED', updatedAt = ? WHERE id = 'o1'", (stamp(0, 60),))])
+
+    result = connector.sales_rollup.refresh()
+    rows = connector.sales_rollup.daily_sales(["p1", "p2"])
+
+    # The watermark is inclusive, so the last order of the build (o4) is seen again
+    assert result["orders"] == 3
+    assert rows[["productId", "day", "qty", "num_orders"]].values.tolist() == [
+        ["p1", day(3), 1.0, 1],
+        ["p1", day(0), 7.0, 1],
+    ]
+
+
+def test_readers_use_rollup_until_refreshed(shop_db):
+    connector = DatabaseConnector()
+    assert len(connector.get_product_sales_history("p3")) == 1
+
+    conn = sqlite3.connect(shop_db)
+    add_order(conn, "o6", 5, "DELIVERED", [("p3", 1, 2.0)], updated_minutes=10 * 24 * 60)
+    conn.commit()
+    conn.close()
+
+    # Fresh within the interval, so the rollup is not re-read from orders
+    assert len(connector.get_product_sales_history("p3")) == 1
+    connector.sales_rollup.refresh()
+    assert len(connector.get_product_sales_history("p3")) == 2
+
+
+def test_category_timeseries_and_price_demand(shop_db):
+    connector = DatabaseConnector()
+
+    series = connector.get_category_sales_timeseries("veg")
+    assert series["y"].tolist() == [4.0]
+
+    demand = connector.get_daily_price_demand("p1")
+    assert demand[["price", "demand", "num_orders"]].values.tolist() == [[9.0, 3.0, 2]]
+
+    features = connector.get_historical_price_demand("p3")
+    assert features.loc[0, "units_sold"] == 4.0
+    assert features.loc[0, "day_of_week"] == int(features.loc[0, "date"].strftime("%w"))
+
+
+def test_full_rebuild_drops_deleted_orders(shop_db):
+    connector = DatabaseConnector()
+    connector.sales_rollup.refresh()
+    write(shop_db, [("DELETE FROM order_items WHERE orderId = 'o4'", ()), ("DELETE FROM orders WHERE id = 'o4'", ())])
+
+    connector.sales_rollup.refresh(full=True)
+
+    assert connector.sales_rollup.daily_sales(["p3"]).empty
+    assert connector.sales_rollup.status()["ready"]
+
+
+def test_reads_reuse_one_connection_per_thread(shop_db, monkeypatch):
+    connector = DatabaseConnector()
+    rollup = connector.sales_rollup
+    rollup.refresh()
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr("app.rollup.sqlite3.connect", lambda *a, **k: opened.append(a) or connect(*a, **k))
+
+    for _ in range(3):
+        assert len(connector.get_product_sales_history("p1")) == 1
+        rollup.product_version("p1")
+    assert opened == []
+
+    thread = threading.Thread(target=rollup.status)
+    thread.start()
+    thread.join()
+    assert len(opened) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,111 @@
+"""Tests for coalescing concurrent identical computations."""
+import asyncio
+import json
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api import price_opt
+from app.schemas import PriceOptimizationRequest
+from app.single_flight import SingleFlight, single_flight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    calls = []
+
+    @single_flight("test-square")
+    def square(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return [x * x]
+
+    async def run():
+        return await asyncio.gather(*[square(3) for _ in range(10)], square(4))
+
+    results = asyncio.run(run())
+
+    assert sorted(calls) == [3, 4]
+    assert results[:10] == [[9]] * 10 and results[10] == [16]
+    # Every caller gets the one result
+    assert all(result is results[0] for result in results[:10])
+    stats = square.flight.stats()
+    assert stats["leaders"] == 2 and stats["coalesced"] == 9 and stats["in_flight"] == 0
+
+    # Finished calls are not cached
+    asyncio.run(run())
+    assert len(calls) == 4
+
+
+def test_exception_is_shared_and_not_kept():
+    flight = SingleFlight("test-failing")
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ValueError("no data")
+
+    async def run():
+        return await asyncio.gather(*[flight.run("k", fail) for _ in range(5)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1 and all(isinstance(e, ValueError) for e in results)
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test-cancel")
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.run("k", compute))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(flight.run("k", compute))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        release.set()
+        return await follower, leader.cancelled()
+
+    assert asyncio.run(run()) == ("done", True)
+    assert flight.in_flight() == 0
+
+
+def test_concurrent_price_optimizations_fit_once(monkeypatch):
+    reads = []
+    history = pd.DataFrame({
+        "price": [8.0, 9.0, 10.0, 11.0, 12.0, 10.0, 9.5],
+        "demand": [30.0, 26.0, 22.0, 17.0, 12.0, 21.0, 24.0],
+    })
+
+    def get_price_demand_data(product_id):
+        reads.append(product_id)
+        time.sleep(0.2)
+        return history
+
+    monkeypatch.setattr(price_opt, "get_price_demand_data", get_price_demand_data)
+
+    async def run():
+        same = [price_opt.optimize_product_price("p1", PriceOptimizationRequest()) for _ in range(8)]
+        other = price_opt.optimize_product_price("p1", PriceOptimizationRequest(num_samples=10))
+        return await asyncio.gather(*same, other)
+
+    responses = [json.loads(response.body) for response in asyncio.run(run())]
+
+    assert reads == ["p1", "p1"]
+    assert len({response["recommended_price"] for response in responses[:8]}) == 1
+    assert len(responses[8]["price_points"]) == 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,36 @@
+"""Tests for lazy router imports and start-up cost."""
+import os
+import subprocess
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import main
+from benchmarks.bench_import_time import measure_import
+
+
+def test_heavy_libraries_not_imported_at_startup():
+    result = measure_import()
+    assert result["heavy_modules"] == []
+
+
+def test_disabled_routers_are_not_imported():
+    code = "import sys, app.main; print(sorted(m for m in sys.modules if m.startswith('app.api.')))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, "ENABLED_ROUTERS": "recommend"},
+        capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip().splitlines()[-1] == "['app.api.recommend']"
+
+
+def test_unknown_router_rejected():
+    with pytest.raises(ValueError, match="Unknown routers"):
+        main.load_routers(["recommend", "nonexistent"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+"""Tests for the chunked readers and the streaming sparse matrix builder."""
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.db import DatabaseConnector
+from app.streaming import CooBuilder, IdEncoder, typed_chunk
+from benchmarks.bench_db_indexes import generate_order_db
+from training.extract import TrainingData, TrainingSnapshot
+
+
+@pytest.fixture
+def shop_db(tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    generate_order_db(path, order_items=2000)
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    monkeypatch.setattr(settings, "sales_rollup_enabled", False)
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    return path
+
+
+def test_id_encoder_codes_are_stable_across_chunks():
+    encoder = IdEncoder(["b"])
+
+    first = encoder.encode(pd.Series(["a", "b", "a"]))
+    second = encoder.encode(["c", None, "a"])
+
+    assert first.dtype == np.int32
+    assert first.tolist() == [1, 0, 1]
+    assert second.tolist() == [2, -1, 1]
+    assert len(encoder) == 3
+    assert encoder.decode([2, 0]).tolist() == ["c", "b"]
+
+
+def test_typed_chunk_encodes_ids_and_narrows_integers():
+    encoder = IdEncoder()
+    chunk = typed_chunk(
+        pd.DataFrame({"user_id": ["u1", "u2"], "quantity": [1, 3], "order_date": ["2024-01-01", "2024-01-02 10:00:00"]}),
+        encoders={"user_id": encoder}, timestamps=("order_date",)
+    )
+
+    assert chunk["user_id"].tolist() == [0, 1]
+    assert chunk["quantity"].dtype == np.int32
+    assert pd.api.types.is_datetime64_any_dtype(chunk["order_date"])
+
+
+def test_coo_builder_sums_duplicates_across_flushes():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "user": rng.integers(0, 30, 1000),
+        "item": rng.integers(0, 20, 1000),
+        "qty": rng.integers(1, 5, 1000),
+    })
+    builder = CooBuilder(buffer_size=64)
+    for start in range(0, len(frame), 50):
+        chunk = frame.iloc[start:start + 50]
+        builder.add(chunk["user"], chunk["item"], chunk["qty"])
+    builder.add([-1, 0], [0, -1], [100, 100])
+
+    matrix = builder.tocsr((40, 20))
+    expected = frame.groupby(["user", "item"])["qty"].sum()
+
+    assert matrix.shape == (40, 20)
+    assert builder.nnz == len(expected)
+    assert matrix[expected.index.get_level_values(0), expected.index.get_level_values(1)].A1.tolist() == \
+        expected.astype(np.float32).tolist()
+
+
+def test_connector_chunks_match_whole_reads(shop_db):
+    connector = DatabaseConnector()
+
+    chunks = list(connector.iter_all_orders(chunksize=300))
+    assert len(chunks) > 1
+    streamed = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(
+        streamed.drop(columns="order_date"),
+        connector.get_all_orders().drop(columns="order_date"),
+        check_dtype=False
+    )
+
+    users = IdEncoder()
+    transactions = pd.concat(connector.iter_transactions(limit=200, chunksize=64, encoders={"user_id": users}))
+    expected = connector.get_transactions(limit=200)
+    assert transactions["user_id"].dtype == np.int32
+    assert users.decode(transactions["user_id"]).tolist() == expected["user_id"].tolist()
+
+    events = pd.concat(connector.iter_events(chunksize=128))
+    assert len(events) == len(connector.get_events())
+    assert "iter_events" in connector.stats.summary()["methods"]
+
+
+def test_streamed_matrix_matches_groupby(shop_db):
+    connector = DatabaseConnector()
+    users, items = IdEncoder(), IdEncoder()
+    builder = CooBuilder(buffer_size=500)
+    for chunk in connector.iter_all_orders(chunksize=256, encoders={"user_id": users, "product_id": items}):
+        builder.add(chunk["user_id"], chunk["product_id"], chunk["quantity"])
+
+    expected = connector.get_all_orders().groupby(["user_id", "product_id"])["quantity"].sum()
+    matrix = builder.tocsr((len(users), len(items)))
+    assert matrix.nnz == len(expected)
+    assert matrix.sum() == pytest.approx(expected.sum())
+
+
+def test_snapshot_streams_extract_and_batches(shop_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "db_chunk_size", 128)
+    snapshot = TrainingSnapshot(tmp_path / "training", source=DatabaseConnector())
+    snapshot.extract()
+
+    items = snapshot.read("order_items")
+    batches = list(snapshot.iter_table("order_items", batch_size=500))
+    assert len(items) == 2000
+    assert len(batches) > 1
+    assert sorted(pd.concat(batches)["id"]) == sorted(items["id"])
+
+    sold = pd.concat(TrainingData(snapshot).iter_sold_items(chunksize=500))
+    assert len(sold) == len(TrainingData(snapshot)._sold_items())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
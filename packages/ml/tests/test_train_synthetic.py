@@ -16,14 +16,14 @@ def make_products(n=5):
 
 
 def test_train_content_based_minimal(monkeypatch, tmp_path):
-    # Provide synthetic products via monkeypatching the db accessor
+    # Provide synthetic products via monkeypatching the training data accessor
     products_df = make_products(n=5)
 
     class FakeDB:
         def get_products(self):
             return products_df
 
-    monkeypatch.setattr(tr, 'db', FakeDB())
+    monkeypatch.setattr(tr, 'load_training_data', lambda: FakeDB())
 
     # Ensure model_dir exists and is isolated for test
     tr.settings.model_dir = tmp_path / "models"
@@ -47,7 +47,7 @@ def test_train_content_based_single_document(monkeypatch, tmp_path):
         def get_products(self):
             return products_df
 
-    monkeypatch.setattr(tr, 'db', FakeDB())
+    monkeypatch.setattr(tr, 'load_training_data', lambda: FakeDB())
 
     tr.settings.model_dir = tmp_path / "models"
     tr.settings.model_dir.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,113 @@
+"""Tests for the columnar training snapshots."""
+import sqlite3
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.db import DatabaseConnector
+from benchmarks.bench_db_indexes import generate_order_db
+from training.extract import TrainingData, TrainingSnapshot
+
+
+@pytest.fixture
+def shop_db(tmp_path, monkeypatch):
+    path = tmp_path / "shop.db"
+    generate_order_db(path, order_items=2000)
+    monkeypatch.setattr(settings, "database_url", f"file:{path}")
+    monkeypatch.setattr(settings, "sales_rollup_enabled", False)
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    return path
+
+
+@pytest.fixture
+def snapshot(shop_db, tmp_path):
+    snapshot = TrainingSnapshot(tmp_path / "training", source=DatabaseConnector())
+    snapshot.extract()
+    return snapshot
+
+
+def execute(path, statements):
+    conn = sqlite3.connect(path)
+    for statement, params in statements:
+        conn.execute(statement, params)
+    conn.commit()
+    conn.close()
+
+
+def now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_tables_are_typed_parquet(snapshot):
+    items = snapshot.read("order_items")
+    orders = snapshot.read("orders")
+
+    assert len(items) == 2000
+    assert items["productId"].dtype == "category"
+    assert orders["status"].dtype == "category"
+    assert pd.api.types.is_datetime64_any_dtype(orders["createdAt"])
+    assert (snapshot.dir / "order_items" / "part-00000.parquet").exists()
+
+
+def test_reads_match_database_connector(snapshot):
+    connector = DatabaseConnector()
+    data = TrainingData(snapshot)
+    product_id = connector.get_top_selling_products(limit=1)[0]
+
+    # The rollup stores quantities as REAL, the raw aggregate as INTEGER
+    same = lambda ours, theirs: pd.testing.assert_frame_equal(ours, theirs, check_dtype=False)
+    same(data.get_sales_timeseries(product_id), connector.get_sales_timeseries(product_id))
+    same(data.get_historical_price_demand(product_id), connector.get_historical_price_demand(product_id))
+    same(data.get_category_sales_timeseries("c0001"), connector.get_category_sales_timeseries("c0001"))
+    assert len(data.get_all_orders()) == len(connector.get_all_orders())
+    assert len(data.get_products()) == len(connector.get_products())
+
+    ours = data.get_transactions(limit=50)
+    theirs = connector.get_transactions(limit=50)
+    assert ours["transaction_id"].tolist() == theirs["transaction_id"].tolist()
+    assert ours["num_items"].tolist() == theirs["num_items"].tolist()
+
+
+def test_incremental_extract_appends_changes_only(snapshot, shop_db):
+    execute(shop_db, [
+        ("INSERT INTO orders VALUES ('onew', 'ORDNEW', 'u00000001', 'u00000000', 9.0, 'PLACED', 'COD', '{}', ?, ?)",
+         (now(), now())),
+        ("INSERT INTO order_items VALUES ('inew', 'onew', 'p00000001', 3, 3.0, ?)", (now(),)),
+        ("UPDATE orders SET status = 'CANCELLED', updatedAt = ? WHERE id = 'o000000000'", (now(),)),
+    ])
+
+    written = snapshot.extract()
+    orders = snapshot.read("orders").set_index("id")
+
+    # The watermark is inclusive, so the rows at the previous watermark come again
+    assert 2 <= written["orders"] < 10
+    assert written["users"] == len(snapshot.read("users"))
+    assert len(snapshot.manifest()["tables"]["orders"]["parts"]) == 2
+    assert orders.loc["o000000000", "status"] == "CANCELLED"
+    assert "inew" in set(snapshot.read("order_items")["id"])
+    assert snapshot.read("order_items")["productId"].dtype == "category"
+
+
+def test_compaction_and_full_extract(snapshot, shop_db, monkeypatch):
+    monkeypatch.setattr(settings, "training_snapshot_max_parts", 1)
+    execute(shop_db, [("UPDATE orders SET updatedAt = ? WHERE id = 'o000000001'", (now(),))])
+
+    snapshot.extract()
+    parts = snapshot.manifest()["tables"]["orders"]["parts"]
+    assert parts == ["part-00002.parquet"]
+    assert [p.name for p in (snapshot.dir / "orders").glob("*.parquet")] == parts
+    assert len(snapshot.read("orders")) == 500
+
+    execute(shop_db, [("DELETE FROM orders WHERE id = 'o000000002'", ())])
+    snapshot.extract(full=True)
+    assert len(snapshot.read("orders")) == 499
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+"""Tests for quantised vector storage."""
+import pytest
+import numpy as np
+import faiss
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.vector_store import (
+    VectorStore,
+    build_index,
+    save_exact_vectors,
+    INDEX_FILENAME,
+)
+from app.api import chat
+
+
+def make_embeddings(n=2000, dimension=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dimension)).astype('float32')
+    vectors = centers[rng.integers(0, 20, size=n)] + 0.5 * rng.normal(size=(n, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def test_int8_rerank_matches_exact_search():
+    vectors = make_embeddings()
+    queries = vectors[:20].copy()
+
+    exact = VectorStore(build_index(vectors, "none"))
+    quantized = VectorStore(build_index(vectors, "int8"), vectors, rerank_candidates=50)
+
+    _, exact_ids = exact.search(queries, 5)
+    scores, ids = quantized.search(queries, 5)
+
+    assert quantized.quantization == "int8"
+    recall = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(exact_ids, ids)])
+    assert recall >= 0.95
+    # Re-ranked scores are exact inner products
+    np.testing.assert_allclose(scores[:, 0], np.sum(vectors[ids[:, 0]] * queries, axis=1), rtol=1e-5)
+
+
+def test_pq_falls_back_to_int8_for_small_corpora():
+    vectors = make_embeddings(n=500)
+    index = build_index(vectors, "pq", pq_subquantizers=8)
+    assert VectorStore(index).quantization == "int8"
+
+
+def test_invalid_quantization():
+    with pytest.raises(ValueError):
+        build_index(make_embeddings(n=10), "float16")
+
+
+def test_load_uses_memory_mapped_exact_vectors(tmp_path):
+    vectors = make_embeddings(n=300)
+    faiss.write_index(build_index(vectors, "int8"), str(tmp_path / INDEX_FILENAME))
+    save_exact_vectors(vectors, tmp_path)
+
+    store = VectorStore.load(tmp_path, rerank_candidates=20)
+
+    assert isinstance(store.exact_vectors, np.memmap)
+    assert store.memory_stats()["index_code_bytes"] < vectors.nbytes
+    _, ids = store.search(vectors[:1], 3)
+    assert ids[0, 0] == 0
+
+
+def test_flat_index_has_no_side_file(tmp_path):
+    vectors = make_embeddings(n=300)
+    save_exact_vectors(vectors, tmp_path)
+    index = build_index(vectors, "none")
+    faiss.write_index(index, str(tmp_path / INDEX_FILENAME))
+
+    # A store rebuilt without quantisation drops the stale side file
+    assert save_exact_vectors(vectors, tmp_path, index) is None
+    assert not any(tmp_path.glob("*.npy"))
+
+    store = VectorStore.load(tmp_path)
+    assert store.exact_vectors is None and store.memory_stats()["rerank_candidates"] == 0
+    _, ids = store.search(vectors[:1], 3)
+    assert ids[0, 0] == 0
+
+
+def test_search_pads_when_fewer_vectors_than_top_k():
+    vectors = make_embeddings(n=3)
+    store = VectorStore(build_index(vectors, "int8"), vectors)
+    _, ids = store.search(vectors[:1], 5)
+    assert list(ids[0, 3:]) == [-1, -1]
+
+
+def test_chat_router_serves_quantized_store(tmp_path, monkeypatch):
+    vectors = make_embeddings(n=300)
+    documents = [{"id": f"p{i}", "text": f"doc {i}"} for i in range(300)]
+
+    class Model:
+        def encode(self, texts, show_progress_bar=False):
+            return vectors[[int(text.split()[1]) for text in texts]] * 3.0
+
+    monkeypatch.setattr(chat, "_store_dir", tmp_path / "products")
+    monkeypatch.setattr(chat, "_embedding_model", Model())
+    monkeypatch.setattr(chat, "_vector_store", None)
+    monkeypatch.setattr(chat, "_faiss_index", None)
+    monkeypatch.setattr(chat, "_documents", [])
+    monkeypatch.setattr(chat.db, "get_product_documents", lambda: documents)
+    monkeypatch.setattr(chat.settings, "vector_quantization", "int8")
+    chat._cache.clear()
+
+    chat.build_vector_index()
+
+    assert isinstance(chat._vector_store.exact_vectors, np.memmap)
+    stats = chat.index_memory()
+    assert stats["quantization"] == "int8" and stats["index_code_bytes"] < vectors.nbytes
+    results = chat.search_documents("doc 7", top_k=3)
+    assert results[0]["id"] == "p7" and results[0]["score"] == pytest.approx(1.0, abs=1e-4)
+
+    # A new process loads the saved store instead of re-encoding
+    monkeypatch.setattr(chat, "_vector_store", None)
+    monkeypatch.setattr(chat.db, "get_product_documents", lambda: [])
+    chat.build_vector_index()
+    assert chat._vector_store.quantization == "int8" and len(chat._documents) == 300
+    chat._cache.clear()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,83 @@
+"""Tests for background model warm-up and the readiness probe."""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import main
+from app.warmup import WarmupRegistry
+
+
+def run_registry(registry):
+    async def runner():
+        registry.start()
+        await registry._runner
+
+    asyncio.run(runner())
+
+
+def test_registry_records_timing_and_memory():
+    registry = WarmupRegistry()
+    registry.register("model_a", lambda: {"loaded": True})
+
+    assert not registry.is_ready()
+    run_registry(registry)
+
+    task = registry.status()["models"]["model_a"]
+    assert registry.is_ready()
+    assert task["status"] == "ready"
+    assert task["details"] == {"loaded": True}
+    assert task["seconds"] is not None
+    assert task["rss_delta_bytes"] is not None
+
+
+def test_optional_failure_does_not_block_readiness():
+    def broken():
+        raise RuntimeError("model missing")
+
+    registry = WarmupRegistry()
+    registry.register("required", lambda: None)
+    registry.register("optional", broken, required=False)
+    run_registry(registry)
+
+    status = registry.status()
+    assert status["ready"]
+    assert status["models"]["optional"]["status"] == "failed"
+    assert status["models"]["optional"]["error"] == "model missing"
+
+
+def test_required_failure_blocks_readiness():
+    def broken():
+        raise RuntimeError("model missing")
+
+    registry = WarmupRegistry()
+    registry.register("required", broken)
+    run_registry(registry)
+
+    assert not registry.is_ready()
+
+
+def test_ready_endpoint(monkeypatch):
+    registry = WarmupRegistry()
+    registry.register("model_a", lambda: None)
+    monkeypatch.setattr(main, "warmup", registry)
+    client = TestClient(main.app)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"
+
+    run_registry(registry)
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["models"]["model_a"]["status"] == "ready"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -6,13 +6,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.config import settings
-from app.db import db
+from app.artifacts import save_recommendation_artifacts, ARTIFACT_DIRNAME
+from training.extract import load_training_data
 import pandas as pd
 import numpy as np
 from scipy.sparse import csr_matrix
 from implicit.als import AlternatingLeastSquares
-import joblib
-import json
 
 def train_als_model():
     """Train ALS model for collaborative filtering."""
@@ -22,8 +21,8 @@ def train_als_model():
     
     try:
         # Get order data
-        print("\nFetching order data from database...")
-        orders = db.get_all_orders()
+        print("\nLoading order data from the training snapshot...")
+        orders = load_training_data().get_all_orders()
         
         if orders.empty:
             print("⚠ No order data found in database")
@@ -31,7 +30,7 @@ def train_als_model():
             print("  Using sample data for demonstration...")
             
             # Create sample data
-            products = db.get_products()
+            products = load_training_data().get_products()
             if products.empty:
                 print("✗ No products found. Cannot train model.")
                 return False
@@ -71,8 +70,6 @@ def train_als_model():
         
         user_to_idx = {user: idx for idx, user in enumerate(unique_users)}
         product_to_idx = {prod: idx for idx, prod in enumerate(unique_products)}
-        idx_to_user = {idx: user for user, idx in user_to_idx.items()}
-        idx_to_product = {idx: prod for prod, idx in product_to_idx.items()}
         
         print(f"✓ Users: {len(unique_users)}")
         print(f"✓ Products: {len(unique_products)}")
@@ -103,30 +100,20 @@ def train_als_model():
             random_state=42
         )
         
-        # Fit model (ALS expects item-user matrix, so transpose)
-        model.fit(user_item_matrix.T)
+        # Fit model (implicit >= 0.5 expects the user-item matrix)
+        model.fit(user_item_matrix)
         
         print("✓ ALS model trained successfully")
         
-        # Save model
-        print("\nSaving model and mappings...")
-        settings.model_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save ALS model
-        joblib.dump(model, settings.model_dir / 'als_model.joblib')
-        print("✓ ALS model saved")
-        
-        # Save mappings
-        mappings = {
-            'user_index': user_to_idx,
-            'item_index': product_to_idx,
-            'index_to_user': idx_to_user,
-            'index_to_item': idx_to_product
-        }
-        
-        with open(settings.model_dir / 'mappings.json', 'w') as f:
-            json.dump(mappings, f, indent=2)
-        print("✓ Mappings saved")
+        # Save model as a new artifact version (TF-IDF is carried over)
+        print("\nSaving model...")
+        version_dir = save_recommendation_artifacts(
+            settings.model_dir / ARTIFACT_DIRNAME,
+            als_model=model,
+            user_ids=list(unique_users),
+            item_ids=list(unique_products)
+        )
+        print(f"✓ ALS model saved to {version_dir}")
         
         # Test the model
         print("\nTesting model...")
@@ -174,7 +161,7 @@ def main():
     print("1. Fetch user-product interaction data")
     print("2. Create user-item matrix")
     print("3. Train ALS collaborative filtering model")
-    print("4. Save model and mappings")
+    print("4. Save model as a new recommendation artifact version")
     print("="*60)
     
     success = train_als_model()
@@ -13,6 +13,7 @@ import re
 
 from app.db import db
 from app.config import settings
+from app.vector_store import build_index, save_exact_vectors, index_quantization
 
 
 def clean_text(text: str) -> str:
@@ -363,22 +364,26 @@ def build_faiss_index(documents: List[Dict], model_name: str = None) -> tuple:
     )
     
     # Normalize embeddings for cosine similarity
+    embeddings = embeddings.astype('float32')
     faiss.normalize_L2(embeddings)
     
     # Build FAISS index
-    print("  Building FAISS index...")
+    print(f"  Building FAISS index (quantization: {settings.vector_quantization})...")
     dimension = embeddings.shape[1]
     
-    # Use IndexFlatIP for inner product (cosine similarity with normalized vectors)
-    index = faiss.IndexFlatIP(dimension)
-    index.add(embeddings)
+    # Inner product over normalized vectors == cosine similarity
+    index = build_index(
+        embeddings,
+        quantization=settings.vector_quantization,
+        pq_subquantizers=settings.vector_pq_subquantizers
+    )
     
     print(f"  ✓ Index built with {index.ntotal} vectors (dimension: {dimension})")
     
     return index, embeddings, model
 
 
-def save_vector_store(index, documents: List[Dict], model_name: str):
+def save_vector_store(index, documents: List[Dict], model_name: str, embeddings: np.ndarray = None):
     """
     Save FAISS index and document mappings.
     
@@ -386,6 +391,8 @@ def save_vector_store(index, documents: List[Dict], model_name: str):
         index: FAISS index
         documents: List of documents
         model_name: Model name used for embeddings
+        embeddings: Exact normalized embeddings, saved as a memory-mapped
+            side file used to re-rank results of a quantized index
     """
     print("\nSaving vector store...")
     
@@ -394,12 +401,19 @@ def save_vector_store(index, documents: List[Dict], model_name: str):
     faiss.write_index(index, str(index_path))
     print(f"  ✓ FAISS index saved to {index_path}")
     
+    # Save exact vectors for re-ranking (a flat index holds them already)
+    if embeddings is not None:
+        vectors_path = save_exact_vectors(embeddings, settings.vector_index_dir, index)
+        if vectors_path is not None:
+            print(f"  ✓ Exact vectors saved to {vectors_path}")
+    
     # Save document mappings
     mappings = {
         'documents': documents,
         'model_name': model_name,
         'total_docs': len(documents),
         'index_dimension': index.d,
+        'quantization': index_quantization(index),
         'created_at': pd.Timestamp.now().isoformat()
     }
     
@@ -419,6 +433,7 @@ def save_vector_store(index, documents: List[Dict], model_name: str):
         'document_types': doc_types,
         'model_name': model_name,
         'index_dimension': index.d,
+        'quantization': index_quantization(index),
         'created_at': pd.Timestamp.now().isoformat()
     }
     
@@ -499,7 +514,7 @@ def main():
     
     # Save vector store
     print("\nStep 3: Saving vector store...")
-    save_vector_store(index, documents, model_name=settings.embedding_model)
+    save_vector_store(index, documents, model_name=settings.embedding_model, embeddings=embeddings)
     
     # Test search
     print("\nStep 4: Testing search...")
@@ -0,0 +1,544 @@
+"""Columnar training snapshots shared by every trainer.
+
+The extract stage reads the training tables from the DB once and stores
+them as Parquet under TRAINING_SNAPSHOT_DIR, one directory of part files
+per table plus a manifest. Foreign keys and low-cardinality columns are
+stored dictionary-encoded (pandas categoricals) and timestamps as
+datetimes.
+
+Orders, order items and events are extracted incrementally: a run fetches
+only the rows at or after each table's watermark (orders.updatedAt for
+orders and their items, createdAt for events) and appends them as a new
+part. Readers keep the latest version of each row, so a status change
+replaces the order. Products and users are small and rewritten every run.
+Hard-deleted rows are only dropped by a full extract.
+
+Trainers call load_training_data(), which extracts when the snapshot is
+missing or older than TRAINING_SNAPSHOT_MAX_AGE_SECONDS and answers the
+DatabaseConnector reads they use from the snapshot. A snapshot directory
+is also a reproducible dataset for benchmarks.
+
+    python training/extract.py [--full] [--dir DIR]
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.config import settings
+from app.rollup import (
+    COLUMNS as DAILY_COLUMNS, price_demand, price_demand_features, sales_history, sales_timeseries
+)
+
+MANIFEST = "manifest.json"
+EXCLUDED_STATUSES = ['CANCELLED', 'REFUNDED']
+
+
+@dataclass(frozen=True)
+class SnapshotTable:
+    """A table of the training snapshot and how it is extracted."""
+    name: str
+    query: str  # "{where}" takes the incremental filter
+    categoricals: Tuple[str, ...] = ()
+    timestamps: Tuple[str, ...] = ()
+    # Result column and SQL expression of the incremental watermark;
+    # tables without one are rewritten on every extract
+    watermark: Optional[str] = None
+    watermark_sql: Optional[str] = None
+    key: str = "id"
+    integers: Tuple[str, ...] = ()
+    floats: Tuple[str, ...] = ()
+    # Every other column is a string
+
+    def columns(self) -> List[str]:
+        """Result columns of the query (its SELECT list uses `AS` or `alias.column`)."""
+        select = self.query.split(" FROM ")[0][len("SELECT "):]
+        return [column.split(" AS ")[-1].split(".")[-1].strip() for column in select.split(",")]
+
+    def schema(self) -> pa.Schema:
+        """Arrow schema of the part files, fixed so every chunk writes the same types."""
+        def arrow_type(column):
+            if column in self.categoricals:
+                return pa.dictionary(pa.int32(), pa.string())
+            if column in self.timestamps:
+                return pa.timestamp('us')
+            if column in self.integers:
+                return pa.int64()
+            if column in self.floats:
+                return pa.float64()
+            return pa.string()
+        return pa.schema([(column, arrow_type(column)) for column in self.columns()])
+
+
+TABLES = [
+    SnapshotTable(
+        "orders",
+        "SELECT id, customerId, farmerId, total, status, paymentMethod, addressSnapshot, createdAt, updatedAt "
+        "FROM orders {where}",
+        categoricals=("customerId", "farmerId", "status", "paymentMethod"),
+        timestamps=("createdAt", "updatedAt"),
+        watermark="updatedAt", watermark_sql="updatedAt",
+        floats=("total",),
+    ),
+    SnapshotTable(
+        "order_items",
+        "SELECT oi.id, oi.orderId, oi.productId, oi.qty, oi.unitPrice, o.updatedAt AS orderUpdatedAt "
+        "FROM order_items oi JOIN orders o ON o.id = oi.orderId {where}",
+        categoricals=("orderId", "productId"),
+        timestamps=("orderUpdatedAt",),
+        watermark="orderUpdatedAt", watermark_sql="o.updatedAt",
+        integers=("qty",), floats=("unitPrice",),
+    ),
+    SnapshotTable(
+        "events",
+        "SELECT id, userId, productId, type, value, createdAt FROM events {where}",
+        categoricals=("userId", "productId", "type"),
+        timestamps=("createdAt",),
+        watermark="createdAt", watermark_sql="createdAt",
+        floats=("value",),
+    ),
+    SnapshotTable(
+        "products",
+        "SELECT p.id, p.name, p.description, p.price, p.unit, p.stockQty, p.ratingAvg, p.ratingCount, "
+        "p.categoryId, p.farmerId, p.status, p.createdAt, c.name AS category "
+        "FROM products p LEFT JOIN categories c ON p.categoryId = c.id",
+        categoricals=("categoryId", "farmerId", "status", "category"),
+        timestamps=("createdAt",),
+        integers=("stockQty", "ratingCount"), floats=("price", "ratingAvg"),
+    ),
+    SnapshotTable(
+        "users",
+        "SELECT id, email, createdAt FROM users",
+        timestamps=("createdAt",),
+    ),
+]
+TABLES_BY_NAME = {table.name: table for table in TABLES}
+
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    # Naive UTC, whether the DB stored offsets or not
+    return pd.to_datetime(values, format='ISO8601', utc=True, errors='coerce').dt.tz_localize(None)
+
+
+def _typed(df: pd.DataFrame, table: SnapshotTable) -> pd.DataFrame:
+    for column in table.categoricals:
+        df[column] = df[column].astype('category')
+    for column in table.timestamps:
+        df[column] = _to_datetime(df[column])
+    return df
+
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    """Categoricals back to objects, as DatabaseConnector returns them."""
+    for column in df.select_dtypes('category').columns:
+        df[column] = df[column].astype(object)
+    return df
+
+
+class TrainingSnapshot:
+    """Parquet part files per table and a manifest of their parts and watermarks."""
+
+    def __init__(self, directory: Optional[Path] = None, source=None):
+        """
+        Args:
+            directory: Snapshot directory (default TRAINING_SNAPSHOT_DIR)
+            source: DatabaseConnector to extract from (default app.db.db)
+        """
+        self.dir = Path(directory or settings.training_snapshot_dir)
+        self._source = source
+
+    @property
+    def source(self):
+        # Imported on first extract, so reading a snapshot never opens the DB
+        if self._source is None:
+            from app.db import db
+            self._source = db
+        return self._source
+
+    def manifest(self) -> Dict[str, Any]:
+        path = self.dir / MANIFEST
+        if not path.exists():
+            return {'extracted_at': None, 'tables': {}}
+        return json.loads(path.read_text())
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        tmp = self.dir / f"{MANIFEST}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, self.dir / MANIFEST)
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last extract, None if there is none."""
+        extracted_at = self.manifest()['extracted_at']
+        return time.time() - extracted_at if extracted_at else None
+
+    def extract(self, full: bool = False) -> Dict[str, int]:
+        """
+        Append the rows changed since each table's watermark.
+
+        Rows are streamed from the DB into the Parquet part chunk by chunk
+        (DB_CHUNK_SIZE rows), so memory does not grow with the table.
+
+        Args:
+            full: Re-extract every table from scratch
+
+        Returns:
+            Rows written per table
+        """
+        start = time.perf_counter()
+        previous = self.manifest()
+        manifest = {'extracted_at': None, 'tables': {}}
+        written = {}
+
+        for table in TABLES:
+            entry = previous['tables'].get(table.name, {'parts': [], 'watermark': None, 'next_part': 0})
+            incremental = not full and table.watermark is not None and entry['watermark'] is not None
+            where = f"WHERE {table.watermark_sql} >= :since" if incremental else ""
+            chunks = self.source.iter_extract_rows(
+                table.query.format(where=where), {'since': entry['watermark']} if incremental else None
+            )
+            next_part = entry['next_part']
+            name, rows, watermark = self._write_part(table, chunks, next_part)
+            written[table.name] = rows
+
+            parts = list(entry['parts']) if incremental else []
+            # Incremental runs with no changes add no part; full runs always
+            # keep one so readers get the columns of an empty table
+            if incremental and rows == 0:
+                (self.dir / table.name / name).unlink()
+            else:
+                parts.append(name)
+                next_part += 1
+            if watermark is None and incremental:
+                watermark = entry['watermark']
+
+            manifest['tables'][table.name] = {
+                'parts': parts, 'watermark': watermark, 'next_part': next_part,
+            }
+            if len(parts) > settings.training_snapshot_max_parts:
+                manifest['tables'][table.name].update(self._compact(table, parts, next_part))
+
+        manifest['extracted_at'] = time.time()
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._write_manifest(manifest)
+        self._remove_unreferenced(manifest)
+
+        total = sum(written.values())
+        print(f"✓ Training snapshot {'extracted' if full or not previous['tables'] else 'updated'}: "
+              f"{total:,} rows in {time.perf_counter() - start:.1f}s "
+              f"({', '.join(f'{name}={n:,}' for name, n in written.items())})")
+        return written
+
+    def _write_part(self, table: SnapshotTable, chunks: Iterable[pd.DataFrame],
+                    number: int) -> Tuple[str, int, Optional[str]]:
+        """Write chunks as one part file; returns its name, row count and max watermark value."""
+        directory = self.dir / table.name
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"part-{number:05d}.parquet"
+        schema = table.schema()
+        rows, watermark = 0, None
+
+        with pq.ParquetWriter(directory / name, schema) as writer:
+            for chunk in chunks:
+                if table.watermark is not None and chunk[table.watermark].notna().any():
+                    # Raw DB value, compared as-is in the next incremental query
+                    chunk_max = chunk[table.watermark].max()
+                    watermark = chunk_max if watermark is None else max(watermark, chunk_max)
+                writer.write_table(pa.Table.from_pandas(_typed(chunk, table), schema=schema, preserve_index=False))
+                rows += len(chunk)
+        return name, rows, watermark
+
+    def _compact(self, table: SnapshotTable, parts: List[str], next_part: int) -> Dict[str, Any]:
+        """Merge a table's parts into one, keeping the latest version of each row."""
+        # The watermark stays the one in the manifest
+        name, _, _ = self._write_part(replace(table, watermark=None), self._iter_parts(table, parts), next_part)
+        return {'parts': [name], 'next_part': next_part + 1}
+
+    def _remove_unreferenced(self, manifest: Dict[str, Any]):
+        for name, entry in manifest['tables'].items():
+            keep = set(entry['parts'])
+            for path in (self.dir / name).glob("part-*.parquet"):
+                if path.name not in keep:
+                    path.unlink()
+
+    def _iter_parts(self, table: SnapshotTable, parts: List[str],
+                    batch_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Batches of a table's parts, newest part first, skipping rows that a
+        newer part replaced. Only the keys of the incremental parts are held
+        in memory, not those of the (large) oldest part.
+        """
+        seen = set()
+        for i, part in enumerate(reversed(parts)):
+            oldest = i == len(parts) - 1
+            parquet = pq.ParquetFile(self.dir / table.name / part)
+            for batch in parquet.iter_batches(batch_size=batch_size or settings.db_chunk_size):
+                df = batch.to_pandas()
+                if seen:
+                    df = df[~df[table.key].isin(seen)]
+                if not oldest:
+                    seen.update(df[table.key])
+                yield df
+
+    def _read_parts(self, table: SnapshotTable, parts: List[str]) -> pd.DataFrame:
+        frames = list(self._iter_parts(table, parts))
+        if not frames:
+            return table.schema().empty_table().to_pandas()
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        # Batches have their own dictionaries; concat falls back to objects
+        for column in table.categoricals:
+            if df[column].dtype != 'category':
+                df[column] = df[column].astype('category')
+        return df.reset_index(drop=True)
+
+    def _parts(self, name: str) -> List[str]:
+        entry = self.manifest()['tables'].get(name)
+        if entry is None:
+            raise FileNotFoundError(f"No '{name}' table in training snapshot {self.dir}")
+        return entry['parts']
+
+    def read(self, name: str) -> pd.DataFrame:
+        """
+        One table of the snapshot.
+
+        Args:
+            name: Table name (see TABLES)
+
+        Returns:
+            DataFrame with the latest version of each row
+        """
+        return self._read_parts(TABLES_BY_NAME[name], self._parts(name))
+
+    def iter_table(self, name: str, batch_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        One table of the snapshot in batches, without loading it whole.
+
+        Args:
+            name: Table name (see TABLES)
+            batch_size: Rows per batch (default DB_CHUNK_SIZE)
+
+        Returns:
+            Iterator of DataFrames with the latest version of each row
+        """
+        return self._iter_parts(TABLES_BY_NAME[name], self._parts(name), batch_size)
+
+
+class TrainingData:
+    """The DatabaseConnector reads used by the trainers, answered from a snapshot."""
+
+    def __init__(self, snapshot: TrainingSnapshot):
+        self.snapshot = snapshot
+        self._tables: Dict[str, pd.DataFrame] = {}
+        self._sold: Optional[pd.DataFrame] = None
+        self._daily: Optional[Dict[str, pd.DataFrame]] = None
+
+    def table(self, name: str) -> pd.DataFrame:
+        if name not in self._tables:
+            self._tables[name] = self.snapshot.read(name)
+        return self._tables[name]
+
+    def _sold_items(self) -> pd.DataFrame:
+        """Order items of orders that were not cancelled or refunded."""
+        if self._sold is None:
+            orders = self.table('orders')
+            orders = orders[~orders['status'].isin(EXCLUDED_STATUSES)]
+            self._sold = self.table('order_items')[['orderId', 'productId', 'qty', 'unitPrice']].merge(
+                orders[['id', 'customerId', 'createdAt']].astype({'id': 'category'}),
+                left_on='orderId', right_on='id'
+            ).drop(columns='id')
+        return self._sold
+
+    def iter_sold_items(self, chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Sold order items in chunks, joined with their order's customer and date.
+
+        Only the orders table is held in memory, not the order items.
+
+        Args:
+            chunksize: Rows per chunk (default DB_CHUNK_SIZE)
+
+        Returns:
+            Iterator of DataFrames with orderId, productId, qty, unitPrice, customerId, createdAt
+        """
+        orders = self.table('orders')
+        orders = orders.loc[~orders['status'].isin(EXCLUDED_STATUSES), ['id', 'customerId', 'createdAt']]
+        for items in self.snapshot.iter_table('order_items', chunksize):
+            yield items[['orderId', 'productId', 'qty', 'unitPrice']].merge(
+                orders, left_on='orderId', right_on='id'
+            ).drop(columns='id')
+
+    def _daily_sales(self, product_ids: List[str], start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> pd.DataFrame:
+        """Daily sales rows (as in the sales rollup) of some products."""
+        if self._daily is None:
+            # One group-by for every product instead of a query per product
+            sold = self._sold_items()
+            daily = sold.assign(
+                day=sold['createdAt'].dt.floor('D'),
+                revenue=sold['qty'] * sold['unitPrice'],
+            ).groupby(['productId', 'day'], observed=True).agg(
+                qty=('qty', 'sum'),
+                revenue=('revenue', 'sum'),
+                avg_price=('unitPrice', 'mean'),
+                num_orders=('orderId', 'nunique'),
+            ).reset_index()
+            daily['productId'] = daily['productId'].astype(str)
+            daily['day'] = daily['day'].dt.strftime('%Y-%m-%d')
+            self._daily = {
+                product_id: rows.reset_index(drop=True)[DAILY_COLUMNS]
+                for product_id, rows in daily.groupby('productId', sort=False)
+            }
+
+        frames = [self._daily[product_id] for product_id in product_ids if product_id in self._daily]
+        if not frames:
+            return pd.DataFrame(columns=DAILY_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        if start:
+            df = df[df['day'] >= start.date().isoformat()]
+        if end:
+            df = df[df['day'] <= end.date().isoformat()]
+        return df.reset_index(drop=True)
+
+    def get_products(self, status: str = "APPROVED") -> pd.DataFrame:
+        products = self.table('products')
+        df = products[products['status'] == status].rename(columns={'name': 'title'})
+        return _plain(df[[
+            'id', 'title', 'description', 'price', 'unit', 'stockQty', 'ratingAvg', 'ratingCount',
+            'categoryId', 'farmerId', 'createdAt', 'category'
+        ]].reset_index(drop=True))
+
+    def get_category_ids(self) -> List[str]:
+        """Distinct category IDs of products (any status)."""
+        return sorted(self.table('products')['categoryId'].dropna().astype(str).unique())
+
+    def get_all_orders(self) -> pd.DataFrame:
+        sold = self._sold_items().sort_values('createdAt', ascending=False, kind='stable')
+        df = sold[['customerId', 'productId', 'qty', 'createdAt']]
+        df.columns = ['user_id', 'product_id', 'quantity', 'order_date']
+        return _plain(df.reset_index(drop=True))
+
+    def get_product_sales_history(self, product_id: str, days: int = 365) -> pd.DataFrame:
+        return sales_history(self._daily_sales([product_id], start=datetime.now() - timedelta(days=days)))
+
+    def get_sales_timeseries(self, product_id: str, start_date: Optional[datetime] = None,
+                             end_date: Optional[datetime] = None) -> pd.DataFrame:
+        return sales_timeseries(self._daily_sales([product_id], start_date, end_date))
+
+    def get_category_sales_timeseries(self, category_id: str, start_date: Optional[datetime] = None,
+                                      end_date: Optional[datetime] = None) -> pd.DataFrame:
+        products = self.table('products')
+        product_ids = products.loc[products['categoryId'] == category_id, 'id'].tolist()
+        return sales_timeseries(self._daily_sales(product_ids, start_date, end_date))
+
+    def get_daily_price_demand(self, product_id: str) -> pd.DataFrame:
+        return price_demand(self._daily_sales([product_id]))
+
+    def get_historical_price_demand(self, product_id: str, days: int = 365) -> pd.DataFrame:
+        return price_demand_features(self._daily_sales([product_id], start=datetime.now() - timedelta(days=days)))
+
+    def get_transactions(self, start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None,
+                         limit: Optional[int] = None) -> pd.DataFrame:
+        orders = self.table('orders')
+        if start_date:
+            orders = orders[orders['createdAt'] >= start_date]
+        if end_date:
+            orders = orders[orders['createdAt'] <= end_date]
+        orders = orders.sort_values('createdAt', ascending=False, kind='stable')
+        if limit:
+            orders = orders.head(limit)
+
+        items = self.table('order_items')
+        items = items[items['orderId'].isin(orders['id'])]
+        per_order = items.groupby('orderId', observed=True).agg(
+            num_items=('id', 'count'),
+            total_quantity=('qty', 'sum'),
+            avg_item_price=('unitPrice', 'mean'),
+            max_item_price=('unitPrice', 'max'),
+            min_item_price=('unitPrice', 'min'),
+        )
+        per_order.index = per_order.index.astype(str)
+
+        df = orders[['id', 'customerId', 'total', 'paymentMethod', 'status', 'createdAt', 'addressSnapshot']]
+        df.columns = ['transaction_id', 'user_id', 'amount', 'payment_method', 'status', 'timestamp',
+                      'shipping_address']
+        df = _plain(df.reset_index(drop=True)).join(per_order, on='transaction_id')
+        df['num_items'] = df['num_items'].fillna(0).astype(int)
+        return df
+
+    def get_transaction_features(self, limit: Optional[int] = None) -> pd.DataFrame:
+        return self.get_transactions(limit=limit)
+
+    def get_user_profiles(self) -> pd.DataFrame:
+        orders = self.table('orders')
+        orders = orders[~orders['status'].isin(EXCLUDED_STATUSES)]
+        per_user = orders.assign(day=orders['createdAt'].dt.floor('D')).groupby('customerId', observed=True).agg(
+            total_orders=('id', 'nunique'),
+            avg_order_amount=('total', 'mean'),
+            # Population standard deviation, like SQL STDDEV
+            stddev_order_amount=('total', lambda totals: totals.std(ddof=0)),
+            max_order_amount=('total', 'max'),
+            min_order_amount=('total', 'min'),
+            total_spent=('total', 'sum'),
+            active_days=('day', 'nunique'),
+        )
+        per_user.index = per_user.index.astype(str)
+
+        users = self.table('users').rename(columns={'id': 'user_id', 'createdAt': 'account_created'})
+        df = users.join(per_user, on='user_id', how='inner').reset_index(drop=True)
+        df['account_age_days'] = (datetime.now() - df['account_created']).dt.days
+        return df
+
+
+_loaded: Optional[TrainingData] = None
+
+
+def load_training_data(extract: Optional[bool] = None) -> TrainingData:
+    """
+    Training data for this process, shared by every trainer it runs.
+
+    Args:
+        extract: Extract first (True) or never (False); by default only
+            when the snapshot is missing or older than
+            TRAINING_SNAPSHOT_MAX_AGE_SECONDS
+
+    Returns:
+        TrainingData over the snapshot
+    """
+    global _loaded
+    snapshot = TrainingSnapshot()
+    if extract is None:
+        age = snapshot.age()
+        extract = age is None or age > settings.training_snapshot_max_age_seconds
+    if extract:
+        snapshot.extract()
+        _loaded = None
+    if _loaded is None:
+        _loaded = TrainingData(snapshot)
+    return _loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--full', action='store_true', help="Re-extract every table from scratch")
+    parser.add_argument('--dir', type=Path, default=None, help="Snapshot directory")
+    args = parser.parse_args()
+
+    snapshot = TrainingSnapshot(args.dir)
+    snapshot.extract(full=args.full)
+    for name, entry in snapshot.manifest()['tables'].items():
+        print(f"  {name}: {len(entry['parts'])} part(s), watermark {entry['watermark']}")
+
+
+if __name__ == "__main__":
+    main()
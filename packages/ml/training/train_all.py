@@ -7,6 +7,7 @@ from train_recs import train_content_based, train_collaborative
 from train_forecast import train_forecast_models
 from train_price import train_price_models
 from train_fraud import train_isolation_forest, train_xgboost_classifier
+from training.extract import load_training_data
 
 
 def main():
@@ -15,6 +16,10 @@ def main():
     print("TRAINING ALL ML MODELS")
     print("=" * 60)
     
+    # Read the DB once; every trainer below uses this snapshot
+    print("\nExtracting training snapshot...")
+    load_training_data(extract=True)
+    
     # Recommendations
     print("\n[1/5] RECOMMENDATION MODELS")
     print("-" * 60)
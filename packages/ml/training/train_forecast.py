@@ -9,7 +9,7 @@ from prophet import Prophet
 import joblib
 import warnings
 
-from app.db import db
+from training.extract import load_training_data
 from app.config import settings
 
 warnings.filterwarnings('ignore')
@@ -20,7 +20,8 @@ def train_forecast_models():
     print("Training forecasting models...")
     
     # Get products with sufficient sales history
-    products_df = db.get_products()
+    data = load_training_data()
+    products_df = data.get_products()
     
     if products_df.empty:
         print("No products found.")
@@ -38,7 +39,7 @@ def train_forecast_models():
         product_name = product['title']
         
         # Get sales history
-        sales_df = db.get_product_sales_history(product_id, days=365)
+        sales_df = data.get_product_sales_history(product_id, days=365)
         
         if sales_df.empty or len(sales_df) < settings.min_history_days:
             print(f"  Skipping {product_name}: insufficient data ({len(sales_df)} days)")
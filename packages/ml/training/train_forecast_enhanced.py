@@ -12,7 +12,7 @@ import json
 import warnings
 from datetime import datetime, timedelta
 
-from app.db import db
+from training.extract import load_training_data
 from app.config import settings
 
 warnings.filterwarnings('ignore')
@@ -153,7 +153,8 @@ def train_product_models(min_history_days: int = 30):
     print("\nTraining per-product forecasting models...")
     
     # Get all products
-    products_df = db.get_products()
+    data = load_training_data()
+    products_df = data.get_products()
     
     if products_df.empty:
         print("No products found!")
@@ -173,7 +174,7 @@ def train_product_models(min_history_days: int = 30):
         product_name = product['title']
         
         # Get sales time series
-        df = db.get_sales_timeseries(product_id)
+        df = data.get_sales_timeseries(product_id)
         
         if df.empty or len(df) < min_history_days:
             print(f"  Skipping {product_name}: insufficient data ({len(df)} days)")
@@ -228,21 +229,19 @@ def train_category_models():
     print("\nTraining category-level aggregate models...")
     
     # Get all categories
-    query = "SELECT DISTINCT categoryId FROM products WHERE categoryId IS NOT NULL"
-    categories = db.execute_query(query)
+    data = load_training_data()
+    category_ids = data.get_category_ids()
     
-    if categories.empty:
+    if not category_ids:
         print("No categories found!")
         return
     
     category_metadata = {}
     models_trained = 0
     
-    for _, row in categories.iterrows():
-        category_id = row['categoryId']
-        
+    for category_id in category_ids:
         # Get category sales time series
-        df = db.get_category_sales_timeseries(category_id)
+        df = data.get_category_sales_timeseries(category_id)
         
         if df.empty or len(df) < settings.min_history_days:
             print(f"  Skipping category {category_id}: insufficient data")
@@ -10,7 +10,7 @@ from sklearn.preprocessing import StandardScaler
 import xgboost as xgb
 import joblib
 
-from app.db import db
+from training.extract import load_training_data
 from app.config import settings
 
 
@@ -75,7 +75,7 @@ def train_isolation_forest():
     print("Training Isolation Forest model...")
     
     # Get transaction data
-    df = db.get_transaction_features(limit=10000)
+    df = load_training_data().get_transaction_features(limit=10000)
     
     if df.empty or len(df) < 100:
         print("Insufficient transaction data.")
@@ -126,7 +126,7 @@ def train_xgboost_classifier():
     print("\nTraining XGBoost classifier...")
     
     # Get transaction data
-    df = db.get_transaction_features(limit=10000)
+    df = load_training_data().get_transaction_features(limit=10000)
     
     if df.empty or len(df) < 100:
         print("Insufficient transaction data.")
@@ -14,7 +14,7 @@ import joblib
 import json
 from datetime import datetime, timedelta
 
-from app.db import db
+from training.extract import load_training_data
 from app.config import settings
 
 
@@ -365,8 +365,9 @@ def main():
     
     # Load data
     print("\nLoading data...")
-    transactions_df = db.get_transactions(limit=10000)
-    user_profiles_df = db.get_user_profiles()
+    data = load_training_data()
+    transactions_df = data.get_transactions(limit=10000)
+    user_profiles_df = data.get_user_profiles()
     
     if transactions_df.empty:
         print("No transactions found!")
@@ -9,7 +9,7 @@ from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import PolynomialFeatures
 import joblib
 
-from app.db import db
+from training.extract import load_training_data
 from app.config import settings
 
 
@@ -18,7 +18,8 @@ def train_price_models():
     print("Training price optimization models...")
     
     # Get products
-    products_df = db.get_products()
+    data = load_training_data()
+    products_df = data.get_products()
     
     if products_df.empty:
         print("No products found.")
@@ -33,20 +34,7 @@ def train_price_models():
         product_name = product['title']
         
         # Get price-demand history
-        query = """
-            SELECT 
-                DATE(o.createdAt) as date,
-                AVG(oi.unitPrice) as price,
-                SUM(oi.qty) as demand
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.orderId
-            WHERE oi.productId = :product_id
-                AND o.status NOT IN ('CANCELLED', 'REFUNDED')
-            GROUP BY DATE(o.createdAt)
-            HAVING price > 0 AND demand > 0
-        """
-        
-        df = db.execute_query(query, {'product_id': product_id})
+        df = data.get_daily_price_demand(product_id)
         
         if df.empty or len(df) < 10:
             continue
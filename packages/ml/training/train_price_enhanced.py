@@ -13,7 +13,7 @@ import joblib
 import json
 from scipy.optimize import minimize_scalar
 
-from app.db import db
+from training.extract import load_training_data
 from app.config import settings
 
 
@@ -227,7 +227,7 @@ def train_price_model(product_id: str) -> dict:
         Dictionary with all model components
     """
     # Get historical data
-    df = db.get_historical_price_demand(product_id, days=365)
+    df = load_training_data().get_historical_price_demand(product_id, days=365)
     
     if df.empty or len(df) < 10:
         return None
@@ -278,7 +278,7 @@ def train_all_products():
     print("\nTraining price optimization models...")
     
     # Get products with sufficient price history
-    products_df = db.get_products()
+    products_df = load_training_data().get_products()
     
     if products_df.empty:
         print("No products found!")
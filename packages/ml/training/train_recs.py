@@ -5,14 +5,13 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
 import numpy as np
-import json
 from sklearn.feature_extraction.text import TfidfVectorizer
 from implicit.als import AlternatingLeastSquares
-from scipy.sparse import csr_matrix
-import joblib
 
-from app.db import db
+from training.extract import load_training_data
 from app.config import settings
+from app.artifacts import save_recommendation_artifacts, ARTIFACT_DIRNAME
+from app.streaming import CooBuilder, IdEncoder
 
 
 def build_user_item_matrix():
@@ -24,43 +23,43 @@ def build_user_item_matrix():
     """
     print("\nBuilding user-item matrix from orders...")
     
-    # Get all orders
-    orders_df = db.get_all_orders()
+    # Stream order items into the sparse matrix, so memory is bounded by the
+    # chunk size and the number of interactions rather than all order items
+    users, items = IdEncoder(), IdEncoder()
+    builder = CooBuilder()
+    num_order_items = 0
+    for chunk in load_training_data().iter_sold_items():
+        num_order_items += len(chunk)
+        # Convert quantity to implicit feedback weight
+        # Higher quantity = stronger preference
+        builder.add(
+            users.encode(chunk['customerId']),
+            items.encode(chunk['productId']),
+            chunk['qty'].clip(upper=10)  # Cap at 10
+        )
     
-    if orders_df.empty:
+    if num_order_items == 0:
         print("No orders found!")
         return None, None, None, None, None
     
-    print(f"Found {len(orders_df)} order items")
-    
-    # Convert quantity to implicit feedback weight
-    # Higher quantity = stronger preference
-    orders_df['weight'] = orders_df['quantity'].apply(lambda x: min(x, 10))  # Cap at 10
+    print(f"Found {num_order_items} order items")
     
-    # Aggregate by user-product pairs
-    interactions = orders_df.groupby(['user_id', 'product_id'])['weight'].sum().reset_index()
+    # Aggregated by user-product pairs; rows and columns in sorted id order
+    user_order = np.argsort(np.asarray(users.ids, dtype=object))
+    item_order = np.argsort(np.asarray(items.ids, dtype=object))
+    sparse_matrix = builder.tocsr((len(users), len(items)))[user_order][:, item_order]
     
-    print(f"Unique users: {interactions['user_id'].nunique()}")
-    print(f"Unique products: {interactions['product_id'].nunique()}")
-    print(f"Total interactions: {len(interactions)}")
+    print(f"Unique users: {len(users)}")
+    print(f"Unique products: {len(items)}")
+    print(f"Total interactions: {sparse_matrix.nnz}")
     
     # Create mappings
-    user_ids = sorted(interactions['user_id'].unique())
-    item_ids = sorted(interactions['product_id'].unique())
+    user_ids = [users.ids[i] for i in user_order]
+    item_ids = [items.ids[i] for i in item_order]
     
     user_index = {uid: idx for idx, uid in enumerate(user_ids)}
     item_index = {pid: idx for idx, pid in enumerate(item_ids)}
     
-    # Build sparse matrix
-    rows = interactions['user_id'].map(user_index).values
-    cols = interactions['product_id'].map(item_index).values
-    data = interactions['weight'].values
-    
-    sparse_matrix = csr_matrix(
-        (data, (rows, cols)),
-        shape=(len(user_ids), len(item_ids))
-    )
-    
     sparsity = 1 - (sparse_matrix.nnz / (sparse_matrix.shape[0] * sparse_matrix.shape[1]))
     print(f"Matrix shape: {sparse_matrix.shape}")
     print(f"Sparsity: {sparsity:.4f}")
@@ -112,7 +111,7 @@ def train_content_based_model():
     print("\nTraining content-based model (TF-IDF)...")
     
     # Get all products
-    products_df = db.get_products()
+    products_df = load_training_data().get_products()
     
     if products_df.empty:
         print("No products found!")
@@ -179,7 +178,7 @@ def train_content_based_model():
 def save_models(als_model, user_index, item_index, user_ids, item_ids, 
                 tfidf_model, tfidf_matrix, products_df):
     """
-    Save all trained models and mappings.
+    Save all trained models and mappings as a new memory-mappable artifact version.
     
     Args:
         als_model: Trained ALS model
@@ -193,43 +192,17 @@ def save_models(als_model, user_index, item_index, user_ids, item_ids,
     """
     print("\nSaving models...")
     
-    # Save ALS model
-    als_path = settings.model_dir / "als_model.joblib"
-    joblib.dump(als_model, als_path)
-    print(f"✓ ALS model saved to {als_path}")
-    
-    # Save TF-IDF model
-    tfidf_path = settings.model_dir / "tfidf.joblib"
-    joblib.dump({
-        'vectorizer': tfidf_model,
-        'matrix': tfidf_matrix,
-        'products': products_df[['id', 'title', 'description', 'category', 'text']]
-    }, tfidf_path)
-    print(f"✓ TF-IDF model saved to {tfidf_path}")
-    
-    # Save mappings as JSON
-    mappings_path = settings.model_dir / "mappings.json"
-    mappings = {
-        'user_index': user_index,
-        'item_index': item_index,
-        'user_ids': user_ids,
-        'item_ids': item_ids,
-        'index_to_user': {str(idx): uid for uid, idx in user_index.items()},
-        'index_to_item': {str(idx): iid for iid, idx in item_index.items()}
-    }
-    
-    with open(mappings_path, 'w') as f:
-        json.dump(mappings, f, indent=2)
-    print(f"✓ Mappings saved to {mappings_path}")
-    
-    # Save user-item matrix for later use
-    matrix_path = settings.model_dir / "user_item_matrix.joblib"
-    joblib.dump({
-        'matrix': None,  # Don't save the full matrix to save space
-        'shape': (len(user_ids), len(item_ids)),
-        'nnz': 0
-    }, matrix_path)
-    print(f"✓ Matrix metadata saved to {matrix_path}")
+    version_dir = save_recommendation_artifacts(
+        settings.model_dir / ARTIFACT_DIRNAME,
+        als_model=als_model,
+        user_ids=user_ids,
+        item_ids=item_ids,
+        tfidf_model=tfidf_model,
+        tfidf_matrix=tfidf_matrix,
+        product_ids=products_df['id'] if products_df is not None else None
+    )
+    print(f"✓ Recommendation artifacts saved to {version_dir}")
+    print(f"  Users: {len(user_ids) if user_ids else 0}, items: {len(item_ids) if item_ids else 0}")
 
 
 def evaluate_models(als_model, user_item_matrix, user_index, item_index):
@@ -314,14 +287,8 @@ def main():
         # Step 5: Evaluate
         evaluate_models(als_model, user_item_matrix, user_index, item_index)
     else:
-        # Save only content-based model
-        tfidf_path = settings.model_dir / "tfidf.joblib"
-        joblib.dump({
-            'vectorizer': tfidf_model,
-            'matrix': tfidf_matrix,
-            'products': products_df[['id', 'title', 'description', 'category', 'text']]
-        }, tfidf_path)
-        print(f"✓ TF-IDF model saved to {tfidf_path}")
+        # Save only content-based model (ALS from the previous version is kept)
+        save_models(None, None, None, None, None, tfidf_model, tfidf_matrix, products_df)
     
     print("\n" + "=" * 70)
     print("TRAINING COMPLETE!")
@@ -343,13 +310,7 @@ def train_content_based():
         print("✗ Cannot train content-based model without product data")
         return
 
-    tfidf_path = settings.model_dir / "tfidf.joblib"
-    joblib.dump({
-        'vectorizer': tfidf_model,
-        'matrix': tfidf_matrix,
-        'products': products_df[['id', 'title', 'description', 'category', 'text']]
-    }, tfidf_path)
-    print(f"✓ TF-IDF model saved to {tfidf_path}")
+    save_models(None, None, None, None, None, tfidf_model, tfidf_matrix, products_df)
 
 
 def train_collaborative():
@@ -366,31 +327,5 @@ def train_collaborative():
 
     als_model = train_als_model(user_item_matrix, factors=64, regularization=0.01, iterations=20)
 
-    # Save ALS model
-    als_path = settings.model_dir / "als_model.joblib"
-    joblib.dump(als_model, als_path)
-    print(f"✓ ALS model saved to {als_path}")
-
-    # Save mappings as JSON
-    mappings_path = settings.model_dir / "mappings.json"
-    mappings = {
-        'user_index': user_index,
-        'item_index': item_index,
-        'user_ids': user_ids,
-        'item_ids': item_ids,
-        'index_to_user': {str(idx): uid for uid, idx in user_index.items()},
-        'index_to_item': {str(idx): iid for iid, idx in item_index.items()}
-    }
-
-    with open(mappings_path, 'w') as f:
-        json.dump(mappings, f, indent=2)
-    print(f"✓ Mappings saved to {mappings_path}")
-
-    # Save matrix metadata
-    matrix_path = settings.model_dir / "user_item_matrix.joblib"
-    joblib.dump({
-        'matrix': None,
-        'shape': (len(user_ids), len(item_ids)),
-        'nnz': user_item_matrix.nnz
-    }, matrix_path)
-    print(f"✓ Matrix metadata saved to {matrix_path}")
+    # Save ALS factors and id mappings (TF-IDF from the previous version is kept)
+    save_models(als_model, user_index, item_index, user_ids, item_ids, None, None, None)